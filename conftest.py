@@ -3,9 +3,22 @@ Pytest fixtures for Enterprise Access tests.
 """
 import pytest
 
+from enterprise_access.apps.api_client.base_oauth import clear_pooled_clients
+
+
 @pytest.fixture(scope='session')
 def celery_config():
     return {
         'broker_url': 'amqp://',
         'result_backend': 'redis://'
     }
+
+
+@pytest.fixture(autouse=True)
+def pooled_api_clients():
+    """
+    API clients are pooled per process, so don't leak them (or mocked versions of them) between tests.
+    """
+    clear_pooled_clients()
+    yield
+    clear_pooled_clients()
@@ -9,6 +9,7 @@ from .content_assignments.assignment_configuration import (
     AssignmentConfigurationUpdateRequestSerializer
 )
 from .subsidy_access_policy import (
+    RedemptionIntentResponseSerializer,
     SubsidyAccessPolicyAllocateRequestSerializer,
     SubsidyAccessPolicyAllocationResponseSerializer,
     SubsidyAccessPolicyCanRedeemElementResponseSerializer,
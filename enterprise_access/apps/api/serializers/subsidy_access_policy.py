@@ -13,7 +13,11 @@ from opaque_keys.edx.keys import CourseKey
 from rest_framework import serializers
 
 from enterprise_access.apps.subsidy_access_policy.constants import CENTS_PER_DOLLAR, PolicyTypes
-from enterprise_access.apps.subsidy_access_policy.models import SubsidyAccessPolicy
+from enterprise_access.apps.subsidy_access_policy.models import (
+    PolicyBalanceSnapshot,
+    RedemptionIntent,
+    SubsidyAccessPolicy
+)
 
 from .content_assignments.assignment import LearnerContentAssignmentResponseSerializer
 
@@ -45,6 +49,9 @@ def policy_pre_write_validation(policy_instance_or_class, field_values_by_name):
 class SubsidyAccessPolicyAggregatesSerializer(serializers.Serializer):
     """
     Response serializer representing aggregates about the policy and related objects.
+
+    The aggregates are served from the policy's balance snapshot while it's fresh (see
+    ``SubsidyAccessPolicy.fresh_balance_snapshot()``), and computed live otherwise.
     """
     amount_redeemed_usd_cents = serializers.SerializerMethodField(
         help_text="Total Amount redeemed for policy, in positive USD cents.",
@@ -63,39 +70,67 @@ class SubsidyAccessPolicyAggregatesSerializer(serializers.Serializer):
             f"Total amount allocated for policies of type {PolicyTypes.ASSIGNED_LEARNER_CREDIT} (0 otherwise), in USD.",
         ),
     )
-    spend_available_usd_cents = serializers.IntegerField(
+    spend_available_usd_cents = serializers.SerializerMethodField(
         help_text="Total Amount of available spend for policy, in positive USD cents.",
-        source="spend_available",
     )
     spend_available_usd = serializers.SerializerMethodField(
         help_text="Total Amount of available spend for policy, in USD.",
     )
 
+    @staticmethod
+    def _balances(policy):
+        """
+        Returns the fresh balance snapshot of the policy, if any, or else the policy itself,
+        both of which have ``total_redeemed``, ``total_allocated`` and ``spend_available``.
+        """
+        return policy.fresh_balance_snapshot() or policy
+
     @extend_schema_field(serializers.IntegerField)
     def get_amount_redeemed_usd_cents(self, policy):
         """
         Make amount a positive number.
         """
-        return policy.total_redeemed * -1
+        return self._balances(policy).total_redeemed * -1
 
     @extend_schema_field(serializers.IntegerField)
     def get_amount_allocated_usd_cents(self, policy):
         """
         Make amount a positive number.
         """
-        return policy.total_allocated * -1
+        return self._balances(policy).total_allocated * -1
+
+    @extend_schema_field(serializers.IntegerField)
+    def get_spend_available_usd_cents(self, policy):
+        return self._balances(policy).spend_available
 
     @extend_schema_field(serializers.FloatField)
     def get_amount_redeemed_usd(self, policy):
-        return float(policy.total_redeemed * -1) / CENTS_PER_DOLLAR
+        return float(self._balances(policy).total_redeemed * -1) / CENTS_PER_DOLLAR
 
     @extend_schema_field(serializers.FloatField)
     def get_amount_allocated_usd(self, policy):
-        return float(policy.total_allocated * -1) / CENTS_PER_DOLLAR
+        return float(self._balances(policy).total_allocated * -1) / CENTS_PER_DOLLAR
 
     @extend_schema_field(serializers.FloatField)
     def get_spend_available_usd(self, policy):
-        return float(policy.spend_available) / CENTS_PER_DOLLAR
+        return float(self._balances(policy).spend_available) / CENTS_PER_DOLLAR
+
+
+class PolicyBalanceSnapshotSerializer(serializers.ModelSerializer):
+    """
+    Response serializer representing the locally materialized balances of a policy, as of some time.
+    """
+    class Meta:
+        model = PolicyBalanceSnapshot
+        fields = [
+            'total_redeemed',
+            'total_allocated',
+            'spend_available',
+            'subsidy_balance',
+            'subsidy_expiration_datetime',
+            'as_of',
+        ]
+        read_only_fields = fields
 
 
 class SubsidyAccessPolicyResponseSerializer(serializers.ModelSerializer):
@@ -107,6 +142,14 @@ class SubsidyAccessPolicyResponseSerializer(serializers.ModelSerializer):
         # This causes the entire unserialized model to be passed into the nested serializer.
         source='*',
     )
+    balance_snapshot = PolicyBalanceSnapshotSerializer(
+        help_text=(
+            'The latest snapshot of the balances of the policy, in USD cents, from which the aggregates are served '
+            'while it is fresh.  Null if the balances were never snapshotted.'
+        ),
+        read_only=True,
+        allow_null=True,
+    )
 
     class Meta:
         model = SubsidyAccessPolicy
@@ -127,6 +170,7 @@ class SubsidyAccessPolicyResponseSerializer(serializers.ModelSerializer):
             'subsidy_expiration_datetime',
             'is_subsidy_active',
             'aggregates',
+            'balance_snapshot',
         ]
         read_only_fields = fields
 
@@ -594,3 +638,46 @@ class SubsidyAccessPolicyAllocationResponseSerializer(serializers.Serializer):
             'learner email(s), and content for this action.'
         ),
     )
+
+
+class RedemptionIntentResponseSerializer(serializers.ModelSerializer):
+    """
+    Response serializer representing an asynchronous redemption of a policy, and its state.
+
+    For views:
+    * SubsidyAccessPolicyRedeemViewset.redeem (asynchronous)
+    * SubsidyAccessPolicyRedeemViewset.redemption_intent
+    """
+    policy_uuid = serializers.UUIDField(source='policy_id', read_only=True)
+    metadata = serializers.JSONField(read_only=True)
+    ledger_transaction = serializers.JSONField(read_only=True)
+    failure_detail = serializers.JSONField(read_only=True)
+    status_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = RedemptionIntent
+        fields = [
+            'uuid',
+            'policy_uuid',
+            'lms_user_id',
+            'content_key',
+            'metadata',
+            'state',
+            'ledger_transaction',
+            'failure_reason',
+            'failure_detail',
+            'created',
+            'modified',
+            'status_url',
+        ]
+        read_only_fields = fields
+
+    def get_status_url(self, obj):
+        """
+        Generate a fully qualified URI that can be polled for the state of the redemption.
+        """
+        location = reverse(
+            'api:v1:policy-redemption-redemption-intent',
+            kwargs={'policy_uuid': obj.policy_id, 'intent_uuid': obj.uuid},
+        )
+        return urljoin(settings.ENTERPRISE_ACCESS_URL, location)
@@ -14,6 +14,7 @@ from enterprise_access.apps.api_client.lms_client import LmsApiClient
 from enterprise_access.apps.core.models import User
 from enterprise_access.apps.events.signals import COUPON_CODE_REQUEST_APPROVED
 from enterprise_access.apps.events.utils import send_coupon_code_request_event_to_event_bus
+from enterprise_access.apps.subsidy_access_policy.lms_api import invalidate_learner_membership_cache
 from enterprise_access.apps.subsidy_request.constants import (
     SUBSIDY_TYPE_CHANGE_DECLINATION,
     SegmentEvents,
@@ -333,3 +334,6 @@ def unlink_users_from_enterprise_task(enterprise_customer_uuid, lms_user_ids):
             user_emails=user_emails,
             is_relinkable=False
         )
+
+    # Don't let cached memberships keep the unlinked users redeeming from the enterprise's policies.
+    invalidate_learner_membership_cache(enterprise_customer_uuid, lms_user_ids)
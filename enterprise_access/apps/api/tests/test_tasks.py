@@ -179,14 +179,16 @@ class TestTasks(APITestWithMocks):
         )
         assert mock_braze_client().send_campaign_message.call_count == 1
 
+    @mock.patch('enterprise_access.apps.api.tasks.invalidate_learner_membership_cache')
     @mock.patch('enterprise_access.apps.api.tasks.LmsApiClient', return_value=mock.MagicMock())
-    def test_unlink_users_from_enterprise_task(self, mock_lms_client):
+    def test_unlink_users_from_enterprise_task(self, mock_lms_client, mock_invalidate_membership):
         unlink_users_from_enterprise_task(self.enterprise_customer_uuid_1, [self.user.lms_user_id])
         mock_lms_client().unlink_users_from_enterprise.assert_called_with(
             enterprise_customer_uuid=self.enterprise_customer_uuid_1,
             user_emails=[self.user.email],
             is_relinkable=False
         )
+        mock_invalidate_membership.assert_called_once_with(self.enterprise_customer_uuid_1, [self.user.lms_user_id])
 
 
 class TestLicenseAssignmentTasks(APITestWithMocks):
@@ -1,6 +1,7 @@
 """
 Tests for Enterprise Access Subsidy Access Policy app API v1 views.
 """
+import json
 from datetime import datetime, timedelta
 from operator import itemgetter
 from unittest import mock
@@ -9,23 +10,36 @@ from uuid import UUID, uuid4
 
 import ddt
 from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from edx_django_utils.cache import RequestCache
 from requests.exceptions import HTTPError
 from rest_framework import status
 from rest_framework.reverse import reverse
 
+from enterprise_access.apps.api.v1.views.subsidy_access_policy import DEGRADED_RESPONSE_HEADER
+from enterprise_access.apps.api_client.circuit_breaker import CircuitBreakerOpen
 from enterprise_access.apps.core.constants import (
     SYSTEM_ENTERPRISE_ADMIN_ROLE,
     SYSTEM_ENTERPRISE_LEARNER_ROLE,
     SYSTEM_ENTERPRISE_OPERATOR_ROLE
 )
+from enterprise_access.apps.events.signals import SUBSIDY_REDEEMED
+from enterprise_access.apps.subsidy_access_policy.api import refresh_policy_balance_snapshots
 from enterprise_access.apps.subsidy_access_policy.constants import (
     REASON_NOT_ENOUGH_VALUE_IN_SUBSIDY,
     AccessMethods,
     MissingSubsidyAccessReasonUserMessages,
     PolicyTypes,
+    RedemptionIntentStateChoices,
     TransactionStateChoices
 )
-from enterprise_access.apps.subsidy_access_policy.models import SubsidyAccessPolicy
+from enterprise_access.apps.subsidy_access_policy.models import (
+    PolicyBalanceSnapshot,
+    RedemptionIntent,
+    SubsidyAccessPolicy
+)
 from enterprise_access.apps.subsidy_access_policy.tests.factories import (
     PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory,
     PerLearnerSpendCapLearnerCreditAccessPolicyFactory
@@ -281,9 +295,112 @@ class TestAuthenticatedPolicyCRUDViews(CRUDViewTestMixin, APITestWithMocks):
                 'amount_allocated_usd': 0.00,
                 'spend_available_usd_cents': 2,
                 'spend_available_usd': 0.02,
-            }
+            },
+            'balance_snapshot': None,
         }, response.json())
 
+    def test_detail_view_balance_snapshot(self):
+        """
+        Test that the detail view includes the balance snapshot of the policy, if any.
+        """
+        self.set_jwt_cookie([{'system_wide_role': SYSTEM_ENTERPRISE_ADMIN_ROLE, 'context': str(self.enterprise_uuid)}])
+        snapshot = refresh_policy_balance_snapshots([self.redeemable_policy])[0]
+
+        request_kwargs = {'uuid': str(self.redeemable_policy.uuid)}
+        response = self.client.get(reverse('api:v1:subsidy-access-policies-detail', kwargs=request_kwargs))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        balance_snapshot = response.json()['balance_snapshot']
+        self.assertEqual(balance_snapshot['total_redeemed'], -1)
+        self.assertEqual(balance_snapshot['total_allocated'], 0)
+        self.assertEqual(balance_snapshot['spend_available'], 2)
+        self.assertEqual(balance_snapshot['subsidy_balance'], snapshot.subsidy_balance)
+        self.assertEqual(parse_datetime(balance_snapshot['as_of']), snapshot.as_of)
+
+    def _get_redeemable_policy_aggregates(self, view_name):
+        """
+        Returns the aggregates of the redeemable policy, as served by the given view, and the policy uuids
+        for which the enterprise-subsidy service was asked for aggregates.
+        """
+        self.set_jwt_cookie([{'system_wide_role': SYSTEM_ENTERPRISE_ADMIN_ROLE, 'context': str(self.enterprise_uuid)}])
+        self.mock_subsidy_client.list_subsidy_transactions.reset_mock()
+        RequestCache.clear_all_namespaces()
+        django_cache.clear()
+        if view_name == 'list':
+            response = self.client.get(
+                reverse('api:v1:subsidy-access-policies-list'),
+                {'enterprise_customer_uuid': str(self.enterprise_uuid)},
+            )
+            policy_json = next(
+                policy for policy in response.json()['results'] if policy['uuid'] == str(self.redeemable_policy.uuid)
+            )
+        else:
+            response = self.client.get(
+                reverse('api:v1:subsidy-access-policies-detail', kwargs={'uuid': str(self.redeemable_policy.uuid)})
+            )
+            policy_json = response.json()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        fetched_policy_uuids = {
+            str(call.kwargs.get('subsidy_access_policy_uuid'))
+            for call in self.mock_subsidy_client.list_subsidy_transactions.call_args_list
+        }
+        return policy_json['aggregates'], fetched_policy_uuids
+
+    def _refresh_and_adjust_balance_snapshot(self, **adjustments):
+        """
+        Refreshes the redeemable policy's balance snapshot, then sets some of its balances to values
+        that differ from the enterprise-subsidy service's, to tell where served aggregates came from.
+        """
+        refresh_policy_balance_snapshots([self.redeemable_policy])
+        PolicyBalanceSnapshot.objects.filter(policy=self.redeemable_policy).update(
+            total_redeemed=-2,
+            spend_available=1,
+            **adjustments,
+        )
+
+    @ddt.data('list', 'detail')
+    def test_aggregates_served_from_fresh_balance_snapshot(self, view_name):
+        """
+        Test that policy responses serve their aggregates from the policy's balance snapshot while it's fresh,
+        without asking the enterprise-subsidy service.
+        """
+        self._refresh_and_adjust_balance_snapshot()
+
+        aggregates, fetched_policy_uuids = self._get_redeemable_policy_aggregates(view_name)
+
+        self.assertEqual(aggregates, {
+            'amount_redeemed_usd_cents': 2,
+            'amount_redeemed_usd': 0.02,
+            'amount_allocated_usd_cents': 0,
+            'amount_allocated_usd': 0.00,
+            'spend_available_usd_cents': 1,
+            'spend_available_usd': 0.01,
+        })
+        self.assertNotIn(str(self.redeemable_policy.uuid), fetched_policy_uuids)
+
+    @ddt.data('list', 'detail')
+    def test_aggregates_recomputed_for_stale_balance_snapshot(self, view_name):
+        """
+        Test that policy responses compute their aggregates from the enterprise-subsidy service once the policy's
+        balance snapshot is older than ``POLICY_BALANCE_SNAPSHOT_MAX_AGE``, even if it was adjusted locally since.
+        """
+        self._refresh_and_adjust_balance_snapshot(
+            as_of=timezone.now() - timedelta(seconds=settings.POLICY_BALANCE_SNAPSHOT_MAX_AGE + 1),
+        )
+        PolicyBalanceSnapshot.record_redemption(self.redeemable_policy, 0)
+
+        aggregates, fetched_policy_uuids = self._get_redeemable_policy_aggregates(view_name)
+
+        self.assertEqual(aggregates, {
+            'amount_redeemed_usd_cents': 1,
+            'amount_redeemed_usd': 0.01,
+            'amount_allocated_usd_cents': 0,
+            'amount_allocated_usd': 0.00,
+            'spend_available_usd_cents': 2,
+            'spend_available_usd': 0.02,
+        })
+        self.assertIn(str(self.redeemable_policy.uuid), fetched_policy_uuids)
+
     @ddt.data(
         # A good admin role, but for a context/customer that doesn't match anything we're aware of, gets you a 403.
         {'system_wide_role': SYSTEM_ENTERPRISE_ADMIN_ROLE, 'context': str(TEST_ENTERPRISE_UUID)},
@@ -332,7 +449,8 @@ class TestAuthenticatedPolicyCRUDViews(CRUDViewTestMixin, APITestWithMocks):
                     'amount_allocated_usd': 0.00,
                     'spend_available_usd_cents': 0,
                     'spend_available_usd': 0.00,
-                }
+                },
+                'balance_snapshot': None,
             },
             {
                 'access_method': 'direct',
@@ -357,7 +475,8 @@ class TestAuthenticatedPolicyCRUDViews(CRUDViewTestMixin, APITestWithMocks):
                     'amount_allocated_usd': 0.00,
                     'spend_available_usd_cents': 2,
                     'spend_available_usd': 0.02,
-                }
+                },
+                'balance_snapshot': None,
             },
         ]
 
@@ -425,7 +544,8 @@ class TestAuthenticatedPolicyCRUDViews(CRUDViewTestMixin, APITestWithMocks):
                 'amount_allocated_usd': 0.00,
                 'spend_available_usd_cents': 2,
                 'spend_available_usd': 0.02,
-            }
+            },
+            'balance_snapshot': None,
         }
         self.assertEqual(expected_response, response.json())
 
@@ -503,7 +623,8 @@ class TestAuthenticatedPolicyCRUDViews(CRUDViewTestMixin, APITestWithMocks):
                 'amount_allocated_usd': 0.00,
                 'spend_available_usd_cents': 4,
                 'spend_available_usd': 0.04,
-            }
+            },
+            'balance_snapshot': None,
         }
         self.assertEqual(expected_response, response.json())
 
@@ -932,6 +1053,18 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
         self.mock_contains_key = contains_key_patcher.start()
         self.mock_contains_key.return_value = True
 
+        bulk_contains_keys_patcher = mock.patch(
+            'enterprise_access.apps.subsidy_access_policy.api.get_and_cache_catalogs_contain_content'
+        )
+        bulk_contains_keys_patcher.start()
+        self.addCleanup(bulk_contains_keys_patcher.stop)
+
+        bulk_metadata_patcher = mock.patch(
+            'enterprise_access.apps.subsidy_access_policy.api.get_and_cache_content_metadata_for_keys'
+        )
+        bulk_metadata_patcher.start()
+        self.addCleanup(bulk_metadata_patcher.stop)
+
         get_content_metadata_patcher = mock.patch(path_prefix + 'get_content_metadata')
         self.mock_get_content_metadata = get_content_metadata_patcher.start()
         self.mock_get_content_metadata.return_value = {}
@@ -946,7 +1079,7 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
         self.addCleanup(contains_key_patcher.stop)
         self.addCleanup(get_content_metadata_patcher.stop)
 
-    @mock.patch('enterprise_access.apps.subsidy_access_policy.models.get_and_cache_transactions_for_learner')
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
     def test_redeem_policy(self, mock_transactions_cache_for_learner):  # pylint: disable=unused-argument
         """
         Verify that SubsidyAccessPolicyRedeemViewset redeem endpoint works as expected
@@ -968,7 +1101,9 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
 
         response_json = self.load_json(response.content)
         assert response_json == mock_transaction_record
-        self.mock_get_content_metadata.assert_called_once_with(payload['content_key'])
+        # Twice for can_redeem()'s predicates, once for the spend reservation (request-cached outside of tests).
+        self.mock_get_content_metadata.assert_called_with(payload['content_key'])
+        self.assertEqual(self.mock_get_content_metadata.call_count, 3)
         self.redeemable_policy.subsidy_client.create_subsidy_transaction.assert_called_once_with(
             subsidy_uuid=str(self.redeemable_policy.subsidy_uuid),
             lms_user_id=payload['lms_user_id'],
@@ -984,7 +1119,132 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
             ),
         )
 
-    @mock.patch('enterprise_access.apps.subsidy_access_policy.models.get_and_cache_transactions_for_learner')
+    def test_redeem_policy_locked(self):
+        """
+        Verify that a redemption which can't acquire its lock responds with a 429 that tells clients when to retry.
+        """
+        payload = {
+            'lms_user_id': 1234,
+            'content_key': 'course-v1:edX+edXPrivacy101+3T2020',
+        }
+        lock_kwargs = self.redeemable_policy.redemption_lock_kwargs(payload['lms_user_id'], payload['content_key'])
+        self.redeemable_policy.acquire_lock(**lock_kwargs)
+
+        response = self.client.post(self.subsidy_access_policy_redeem_endpoint, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], str(settings.POLICY_LOCKED_RETRY_AFTER))
+        self.redeemable_policy.subsidy_client.create_subsidy_transaction.assert_not_called()
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
+    def test_redeem_policy_subsidy_service_unavailable(
+        self, mock_transactions_cache_for_learner,
+    ):  # pylint: disable=unused-argument
+        """
+        Verify that a redemption fails fast with a 503 while the subsidy service's circuit breaker is open,
+        and is never based on last-known subsidy data.
+        """
+        self.mock_get_content_metadata.return_value = {'content_price': 123}
+        self.redeemable_policy.subsidy_client.can_redeem.side_effect = CircuitBreakerOpen('enterprise-subsidy', 12)
+        payload = {
+            'lms_user_id': 1234,
+            'content_key': 'course-v1:edX+edXPrivacy101+3T2020',
+        }
+
+        response = self.client.post(self.subsidy_access_policy_redeem_endpoint, payload)
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '12')
+        self.assertNotIn(DEGRADED_RESPONSE_HEADER, response)
+        self.redeemable_policy.subsidy_client.create_subsidy_transaction.assert_not_called()
+
+    @mock.patch(
+        'enterprise_access.apps.subsidy_access_policy.redemption_api.send_subsidy_redemption_event_to_event_bus'
+    )
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
+    def test_redeem_policy_async(
+        self, mock_transactions_cache_for_learner, mock_send_event,
+    ):  # pylint: disable=unused-argument
+        """
+        Verify that a redemption with a ``Prefer: respond-async`` header is accepted with a 202, and processed
+        asynchronously, and that its status URL reports the resulting transaction.
+        """
+        self.mock_get_content_metadata.return_value = {'content_price': 123}
+        mock_transaction_record = {
+            'uuid': str(uuid4()),
+            'state': TransactionStateChoices.COMMITTED,
+        }
+        self.redeemable_policy.subsidy_client.create_subsidy_transaction.side_effect = None
+        self.redeemable_policy.subsidy_client.create_subsidy_transaction.return_value = mock_transaction_record
+        payload = {
+            'lms_user_id': 1234,
+            'content_key': 'course-v1:edX+edXPrivacy101+3T2020',
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.subsidy_access_policy_redeem_endpoint, payload, HTTP_PREFER='respond-async',
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response['Preference-Applied'], 'respond-async')
+        response_json = self.load_json(response.content)
+        self.assertEqual(response_json['state'], RedemptionIntentStateChoices.QUEUED)
+        self.assertEqual(response_json['policy_uuid'], str(self.redeemable_policy.uuid))
+        status_url = reverse(
+            'api:v1:policy-redemption-redemption-intent',
+            kwargs={'policy_uuid': self.redeemable_policy.uuid, 'intent_uuid': response_json['uuid']},
+        )
+        self.assertTrue(response['Location'].endswith(status_url))
+        self.redeemable_policy.subsidy_client.create_subsidy_transaction.assert_called_once()
+        mock_send_event.assert_called_once_with(
+            SUBSIDY_REDEEMED.event_type,
+            {'lms_user_id': payload['lms_user_id'], 'content_key': payload['content_key'], 'metadata': None},
+        )
+
+        status_response = self.client.get(status_url)
+
+        self.assertEqual(status_response.status_code, status.HTTP_200_OK)
+        status_json = self.load_json(status_response.content)
+        self.assertEqual(status_json['state'], RedemptionIntentStateChoices.REDEEMED)
+        self.assertEqual(status_json['ledger_transaction'], mock_transaction_record)
+
+    @mock.patch('enterprise_access.apps.api.v1.views.subsidy_access_policy.LmsApiClient')
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
+    def test_redeem_policy_async_not_redeemable(
+        self, mock_transactions_cache_for_learner, mock_lms_client,
+    ):  # pylint: disable=unused-argument
+        """
+        Verify that an asynchronous redemption is refused right away if the policy isn't redeemable.
+        """
+        mock_lms_client.return_value.get_enterprise_customer_data.return_value = {'admin_users': []}
+        self.mock_get_content_metadata.return_value = {'content_price': 123}
+        self.mock_contains_key.return_value = False
+        payload = {
+            'lms_user_id': 1234,
+            'content_key': 'course-v1:edX+edXPrivacy101+3T2020',
+        }
+
+        response = self.client.post(self.subsidy_access_policy_redeem_endpoint, payload, HTTP_PREFER='respond-async')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertFalse(RedemptionIntent.objects.exists())
+        self.redeemable_policy.subsidy_client.create_subsidy_transaction.assert_not_called()
+
+    def test_redemption_intent_not_found(self):
+        """
+        Verify that the status of an unknown asynchronous redemption is a 404.
+        """
+        status_url = reverse(
+            'api:v1:policy-redemption-redemption-intent',
+            kwargs={'policy_uuid': self.redeemable_policy.uuid, 'intent_uuid': uuid4()},
+        )
+
+        response = self.client.get(status_url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
     def test_redeem_policy_with_metadata(self, mock_transactions_cache_for_learner):  # pylint: disable=unused-argument
         """
         Verify that SubsidyAccessPolicyRedeemViewset redeem endpoint works as expected
@@ -1009,7 +1269,9 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
 
         response_json = self.load_json(response.content)
         assert response_json == mock_transaction_record
-        self.mock_get_content_metadata.assert_called_once_with(payload['content_key'])
+        # Twice for can_redeem()'s predicates, once for the spend reservation (request-cached outside of tests).
+        self.mock_get_content_metadata.assert_called_with(payload['content_key'])
+        self.assertEqual(self.mock_get_content_metadata.call_count, 3)
         self.redeemable_policy.subsidy_client.create_subsidy_transaction.assert_called_once_with(
             subsidy_uuid=str(self.redeemable_policy.subsidy_uuid),
             lms_user_id=payload['lms_user_id'],
@@ -1025,7 +1287,7 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
             ),
         )
 
-    @mock.patch('enterprise_access.apps.subsidy_access_policy.models.get_and_cache_transactions_for_learner')
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
     @ddt.data(
         {
             "existing_transaction_state": None,
@@ -1123,7 +1385,7 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
         else:
             assert new_idempotency_key_sent == baseline_idempotency_key
 
-    @mock.patch('enterprise_access.apps.subsidy_access_policy.models.get_and_cache_transactions_for_learner')
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
     @mock.patch('enterprise_access.apps.subsidy_access_policy.models.SubsidyAccessPolicy.subsidy_record')
     @ddt.data(
         {
@@ -1233,7 +1495,7 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
             ],
             'aggregates': {
                 'total_quantity': mock_total_quantity_transactions,
-            }
+            },
         }
         mock_subsidy_record.return_value = {
             'uuid': str(uuid4()),
@@ -1276,6 +1538,55 @@ class TestSubsidyAccessPolicyRedeemViewset(APITestWithMocks):
             # with an inactive (i.e., expired, not yet started) subsidy, we should get no records back.
             assert len(response_json) == 0
 
+    @ddt.data(
+        {'is_staff': True, 'headers': {'HTTP_X_EVALUATION_TRACE': 'true'}, 'query_params': {}, 'expect_trace': True},
+        {'is_staff': True, 'headers': {}, 'query_params': {'evaluation_trace': '1'}, 'expect_trace': True},
+        {'is_staff': True, 'headers': {}, 'query_params': {}, 'expect_trace': False},
+        {'is_staff': False, 'headers': {'HTTP_X_EVALUATION_TRACE': 'true'}, 'query_params': {}, 'expect_trace': False},
+    )
+    @ddt.unpack
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
+    @mock.patch('enterprise_access.apps.api.v1.views.subsidy_access_policy.logger')
+    def test_credits_available_evaluation_trace(
+        self, mock_logger, mock_transactions_cache_for_learner, is_staff, headers, query_params, expect_trace,
+    ):
+        """
+        Verify that staff can opt in to logging a trace of each policy's checks, and of the tier each fact was
+        served from.
+        """
+        self.user.is_staff = is_staff
+        self.user.save()
+        self.set_jwt_cookie([{'system_wide_role': SYSTEM_ENTERPRISE_LEARNER_ROLE, 'context': self.enterprise_uuid}])
+        self.subsidy_client.retrieve_subsidy.return_value = {'is_active': True, 'current_balance': '5000'}
+        mock_transactions_cache_for_learner.return_value = {'transactions': [], 'aggregates': {}}
+
+        query_params = {'enterprise_customer_uuid': self.enterprise_uuid, 'lms_user_id': 1234, **query_params}
+        response = self.client.get(self.subsidy_access_policy_credits_available_endpoint, query_params, **headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        trace_log_calls = [
+            call for call in mock_logger.info.call_args_list if call.args[0] == '[evaluation_trace] %s'
+        ]
+        if not expect_trace:
+            assert not trace_log_calls
+            return
+
+        assert len(trace_log_calls) == 1
+        trace = json.loads(trace_log_calls[0].args[1])
+        assert trace['action'] == 'credits_available'
+        assert trace['status_code'] == status.HTTP_200_OK
+        [policy_trace] = trace['policies']
+        assert policy_trace['policy_uuid'] == str(self.redeemable_policy.uuid)
+        [step] = policy_trace['steps']
+        assert step['check'] == 'credit_available'
+        assert step['holds'] is True
+        assert step['elapsed_ms'] >= 0
+        lookups = [(lookup['resource'], lookup['tier']) for lookup in step['lookups']]
+        assert ('learner_membership', 'upstream') in lookups
+        # The subsidy record is fetched once, then read from the request cache.
+        assert lookups.count(('subsidy_record', 'upstream')) == 1
+        assert ('subsidy_record', 'request') in lookups
+
 
 @ddt.ddt
 class TestSubsidyAccessPolicyCanRedeemView(APITestWithMocks):
@@ -1332,6 +1643,24 @@ class TestSubsidyAccessPolicyCanRedeemView(APITestWithMocks):
         self.mock_contains_key = contains_key_patcher.start()
         self.mock_contains_key.return_value = True
 
+        bulk_contains_keys_patcher = mock.patch(
+            'enterprise_access.apps.subsidy_access_policy.api.get_and_cache_catalogs_contain_content'
+        )
+        bulk_contains_keys_patcher.start()
+        self.addCleanup(bulk_contains_keys_patcher.stop)
+
+        bulk_metadata_patcher = mock.patch(
+            'enterprise_access.apps.subsidy_access_policy.api.get_and_cache_content_metadata_for_keys'
+        )
+        bulk_metadata_patcher.start()
+        self.addCleanup(bulk_metadata_patcher.stop)
+
+        view_bulk_metadata_patcher = mock.patch(
+            'enterprise_access.apps.api.v1.views.subsidy_access_policy.get_and_cache_content_metadata_for_keys'
+        )
+        view_bulk_metadata_patcher.start()
+        self.addCleanup(view_bulk_metadata_patcher.stop)
+
         get_content_metadata_patcher = mock.patch(path_prefix + 'get_content_metadata')
         self.mock_get_content_metadata = get_content_metadata_patcher.start()
         self.mock_get_content_metadata.return_value = {}
@@ -1746,6 +2075,52 @@ class TestSubsidyAccessPolicyCanRedeemView(APITestWithMocks):
             'detail': f'Could not determine price for content_key: {test_content_key}',
         }
 
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_versioned_subsidy_client')
+    def test_can_redeem_degraded_response(self, mock_get_client):
+        """
+        Test that, while the subsidy service's circuit breaker is open, the can_redeem endpoint
+        responds from last-known subsidy data, and marks its response as degraded.
+        """
+        query_params = {'content_key': 'course-v1:demox+1234+2T2023'}
+        mock_client = mock_get_client.return_value
+        mock_client.list_subsidy_transactions.return_value = {'results': [], 'next': None}
+        self.mock_get_content_metadata.return_value = {'content_price': 29900}
+
+        with mock.patch(
+            'enterprise_access.apps.api.v1.views.subsidy_access_policy.get_and_cache_content_metadata',
+            return_value={'content_price': 29900},
+        ):
+            response = self.client.get(self.subsidy_access_policy_can_redeem_endpoint, query_params)
+
+            assert response.status_code == status.HTTP_200_OK
+            assert DEGRADED_RESPONSE_HEADER not in response
+            live_response_json = response.json()
+            assert live_response_json[0]['can_redeem']
+
+            mock_client.list_subsidy_transactions.side_effect = CircuitBreakerOpen('enterprise-subsidy', 12)
+            self.redeemable_policy.subsidy_client.can_redeem.side_effect = CircuitBreakerOpen('enterprise-subsidy', 12)
+
+            response = self.client.get(self.subsidy_access_policy_can_redeem_endpoint, query_params)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response[DEGRADED_RESPONSE_HEADER] == 'enterprise-subsidy'
+        assert response.json() == live_response_json
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_versioned_subsidy_client')
+    def test_can_redeem_subsidy_service_unavailable(self, mock_get_client):
+        """
+        Test that, while the subsidy service's circuit breaker is open and there is no last-known
+        subsidy data to fall back on, the can_redeem endpoint fails fast with a 503.
+        """
+        query_params = {'content_key': 'course-v1:demox+1234+2T2023'}
+        mock_client = mock_get_client.return_value
+        mock_client.list_subsidy_transactions.side_effect = CircuitBreakerOpen('enterprise-subsidy', 12)
+
+        response = self.client.get(self.subsidy_access_policy_can_redeem_endpoint, query_params)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response['Retry-After'] == '12'
+
     @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_versioned_subsidy_client')
     def test_can_redeem_subsidy_client_http_error(self, mock_get_client):
         """
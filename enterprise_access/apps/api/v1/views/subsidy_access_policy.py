@@ -1,9 +1,9 @@
 """
 REST API views for the subsidy_access_policy app.
 """
+import json
 import logging
 import os
-from collections import defaultdict
 from contextlib import suppress
 
 import requests
@@ -24,6 +24,7 @@ from rest_framework.response import Response
 
 from enterprise_access.apps.api import filters, serializers, utils
 from enterprise_access.apps.api.mixins import UserDetailsFromJwtMixin
+from enterprise_access.apps.api_client.circuit_breaker import CircuitBreakerOpen
 from enterprise_access.apps.api_client.lms_client import LmsApiClient
 from enterprise_access.apps.content_assignments.api import AllocationException
 from enterprise_access.apps.core.constants import (
@@ -34,6 +35,8 @@ from enterprise_access.apps.core.constants import (
 )
 from enterprise_access.apps.events.signals import SUBSIDY_REDEEMED
 from enterprise_access.apps.events.utils import send_subsidy_redemption_event_to_event_bus
+from enterprise_access.apps.subsidy_access_policy import api as policy_api
+from enterprise_access.apps.subsidy_access_policy import redemption_api
 from enterprise_access.apps.subsidy_access_policy.constants import (
     REASON_CONTENT_NOT_IN_CATALOG,
     REASON_LEARNER_MAX_ENROLLMENTS_REACHED,
@@ -46,13 +49,31 @@ from enterprise_access.apps.subsidy_access_policy.constants import (
     MissingSubsidyAccessReasonUserMessages,
     TransactionStateChoices
 )
-from enterprise_access.apps.subsidy_access_policy.content_metadata_api import get_and_cache_content_metadata
-from enterprise_access.apps.subsidy_access_policy.exceptions import ContentPriceNullException, SubsidyAPIHTTPError
+from enterprise_access.apps.subsidy_access_policy.content_metadata_api import (
+    get_and_cache_content_metadata,
+    get_and_cache_content_metadata_for_keys
+)
+from enterprise_access.apps.subsidy_access_policy.evaluation_trace import (
+    get_evaluation_trace,
+    start_evaluation_trace,
+    traced_step
+)
+from enterprise_access.apps.subsidy_access_policy.exceptions import (
+    ContentPriceNullException,
+    SubsidyAccessPolicyEvaluationTimeout,
+    SubsidyAccessPolicySpendReservationFailed,
+    SubsidyAPIHTTPError
+)
 from enterprise_access.apps.subsidy_access_policy.models import (
+    RedemptionIntent,
     SubsidyAccessPolicy,
     SubsidyAccessPolicyLockAttemptFailed
 )
-from enterprise_access.apps.subsidy_access_policy.subsidy_api import get_redemptions_by_content_and_policy_for_learner
+from enterprise_access.apps.subsidy_access_policy.subsidy_api import (
+    allow_degraded_responses,
+    get_redemptions_by_content_and_policy_for_learner,
+    is_degraded_response
+)
 
 from .utils import PaginationWithPageCount
 
@@ -62,6 +83,18 @@ SUBSIDY_ACCESS_POLICY_CRUD_API_TAG = 'Subsidy Access Policies CRUD'
 SUBSIDY_ACCESS_POLICY_REDEMPTION_API_TAG = 'Subsidy Access Policy Redemption'
 SUBSIDY_ACCESS_POLICY_ALLOCATION_API_TAG = 'Subsidy Access Policy Allocation'
 
+# Set on responses built (partly) from last-known subsidy data, while the subsidy service is unavailable.
+DEGRADED_RESPONSE_HEADER = 'X-Degraded-Response'
+
+# Staff may opt a request in to logging an evaluation trace of its policies, with either of these.
+EVALUATION_TRACE_HEADER = 'X-Evaluation-Trace'
+EVALUATION_TRACE_QUERY_PARAM = 'evaluation_trace'
+EVALUATION_TRACE_ACTIONS = ('can_redeem', 'credits_available', 'redeem')
+
+# Clients opt a redemption in to being processed asynchronously with this preference (RFC 7240).
+PREFER_HEADER = 'Prefer'
+RESPOND_ASYNC_PREFERENCE = 'respond-async'
+
 
 def policy_permission_detail_fn(request, *args, uuid=None, **kwargs):
     """
@@ -178,9 +211,9 @@ class SubsidyAccessPolicyViewSet(
 
     def get_queryset(self):
         """
-        A base queryset to list or retrieve `SubsidyAccessPolicy` records.
+        A base queryset to list or retrieve `SubsidyAccessPolicy` records, along with their balance snapshots.
         """
-        return SubsidyAccessPolicy.objects.all()
+        return SubsidyAccessPolicy.objects.select_related('balance_snapshot')
 
     def get_serializer_class(self):
         """
@@ -193,6 +226,18 @@ class SubsidyAccessPolicyViewSet(
             return serializers.SubsidyAccessPolicyUpdateRequestSerializer
         return self.serializer_class
 
+    def paginate_queryset(self, queryset):
+        """
+        Prefetches the aggregates of each policy in the page that has no fresh balance snapshot
+        to serve them from, so that serializing the page doesn't make remote calls and queries per policy.
+        """
+        page = super().paginate_queryset(queryset)
+        if page is not None and self.action == 'list':
+            policy_api.prefetch_policy_aggregates(
+                [policy for policy in page if policy.fresh_balance_snapshot() is None]
+            )
+        return page
+
     @extend_schema(
         tags=[SUBSIDY_ACCESS_POLICY_CRUD_API_TAG],
         summary='Retrieve subsidy access policy by UUID.',
@@ -324,11 +369,37 @@ class SubsidyAccessPolicyLockedException(APIException):
 
     See: https://developer.mozilla.org/en-US/docs/Web/HTTP/Status/423
 
-    HTTP 429 Too Many Requests is the next best thing, and implies retryability.
+    HTTP 429 Too Many Requests is the next best thing, and implies retryability.  Like DRF's ``Throttled``,
+    the ``wait`` attribute makes the response carry a ``Retry-After`` header, so that clients back off.
     """
     status_code = status.HTTP_429_TOO_MANY_REQUESTS
     default_detail = 'Enrollment currently locked for this subsidy access policy.'
 
+    def __init__(self, detail=None, code=None):
+        super().__init__(detail, code)
+        self.wait = settings.POLICY_LOCKED_RETRY_AFTER
+
+
+class PolicyEvaluationTimeoutException(APIException):
+    """
+    Throw this exception when the concurrent evaluation of policies did not complete within the configured deadline.
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Evaluation of subsidy access policies timed out.'
+
+
+class SubsidyServiceUnavailableException(APIException):
+    """
+    Throw this exception when calls to the enterprise-subsidy service fail fast, because its circuit breaker is open.
+    The ``wait`` attribute makes the response carry a ``Retry-After`` header, for when the breaker lets calls through.
+    """
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The enterprise-subsidy service is currently unavailable.'
+
+    def __init__(self, detail=None, code=None, wait=None):
+        super().__init__(detail, code)
+        self.wait = wait
+
 
 class AllocationRequestException(APIException):
     status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -353,7 +424,7 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
         if self.action in ('list', 'redemption', 'credits_available'):
             enterprise_uuid = self.request.query_params.get('enterprise_customer_uuid')
 
-        if self.action == 'redeem':
+        if self.action in ('redeem', 'redemption_intent'):
             policy_uuid = self.kwargs.get('policy_uuid')
             with suppress(ValidationError):  # Ignore if `policy_uuid` is not a valid uuid
                 policy = SubsidyAccessPolicy.objects.filter(uuid=policy_uuid).first()
@@ -371,6 +442,50 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
         """
         return self.enterprise_customer_uuid
 
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in EVALUATION_TRACE_ACTIONS and self.is_evaluation_trace_requested(request):
+            start_evaluation_trace()
+
+    @staticmethod
+    def is_evaluation_trace_requested(request):
+        """
+        Returns true if a staff user asked for an evaluation trace of this request,
+        via the ``X-Evaluation-Trace`` header or the ``evaluation_trace`` query parameter.
+        """
+        requested = (
+            request.headers.get(EVALUATION_TRACE_HEADER) or request.query_params.get(EVALUATION_TRACE_QUERY_PARAM)
+        )
+        return bool(requested) and requested.lower() in ('1', 'true') and request.user.is_staff
+
+    @staticmethod
+    def is_async_redemption_requested(request):
+        """
+        Returns true if the client asked for its redemption to be processed asynchronously,
+        via the ``Prefer: respond-async`` header.
+        """
+        preferences = request.headers.get(PREFER_HEADER, '').split(',')
+        return any(preference.strip().lower() == RESPOND_ASYNC_PREFERENCE for preference in preferences)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, CircuitBreakerOpen):
+            logger.warning(f'{exc} when handling {self.action} for {self.enterprise_customer_uuid}')
+            exc = SubsidyServiceUnavailableException(wait=exc.retry_after)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if is_degraded_response():
+            response[DEGRADED_RESPONSE_HEADER] = 'enterprise-subsidy'
+        if trace := get_evaluation_trace():
+            logger.info('[evaluation_trace] %s', json.dumps({
+                'action': self.action,
+                'enterprise_customer_uuid': str(self.enterprise_customer_uuid),
+                'status_code': response.status_code,
+                **trace.as_dict(),
+            }))
+        return response
+
     def get_queryset(self):
         """
         Base queryset that returns all active policies associated
@@ -381,13 +496,14 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
             active=True,
         ).order_by('-created')
 
-    def evaluate_policies(self, enterprise_customer_uuid, lms_user_id, content_key):
+    def evaluate_policies(self, enterprise_customer_uuid, lms_user_id, content_key, policies=None):
         """
         Evaluate all policies for the given enterprise customer to check if it can be redeemed against the given learner
         and content.
 
-        Note: Calling this will cause multiple backend API calls to the enterprise-subsidy can_redeem endpoint, one for
-        each access policy evaluated.
+        Note: Unless the redeemability facts have already been prefetched for this content_key (see
+        ``policy_api.prefetch_redeemability_facts()``), calling this will cause backend API calls to the
+        enterprise-subsidy can_redeem endpoint, one for each subsidy related to the access policies evaluated.
 
         Returns:
             tuple of (list of SubsidyAccessPolicy, dict mapping str -> list of SubsidyAccessPolicy): The first tuple
@@ -395,43 +511,31 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
             non-redeemable policies.  The reason strings are non-specific, short explanations for why each bucket of
             policies has been deemed non-redeemable.
         """
-        redeemable_policies = []
-        non_redeemable_policies = defaultdict(list)
-        all_policies_for_enterprise = self.get_queryset()
-        for policy in all_policies_for_enterprise:
-            try:
-                redeemable, reason, _ = policy.can_redeem(lms_user_id, content_key, skip_customer_user_check=True)
-                logger.info(
-                    f'[can_redeem] {policy} inputs: (lms_user_id={lms_user_id}, content_key={content_key}) results: '
-                    f'redeemable={redeemable}, reason={reason}.'
-                )
-            except ContentPriceNullException as exc:
-                logger.warning(f'{exc} when checking can_redeem() for {enterprise_customer_uuid}')
-                raise RedemptionRequestException(
-                    detail=f'Could not determine price for content_key: {content_key}',
-                ) from exc
-            if redeemable:
-                redeemable_policies.append(policy)
-            else:
-                # Aggregate the reasons for policies not being redeemable.  This really only works if the reason string
-                # is short and generic because the bucketing logic simply treats entire string as the bucket key.
-                non_redeemable_policies[reason].append(policy)
-
-        return (redeemable_policies, non_redeemable_policies)
+        if policies is None:
+            policies = self.get_queryset()
+        try:
+            return policy_api.evaluate_policies_for_content_key(policies, lms_user_id, content_key)
+        except ContentPriceNullException as exc:
+            logger.warning(f'{exc} when checking can_redeem() for {enterprise_customer_uuid}')
+            raise RedemptionRequestException(
+                detail=f'Could not determine price for content_key: {content_key}',
+            ) from exc
+        except SubsidyAccessPolicyEvaluationTimeout as exc:
+            logger.warning(f'{exc} when checking can_redeem() for {enterprise_customer_uuid}')
+            raise PolicyEvaluationTimeoutException() from exc
 
     def policies_with_credit_available(self, enterprise_customer_uuid, lms_user_id):
         """
         Return policies with credit availble, associated with the given customer, and redeemable by the given learner.
         """
-        policies = []
         all_policies_for_enterprise = self.get_queryset().filter(
             enterprise_customer_uuid=enterprise_customer_uuid
         )
-        for policy in all_policies_for_enterprise:
-            if policy.credit_available(lms_user_id):
-                policies.append(policy)
-
-        return policies
+        try:
+            return policy_api.policies_with_credit_available(all_policies_for_enterprise, lms_user_id)
+        except SubsidyAccessPolicyEvaluationTimeout as exc:
+            logger.warning(f'{exc} when checking credit_available() for {enterprise_customer_uuid}')
+            raise PolicyEvaluationTimeoutException() from exc
 
     @extend_schema(
         tags=[SUBSIDY_ACCESS_POLICY_REDEMPTION_API_TAG],
@@ -444,7 +548,11 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
         """
         Return a list of all redeemable policies for given `enterprise_customer_uuid`, `lms_user_id` that have
         redeemable credit available.
+
+        While the enterprise-subsidy service is unavailable, the response may be built from last-known subsidy
+        data, in which case it carries an ``X-Degraded-Response`` header.
         """
+        allow_degraded_responses()
         serializer = serializers.SubsidyAccessPolicyCreditsAvailableRequestSerializer(data=request.query_params)
         serializer.is_valid(raise_exception=True)
 
@@ -479,6 +587,10 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
             403: The requester has insufficient redeem permissions.
             422: The subsidy access policy is not redeemable in a way that IS NOT retryable.
             429: The subsidy access policy is not redeemable in a way that IS retryable (e.g. policy currently locked).
+            503: The enterprise-subsidy service is currently unavailable, retry after the ``Retry-After`` header.
+            202: With a ``Prefer: respond-async`` request header, the redemption was accepted, to be processed
+                 asynchronously.  Response body is JSON with a serialized RedemptionIntent, whose ``status_url``
+                 (also the ``Location`` header) can be polled for its state and, once redeemed, its Transaction.
             200: The policy was successfully redeemed.  Response body is JSON with a serialized Transaction
                  containing the following keys (sample values):
                  {
@@ -506,15 +618,21 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
         lms_user_id = serializer.data['lms_user_id']
         content_key = serializer.data['content_key']
         metadata = serializer.data.get('metadata')
+        if self.is_async_redemption_requested(request):
+            return self.redeem_async(policy, lms_user_id, content_key, metadata)
         try:
-            # For now, we should lock the whole policy (i.e. pass nothing to policy.lock()).  In some cases this is more
-            # aggressive than necessary, but we can optimize for performance at a later phase of this project.  At that
-            # point, we should also consider migrating this logic into the policy model so that different policy types
-            # that have different locking needs can supply different lock kwargs.
-            with policy.lock():
+            # Only lock what the policy type's per-learner checks need (see redemption_lock_kwargs()), and protect
+            # the policy-wide spend limit with a spend reservation, so that unrelated learners can redeem in parallel.
+            with policy.redemption_lock(lms_user_id, content_key) as lock_id:
                 can_redeem, reason, existing_transactions = policy.can_redeem(lms_user_id, content_key)
                 if can_redeem:
-                    redemption_result = policy.redeem(lms_user_id, content_key, existing_transactions, metadata)
+                    # can_redeem() may have taken a while, so make sure we still hold the lock for the redemption.
+                    policy.renew_redemption_lock(lock_id, lms_user_id, content_key)
+                    with policy.reserve_spend(policy.get_content_price(content_key)):
+                        with traced_step(policy.uuid, 'create_transaction'):
+                            redemption_result = policy.redeem(
+                                lms_user_id, content_key, existing_transactions, metadata,
+                            )
                     send_subsidy_redemption_event_to_event_bus(
                         SUBSIDY_REDEEMED.event_type,
                         serializer.data
@@ -527,7 +645,7 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
                             {reason: [policy]}
                         )
                     )
-        except SubsidyAccessPolicyLockAttemptFailed as exc:
+        except (SubsidyAccessPolicyLockAttemptFailed, SubsidyAccessPolicySpendReservationFailed) as exc:
             logger.exception(exc)
             raise SubsidyAccessPolicyLockedException() from exc
         except SubsidyAPIHTTPError as exc:
@@ -538,6 +656,54 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
                 detail=error_payload,
             ) from exc
 
+    def redeem_async(self, policy, lms_user_id, content_key, metadata):
+        """
+        Accepts a redemption of the given policy, to be processed asynchronously (see the ``redemption_api`` module),
+        and responds with the accepted RedemptionIntent.
+        """
+        try:
+            accepted, reason, intent = redemption_api.accept_redemption(policy, lms_user_id, content_key, metadata)
+        except (SubsidyAccessPolicyLockAttemptFailed, SubsidyAccessPolicySpendReservationFailed) as exc:
+            logger.exception(exc)
+            raise SubsidyAccessPolicyLockedException() from exc
+        if not accepted:
+            raise RedemptionRequestException(
+                detail=_get_reasons_for_no_redeemable_policies(
+                    policy.enterprise_customer_uuid,
+                    {reason: [policy]}
+                )
+            )
+        response_data = serializers.RedemptionIntentResponseSerializer(intent).data
+        return Response(
+            response_data,
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': response_data['status_url'], 'Preference-Applied': RESPOND_ASYNC_PREFERENCE},
+        )
+
+    @extend_schema(
+        tags=[SUBSIDY_ACCESS_POLICY_REDEMPTION_API_TAG],
+        summary='Retrieve an asynchronous redemption of a policy.',
+        responses={
+            status.HTTP_200_OK: serializers.RedemptionIntentResponseSerializer,
+            status.HTTP_404_NOT_FOUND: None,
+        },
+    )
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='redemption-intents/(?P<intent_uuid>[^/.]+)',
+        url_name='redemption-intent',
+    )
+    def redemption_intent(self, request, *args, intent_uuid=None, **kwargs):
+        """
+        Retrieve the state of an asynchronous redemption of a policy, i.e. one that was requested
+        with a ``Prefer: respond-async`` header.  Its ``state`` is one of ``queued``, ``redeemed``
+        (along with the ``ledger_transaction``) or ``failed`` (along with a ``failure_reason``).
+        """
+        intent = get_object_or_404(RedemptionIntent, policy_id=kwargs.get('policy_uuid'), uuid=intent_uuid)
+        response_serializer = serializers.RedemptionIntentResponseSerializer(intent)
+        return Response(response_serializer.data, status=status.HTTP_200_OK)
+
     def get_existing_redemptions(self, policies, lms_user_id):
         """
         Returns a mapping of content keys to a mapping of policy uuids to lists of transactions
@@ -553,6 +719,9 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
             raise RedemptionRequestException(
                 detail=error_payload,
             ) from exc
+        except SubsidyAccessPolicyEvaluationTimeout as exc:
+            logger.warning(f'{exc} when fetching redemptions from subsidy API')
+            raise PolicyEvaluationTimeoutException() from exc
 
         for content_key, transactions_by_policy in redemptions_map.items():
             for _, redemptions in transactions_by_policy.items():
@@ -601,8 +770,14 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
 
                 200: If a redeemable access policy was found, an existing redemption was found, or neither.  Response
                      body is a JSON list of dict containing redemption evaluations for each given content_key.  See
-                     redoc for a sample response.
+                     redoc for a sample response.  If the enterprise-subsidy service is unavailable, the evaluations
+                     may be based on last-known subsidy data, in which case the response carries an
+                     ``X-Degraded-Response`` header.
+
+                503: If the enterprise-subsidy service is unavailable, and there's no last-known subsidy data to
+                     fall back on.  The response carries a ``Retry-After`` header.
         """
+        allow_degraded_responses()
         serializer = serializers.SubsidyAccessPolicyCanRedeemRequestSerializer(data=request.query_params)
         serializer.is_valid(raise_exception=True)
 
@@ -619,19 +794,15 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
         if not policies_for_customer:
             raise NotFound(detail='No active policies for this customer')
 
-        redemptions_by_content_and_policy = self.get_existing_redemptions(
-            policies_for_customer,
-            lms_user_id
-        )
+        with traced_step(None, 'existing_redemptions'):
+            redemptions_by_content_and_policy = self.get_existing_redemptions(
+                policies_for_customer,
+                lms_user_id
+            )
 
-        element_responses = []
+        redemptions_by_content_key = {}
+        has_successful_redemption_by_content_key = {}
         for content_key in content_keys:
-            reasons = []
-            redeemable_policies = []
-            non_redeemable_policies = []
-            resolved_policy = None
-            list_price = None
-
             redemptions_by_policy_uuid = redemptions_by_content_and_policy[content_key]
             # Flatten dict of lists because the response doesn't need to be bucketed by policy_uuid.
             redemptions = [
@@ -639,11 +810,12 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
                 for redemptions in redemptions_by_policy_uuid.values()
                 for redemption in redemptions
             ]
+            redemptions_by_content_key[content_key] = redemptions
 
             # Determine if the learner has already redeemed the requested content_key.  Just because a transaction has
             # state='committed' doesn't mean it counts as a successful redemption; it must also NOT have a committed
             # reversal.
-            has_successful_redemption = any(
+            has_successful_redemption_by_content_key[content_key] = any(
                 redemption['state'] == TransactionStateChoices.COMMITTED and (
                     not redemption['reversal'] or
                     redemption['reversal'].get('state') != TransactionStateChoices.COMMITTED
@@ -651,12 +823,45 @@ class SubsidyAccessPolicyRedeemViewset(UserDetailsFromJwtMixin, PermissionRequir
                 for redemption in redemptions
             )
 
+        # Gather every remote fact needed to evaluate the whole (policy x content_key) matrix in bulk, up front,
+        # only for content keys without existing successful redemptions.
+        try:
+            with traced_step(None, 'prefetch_redeemability_facts'):
+                policy_api.prefetch_redeemability_facts(
+                    policies_for_customer,
+                    lms_user_id,
+                    [key for key in content_keys if not has_successful_redemption_by_content_key[key]],
+                )
+        except SubsidyAccessPolicyEvaluationTimeout as exc:
+            logger.warning(f'{exc} when prefetching can_redeem() facts for {enterprise_customer_uuid}')
+            raise PolicyEvaluationTimeoutException() from exc
+
+        # Content with a successful redemption always displays a list price, so fetch its metadata in bulk.
+        # On failure, _get_list_price() falls back to fetching (and handling errors) per content key.
+        try:
+            get_and_cache_content_metadata_for_keys(
+                enterprise_customer_uuid,
+                [key for key in content_keys if has_successful_redemption_by_content_key[key]],
+            )
+        except requests.exceptions.HTTPError as exc:
+            logger.warning(f'{exc} when prefetching content metadata for {enterprise_customer_uuid}')
+
+        element_responses = []
+        for content_key in content_keys:
+            reasons = []
+            redeemable_policies = []
+            non_redeemable_policies = []
+            resolved_policy = None
+            list_price = None
+            redemptions = redemptions_by_content_key[content_key]
+            has_successful_redemption = has_successful_redemption_by_content_key[content_key]
+
             # Of all policies for this customer, determine which are redeemable and which are not.
             # But, only do this if there are no existing successful redemptions,
             # so we don't unnecessarily call `can_redeem()` on every policy.
             if not has_successful_redemption:
                 redeemable_policies, non_redeemable_policies = self.evaluate_policies(
-                    enterprise_customer_uuid, lms_user_id, content_key
+                    enterprise_customer_uuid, lms_user_id, content_key, policies=policies_for_customer,
                 )
 
             if not redemptions and not redeemable_policies:
@@ -0,0 +1,54 @@
+"""
+Asyncio-native counterparts of the API clients, for the hot read paths.
+
+Each async client wraps a (pooled) synchronous client, and runs its blocking ``requests`` calls
+on asgiref's executor, so that many upstream calls can be awaited concurrently, e.g. via ``asyncio.gather()``,
+over the same keep-alive connection pool that synchronous callers use (see ``base_oauth``).
+"""
+from asgiref.sync import sync_to_async
+
+from enterprise_access.apps.api_client.enterprise_catalog_client import EnterpriseCatalogApiClient
+from enterprise_access.apps.api_client.lms_client import LmsApiClient
+
+
+class BaseAsyncClient:
+    """
+    Base class for async clients, which delegate to a synchronous client.
+    """
+
+    def __init__(self, sync_client):
+        self.sync_client = sync_client
+
+    async def _call(self, method_name, *args, **kwargs):
+        """
+        Awaits the named method of the synchronous client, without blocking the event loop.
+        """
+        method = getattr(self.sync_client, method_name)
+        return await sync_to_async(method, thread_sensitive=False)(*args, **kwargs)
+
+
+class AsyncLmsApiClient(BaseAsyncClient):
+    """
+    Async API client for calls to the LMS service.
+    """
+
+    def __init__(self, sync_client=None):
+        super().__init__(sync_client or LmsApiClient())
+
+    async def enterprise_contains_learner(self, enterprise_customer_uuid, learner_id):
+        return await self._call('enterprise_contains_learner', enterprise_customer_uuid, learner_id)
+
+    async def get_enterprise_admin_users(self, enterprise_customer_uuid):
+        return await self._call('get_enterprise_admin_users', enterprise_customer_uuid)
+
+
+class AsyncEnterpriseCatalogApiClient(BaseAsyncClient):
+    """
+    Async API client for calls to the enterprise catalog service.
+    """
+
+    def __init__(self, sync_client=None):
+        super().__init__(sync_client or EnterpriseCatalogApiClient())
+
+    async def contains_content_items(self, catalog_uuid, content_ids):
+        return await self._call('contains_content_items', catalog_uuid, content_ids)
@@ -2,12 +2,82 @@
 base API client
 """
 import logging
+import os
+import threading
 
 from django.conf import settings
 from edx_rest_api_client.client import OAuthAPIClient
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+# Process-wide registry of API clients, so that every caller in this process
+# shares one keep-alive connection pool per upstream service.
+_client_registry = {}
+_client_registry_lock = threading.RLock()
+
+
+def _reset_client_registry_after_fork():
+    """
+    Connection pools (and locks held by other threads) must not be shared with forked
+    processes, e.g. celery prefork workers, so a child starts with an empty registry.
+    """
+    global _client_registry_lock  # pylint: disable=global-statement
+    _client_registry.clear()
+    _client_registry_lock = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_client_registry_after_fork)
+
+
+def get_or_create_pooled_client(key, factory):
+    """
+    Returns the process-wide client registered under ``key``, calling ``factory()`` to create it on first use.
+    The returned client is shared across threads, so it must not hold any per-request state.
+    """
+    client = _client_registry.get(key)
+    if client is not None:
+        return client
+    with _client_registry_lock:
+        client = _client_registry.get(key)
+        if client is None:
+            client = _client_registry[key] = factory()
+    return client
+
+
+def clear_pooled_clients():
+    """
+    Closes and forgets all pooled clients, e.g. between tests.
+    """
+    with _client_registry_lock:
+        clients = list(_client_registry.values())
+        _client_registry.clear()
+    for client in clients:
+        close = getattr(client, 'close', None)
+        if callable(close):
+            close()
+
+
+def get_pooled_oauth_api_client(base_url, client_id, client_secret):
+    """
+    Returns the process-wide ``OAuthAPIClient`` for the given OAuth2 provider and credentials.
+
+    The client is a ``requests.Session``, so sharing it keeps connections alive across calls
+    instead of paying for a new TCP/TLS handshake on every request. Its JWT access token
+    is already cached (via TieredCache) by ``edx_rest_api_client``, until shortly before it expires.
+    """
+    def _create_client():
+        client = OAuthAPIClient(base_url, client_id, client_secret)
+        adapter = HTTPAdapter(
+            pool_connections=settings.API_CLIENT_POOL_CONNECTIONS,
+            pool_maxsize=settings.API_CLIENT_POOL_MAXSIZE,
+        )
+        client.mount('http://', adapter)
+        client.mount('https://', adapter)
+        return client
+
+    return get_or_create_pooled_client(('oauth_api_client', base_url, client_id), _create_client)
+
 
 class BaseOAuthClient:
     """
@@ -15,7 +85,7 @@ class BaseOAuthClient:
     """
 
     def __init__(self):
-        self.client = OAuthAPIClient(
+        self.client = get_pooled_oauth_api_client(
             settings.SOCIAL_AUTH_EDX_OAUTH2_URL_ROOT.strip('/'),
             self.oauth2_client_id,
             self.oauth2_client_secret
@@ -0,0 +1,189 @@
+"""
+Circuit breakers for calls to upstream services.
+
+While an upstream service is failing or slow, a circuit breaker fails calls to it fast, instead of
+letting every request block on it until it times out and exhausting our workers.  The state of each breaker
+is kept in the django cache, so that all workers and processes trip (and recover) together.
+
+A breaker is *closed* while calls go through as usual.  It *opens* (trips) when, within a window of
+``CIRCUIT_BREAKER_WINDOW_SECONDS``, at least ``CIRCUIT_BREAKER_MINIMUM_CALLS`` calls were made, and at least
+``CIRCUIT_BREAKER_FAILURE_RATE`` of them failed, where calls that raised, returned a server error, or took
+longer than ``CIRCUIT_BREAKER_SLOW_CALL_SECONDS`` count as failures.  Slowness only counts against idempotent
+requests, though: a non-idempotent request that succeeded slowly, e.g. a redemption's transaction creation, which
+includes an enrollment, did what it should, and tripping on it would refuse the next redemptions.
+An open breaker raises ``CircuitBreakerOpen``
+without calling the service.  After ``CIRCUIT_BREAKER_OPEN_SECONDS``, the breaker is *half-open*: a single
+probe call is let through, which closes the breaker if it succeeds, or re-opens it otherwise.
+"""
+import logging
+import math
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from edx_django_utils.cache.utils import get_cache_key
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_BREAKER_RESOURCE_NAME = 'circuit_breaker'
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half-open'
+
+# HTTP methods whose requests only count as failures by being slow, see ``CircuitBreakerAdapter``.
+IDEMPOTENT_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE', 'TRACE'))
+
+
+class CircuitBreakerOpen(requests.exceptions.ConnectionError):
+    """
+    Raised instead of calling an upstream service whose circuit breaker is open.
+    ``retry_after`` is the number of seconds until the breaker lets a probe call through.
+    """
+    def __init__(self, name, retry_after):
+        super().__init__(f'Circuit breaker for {name} is open, retry after {retry_after} seconds.')
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker whose state is shared, via the django cache, by every process that uses the same ``name``.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def _cache_key(self, *parts):
+        return get_cache_key(resource=CIRCUIT_BREAKER_RESOURCE_NAME, name=self.name, parts=parts)
+
+    @property
+    def _reopen_at_key(self):
+        """ Present (until the breaker is half-open) while the breaker is open. """
+        return self._cache_key('reopen-at')
+
+    @property
+    def _tripped_key(self):
+        """ Present while the breaker is open or half-open. """
+        return self._cache_key('tripped')
+
+    @property
+    def _probe_key(self):
+        """ Present while a half-open breaker's probe call is in flight. """
+        return self._cache_key('probe')
+
+    def _window_keys(self):
+        window = int(time.time() // settings.CIRCUIT_BREAKER_WINDOW_SECONDS)
+        return self._cache_key('calls', window), self._cache_key('failures', window)
+
+    def state(self):
+        """
+        Returns the current state of the breaker, one of ``STATE_CLOSED``, ``STATE_OPEN`` or ``STATE_HALF_OPEN``.
+        """
+        return self._state(django_cache.get_many([self._reopen_at_key, self._tripped_key]))
+
+    def _state(self, cached_state):
+        """ Returns the state of the breaker, given the result of ``get_many()`` of its state keys. """
+        if self._reopen_at_key in cached_state:
+            return STATE_OPEN
+        if self._tripped_key in cached_state:
+            return STATE_HALF_OPEN
+        return STATE_CLOSED
+
+    def _before_call(self):
+        """
+        Raises ``CircuitBreakerOpen`` if the call may not go through, otherwise returns whether it's a probe call.
+        """
+        cached_state = django_cache.get_many([self._reopen_at_key, self._tripped_key])
+        state = self._state(cached_state)
+        if state == STATE_CLOSED:
+            return False
+        if state == STATE_HALF_OPEN and django_cache.add(self._probe_key, True, settings.CIRCUIT_BREAKER_OPEN_SECONDS):
+            logger.info('Circuit breaker for %s is half-open, letting a probe call through.', self.name)
+            return True
+        retry_after = cached_state.get(self._reopen_at_key, time.time()) - time.time()
+        raise CircuitBreakerOpen(self.name, max(math.ceil(retry_after), 1))
+
+    def _trip(self):
+        """ Opens the breaker, for all processes. """
+        open_seconds = settings.CIRCUIT_BREAKER_OPEN_SECONDS
+        django_cache.set(self._reopen_at_key, time.time() + open_seconds, open_seconds)
+        # The tripped marker outlives the open period, so that the breaker is then half-open.
+        django_cache.set(self._tripped_key, True, None)
+
+    def _record_probe(self, succeeded):
+        """ Closes the breaker if the probe call succeeded, or re-opens it otherwise. """
+        if succeeded:
+            django_cache.delete_many([self._tripped_key, *self._window_keys()])
+            logger.info('Circuit breaker for %s closed after a successful probe call.', self.name)
+        else:
+            self._trip()
+            logger.warning('Circuit breaker for %s re-opened after a failed probe call.', self.name)
+        django_cache.delete(self._probe_key)
+
+    def _record_call(self, succeeded):
+        """ Counts the call in the current window, and opens the breaker if too many calls in it failed. """
+        calls_key, failures_key = self._window_keys()
+        window_timeout = settings.CIRCUIT_BREAKER_WINDOW_SECONDS * 2
+        django_cache.add(calls_key, 0, window_timeout)
+        calls = django_cache.incr(calls_key)
+        if succeeded:
+            return
+        django_cache.add(failures_key, 0, window_timeout)
+        failures = django_cache.incr(failures_key)
+        failure_rate = failures / calls
+        if calls >= settings.CIRCUIT_BREAKER_MINIMUM_CALLS and failure_rate >= settings.CIRCUIT_BREAKER_FAILURE_RATE:
+            self._trip()
+            django_cache.delete_many([calls_key, failures_key])
+            logger.warning(
+                'Circuit breaker for %s opened after %s of %s calls failed, for %s seconds.',
+                self.name, failures, calls, settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+            )
+
+    def call(self, func, *args, is_failure=None, count_slow_calls=True, **kwargs):
+        """
+        Returns ``func(*args, **kwargs)``, or raises ``CircuitBreakerOpen`` without calling it if the breaker is open.
+
+        Calls that raise, that take longer than ``CIRCUIT_BREAKER_SLOW_CALL_SECONDS`` (unless ``count_slow_calls``
+        is false), or whose result satisfies the optional ``is_failure`` predicate, count as failures.
+        """
+        is_probe = self._before_call()
+        record = self._record_probe if is_probe else self._record_call
+        started_at = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            record(succeeded=False)
+            raise
+        too_slow = count_slow_calls and time.monotonic() - started_at > settings.CIRCUIT_BREAKER_SLOW_CALL_SECONDS
+        record(succeeded=not too_slow and not (is_failure and is_failure(result)))
+        return result
+
+
+class CircuitBreakerAdapter(HTTPAdapter):
+    """
+    Transport adapter that sends every request through a circuit breaker, counting connection errors,
+    timeouts and server errors as failures, as well as slow responses to idempotent requests.
+    Requests that don't specify a timeout get ``default_timeout``.
+
+    Mount it on a session for the URL prefix of an upstream service, e.g.
+    ``session.mount('https://subsidy.example.com/', CircuitBreakerAdapter(CircuitBreaker('subsidy')))``.
+    """
+
+    def __init__(self, circuit_breaker, default_timeout=None, **kwargs):
+        self.circuit_breaker = circuit_breaker
+        self.default_timeout = default_timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.default_timeout
+        return self.circuit_breaker.call(
+            super().send,
+            request,
+            is_failure=lambda response: response.status_code >= 500,
+            count_slow_calls=request.method in IDEMPOTENT_METHODS,
+            **kwargs,
+        )
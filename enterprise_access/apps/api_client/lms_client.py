@@ -145,6 +145,46 @@ class LmsApiClient(BaseOAuthClient):
 
         return result
 
+    def get_enterprise_learner_ids(self, enterprise_customer_uuid, learner_ids):
+        """
+        Bulk variant of ``enterprise_contains_learner()``: finds which of ``learner_ids`` are a part of
+        the enterprise represented by `enterprise_customer_uuid`, with one (paginated) request.
+
+        Arguments:
+            enterprise_customer_uuid (UUID): UUID of the enterprise customer.
+            learner_ids (list of int): LMS user ids of learners.
+
+        Returns:
+            set of int: the given learner ids that are linked with the enterprise.
+
+        Raises:
+            ``requests.exceptions.HTTPError`` on any endpoint response with an unsuccessful status code.
+        """
+        ec_uuid = str(enterprise_customer_uuid)
+        requested_ids = {int(learner_id) for learner_id in learner_ids}
+        query_params = {
+            'enterprise_customer_uuid': ec_uuid,
+            'user_ids': ','.join(str(learner_id) for learner_id in sorted(requested_ids)),
+        }
+
+        url = self.enterprise_learner_endpoint
+        linked_ids = set()
+        try:
+            while url:
+                response = self.client.get(url, params=query_params, timeout=settings.LMS_CLIENT_TIMEOUT)
+                response.raise_for_status()
+                resp_json = response.json()
+                # The next page's url already carries the query params.
+                url, query_params = resp_json.get('next'), None
+                for result in resp_json.get('results') or []:
+                    if result['enterprise_customer']['uuid'] == ec_uuid and result['user']['id'] in requested_ids:
+                        linked_ids.add(result['user']['id'])
+        except requests.exceptions.HTTPError:
+            logger.exception('Failed to fetch data from LMS. URL: [%s].', url)
+            raise
+
+        return linked_ids
+
     def create_pending_enterprise_users(self, enterprise_customer_uuid, user_emails):
         """
         Creates a pending enterprise user in the given ``enterprise_customer_uuid`` for each of the
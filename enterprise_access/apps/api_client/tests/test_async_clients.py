@@ -0,0 +1,37 @@
+"""
+Tests for the async API clients.
+"""
+import asyncio
+import uuid
+from unittest import mock
+
+from django.test import TestCase
+
+from enterprise_access.apps.api_client.async_clients import AsyncEnterpriseCatalogApiClient, AsyncLmsApiClient
+
+
+class TestAsyncClients(TestCase):
+    """
+    Tests for the async clients.
+    """
+
+    def test_async_clients_delegate_to_sync_clients(self):
+        customer_uuid = uuid.uuid4()
+        mock_lms_client = mock.Mock()
+        mock_lms_client.enterprise_contains_learner.return_value = True
+        mock_lms_client.get_enterprise_admin_users.return_value = [{'email': 'admin@example.com'}]
+        mock_catalog_client = mock.Mock()
+        mock_catalog_client.contains_content_items.return_value = False
+
+        async def _gather():
+            lms_client = AsyncLmsApiClient(mock_lms_client)
+            catalog_client = AsyncEnterpriseCatalogApiClient(mock_catalog_client)
+            return await asyncio.gather(
+                lms_client.enterprise_contains_learner(customer_uuid, 42),
+                lms_client.get_enterprise_admin_users(customer_uuid),
+                catalog_client.contains_content_items(customer_uuid, ['edX+DemoX']),
+            )
+
+        self.assertEqual(asyncio.run(_gather()), [True, [{'email': 'admin@example.com'}], False])
+        mock_lms_client.enterprise_contains_learner.assert_called_once_with(customer_uuid, 42)
+        mock_catalog_client.contains_content_items.assert_called_once_with(customer_uuid, ['edX+DemoX'])
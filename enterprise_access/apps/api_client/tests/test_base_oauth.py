@@ -0,0 +1,71 @@
+"""
+Tests for the pooled API client registry.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from enterprise_access.apps.api_client import base_oauth
+from enterprise_access.apps.api_client.enterprise_catalog_client import EnterpriseCatalogApiClient
+from enterprise_access.apps.api_client.lms_client import LmsApiClient
+
+
+class TestPooledClients(TestCase):
+    """
+    Tests for ``get_or_create_pooled_client()`` and ``get_pooled_oauth_api_client()``.
+    """
+
+    def test_clients_share_one_pooled_session(self):
+        lms_client = LmsApiClient()
+        catalog_client = EnterpriseCatalogApiClient()
+
+        self.assertIs(lms_client.client, catalog_client.client)
+        self.assertIs(LmsApiClient().client, lms_client.client)
+
+    @override_settings(API_CLIENT_POOL_CONNECTIONS=3, API_CLIENT_POOL_MAXSIZE=7)
+    def test_pool_sizes_are_configurable(self):
+        session = LmsApiClient().client
+
+        adapter = session.get_adapter('https://lms.example.com/')
+        self.assertEqual(adapter._pool_connections, 3)  # pylint: disable=protected-access
+        self.assertEqual(adapter._pool_maxsize, 7)  # pylint: disable=protected-access
+
+    def test_factory_called_once_across_threads(self):
+        factory = mock.Mock(side_effect=object)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(
+                lambda _: base_oauth.get_or_create_pooled_client('some-key', factory),
+                range(32),
+            ))
+
+        factory.assert_called_once_with()
+        self.assertTrue(all(client is clients[0] for client in clients))
+
+    def test_registry_reset_after_fork(self):
+        session = LmsApiClient().client
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            # In the child, a fresh session must be created rather than reusing the parent's connections.
+            os.close(read_fd)
+            os.write(write_fd, b'1' if LmsApiClient().client is not session else b'0')
+            os._exit(0)
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_fd, 'rb') as child_output:
+            self.assertEqual(child_output.read(), b'1')
+
+        self.assertIs(LmsApiClient().client, session)
+
+    def test_clear_pooled_clients_closes_sessions(self):
+        session = LmsApiClient().client
+
+        with mock.patch.object(session, 'close') as mock_close:
+            base_oauth.clear_pooled_clients()
+
+        mock_close.assert_called_once_with()
+        self.assertIsNot(LmsApiClient().client, session)
@@ -0,0 +1,172 @@
+"""
+Tests for the cache-backed circuit breaker.
+"""
+import time
+from unittest import mock
+
+import requests
+from django.core.cache import cache as django_cache
+from django.test import TestCase, override_settings
+
+from enterprise_access.apps.api_client.circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    CircuitBreakerAdapter,
+    CircuitBreakerOpen
+)
+
+
+def _response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+def _fail():
+    raise requests.exceptions.ConnectTimeout('upstream is down')
+
+
+@override_settings(
+    CIRCUIT_BREAKER_WINDOW_SECONDS=60,
+    CIRCUIT_BREAKER_MINIMUM_CALLS=4,
+    CIRCUIT_BREAKER_FAILURE_RATE=0.5,
+    CIRCUIT_BREAKER_SLOW_CALL_SECONDS=0.05,
+    CIRCUIT_BREAKER_OPEN_SECONDS=30,
+)
+class TestCircuitBreaker(TestCase):
+    """
+    Tests for ``CircuitBreaker``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(django_cache.clear)
+        self.breaker = CircuitBreaker('some-service')
+
+    def _trip(self):
+        for _ in range(4):
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                self.breaker.call(_fail)
+
+    def test_opens_at_failure_rate(self):
+        for _ in range(2):
+            self.breaker.call(lambda: 'ok')
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                self.breaker.call(_fail)
+
+        self.assertEqual(self.breaker.state(), STATE_OPEN)
+        func = mock.Mock()
+        with self.assertRaises(CircuitBreakerOpen) as context:
+            self.breaker.call(func)
+        func.assert_not_called()
+        self.assertEqual(context.exception.retry_after, 30)
+
+    def test_stays_closed_below_minimum_calls(self):
+        for _ in range(3):
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                self.breaker.call(_fail)
+
+        self.assertEqual(self.breaker.state(), STATE_CLOSED)
+
+    def test_slow_and_failed_results_count_as_failures(self):
+        for _ in range(2):
+            self.breaker.call(time.sleep, 0.06)
+        for _ in range(2):
+            self.breaker.call(lambda: 500, is_failure=lambda status_code: status_code >= 500)
+
+        self.assertEqual(self.breaker.state(), STATE_OPEN)
+
+    def test_slow_calls_not_counted_if_told_so(self):
+        for _ in range(4):
+            self.breaker.call(time.sleep, 0.06, count_slow_calls=False)
+
+        self.assertEqual(self.breaker.state(), STATE_CLOSED)
+
+    def test_state_is_shared(self):
+        self._trip()
+
+        self.assertEqual(CircuitBreaker('some-service').state(), STATE_OPEN)
+        self.assertEqual(CircuitBreaker('other-service').state(), STATE_CLOSED)
+
+    @override_settings(CIRCUIT_BREAKER_OPEN_SECONDS=0.05)
+    def test_half_open_probe_success_closes(self):
+        self._trip()
+        time.sleep(0.06)
+        self.assertEqual(self.breaker.state(), STATE_HALF_OPEN)
+
+        def probe():
+            # Only the probe call goes through while the breaker is half-open.
+            with self.assertRaises(CircuitBreakerOpen):
+                self.breaker.call(mock.Mock())
+            return 'ok'
+
+        self.assertEqual(self.breaker.call(probe), 'ok')
+        self.assertEqual(self.breaker.state(), STATE_CLOSED)
+        self.assertEqual(self.breaker.call(lambda: 'ok'), 'ok')
+
+    @override_settings(CIRCUIT_BREAKER_OPEN_SECONDS=0.05)
+    def test_half_open_probe_failure_reopens(self):
+        self._trip()
+        time.sleep(0.06)
+
+        with self.assertRaises(requests.exceptions.ConnectTimeout):
+            self.breaker.call(_fail)
+
+        self.assertEqual(self.breaker.state(), STATE_OPEN)
+
+
+@override_settings(CIRCUIT_BREAKER_MINIMUM_CALLS=1, CIRCUIT_BREAKER_SLOW_CALL_SECONDS=5)
+class TestCircuitBreakerAdapter(TestCase):
+    """
+    Tests for ``CircuitBreakerAdapter``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(django_cache.clear)
+        self.breaker = CircuitBreaker('some-service')
+        self.session = requests.Session()
+        self.session.mount('https://some-service.example.com/', CircuitBreakerAdapter(self.breaker, default_timeout=7))
+
+    @mock.patch('requests.adapters.HTTPAdapter.send')
+    def test_server_errors_trip_the_breaker(self, mock_send):
+        mock_send.return_value = _response(503)
+
+        self.session.get('https://some-service.example.com/api/')
+
+        self.assertEqual(mock_send.call_args.kwargs['timeout'], 7)
+        self.assertEqual(self.breaker.state(), STATE_OPEN)
+        with self.assertRaises(CircuitBreakerOpen):
+            self.session.get('https://some-service.example.com/api/')
+        self.assertEqual(mock_send.call_count, 1)
+
+    @mock.patch('requests.adapters.HTTPAdapter.send')
+    def test_other_hosts_are_not_affected(self, mock_send):
+        mock_send.return_value = _response(503)
+
+        self.session.get('https://other-service.example.com/api/', timeout=3)
+
+        self.assertEqual(mock_send.call_args.kwargs['timeout'], 3)
+        self.assertEqual(self.breaker.state(), STATE_CLOSED)
+
+    @override_settings(CIRCUIT_BREAKER_SLOW_CALL_SECONDS=0.05)
+    @mock.patch('requests.adapters.HTTPAdapter.send')
+    def test_slow_successful_posts_do_not_trip_the_breaker(self, mock_send):
+        """
+        A slow, but successful, non-idempotent request (e.g. creating a transaction) isn't a failure,
+        whereas a slow idempotent one is.
+        """
+        def slow_send(*args, **kwargs):
+            time.sleep(0.06)
+            return _response(201)
+
+        mock_send.side_effect = slow_send
+
+        self.session.post('https://some-service.example.com/api/transactions/')
+        self.assertEqual(self.breaker.state(), STATE_CLOSED)
+
+        self.session.get('https://some-service.example.com/api/transactions/')
+        self.assertEqual(self.breaker.state(), STATE_OPEN)
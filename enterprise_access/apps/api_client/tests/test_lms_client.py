@@ -201,6 +201,34 @@ class TestLmsApiClient(TestCase):
             timeout=settings.LMS_CLIENT_TIMEOUT
         )
 
+    @mock.patch('enterprise_access.apps.api_client.base_oauth.OAuthAPIClient')
+    def test_get_enterprise_learner_ids(self, mock_oauth_client):
+        """
+        Verify get_enterprise_learner_ids checks many learners, following pagination.
+        """
+        mock_enterprise_uuid = str(uuid4())
+        next_url = 'http://edx-platform.example.com/enterprise/api/v1/enterprise-learner/?page=2'
+
+        def _learner(user_id):
+            return {'enterprise_customer': {'uuid': mock_enterprise_uuid}, 'user': {'id': user_id}}
+
+        mock_oauth_client.return_value.get.side_effect = [
+            MockResponse({'next': next_url, 'results': [_learner(1)]}, status.HTTP_200_OK),
+            MockResponse({'next': None, 'results': [_learner(3)]}, status.HTTP_200_OK),
+        ]
+
+        client = LmsApiClient()
+        assert client.get_enterprise_learner_ids(mock_enterprise_uuid, [3, 1, 2]) == {1, 3}
+
+        mock_oauth_client.return_value.get.assert_has_calls([
+            mock.call(
+                'http://edx-platform.example.com/enterprise/api/v1/enterprise-learner/',
+                params={'enterprise_customer_uuid': mock_enterprise_uuid, 'user_ids': '1,2,3'},
+                timeout=settings.LMS_CLIENT_TIMEOUT,
+            ),
+            mock.call(next_url, params=None, timeout=settings.LMS_CLIENT_TIMEOUT),
+        ])
+
     @ddt.data(
         {
             'mock_response_status': status.HTTP_204_NO_CONTENT,
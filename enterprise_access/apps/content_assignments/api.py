@@ -82,6 +82,32 @@ def get_allocated_quantity_for_configuration(assignment_configuration):
     return aggregate['total_quantity'] or 0
 
 
+def get_allocated_quantities_for_configurations(assignment_configuration_uuids):
+    """
+    Bulk variant of ``get_allocated_quantity_for_configuration()``, which computes the allocated totals
+    for many configurations in a single ``GROUP BY`` query.
+
+    Returns:
+        dict: Mapping of assignment configuration uuid -> total quantity, in USD cents, currently allocated.
+            Every requested uuid is present in the mapping, with a value of 0 if nothing is allocated.
+    """
+    allocated_quantities = {uuid: 0 for uuid in assignment_configuration_uuids}
+    if not allocated_quantities:
+        return allocated_quantities
+
+    rows = LearnerContentAssignment.objects.filter(
+        assignment_configuration__in=allocated_quantities.keys(),
+        state=LearnerContentAssignmentStateChoices.ALLOCATED,
+    ).values(
+        'assignment_configuration',
+    ).annotate(
+        total_quantity=Sum('content_quantity'),
+    ).order_by()
+    for row in rows:
+        allocated_quantities[row['assignment_configuration']] = row['total_quantity'] or 0
+    return allocated_quantities
+
+
 def allocate_assignments(assignment_configuration, learner_emails, content_key, content_price_cents):
     """
     Creates or updates an allocated assignment record
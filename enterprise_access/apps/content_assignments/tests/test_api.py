@@ -7,6 +7,7 @@ from ..api import (
     AllocationException,
     allocate_assignments,
     cancel_assignments,
+    get_allocated_quantities_for_configurations,
     get_allocated_quantity_for_configuration,
     get_assignments_for_configuration
 )
@@ -108,6 +109,35 @@ class TestContentAssignmentApi(TestCase):
             actual_amount = get_allocated_quantity_for_configuration(other_config)
             self.assertEqual(actual_amount, 0)
 
+    def test_get_allocated_quantities_for_configurations(self):
+        """
+        Tests that allocated quantities for many configurations are computed in a single query,
+        including configurations with nothing allocated.
+        """
+        config_one = AssignmentConfiguration.objects.create()
+        config_two = AssignmentConfiguration.objects.create()
+        config_empty = AssignmentConfiguration.objects.create()
+        for config, amount in ((config_one, -1000), (config_one, -2000), (config_two, -500)):
+            LearnerContentAssignmentFactory.create(
+                assignment_configuration=config,
+                content_quantity=amount,
+            )
+        LearnerContentAssignmentFactory.create(
+            assignment_configuration=config_two,
+            content_quantity=-7000,
+            state=LearnerContentAssignmentStateChoices.CANCELLED,
+        )
+
+        with self.assertNumQueries(1):
+            actual_amounts = get_allocated_quantities_for_configurations(
+                [config_one.uuid, config_two.uuid, config_empty.uuid]
+            )
+
+        self.assertEqual(actual_amounts, {config_one.uuid: -3000, config_two.uuid: -500, config_empty.uuid: 0})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_allocated_quantities_for_configurations([]), {})
+
     def test_allocate_assignments_negative_quantity(self):
         """
         Tests the allocation of new assignments for a price < 0
@@ -4,7 +4,7 @@ Data attributes for events within enterprise-access.
 
 import attr
 from confluent_kafka.schema_registry import SchemaRegistryClient
-from confluent_kafka.schema_registry.avro import AvroSerializer
+from confluent_kafka.schema_registry.avro import AvroDeserializer, AvroSerializer
 from django.conf import settings
 
 # TODO: Move the CouponCodeRequestData class to openedx_events and use the Attr<->Avro bridge as a serializer
@@ -287,3 +287,137 @@ class SubsidyRedemptionSerializer:
             )
 
         return cls.SERIALIZER
+
+
+@attr.s(frozen=True)
+class SubsidyTransactionReversalData:
+    """
+    Attributes defined for the reversal of a subsidy transaction.
+    """
+
+    uuid = attr.ib(type=str)
+    state = attr.ib(type=str)
+    quantity = attr.ib(type=int)
+    modified = attr.ib(type=str)
+
+
+@attr.s(frozen=True)
+class SubsidyTransactionData:
+    """
+    Attributes defined for a subsidy (ledger) transaction.
+    """
+
+    uuid = attr.ib(type=str)
+    subsidy_uuid = attr.ib(type=str)
+    lms_user_id = attr.ib(type=int)
+    content_key = attr.ib(type=str)
+    subsidy_access_policy_uuid = attr.ib(type=str)
+    state = attr.ib(type=str)
+    quantity = attr.ib(type=int)
+    idempotency_key = attr.ib(type=str)
+    created = attr.ib(type=str)
+    modified = attr.ib(type=str)
+    reversal = attr.ib(type=SubsidyTransactionReversalData, default=None)
+
+
+class SubsidyTransactionEvent:
+    """
+    subsidy transaction lifecycle (created, committed, failed and reversed) events, consumed from the event bus.
+    """
+
+    AVRO_SCHEMA = """
+        {
+            "namespace": "enterprise_access.apps.subsidy_access_policy",
+            "name": "SubsidyTransactionEvent",
+            "type": "record",
+            "fields": [
+                {"name": "uuid", "type": "string"},
+                {"name": "subsidy_uuid", "type": "string"},
+                {"name": "lms_user_id", "type": "long"},
+                {"name": "content_key", "type": "string"},
+                {"name": "subsidy_access_policy_uuid", "type": ["null", "string"], "default": null},
+                {"name": "state", "type": "string"},
+                {"name": "quantity", "type": "long"},
+                {"name": "idempotency_key", "type": "string"},
+                {"name": "created", "type": "string"},
+                {"name": "modified", "type": "string"},
+                {
+                    "name": "reversal",
+                    "type": ["null", {
+                        "name": "SubsidyTransactionReversal",
+                        "type": "record",
+                        "fields": [
+                            {"name": "uuid", "type": "string"},
+                            {"name": "state", "type": "string"},
+                            {"name": "quantity", "type": "long"},
+                            {"name": "modified", "type": "string"}
+                        ]
+                    }],
+                    "default": null
+                }
+            ]
+        }
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.uuid = kwargs['uuid']
+        self.subsidy_uuid = kwargs['subsidy_uuid']
+        self.lms_user_id = kwargs['lms_user_id']
+        self.content_key = kwargs['content_key']
+        self.subsidy_access_policy_uuid = kwargs.get('subsidy_access_policy_uuid')
+        self.state = kwargs['state']
+        self.quantity = kwargs['quantity']
+        self.idempotency_key = kwargs['idempotency_key']
+        self.created = kwargs['created']
+        self.modified = kwargs['modified']
+        self.reversal = kwargs.get('reversal')
+
+    @staticmethod
+    def from_dict(dict_instance, ctx):  # pylint: disable=unused-argument
+        return SubsidyTransactionEvent(**dict_instance)
+
+    @staticmethod
+    def to_dict(obj, ctx):  # pylint: disable=unused-argument
+        return {
+            'uuid': obj.uuid,
+            'subsidy_uuid': obj.subsidy_uuid,
+            'lms_user_id': obj.lms_user_id,
+            'content_key': obj.content_key,
+            'subsidy_access_policy_uuid': obj.subsidy_access_policy_uuid,
+            'state': obj.state,
+            'quantity': obj.quantity,
+            'idempotency_key': obj.idempotency_key,
+            'created': obj.created,
+            'modified': obj.modified,
+            'reversal': obj.reversal,
+        }
+
+
+class SubsidyTransactionEventDeserializer:
+    """
+    Wrapper class used to ensure a single instance of the SubsidyTransactionEventDeserializer.
+    This avoids errors on startup.
+    """
+    KAFKA_SCHEMA_REGISTRY_CONFIG = {
+        'url': getattr(settings, 'SCHEMA_REGISTRY_URL', ''),
+        'basic.auth.user.info': f"{getattr(settings, 'SCHEMA_REGISTRY_API_KEY', '')}"
+                                f":{getattr(settings, 'SCHEMA_REGISTRY_API_SECRET', '')}",
+    }
+    DESERIALIZER = None
+
+    @classmethod
+    def get_deserializer(cls):
+        """
+        Get or create a single instance of the SubsidyTransactionEvent deserializer
+        to be used throughout the life of the app.
+
+        :return: AvroDeserializer
+        """
+        if cls.DESERIALIZER is None:
+            cls.DESERIALIZER = AvroDeserializer(
+                schema_registry_client=SchemaRegistryClient(cls.KAFKA_SCHEMA_REGISTRY_CONFIG),
+                schema_str=SubsidyTransactionEvent.AVRO_SCHEMA,
+                from_dict=SubsidyTransactionEvent.from_dict,
+            )
+
+        return cls.DESERIALIZER
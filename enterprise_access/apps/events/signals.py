@@ -4,7 +4,7 @@ Custom signals definitions that represent enterprise-access events.
 
 from openedx_events.tooling import OpenEdxPublicSignal
 
-from .data import AccessPolicyData, CouponCodeRequestData, LicenseRequestData, SubsidyRedemption
+from .data import AccessPolicyData, CouponCodeRequestData, LicenseRequestData, SubsidyRedemption, SubsidyTransactionData
 
 # TODO: Move the signals to openedx_events
 
@@ -57,3 +57,33 @@ SUBSIDY_REDEMPTION_REVERSED = OpenEdxPublicSignal(
         "redemption": SubsidyRedemption,
     }
 )
+
+# Lifecycle events of subsidy transactions, produced by the enterprise-subsidy service.
+
+SUBSIDY_TRANSACTION_CREATED = OpenEdxPublicSignal(
+    event_type="org.openedx.enterprise.subsidy.ledger-transaction.created.v1",
+    data={
+        "ledger_transaction": SubsidyTransactionData,
+    }
+)
+
+SUBSIDY_TRANSACTION_COMMITTED = OpenEdxPublicSignal(
+    event_type="org.openedx.enterprise.subsidy.ledger-transaction.committed.v1",
+    data={
+        "ledger_transaction": SubsidyTransactionData,
+    }
+)
+
+SUBSIDY_TRANSACTION_FAILED = OpenEdxPublicSignal(
+    event_type="org.openedx.enterprise.subsidy.ledger-transaction.failed.v1",
+    data={
+        "ledger_transaction": SubsidyTransactionData,
+    }
+)
+
+SUBSIDY_TRANSACTION_REVERSED = OpenEdxPublicSignal(
+    event_type="org.openedx.enterprise.subsidy.ledger-transaction.reversed.v1",
+    data={
+        "ledger_transaction": SubsidyTransactionData,
+    }
+)
@@ -0,0 +1,105 @@
+"""
+An in-process stand-in for a Kafka broker, for testing event consumers without one.
+"""
+from collections import defaultdict
+
+from confluent_kafka.error import ValueDeserializationError
+
+
+class LocalMessage:
+    """
+    Mimics the interface of a ``confluent_kafka.Message`` that was consumed and deserialized.
+    """
+
+    def __init__(self, topic, key, value, offset, error=None, undeserializable=False):
+        self._topic = topic
+        self._key = key
+        self._value = value
+        self._offset = offset
+        self._error = error
+        self.undeserializable = undeserializable
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return 0
+
+    def offset(self):
+        return self._offset
+
+    def key(self):
+        return self._key
+
+    def value(self):
+        return self._value
+
+    def error(self):
+        return self._error
+
+
+class LocalEventBroker:
+    """
+    Holds single-partition topics of produced messages, and the offsets committed by each consumer group.
+    """
+
+    def __init__(self):
+        self.topics = defaultdict(list)
+        self.committed_offsets = defaultdict(dict)
+
+    def produce(self, topic, key, value):
+        self.topics[topic].append(LocalMessage(topic, key, value, offset=len(self.topics[topic])))
+
+    def produce_error(self, topic, error):
+        """
+        Delivers an error to consumers of the given topic, in the place of a message.
+        """
+        self.topics[topic].append(LocalMessage(topic, None, None, offset=len(self.topics[topic]), error=error))
+
+    def produce_undeserializable(self, topic, key, raw_value):
+        """
+        Produces a message whose value consumers fail to deserialize.
+        """
+        self.topics[topic].append(
+            LocalMessage(topic, key, raw_value, offset=len(self.topics[topic]), undeserializable=True)
+        )
+
+    def consumer(self, group_id):
+        return LocalConsumer(self, group_id)
+
+
+class LocalConsumer:
+    """
+    Mimics the interface of a ``confluent_kafka.DeserializingConsumer`` with auto-commit disabled, which
+    resumes each topic from the offset its group last committed.
+    """
+
+    def __init__(self, broker, group_id):
+        self.broker = broker
+        self.group_id = group_id
+        self.positions = {}
+        self.closed = False
+
+    def subscribe(self, topics):
+        committed_offsets = self.broker.committed_offsets[self.group_id]
+        self.positions = {topic: committed_offsets.get(topic, 0) for topic in topics}
+
+    def poll(self, timeout=None):  # pylint: disable=unused-argument
+        """
+        Returns the next message of any subscribed topic, or None if there isn't one.  Like the real
+        consumer, raises ``ValueDeserializationError`` for messages whose value can't be deserialized.
+        """
+        for topic, position in self.positions.items():
+            if position < len(self.broker.topics[topic]):
+                self.positions[topic] = position + 1
+                message = self.broker.topics[topic][position]
+                if message.undeserializable:
+                    raise ValueDeserializationError(exception=ValueError('Unknown magic byte'), kafka_message=message)
+                return message
+        return None
+
+    def commit(self, message, asynchronous=True):  # pylint: disable=unused-argument
+        self.broker.committed_offsets[self.group_id][message.topic()] = message.offset() + 1
+
+    def close(self):
+        self.closed = True
@@ -1,14 +1,16 @@
 """
-Util classes and methods for producing enterprise-access events to the event bus. Likely
-temporary.
+Util classes and methods for producing enterprise-access events to, and consuming events from, the event bus.
+Likely temporary.
 """
 
+import base64
+import json
 import logging
 
-from confluent_kafka import KafkaError, KafkaException, SerializingProducer
+from confluent_kafka import DeserializingConsumer, KafkaError, KafkaException, SerializingProducer
 from confluent_kafka.admin import AdminClient, NewTopic
 from confluent_kafka.error import ValueSerializationError
-from confluent_kafka.serialization import StringSerializer
+from confluent_kafka.serialization import StringDeserializer, StringSerializer
 from django.conf import settings
 
 from enterprise_access.apps.events.data import (
@@ -17,7 +19,8 @@ from enterprise_access.apps.events.data import (
     CouponCodeRequestEvent,
     CouponCodeRequestEventSerializer,
     SubsidyRedemptionEvent,
-    SubsidyRedemptionSerializer
+    SubsidyRedemptionSerializer,
+    SubsidyTransactionEventDeserializer
 )
 
 logger = logging.getLogger(__name__)
@@ -171,6 +174,76 @@ def send_subsidy_redemption_event_to_event_bus(event_name, event_properties):
             logger.exception(vse)
 
 
+def create_subsidy_transaction_event_consumer(group_id):
+    """
+    Creates a consumer of subsidy transaction lifecycle events, whose message keys are event types and whose
+    message values are ``SubsidyTransactionEvent`` instances.  Offsets are only committed explicitly, so that
+    each event is processed at least once.
+    :param group_id: the consumer group, whose members share the partitions of the topic
+    :return: DeserializingConsumer
+    """
+    consumer_settings = {
+        'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVER,
+        'group.id': group_id,
+        'key.deserializer': StringDeserializer('utf-8'),
+        'value.deserializer': SubsidyTransactionEventDeserializer.get_deserializer(),
+        'enable.auto.commit': False,
+        'auto.offset.reset': 'earliest',
+    }
+
+    if settings.KAFKA_API_KEY and settings.KAFKA_API_SECRET:
+        consumer_settings.update({
+            'sasl.mechanism': 'PLAIN',
+            'security.protocol': 'SASL_SSL',
+            'sasl.username': settings.KAFKA_API_KEY,
+            'sasl.password': settings.KAFKA_API_SECRET,
+        })
+
+    return DeserializingConsumer(consumer_settings)
+
+
+def _describe_message_value(value):
+    """
+    Returns a JSON-serializable description of a consumed message's value, which is either still raw bytes
+    (if it couldn't be deserialized), or a deserialized event.
+    """
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return {'raw_base64': base64.b64encode(value).decode('ascii')}
+    return vars(value)
+
+
+def send_subsidy_transaction_event_to_dead_letter_topic(message, reason):
+    """
+    Sends a description of a consumed subsidy transaction event that couldn't be deserialized or projected, i.e.
+    where it was consumed from, its key and value, and why it was skipped, to the dead-letter topic.
+    Waits for the description to be delivered, so that the event's offset may be committed afterwards.
+    """
+    if settings.KAFKA_ENABLED:  # pragma: no cover
+        event_producer = ProducerFactory.get_or_create_event_producer(
+            settings.SUBSIDY_TRANSACTION_DEAD_LETTER_TOPIC_NAME,
+            StringSerializer('utf-8'),
+            StringSerializer('utf-8'),
+        )
+        key = message.key()
+        if isinstance(key, bytes):
+            key = key.decode('utf-8', errors='replace')
+        event_producer.produce(
+            settings.SUBSIDY_TRANSACTION_DEAD_LETTER_TOPIC_NAME,
+            key=key,
+            value=json.dumps({
+                'topic': message.topic(),
+                'partition': message.partition(),
+                'offset': message.offset(),
+                'value': _describe_message_value(message.value()),
+                'reason': reason,
+            }, default=str),
+            on_delivery=verify_event
+        )
+        event_producer.flush()
+
+
 def verify_event(err, evt):
     """
     Simple callback method for debugging event production.
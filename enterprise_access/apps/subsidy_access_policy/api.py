@@ -1,7 +1,24 @@
 """
 Python API for interacting with SubsidyAccessPolicy records.
 """
-from .models import SubsidyAccessPolicy
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from enterprise_access.apps.content_assignments import api as assignments_api
+
+from .constants import AccessMethods
+from .content_metadata_api import get_and_cache_catalogs_contain_content, get_and_cache_content_metadata_for_keys
+from .evaluation_trace import traced_step
+from .exceptions import ContentPriceNullException
+from .models import PolicyBalanceSnapshot, SubsidyAccessPolicy
+from .predicates import COST_LOCAL, COST_SHARED_REMOTE
+from .utils import map_with_bounded_concurrency
+
+logger = logging.getLogger(__name__)
 
 
 def get_subsidy_access_policy(uuid):
@@ -13,3 +30,242 @@ def get_subsidy_access_policy(uuid):
         return SubsidyAccessPolicy.objects.get(uuid=uuid)
     except SubsidyAccessPolicy.DoesNotExist:
         return None
+
+
+def prefetch_redeemability_facts(policies, lms_user_id, content_keys):
+    """
+    Gathers, up front and at most once each, the remote facts needed to evaluate ``can_redeem()``
+    for the given learner against every (policy, content_key) combination.
+
+    Facts are stored in the request/tiered caches that ``SubsidyAccessPolicy.can_redeem()`` already reads from,
+    so the subsequent per-policy evaluation happens in-memory.  Each remote fact is only fetched for the
+    (policy, content_key) combinations that survive the redemption predicates cheaper than it, in stages:
+
+      * The predicates answered from the policy record itself (e.g. whether it's active).
+      * Catalog inclusion, in bulk for every distinct (catalog, content_key) across the surviving policies
+        (see ``get_and_cache_catalogs_contain_content()``).
+      * Content metadata, in bulk for every content_key that is contained in at least one surviving policy's
+        catalog (see ``get_and_cache_content_metadata_for_keys()``).
+      * Every predicate short of the enterprise-subsidy ``can_redeem`` payload, for the combinations whose catalog
+        contains the content, e.g. the learner's limits and the policy's spend limit.
+      * The ``can_redeem`` payload, once per distinct (subsidy, content_key) of the combinations still standing.
+
+    Only the bulk metadata fetch may fetch a fact which a serial evaluation would have skipped, e.g. for
+    content whose only containing policies turn out to be over their spend limit.
+
+    Params:
+      policies: An iterable of SubsidyAccessPolicy records, all belonging to the same enterprise customer.
+      lms_user_id: The learner for whom redeemability will be evaluated.
+      content_keys: An iterable of content keys for which redeemability will be evaluated.
+    """
+    def _holds_up_to(policy_and_content_key, max_cost):
+        policy, content_key = policy_and_content_key
+        try:
+            # Like evaluate_policies_for_content_key(), which leaves the learner's membership to the caller.
+            return policy.evaluate_redemption_predicates(
+                lms_user_id, content_key, skip_customer_user_check=True, max_cost=max_cost, traced=False,
+            ).passed
+        except ContentPriceNullException:
+            # The evaluation itself raises this again, without needing anything else.
+            return False
+
+    policies = list(policies)
+    content_keys = list(content_keys)
+    candidates = [
+        (policy, content_key) for policy in policies for content_key in content_keys
+        if _holds_up_to((policy, content_key), COST_LOCAL)
+    ]
+    if not candidates:
+        return
+
+    policies_by_catalog_uuid = defaultdict(list)
+    for policy in dict.fromkeys(policy for policy, _ in candidates):
+        policies_by_catalog_uuid[policy.catalog_uuid].append(policy)
+
+    # Resolve catalog inclusion for every (catalog, content_key) in bulk, so that
+    # the per-policy checks below (and in can_redeem()) read it from the request cache.
+    get_and_cache_catalogs_contain_content(policies_by_catalog_uuid.keys(), content_keys)
+
+    # Any policy of a catalog can answer the catalog inclusion question for all of them.
+    contained_catalog_uuids_by_content_key = {
+        content_key: {
+            catalog_uuid for catalog_uuid, catalog_policies in policies_by_catalog_uuid.items()
+            if catalog_policies[0].catalog_contains_content_key(content_key)
+        }
+        for content_key in content_keys
+    }
+
+    # Fetch metadata in bulk, only for content that's contained in at least one catalog.
+    get_and_cache_content_metadata_for_keys(
+        policies[0].enterprise_customer_uuid,
+        [content_key for content_key, catalog_uuids in contained_catalog_uuids_by_content_key.items() if catalog_uuids],
+    )
+
+    candidates = [
+        (policy, content_key) for policy, content_key in candidates
+        if policy.catalog_uuid in contained_catalog_uuids_by_content_key[content_key]
+    ]
+    survivors = map_with_bounded_concurrency(lambda candidate: _holds_up_to(candidate, COST_SHARED_REMOTE), candidates)
+
+    subsidy_can_redeem_checks = {}
+    for (policy, content_key), survives in zip(candidates, survivors):
+        if survives:
+            subsidy_can_redeem_checks.setdefault((policy.subsidy_uuid, content_key), (policy, content_key))
+
+    map_with_bounded_concurrency(
+        lambda check: check[0].subsidy_can_redeem(lms_user_id, check[1]),
+        list(subsidy_can_redeem_checks.values()),
+    )
+
+    logger.info(
+        '[prefetch_redeemability_facts] Prefetched facts for lms_user_id=%s, %s policies and %s content keys, '
+        'and %s subsidy can_redeem payloads.',
+        lms_user_id,
+        len(policies),
+        len(content_keys),
+        len(subsidy_can_redeem_checks),
+    )
+
+
+def evaluate_policies_for_content_key(policies, lms_user_id, content_key):
+    """
+    Evaluate whether each of the given policies is redeemable by the given learner for the given content.
+
+    Meant to be called after ``prefetch_redeemability_facts()`` for a batch of content keys, in which case
+    no further remote calls are made.  Policies are evaluated concurrently if configured to do so
+    (see ``map_with_bounded_concurrency()``), but the returned lists always follow the order of ``policies``.
+
+    Returns:
+        tuple of (list of SubsidyAccessPolicy, dict mapping str -> list of SubsidyAccessPolicy): The first tuple
+        element is a list of redeemable policies, and the second tuple element is a mapping of reason strings to
+        non-redeemable policies.
+
+    Raises:
+        ContentPriceNullException: If the price of the content could not be determined.
+        SubsidyAccessPolicyEvaluationTimeout: If concurrent evaluation did not complete in time.
+    """
+    policies = list(policies)
+    results = map_with_bounded_concurrency(
+        lambda policy: policy.can_redeem(lms_user_id, content_key, skip_customer_user_check=True),
+        policies,
+    )
+
+    redeemable_policies = []
+    non_redeemable_policies = defaultdict(list)
+    for policy, (redeemable, reason, _) in zip(policies, results):
+        logger.info(
+            f'[can_redeem] {policy} inputs: (lms_user_id={lms_user_id}, content_key={content_key}) results: '
+            f'redeemable={redeemable}, reason={reason}.'
+        )
+        if redeemable:
+            redeemable_policies.append(policy)
+        else:
+            # Aggregate the reasons for policies not being redeemable.  This really only works if the reason string
+            # is short and generic because the bucketing logic simply treats entire string as the bucket key.
+            non_redeemable_policies[reason].append(policy)
+
+    return (redeemable_policies, non_redeemable_policies)
+
+
+def policies_with_credit_available(policies, lms_user_id, skip_customer_user_check=False):
+    """
+    Returns the subset of the given policies for which the given learner has credit available,
+    in the order of ``policies``.  Policies are checked concurrently if configured to do so
+    (see ``map_with_bounded_concurrency()``).
+
+    Raises:
+        SubsidyAccessPolicyEvaluationTimeout: If concurrent evaluation did not complete in time.
+    """
+    def _credit_available(policy):
+        with traced_step(policy.uuid, 'credit_available') as step:
+            has_credit_available = policy.credit_available(lms_user_id, skip_customer_user_check)
+            if step is not None:
+                step['holds'] = has_credit_available
+        return has_credit_available
+
+    policies = list(policies)
+    results = map_with_bounded_concurrency(_credit_available, policies)
+    return [policy for policy, has_credit_available in zip(policies, results) if has_credit_available]
+
+
+def prefetch_policy_aggregates(policies):
+    """
+    Gathers, up front, everything needed to serialize the aggregates of each of the given policies,
+    much like ``prefetch_related()`` does for related objects.
+
+      * The subsidy record is fetched once per distinct subsidy, since it's cached by subsidy uuid.
+      * The transaction aggregates are fetched once per policy (the subsidy service only aggregates
+        per policy), concurrently if configured to do so (see ``map_with_bounded_concurrency()``).
+      * The allocated totals of all assigned-credit policies are computed in a single ``GROUP BY`` query
+        and stored on the policy instances, so that ``total_allocated`` doesn't query per policy.
+
+    Params:
+      policies: An iterable of SubsidyAccessPolicy records, e.g. a page of a list response.
+    """
+    policies = list(policies)
+    if not policies:
+        return
+
+    policies_by_subsidy_uuid = defaultdict(list)
+    for policy in policies:
+        policies_by_subsidy_uuid[policy.subsidy_uuid].append(policy)
+
+    map_with_bounded_concurrency(
+        lambda policy: policy.subsidy_record(),
+        [subsidy_policies[0] for subsidy_policies in policies_by_subsidy_uuid.values()],
+    )
+    map_with_bounded_concurrency(lambda policy: policy.aggregates_for_policy(), policies)
+
+    assigned_policies = [
+        policy for policy in policies
+        if policy.access_method == AccessMethods.ASSIGNED and policy.assignment_configuration_id
+    ]
+    allocated_quantities = assignments_api.get_allocated_quantities_for_configurations(
+        [policy.assignment_configuration_id for policy in assigned_policies]
+    )
+    for policy in assigned_policies:
+        # pylint: disable=protected-access
+        policy._prefetched_total_allocated = allocated_quantities[policy.assignment_configuration_id]
+
+    logger.info(
+        '[prefetch_policy_aggregates] Prefetched aggregates for %s policies across %s subsidies.',
+        len(policies),
+        len(policies_by_subsidy_uuid),
+    )
+
+
+def refresh_policy_balance_snapshots(policies):
+    """
+    Refreshes the ``PolicyBalanceSnapshot`` of each of the given policies from the enterprise-subsidy service,
+    fetching the balances of all of them in bulk (see ``prefetch_policy_aggregates()``).
+
+    Params:
+      policies: An iterable of SubsidyAccessPolicy records.
+    Returns:
+      The list of refreshed ``PolicyBalanceSnapshot`` records.
+    """
+    policies = list(policies)
+    as_of = timezone.now()
+    prefetch_policy_aggregates(policies)
+
+    snapshots = []
+    with transaction.atomic():
+        for policy in policies:
+            subsidy_expiration_datetime = policy.subsidy_expiration_datetime
+            if isinstance(subsidy_expiration_datetime, str):
+                subsidy_expiration_datetime = parse_datetime(subsidy_expiration_datetime)
+            snapshot, _ = PolicyBalanceSnapshot.objects.update_or_create(
+                policy=policy,
+                defaults={
+                    'total_redeemed': policy.total_redeemed,
+                    'total_allocated': policy.total_allocated,
+                    'spend_available': policy.spend_available,
+                    'subsidy_balance': policy.subsidy_balance(),
+                    'subsidy_expiration_datetime': subsidy_expiration_datetime,
+                    'as_of': as_of,
+                },
+            )
+            snapshots.append(snapshot)
+
+    logger.info('[refresh_policy_balance_snapshots] Refreshed balance snapshots of %s policies.', len(snapshots))
+    return snapshots
@@ -0,0 +1,57 @@
+"""
+Asyncio-native Python API for the remote facts that subsidy access policies depend on.
+
+These are the async counterparts of ``SubsidyAccessPolicy.subsidy_record()``, ``aggregates_for_policy()``
+and ``content_metadata_api.get_and_cache_catalog_contains_content()``.  Each delegates to its sync counterpart
+on asgiref's executor, so that they share the same cache entries, single-flight fetches, circuit breaker and
+last-known fallbacks, and they can be composed into concurrent pipelines, e.g.::
+
+    subsidy_record, contains_content = await asyncio.gather(
+        aget_subsidy_record(policy),
+        aget_catalog_contains_content(policy.catalog_uuid, content_key),
+    )
+
+The request cache is thread-local, so the executor's threads start each call from an empty request cache,
+and clear it afterwards; only the django cache tier is shared with the caller.
+"""
+from asgiref.sync import sync_to_async
+from edx_django_utils.cache import RequestCache
+
+from .content_metadata_api import get_and_cache_catalog_contains_content
+
+
+def _call_with_own_request_cache(func, *args, **kwargs):
+    """
+    Calls ``func`` (on an executor thread), and clears the thread's request cache afterwards,
+    so that it isn't read by the thread's next call.
+    """
+    try:
+        return func(*args, **kwargs)
+    finally:
+        RequestCache.clear_all_namespaces()
+
+
+async def _run_in_executor(func, *args, **kwargs):
+    return await sync_to_async(_call_with_own_request_cache, thread_sensitive=False)(func, *args, **kwargs)
+
+
+async def aget_subsidy_record(policy):
+    """
+    Returns the given policy's subsidy record, see ``SubsidyAccessPolicy.subsidy_record()``.
+    """
+    return await _run_in_executor(policy.subsidy_record)
+
+
+async def aget_policy_aggregates(policy):
+    """
+    Returns the transaction aggregates of the given policy, see ``SubsidyAccessPolicy.aggregates_for_policy()``.
+    """
+    return await _run_in_executor(policy.aggregates_for_policy)
+
+
+async def aget_catalog_contains_content(enterprise_catalog_uuid, content_key, timeout=None):
+    """
+    Returns a boolean indicating if the given content is in the given catalog.
+    Delegates to the sync function, so that stale answers are revalidated in the same way.
+    """
+    return await _run_in_executor(get_and_cache_catalog_contains_content, enterprise_catalog_uuid, content_key, timeout)
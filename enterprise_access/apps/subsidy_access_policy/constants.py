@@ -105,3 +105,30 @@ REASON_NOT_ENOUGH_VALUE_IN_SUBSIDY = "not_enough_value_in_subsidy"
 REASON_LEARNER_MAX_SPEND_REACHED = "learner_max_spend_reached"
 REASON_POLICY_SPEND_LIMIT_REACHED = "policy_spend_limit_reached"
 REASON_LEARNER_MAX_ENROLLMENTS_REACHED = "learner_max_enrollments_reached"
+# An asynchronous redemption failed because the enterprise-subsidy service refused to create its transaction.
+REASON_SUBSIDY_TRANSACTION_REFUSED = "subsidy_transaction_refused"
+# An asynchronous redemption failed because it couldn't be carried out within its retries.
+REASON_REDEMPTION_RETRIES_EXHAUSTED = "redemption_retries_exhausted"
+
+
+class RedemptionIntentStateChoices:
+    """
+    Lifecycle states of an asynchronous redemption (see ``RedemptionIntent``).
+
+    QUEUED
+        Indicates that the redemption was accepted, and that its subsidy transaction is yet to be created.
+
+    REDEEMED
+        Indicates that the subsidy transaction was created.
+
+    FAILED
+        Indicates that the redemption was not carried out, for the ``failure_reason`` of the intent.
+    """
+    QUEUED = 'queued'
+    REDEEMED = 'redeemed'
+    FAILED = 'failed'
+    CHOICES = (
+        (QUEUED, 'Queued'),
+        (REDEEMED, 'Redeemed'),
+        (FAILED, 'Failed'),
+    )
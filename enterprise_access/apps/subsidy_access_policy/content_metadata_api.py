@@ -1,19 +1,152 @@
 """
 Python API for interacting with content metadata
 for use in the domain of SubsidyAccessPolicies.
+
+Content metadata and catalog inclusion are cached with stale-while-revalidate semantics:
+a cached value is fresh for the (soft) ``timeout`` of the caller, defaulting to ``CONTENT_METADATA_CACHE_TIMEOUT``.
+After that, the stale value is still served, and a single background refresh per key is enqueued,
+until the value expires at ``CONTENT_METADATA_CACHE_HARD_TIMEOUT``; only then does a request block on upstream.
 """
 import logging
 
 from django.conf import settings
-from edx_django_utils.cache import TieredCache
-from requests.exceptions import HTTPError
+from django.core.cache import cache as django_cache
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 
 from ..api_client.enterprise_catalog_client import EnterpriseCatalogApiClient
-from .utils import get_versioned_subsidy_client, versioned_cache_key
+from .evaluation_trace import TIER_REQUEST, TIER_SHARED, TIER_UPSTREAM, record_cache_lookup
+from .utils import (
+    fetch_many_with_single_flight,
+    get_versioned_subsidy_client,
+    map_with_bounded_concurrency,
+    versioned_cache_key
+)
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_CACHE_TIMEOUT = getattr(settings, 'CONTENT_METADATA_CACHE_TIMEOUT', 60 * 5)
+HARD_CACHE_TIMEOUT = getattr(settings, 'CONTENT_METADATA_CACHE_HARD_TIMEOUT', DEFAULT_CACHE_TIMEOUT * 6)
+# How long an enqueued refresh of a stale key prevents enqueuing another one.
+REFRESH_DEDUPLICATION_TIMEOUT = getattr(settings, 'CONTENT_METADATA_REFRESH_DEDUPLICATION_TIMEOUT', 60)
+CATALOG_CONTAINS_CONTENT_CHUNK_SIZE = getattr(settings, 'CATALOG_CONTAINS_CONTENT_CHUNK_SIZE', 25)
+# Above this share of contained keys, keys are checked one by one, without first checking whole chunks;
+# below the sparse one, chunks with any contained key are resolved by bisection rather than key by key.
+CATALOG_CONTAINS_CONTENT_DENSE_HIT_RATE = 0.5
+CATALOG_CONTAINS_CONTENT_SPARSE_HIT_RATE = 0.2
+CONTENT_METADATA_FETCH_MAX_WORKERS = getattr(settings, 'CONTENT_METADATA_FETCH_MAX_WORKERS', 4)
+
+
+def content_metadata_cache_key(enterprise_customer_uuid, content_key):
+    return versioned_cache_key(
+        'get_subsidy_content_metadata', enterprise_customer_uuid, content_key,
+        customer=enterprise_customer_uuid,
+    )
+
+
+def catalog_contains_content_cache_key(enterprise_catalog_uuid, content_key):
+    return versioned_cache_key(
+        'contains_content_key', enterprise_catalog_uuid, content_key,
+        catalog=enterprise_catalog_uuid,
+    )
+
+
+def catalog_contains_content_hit_rate_cache_key(enterprise_catalog_uuid):
+    return versioned_cache_key(
+        'contains_content_hit_rate', enterprise_catalog_uuid,
+        catalog=enterprise_catalog_uuid,
+    )
+
+
+def _fresh_marker_cache_key(cache_key):
+    """
+    The key of the marker which exists for as long as the value cached at ``cache_key`` is fresh.
+    """
+    return f'{cache_key}:fresh'
+
+
+def _get_many_cached(cache_keys_by_id, resource):
+    """
+    Reads many cached values, first from the request cache, then with one ``get_many()`` from the django cache,
+    which also reads whether each value is still fresh.
+
+    Params:
+      cache_keys_by_id: A dictionary mapping some identifier of each value to its cache key.
+      resource: What the values are, as recorded in the request's evaluation trace, if any.
+    Returns:
+      A tuple of (dict of identifier -> cached value, list of missing identifiers, list of stale identifiers).
+      Stale identifiers are only returned if no other request already claimed their refresh.
+    """
+    results = {}
+    request_cache_misses = {}
+    for identifier, cache_key in cache_keys_by_id.items():
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+        if cached_response.is_found:
+            results[identifier] = cached_response.value
+            record_cache_lookup(resource, TIER_REQUEST)
+        else:
+            request_cache_misses[identifier] = cache_key
+
+    if not request_cache_misses:
+        return results, [], []
+
+    django_cached_values = django_cache.get_many([
+        key
+        for cache_key in request_cache_misses.values()
+        for key in (cache_key, _fresh_marker_cache_key(cache_key))
+    ])
+    missing, stale = [], []
+    for identifier, cache_key in request_cache_misses.items():
+        if cache_key not in django_cached_values:
+            missing.append(identifier)
+            record_cache_lookup(resource, TIER_UPSTREAM)
+            continue
+        results[identifier] = django_cached_values[cache_key]
+        record_cache_lookup(resource, TIER_SHARED)
+        DEFAULT_REQUEST_CACHE.set(cache_key, django_cached_values[cache_key])
+        fresh_marker_key = _fresh_marker_cache_key(cache_key)
+        # Whoever adds the fresh marker back first owns the refresh, everyone else keeps serving the stale value.
+        if fresh_marker_key not in django_cached_values and django_cache.add(
+            fresh_marker_key, True, REFRESH_DEDUPLICATION_TIMEOUT,
+        ):
+            stale.append(identifier)
+    return results, missing, stale
+
+
+def _set_many_cached(values_by_cache_key, timeout=None):
+    """
+    Caches the given values in all tiers, fresh for ``timeout`` seconds and available until the hard timeout.
+    """
+    soft_timeout = timeout or DEFAULT_CACHE_TIMEOUT
+    django_cache.set_many(values_by_cache_key, max(soft_timeout, HARD_CACHE_TIMEOUT))
+    django_cache.set_many(
+        {_fresh_marker_cache_key(cache_key): True for cache_key in values_by_cache_key},
+        soft_timeout,
+    )
+    for cache_key, value in values_by_cache_key.items():
+        DEFAULT_REQUEST_CACHE.set(cache_key, value)
+
+
+def _fetch_and_cache_with_single_flight(cache_keys_by_id, refresh_many):
+    """
+    Fetches and caches the missing values, coalescing concurrent misses of the same keys
+    into one upstream fetch (see ``fetch_many_with_single_flight()``).
+    """
+    results = fetch_many_with_single_flight(cache_keys_by_id, refresh_many)
+    for identifier, value in results.items():
+        DEFAULT_REQUEST_CACHE.set(cache_keys_by_id[identifier], value)
+    return results
+
+
+def _enqueue_content_metadata_refresh(enterprise_customer_uuid, content_keys, timeout):
+    # Imported here because the tasks module (indirectly) imports this one.
+    from .tasks import refresh_content_metadata_task  # pylint: disable=import-outside-toplevel,cyclic-import
+    refresh_content_metadata_task.delay(str(enterprise_customer_uuid), list(content_keys), timeout)
+
+
+def _enqueue_catalog_contains_content_refresh(enterprise_catalog_uuid, content_keys, timeout):
+    # Imported here because the tasks module (indirectly) imports this one.
+    from .tasks import refresh_catalog_contains_content_task  # pylint: disable=import-outside-toplevel,cyclic-import
+    refresh_catalog_contains_content_task.delay(str(enterprise_catalog_uuid), list(content_keys), timeout)
 
 
 def get_and_cache_content_metadata(enterprise_customer_uuid, content_key, timeout=None):
@@ -25,53 +158,234 @@ def get_and_cache_content_metadata(enterprise_customer_uuid, content_key, timeou
     Raises: An HTTPError if there's a problem getting the content metadata
       via the subsidy service.
     """
-    cache_key = versioned_cache_key('get_subsidy_content_metadata', enterprise_customer_uuid, content_key)
-    cached_response = TieredCache.get_cached_response(cache_key)
-    if cached_response.is_found:
-        return cached_response.value
+    return get_and_cache_content_metadata_for_keys(enterprise_customer_uuid, [content_key], timeout)[content_key]
 
-    client = get_versioned_subsidy_client()
-    try:
-        metadata = client.get_subsidy_content_data(
-            enterprise_customer_uuid,
-            content_key,
-        )
-    except HTTPError as exc:
-        raise exc
 
+def _fetch_content_metadata_for_keys(enterprise_customer_uuid, content_keys):
+    """
+    Fetches the metadata of each of the given content keys from the enterprise-subsidy service,
+    concurrently on a pool of at most ``CONTENT_METADATA_FETCH_MAX_WORKERS`` threads
+    (the service has no batch content-data endpoint).
+
+    Returns: A dictionary mapping each content key to its content metadata.
+    """
+    client = get_versioned_subsidy_client()
+    fetched_metadata = map_with_bounded_concurrency(
+        lambda content_key: client.get_subsidy_content_data(enterprise_customer_uuid, content_key),
+        content_keys,
+        max_workers=CONTENT_METADATA_FETCH_MAX_WORKERS,
+    )
     logger.info(
-        'Fetched content metadata for customer %s and content_key %s',
+        'Fetched content metadata for customer %s and content_keys %s',
         enterprise_customer_uuid,
-        content_key,
+        content_keys,
+    )
+    return dict(zip(content_keys, fetched_metadata))
+
+
+def refresh_content_metadata_for_keys(enterprise_customer_uuid, content_keys, timeout=None):
+    """
+    Re-fetches and caches the metadata of the given content keys, regardless of what's currently cached.
+    """
+    fetched_metadata = _fetch_content_metadata_for_keys(enterprise_customer_uuid, content_keys)
+    _set_many_cached(
+        {
+            content_metadata_cache_key(enterprise_customer_uuid, content_key): metadata
+            for content_key, metadata in fetched_metadata.items()
+        },
+        timeout,
     )
-    TieredCache.set_all_tiers(cache_key, metadata, timeout or DEFAULT_CACHE_TIMEOUT)
-    return metadata
+    return fetched_metadata
+
+
+def get_and_cache_content_metadata_for_keys(enterprise_customer_uuid, content_keys, timeout=None):
+    """
+    Bulk variant of ``get_and_cache_content_metadata()``, which returns the metadata for many content keys.
+
+    Content keys are de-duplicated, all cached metadata is read from the django cache in a single ``get_many()``,
+    and the misses are fetched from the enterprise-subsidy service concurrently, see
+    ``_fetch_content_metadata_for_keys()``.  Fetched metadata is written back in a single ``set_many()``.
+    Stale metadata is served as-is, and refreshed in the background.
+
+    Returns: A dictionary mapping each content key to its content metadata.
+    Raises: An HTTPError if there's a problem getting the content metadata
+      via the subsidy service.
+    """
+    cache_keys = {
+        content_key: content_metadata_cache_key(enterprise_customer_uuid, content_key)
+        for content_key in dict.fromkeys(content_keys)
+    }
+    results, content_keys_to_fetch, stale_content_keys = _get_many_cached(cache_keys, 'content_metadata')
+
+    if stale_content_keys:
+        _enqueue_content_metadata_refresh(enterprise_customer_uuid, stale_content_keys, timeout)
+
+    if content_keys_to_fetch:
+        results.update(_fetch_and_cache_with_single_flight(
+            {content_key: cache_keys[content_key] for content_key in content_keys_to_fetch},
+            lambda content_keys: refresh_content_metadata_for_keys(enterprise_customer_uuid, content_keys, timeout),
+        ))
+    return results
 
 
 def get_and_cache_catalog_contains_content(enterprise_catalog_uuid, content_key, timeout=None):
     """
     Returns a boolean indicating if the given content is in the given catalog.
-    This value is cached in a ``TieredCache`` (meaning in both the RequestCache,
-    _and_ the django cache for the configured expiration period).
-    """
-    cache_key = versioned_cache_key('contains_content_key', enterprise_catalog_uuid, content_key)
-    cached_response = TieredCache.get_cached_response(cache_key)
-    if cached_response.is_found:
-        return cached_response.value
-
-    try:
-        result = EnterpriseCatalogApiClient().contains_content_items(
-            enterprise_catalog_uuid,
-            [content_key],
-        )
-    except HTTPError as exc:
-        raise exc
+    This value is cached in both the RequestCache, _and_ the django cache, see the module docstring.
+    """
+    return get_and_cache_catalogs_contain_content(
+        [enterprise_catalog_uuid], [content_key], timeout,
+    )[(enterprise_catalog_uuid, content_key)]
+
+
+def _resolve_contained_by_bisection(client, enterprise_catalog_uuid, content_keys):
+    """
+    Resolves catalog inclusion of each of the given content keys, at least one of which is known to be contained,
+    by recursively checking halves of them: sparse hits among many keys take a logarithmic number of calls.
+    """
+    if len(content_keys) == 1:
+        return {content_keys[0]: True}
+    middle = len(content_keys) // 2
+    left, right = content_keys[:middle], content_keys[middle:]
+    results = {}
+    if client.contains_content_items(enterprise_catalog_uuid, left):
+        results.update(_resolve_contained_by_bisection(client, enterprise_catalog_uuid, left))
+        right_contains_any = client.contains_content_items(enterprise_catalog_uuid, right)
+    else:
+        results.update({content_key: False for content_key in left})
+        # Some key is contained, and it's not on the left.
+        right_contains_any = True
+    if right_contains_any:
+        results.update(_resolve_contained_by_bisection(client, enterprise_catalog_uuid, right))
+    else:
+        results.update({content_key: False for content_key in right})
+    return results
+
 
+def _resolve_contained_key_by_key(client, enterprise_catalog_uuid, content_keys, contains_any=False):
+    """
+    Resolves catalog inclusion of each of the given content keys with one call per key, except for the last one
+    when it's known that some key is contained (``contains_any``), and none of the others are.
+    """
+    results = {}
+    for index, content_key in enumerate(content_keys):
+        if contains_any and index == len(content_keys) - 1 and not any(results.values()):
+            results[content_key] = True
+        else:
+            results[content_key] = bool(client.contains_content_items(enterprise_catalog_uuid, [content_key]))
+    return results
+
+
+def _fetch_catalog_contains_content_keys(client, enterprise_catalog_uuid, content_keys):
+    """
+    Resolves catalog inclusion of each of the given content keys, with as few upstream calls as possible.
+
+    The ``contains_content_items`` endpoint answers whether the catalog contains *any* of the given keys,
+    which makes this a group testing problem, whose best strategy depends on the share of contained keys (the hit
+    rate).  That's estimated from the keys resolved so far, or else from the catalog's previous fetch:
+
+      * When most keys are expected to be contained, e.g. for catalog search results, they're checked one by one,
+        since checking a chunk of them first would almost always be a wasted call.
+      * Otherwise, a single call per chunk of keys rules out the whole chunk in the case where none are contained.
+        Chunks with some contained key are resolved by bisection if hits are expected to be sparse,
+        or else key by key.
+
+    Returns:
+        dict: Mapping of content_key -> bool.
+    """
+    hit_rate_cache_key = catalog_contains_content_hit_rate_cache_key(enterprise_catalog_uuid)
+    previous_hit_rate = django_cache.get(hit_rate_cache_key)
+    results = {}
+    for start in range(0, len(content_keys), CATALOG_CONTAINS_CONTENT_CHUNK_SIZE):
+        chunk = content_keys[start:start + CATALOG_CONTAINS_CONTENT_CHUNK_SIZE]
+        hit_rate = sum(results.values()) / len(results) if results else previous_hit_rate
+        if hit_rate is not None and hit_rate >= CATALOG_CONTAINS_CONTENT_DENSE_HIT_RATE:
+            results.update(_resolve_contained_key_by_key(client, enterprise_catalog_uuid, chunk))
+            continue
+        chunk_contains_any = client.contains_content_items(enterprise_catalog_uuid, chunk)
+        if not chunk_contains_any:
+            results.update({content_key: False for content_key in chunk})
+        elif hit_rate is not None and hit_rate < CATALOG_CONTAINS_CONTENT_SPARSE_HIT_RATE:
+            results.update(_resolve_contained_by_bisection(client, enterprise_catalog_uuid, chunk))
+        else:
+            results.update(_resolve_contained_key_by_key(client, enterprise_catalog_uuid, chunk, contains_any=True))
+    if results:
+        django_cache.set(hit_rate_cache_key, sum(results.values()) / len(results), HARD_CACHE_TIMEOUT)
+    return results
+
+
+def refresh_catalog_contains_content(enterprise_catalog_uuid, content_keys, timeout=None, client=None):
+    """
+    Re-fetches and caches whether the given catalog contains each of the given content keys,
+    regardless of what's currently cached.
+
+    Returns:
+        dict: Mapping of content_key -> bool.
+    """
+    catalog_results = _fetch_catalog_contains_content_keys(
+        client or EnterpriseCatalogApiClient(), enterprise_catalog_uuid, content_keys,
+    )
     logger.info(
-        'Fetched catalog inclusion for catalog %s and content_key %s. Result = %s',
+        'Fetched catalog inclusion for catalog %s and %s content keys. Contained = %s',
         enterprise_catalog_uuid,
-        content_key,
-        result,
+        len(content_keys),
+        [content_key for content_key, contained in catalog_results.items() if contained],
+    )
+    _set_many_cached(
+        {
+            catalog_contains_content_cache_key(enterprise_catalog_uuid, content_key): contained
+            for content_key, contained in catalog_results.items()
+        },
+        timeout,
     )
-    TieredCache.set_all_tiers(cache_key, result, timeout or DEFAULT_CACHE_TIMEOUT)
-    return result
+    return catalog_results
+
+
+def get_and_cache_catalogs_contain_content(enterprise_catalog_uuids, content_keys, timeout=None):
+    """
+    Bulk variant of ``get_and_cache_catalog_contains_content()``, which answers whether each of the given
+    catalogs contains each of the given content keys.
+
+    Catalogs and content keys are de-duplicated, all cached answers are read from the django cache in a single
+    ``get_many()``, and the misses are resolved with chunked multi-key upstream calls (one per catalog in the common
+    case).  Every answer is cached per (catalog, content_key), in the same entries that
+    ``get_and_cache_catalog_contains_content()`` reads from.  Stale answers are served as-is,
+    and refreshed in the background.
+
+    Returns:
+        dict: Mapping of (enterprise_catalog_uuid, content_key) -> bool.
+    Raises: An HTTPError if there's a problem checking catalog inclusion via the enterprise-catalog service.
+    """
+    cache_keys = {
+        (catalog_uuid, content_key): catalog_contains_content_cache_key(catalog_uuid, content_key)
+        for catalog_uuid in dict.fromkeys(enterprise_catalog_uuids)
+        for content_key in dict.fromkeys(content_keys)
+    }
+    results, missing_pairs, stale_pairs = _get_many_cached(cache_keys, 'catalog_contains_content')
+
+    stale_content_keys_by_catalog = {}
+    for catalog_uuid, content_key in stale_pairs:
+        stale_content_keys_by_catalog.setdefault(catalog_uuid, []).append(content_key)
+    for catalog_uuid, stale_content_keys in stale_content_keys_by_catalog.items():
+        _enqueue_catalog_contains_content_refresh(catalog_uuid, stale_content_keys, timeout)
+
+    if not missing_pairs:
+        return results
+
+    content_keys_to_fetch_by_catalog = {}
+    for catalog_uuid, content_key in missing_pairs:
+        content_keys_to_fetch_by_catalog.setdefault(catalog_uuid, []).append(content_key)
+
+    client = EnterpriseCatalogApiClient()
+    for catalog_uuid, content_keys_to_fetch in content_keys_to_fetch_by_catalog.items():
+        catalog_results = _fetch_and_cache_with_single_flight(
+            {content_key: cache_keys[(catalog_uuid, content_key)] for content_key in content_keys_to_fetch},
+            lambda content_keys, catalog_uuid=catalog_uuid: refresh_catalog_contains_content(
+                catalog_uuid, content_keys, timeout, client,
+            ),
+        )
+        results.update({
+            (catalog_uuid, content_key): contained
+            for content_key, contained in catalog_results.items()
+        })
+    return results
@@ -0,0 +1,147 @@
+"""
+Python API for tracing, per request, how SubsidyAccessPolicies were evaluated: which checks were performed
+for each policy, how long each took, and from which cache tier each fact they read was served.
+
+Tracing is opt-in, per request (see ``start_evaluation_trace()``); while no trace is started,
+recording is a no-op.  The trace lives in the request cache, so worker threads dispatched by
+``map_with_bounded_concurrency()`` record into the same trace as the request that started it.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, TieredCache
+
+from .utils import request_cache
+
+EVALUATION_TRACE_CACHE_KEY = 'evaluation_trace'
+
+# The tiers a fact can be served from.
+# The request cache, i.e. the fact was already read during the current request.
+TIER_REQUEST = 'request'
+# The django cache, shared across requests and workers.
+TIER_SHARED = 'shared'
+# The local learner ledger projection (see the ``ledger_projection_api`` module).
+TIER_PROJECTION = 'projection'
+# The upstream service, i.e. neither cache tier had the fact.
+TIER_UPSTREAM = 'upstream'
+
+
+class EvaluationTrace:
+    """
+    The checks performed while evaluating policies during a request, as a list of steps per policy.
+    Each step records the name of the check, its outcome (if any), its wall time in milliseconds,
+    and the facts it looked up, along with the tier each was served from.
+
+    Steps that aren't about a single policy, e.g. prefetching facts for many policies at once,
+    are recorded with a policy uuid of None.  Lookups made outside of any step are recorded as unattributed.
+    """
+
+    def __init__(self):
+        self.steps_by_policy_uuid = {}
+        self.unattributed_lookups = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def step(self, policy_uuid, name):
+        """
+        Context manager that records a step of the given policy's evaluation, timing its body, and attributing
+        every lookup made in its body (on the current thread) to it.  Yields the step, whose ``holds`` the body
+        may set to the outcome of the check.
+        """
+        step = {'check': name, 'holds': None, 'elapsed_ms': None, 'lookups': []}
+        parent_step = getattr(self._local, 'step', None)
+        self._local.step = step
+        started_at = time.perf_counter()
+        try:
+            yield step
+        finally:
+            step['elapsed_ms'] = round((time.perf_counter() - started_at) * 1000, 3)
+            self._local.step = parent_step
+            policy_key = str(policy_uuid) if policy_uuid is not None else None
+            with self._lock:
+                self.steps_by_policy_uuid.setdefault(policy_key, []).append(step)
+
+    def record_lookup(self, resource, tier):
+        """
+        Records that a fact about ``resource`` was served from the given tier, as part of the current thread's step.
+        """
+        lookup = {'resource': resource, 'tier': tier}
+        step = getattr(self._local, 'step', None)
+        if step is not None:
+            step['lookups'].append(lookup)
+        else:
+            with self._lock:
+                self.unattributed_lookups.append(lookup)
+
+    def as_dict(self):
+        """
+        Returns the trace as a JSON-serializable dictionary.
+        """
+        with self._lock:
+            return {
+                'steps': list(self.steps_by_policy_uuid.get(None, [])),
+                'policies': [
+                    {'policy_uuid': policy_uuid, 'steps': list(steps)}
+                    for policy_uuid, steps in self.steps_by_policy_uuid.items()
+                    if policy_uuid is not None
+                ],
+                'unattributed_lookups': list(self.unattributed_lookups),
+            }
+
+
+def start_evaluation_trace():
+    """
+    Starts tracing policy evaluation for the rest of the current request, and returns the ``EvaluationTrace``.
+    """
+    trace = EvaluationTrace()
+    request_cache().set(EVALUATION_TRACE_CACHE_KEY, trace)
+    return trace
+
+
+def get_evaluation_trace():
+    """
+    Returns the ``EvaluationTrace`` of the current request, or None if it isn't traced.
+    """
+    cached_response = request_cache().get_cached_response(EVALUATION_TRACE_CACHE_KEY)
+    return cached_response.value if cached_response.is_found else None
+
+
+@contextmanager
+def traced_step(policy_uuid, name):
+    """
+    Records the body as a step of the given policy's evaluation, if the current request is traced
+    (see ``EvaluationTrace.step()``).  Yields the step, or None if the request isn't traced.
+    """
+    trace = get_evaluation_trace()
+    if trace is None:
+        yield None
+        return
+    with trace.step(policy_uuid, name) as step:
+        yield step
+
+
+def record_cache_lookup(resource, tier):
+    """
+    Records that a fact about ``resource`` (e.g. ``'content_metadata'``) was served from the given tier,
+    if the current request is traced.
+    """
+    trace = get_evaluation_trace()
+    if trace is not None:
+        trace.record_lookup(resource, tier)
+
+
+def get_tiered_cached_response(cache_key, resource):
+    """
+    Same as ``TieredCache.get_cached_response()``, but also records the tier that ``cache_key`` was served from,
+    if any, or else that ``resource`` is about to be fetched from upstream.
+    """
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+    if cached_response.is_found:
+        record_cache_lookup(resource, TIER_REQUEST)
+        return cached_response
+
+    cached_response = TieredCache.get_cached_response(cache_key)
+    record_cache_lookup(resource, TIER_SHARED if cached_response.is_found else TIER_UPSTREAM)
+    return cached_response
@@ -29,6 +29,19 @@ class SubsidyAccessPolicyLockAttemptFailed(SubsidyAccessPolicyException):
     """
 
 
+class SubsidyAccessPolicySpendReservationFailed(SubsidyAccessPolicyException):
+    """
+    Raised when spend could not be reserved against a SubsidyAccessPolicy's spend limit,
+    because of other in-flight redemptions.
+    """
+
+
+class SubsidyAccessPolicyEvaluationTimeout(SubsidyAccessPolicyException):
+    """
+    Raised when concurrent evaluation of policies did not complete within the configured deadline.
+    """
+
+
 class SubsidyAPIHTTPError(requests.exceptions.HTTPError):
     """
     Exception that distinguishes HTTPErrors that arise from
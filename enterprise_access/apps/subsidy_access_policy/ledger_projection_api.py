@@ -0,0 +1,99 @@
+"""
+Python API for maintaining a local projection of learners' subsidy transactions (their *ledgers*),
+for use in the domain of SubsidyAccessPolicies.
+
+The projection is fed by the subsidy transaction lifecycle events that the enterprise-subsidy service
+produces to the event bus (see the ``consume_subsidy_transaction_events`` management command), and seeded,
+one subsidy at a time, from the enterprise-subsidy service's API (see ``backfill_subsidy()``).
+Once a subsidy is backfilled, and while ``LEARNER_LEDGER_PROJECTION_ENABLED`` is set, its learners'
+transactions are read from the projection instead of that API (see ``subsidy_api.is_subsidy_projected()``).
+"""
+import logging
+
+from django.utils import timezone
+
+from enterprise_access.apps.events.signals import (
+    SUBSIDY_TRANSACTION_COMMITTED,
+    SUBSIDY_TRANSACTION_CREATED,
+    SUBSIDY_TRANSACTION_FAILED,
+    SUBSIDY_TRANSACTION_REVERSED
+)
+
+from .models import LearnerTransactionProjection, ProjectedSubsidy
+from .subsidy_api import (
+    invalidate_learner_ledger_cache,
+    invalidate_policy_aggregates_cache,
+    invalidate_subsidy_record_cache,
+    projected_subsidy_cache_key
+)
+from .utils import get_versioned_subsidy_client, request_cache
+
+logger = logging.getLogger(__name__)
+
+PROJECTED_EVENT_TYPES = {
+    signal.event_type for signal in (
+        SUBSIDY_TRANSACTION_CREATED,
+        SUBSIDY_TRANSACTION_COMMITTED,
+        SUBSIDY_TRANSACTION_FAILED,
+        SUBSIDY_TRANSACTION_REVERSED,
+    )
+}
+
+
+def apply_transaction_event(event_type, ledger_transaction):
+    """
+    Projects the transaction carried by a subsidy transaction lifecycle event, and drops any cached data
+    that the transaction may have changed.  Events of other types are ignored.
+
+    Returns:
+      True if the projection was changed, False otherwise (e.g. for a stale or redelivered event).
+    """
+    if event_type not in PROJECTED_EVENT_TYPES:
+        logger.warning('Ignoring event of unknown type %s for transaction %s', event_type, ledger_transaction['uuid'])
+        return False
+
+    subsidy_uuid = ledger_transaction['subsidy_uuid']
+    _, changed = LearnerTransactionProjection.project(subsidy_uuid, ledger_transaction)
+    if not changed:
+        logger.info('Skipped stale %s event for transaction %s', event_type, ledger_transaction['uuid'])
+        return False
+
+    invalidate_learner_ledger_cache(subsidy_uuid, ledger_transaction['lms_user_id'])
+    invalidate_subsidy_record_cache(subsidy_uuid)
+    if ledger_transaction.get('subsidy_access_policy_uuid'):
+        invalidate_policy_aggregates_cache(subsidy_uuid, ledger_transaction['subsidy_access_policy_uuid'])
+    logger.info('Projected %s event for transaction %s', event_type, ledger_transaction['uuid'])
+    return True
+
+
+def backfill_subsidy(subsidy_uuid):
+    """
+    Projects every transaction of the given subsidy, as listed by the enterprise-subsidy service, and marks
+    the subsidy as projected.  Transaction events should already be consumed while this runs, so that no
+    change made after a transaction is listed goes missing.
+
+    Returns:
+      The number of transactions projected.
+    """
+    backfilled_at = timezone.now()
+    client = get_versioned_subsidy_client()
+    response_payload = client.list_subsidy_transactions(subsidy_uuid=subsidy_uuid, include_aggregates=False)
+    num_projected = 0
+    while True:
+        for ledger_transaction in response_payload['results']:
+            LearnerTransactionProjection.project(subsidy_uuid, ledger_transaction)
+            num_projected += 1
+        next_page = response_payload.get('next')
+        if not next_page:
+            break
+        response_payload = client.client.get(next_page).json()
+
+    ProjectedSubsidy.objects.update_or_create(
+        subsidy_uuid=subsidy_uuid,
+        defaults={'backfilled_at': backfilled_at},
+    )
+    request_cache().delete(projected_subsidy_cache_key(subsidy_uuid))
+    logger.info(
+        'Backfilled %s transactions of subsidy %s into the learner ledger projection', num_projected, subsidy_uuid,
+    )
+    return num_projected
@@ -0,0 +1,137 @@
+"""
+Python API for checking, via the LMS, which learners are linked to an enterprise customer,
+for use in the domain of SubsidyAccessPolicies.
+
+Membership checks are cached in two tiers: the request cache, so that evaluating many policies
+for the same learner calls the LMS at most once per request, and the django cache, for
+``LEARNER_MEMBERSHIP_CACHE_TIMEOUT`` seconds.  Only positive results are shared across requests, since
+unlinking a learner explicitly invalidates them (see ``invalidate_learner_membership_cache()``),
+whereas nothing tells us when a learner gets linked.
+"""
+import logging
+
+import requests
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
+
+from .evaluation_trace import TIER_REQUEST, TIER_SHARED, TIER_UPSTREAM, record_cache_lookup
+from .utils import versioned_cache_key
+
+logger = logging.getLogger(__name__)
+
+LEARNER_MEMBERSHIP_CACHE_TIMEOUT = getattr(settings, 'LEARNER_MEMBERSHIP_CACHE_TIMEOUT', 60 * 2)
+# The maximum number of learner ids checked per LMS request by ``enterprise_contains_learners()``.
+LEARNER_MEMBERSHIP_CHUNK_SIZE = getattr(settings, 'LEARNER_MEMBERSHIP_CHUNK_SIZE', 100)
+
+
+def learner_membership_cache_key(enterprise_customer_uuid, lms_user_id):
+    return versioned_cache_key(
+        'enterprise_contains_learner', enterprise_customer_uuid, lms_user_id,
+        customer=enterprise_customer_uuid,
+    )
+
+
+def _get_many_cached(cache_keys_by_id):
+    """
+    Returns a tuple of (dict of learner id -> cached membership, list of learner ids that aren't cached),
+    reading the request cache first, then the django cache with one ``get_many()``.
+    """
+    results, request_cache_misses = {}, {}
+    for lms_user_id, cache_key in cache_keys_by_id.items():
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+        if cached_response.is_found:
+            results[lms_user_id] = cached_response.value
+            record_cache_lookup('learner_membership', TIER_REQUEST)
+        else:
+            request_cache_misses[lms_user_id] = cache_key
+
+    if request_cache_misses:
+        django_cached_values = django_cache.get_many(list(request_cache_misses.values()))
+        for lms_user_id, cache_key in request_cache_misses.items():
+            if cache_key in django_cached_values:
+                results[lms_user_id] = django_cached_values[cache_key]
+                DEFAULT_REQUEST_CACHE.set(cache_key, django_cached_values[cache_key])
+                record_cache_lookup('learner_membership', TIER_SHARED)
+            else:
+                record_cache_lookup('learner_membership', TIER_UPSTREAM)
+
+    missing = [lms_user_id for lms_user_id in cache_keys_by_id if lms_user_id not in results]
+    return results, missing
+
+
+def _set_many_cached(memberships_by_cache_key, share=True):
+    """
+    Caches the given memberships for the rest of the request, and, if ``share`` is true,
+    the positive ones across requests too.
+    """
+    for cache_key, is_member in memberships_by_cache_key.items():
+        DEFAULT_REQUEST_CACHE.set(cache_key, is_member)
+    if share:
+        django_cache.set_many(
+            {cache_key: True for cache_key, is_member in memberships_by_cache_key.items() if is_member},
+            LEARNER_MEMBERSHIP_CACHE_TIMEOUT,
+        )
+
+
+def enterprise_contains_learner(lms_api_client, enterprise_customer_uuid, lms_user_id):
+    """
+    Cached variant of ``LmsApiClient.enterprise_contains_learner()``.
+    """
+    cache_key = learner_membership_cache_key(enterprise_customer_uuid, lms_user_id)
+    cached, _ = _get_many_cached({lms_user_id: cache_key})
+    if lms_user_id in cached:
+        return cached[lms_user_id]
+
+    is_member = lms_api_client.enterprise_contains_learner(enterprise_customer_uuid, lms_user_id)
+    _set_many_cached({cache_key: is_member})
+    return is_member
+
+
+def enterprise_contains_learners(lms_api_client, enterprise_customer_uuid, lms_user_ids):
+    """
+    Bulk variant of ``enterprise_contains_learner()``, which checks every learner that isn't cached yet
+    with one LMS request per ``LEARNER_MEMBERSHIP_CHUNK_SIZE`` learners.
+
+    Returns:
+      A dictionary of lms_user_id -> whether the learner is linked to the enterprise customer.
+      If the LMS request for some learners fails, they're treated as not linked, but not cached as such.
+    """
+    cache_keys_by_id = {
+        lms_user_id: learner_membership_cache_key(enterprise_customer_uuid, lms_user_id)
+        for lms_user_id in lms_user_ids
+    }
+    results, missing = _get_many_cached(cache_keys_by_id)
+
+    for offset in range(0, len(missing), LEARNER_MEMBERSHIP_CHUNK_SIZE):
+        chunk = missing[offset:offset + LEARNER_MEMBERSHIP_CHUNK_SIZE]
+        try:
+            linked_ids = lms_api_client.get_enterprise_learner_ids(enterprise_customer_uuid, chunk)
+            succeeded = True
+        except requests.exceptions.HTTPError:
+            linked_ids, succeeded = set(), False
+        memberships = {lms_user_id: int(lms_user_id) in linked_ids for lms_user_id in chunk}
+        _set_many_cached(
+            {cache_keys_by_id[lms_user_id]: is_member for lms_user_id, is_member in memberships.items()},
+            share=succeeded,
+        )
+        results.update(memberships)
+
+    return results
+
+
+def invalidate_learner_membership_cache(enterprise_customer_uuid, lms_user_ids):
+    """
+    Drops the cached memberships of the given learners in the given enterprise customer, e.g. once they're unlinked.
+    """
+    cache_keys = [
+        learner_membership_cache_key(enterprise_customer_uuid, lms_user_id)
+        for lms_user_id in lms_user_ids
+    ]
+    for cache_key in cache_keys:
+        DEFAULT_REQUEST_CACHE.delete(cache_key)
+    django_cache.delete_many(cache_keys)
+    logger.info(
+        'Invalidated cached membership of %s learners in enterprise customer %s.',
+        len(cache_keys), enterprise_customer_uuid,
+    )
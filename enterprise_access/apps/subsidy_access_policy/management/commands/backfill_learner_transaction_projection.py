@@ -0,0 +1,34 @@
+"""
+Management command to backfill the local learner ledger projection with the transactions of a subsidy.
+"""
+
+import logging
+
+from django.core.management.base import BaseCommand
+
+from enterprise_access.apps.subsidy_access_policy.ledger_projection_api import backfill_subsidy
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Projects every transaction of the given subsidies, then marks them as projected, so that (once
+    ``LEARNER_LEDGER_PROJECTION_ENABLED`` is set) their learners' transactions are read locally.
+    Should only be run while ``consume_subsidy_transaction_events`` is running, and can safely be re-run.
+    """
+    help = 'Backfill the local learner ledger projection with all transactions of the given subsidies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--subsidy-uuid',
+            action='append',
+            dest='subsidy_uuids',
+            required=True,
+            help='The subsidy to backfill.  May be given more than once.',
+        )
+
+    def handle(self, *args, **options):
+        for subsidy_uuid in options['subsidy_uuids']:
+            num_projected = backfill_subsidy(subsidy_uuid)
+            logger.info('Backfilled subsidy %s with %s transactions.', subsidy_uuid, num_projected)
@@ -0,0 +1,52 @@
+"""
+Management command to invalidate the cached remote data of a single customer, subsidy or catalog.
+"""
+
+import logging
+
+from django.core.management.base import BaseCommand
+
+from enterprise_access.apps.subsidy_access_policy.utils import (
+    CACHE_GENERATION_GLOBAL_SCOPE,
+    CACHE_GENERATION_SCOPES,
+    bump_cache_generation
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Bumps the cache generation of the given scope, which logically invalidates every versioned
+    cache key built in that scope (see ``versioned_cache_key()``), e.g. all cached content metadata
+    of one enterprise customer, without flushing any other customer's cached data.
+    """
+    help = 'Invalidate all cached data of a single cache scope, e.g. one enterprise customer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scope',
+            action='store',
+            dest='scope',
+            required=True,
+            choices=CACHE_GENERATION_SCOPES,
+            help='The kind of cache scope to invalidate.',
+        )
+        parser.add_argument(
+            '--identifier',
+            action='store',
+            dest='identifier',
+            default=None,
+            help='The uuid of the customer, subsidy or catalog to invalidate. Not used for the global scope.',
+        )
+
+    def handle(self, *args, **options):
+        scope = options['scope']
+        identifier = options['identifier']
+        if scope == CACHE_GENERATION_GLOBAL_SCOPE:
+            identifier = CACHE_GENERATION_GLOBAL_SCOPE
+        elif not identifier:
+            raise ValueError(f'An --identifier is required for the {scope} scope.')
+
+        generation = bump_cache_generation(scope, identifier)
+        logger.info('Bumped cache generation of %s %s to %s', scope, identifier, generation)
@@ -0,0 +1,132 @@
+"""
+Management command to consume subsidy transaction lifecycle events into the local learner ledger projection.
+"""
+
+import logging
+import time
+
+from confluent_kafka.error import KeyDeserializationError, ValueDeserializationError
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError, close_old_connections
+
+from enterprise_access.apps.events.data import SubsidyTransactionEvent
+from enterprise_access.apps.events.utils import (
+    create_subsidy_transaction_event_consumer,
+    send_subsidy_transaction_event_to_dead_letter_topic
+)
+from enterprise_access.apps.subsidy_access_policy.ledger_projection_api import apply_transaction_event
+
+logger = logging.getLogger(__name__)
+
+# Errors which mean that an event's payload can't be projected, however many times it's retried.
+UNPROCESSABLE_EVENT_ERRORS = (AttributeError, KeyError, TypeError, ValueError, ValidationError, DataError)
+# How many times an event is tried, with exponential backoff, before the command gives up on other errors.
+MAX_ATTEMPTS_PER_EVENT = 5
+RETRY_BACKOFF_SECONDS = 1
+
+
+class Command(BaseCommand):
+    """
+    This command is intended to run continuously, as a worker process, in as many instances as the
+    subsidy transaction topic has partitions.  Every event's offset is committed only after the event
+    is projected, so each event is projected at least once; redelivered and out-of-order events are
+    detected by the projection itself.  Events that can't be deserialized or projected are sent to the
+    dead-letter topic, and skipped.  Other (e.g. database) errors are retried with backoff, after which
+    the command exits with an error, without committing the event's offset.
+    """
+    help = 'Consume subsidy transaction events from the event bus into the local learner ledger projection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--group-id',
+            action='store',
+            dest='group_id',
+            default=settings.SUBSIDY_TRANSACTION_CONSUMER_GROUP_ID,
+            help='The consumer group to join.',
+        )
+        parser.add_argument(
+            '--max-messages',
+            action='store',
+            dest='max_messages',
+            default=0,
+            help='How many messages to consume before exiting, or 0 to consume forever.',
+            type=int,
+        )
+        parser.add_argument(
+            '--poll-timeout',
+            action='store',
+            dest='poll_timeout',
+            default=1.0,
+            help='How long to wait for each message, in seconds.',
+            type=float,
+        )
+
+    def handle(self, *args, **options):
+        max_messages = options['max_messages']
+        consumer = create_subsidy_transaction_event_consumer(options['group_id'])
+        consumer.subscribe([settings.SUBSIDY_TRANSACTION_TOPIC_NAME])
+
+        num_consumed = 0
+        try:
+            while not max_messages or num_consumed < max_messages:
+                try:
+                    msg = consumer.poll(timeout=options['poll_timeout'])
+                except (KeyDeserializationError, ValueDeserializationError) as exc:
+                    num_consumed += 1
+                    self._dead_letter(consumer, exc.kafka_message, f'Could not deserialize event: {exc}')
+                    continue
+                if msg is None:
+                    continue
+                if msg.error():
+                    logger.error('Error consuming subsidy transaction events: %s', msg.error())
+                    continue
+
+                num_consumed += 1
+                self._project(consumer, msg)
+        finally:
+            consumer.close()
+
+    def _dead_letter(self, consumer, msg, reason):
+        """
+        Sends the given message to the dead-letter topic, and commits its offset.
+        """
+        logger.error(
+            'Sending event at offset %s of partition %s to the dead-letter topic: %s',
+            msg.offset(), msg.partition(), reason,
+        )
+        send_subsidy_transaction_event_to_dead_letter_topic(msg, reason)
+        consumer.commit(message=msg, asynchronous=False)
+
+    def _project(self, consumer, msg):
+        """
+        Projects the event of the given message, retrying errors other than unprocessable payloads with backoff,
+        and commits its offset once it's projected (or dead-lettered).
+
+        Raises:
+            CommandError: If the event still couldn't be projected after ``MAX_ATTEMPTS_PER_EVENT`` attempts.
+        """
+        for attempt in range(1, MAX_ATTEMPTS_PER_EVENT + 1):
+            try:
+                apply_transaction_event(msg.key(), SubsidyTransactionEvent.to_dict(msg.value(), None))
+            except UNPROCESSABLE_EVENT_ERRORS as exc:
+                self._dead_letter(consumer, msg, f'Could not project {msg.key()} event: {exc!r}')
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                if attempt == MAX_ATTEMPTS_PER_EVENT:
+                    raise CommandError(
+                        f'Failed to project {msg.key()} event at offset {msg.offset()} of partition '
+                        f'{msg.partition()} after {attempt} attempts'
+                    ) from exc
+                backoff = RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                logger.warning(
+                    'Failed to project %s event at offset %s of partition %s, retrying in %s seconds: %r',
+                    msg.key(), msg.offset(), msg.partition(), backoff, exc,
+                )
+                # Drops the database connection if the error left it unusable.
+                close_old_connections()
+                time.sleep(backoff)
+            else:
+                consumer.commit(message=msg, asynchronous=False)
+                return
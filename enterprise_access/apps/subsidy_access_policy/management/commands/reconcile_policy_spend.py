@@ -0,0 +1,65 @@
+"""
+Management command to reconcile the committed spend of policies against the enterprise-subsidy service.
+"""
+
+import logging
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from enterprise_access.apps.subsidy_access_policy.models import SubsidyAccessPolicy
+from enterprise_access.apps.subsidy_access_policy.tasks import reconcile_policy_spend_task
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    This command is intended to run as frequently as specified in a crontab.  Spend-limit checks
+    rely on a locally committed spend counter per policy (see ``spend_api``), and this command
+    corrects that counter for any spend that didn't go through this service, e.g. reversals.
+    Only active policies with a ``spend_limit`` are reconciled, since no other policy uses the counter.
+    """
+    help = (
+        'Spin off celery tasks to reconcile the committed spend of active, spend-limited '
+        'subsidy access policies against the enterprise-subsidy service.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            default=25,
+            help='How many tasks to kick start before sleeping.',
+            type=int,
+        )
+        parser.add_argument(
+            '--sleep-duration',
+            action='store',
+            dest='sleep_duration',
+            default=5,
+            help='How long to sleep between batches.',
+            type=int,
+        )
+
+    def _we_should_sleep(self, task_number, batch_size):
+        return task_number % batch_size == 0
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        sleep_duration = options['sleep_duration']
+
+        policy_uuids = SubsidyAccessPolicy.objects.filter(
+            active=True,
+            spend_limit__isnull=False,
+        ).values_list(
+            'uuid',
+            flat=True,
+        )
+
+        for task_number, policy_uuid in enumerate(policy_uuids):
+            reconcile_policy_spend_task.delay(str(policy_uuid))
+
+            if self._we_should_sleep(task_number + 1, batch_size):
+                sleep(sleep_duration)
@@ -0,0 +1,74 @@
+"""
+Management command to refresh the balance snapshots of policies from the enterprise-subsidy service.
+"""
+
+import logging
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from enterprise_access.apps.subsidy_access_policy.models import SubsidyAccessPolicy
+from enterprise_access.apps.subsidy_access_policy.tasks import refresh_policy_balance_snapshots_task
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    This command is intended to run as frequently as specified in a crontab.  Each ``PolicyBalanceSnapshot``
+    is adjusted by this service's own redemptions and allocations, and this command corrects it for
+    everything else, e.g. reversals, by refreshing it from the enterprise-subsidy service.
+    Policies are refreshed in chunks, so that each task fetches the balances of many policies in bulk.
+    """
+    help = (
+        'Spin off celery tasks to refresh the balance snapshots of active subsidy access policies '
+        'from the enterprise-subsidy service.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--policies-per-task',
+            action='store',
+            dest='policies_per_task',
+            default=50,
+            help='How many policies to refresh in each task.',
+            type=int,
+        )
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            default=25,
+            help='How many tasks to kick start before sleeping.',
+            type=int,
+        )
+        parser.add_argument(
+            '--sleep-duration',
+            action='store',
+            dest='sleep_duration',
+            default=5,
+            help='How long to sleep between batches.',
+            type=int,
+        )
+
+    def _we_should_sleep(self, task_number, batch_size):
+        return task_number % batch_size == 0
+
+    def handle(self, *args, **options):
+        policies_per_task = options['policies_per_task']
+        batch_size = options['batch_size']
+        sleep_duration = options['sleep_duration']
+
+        policy_uuids = [
+            str(policy_uuid)
+            for policy_uuid in SubsidyAccessPolicy.objects.filter(active=True).order_by('subsidy_uuid').values_list(
+                'uuid',
+                flat=True,
+            )
+        ]
+
+        for task_number, offset in enumerate(range(0, len(policy_uuids), policies_per_task)):
+            refresh_policy_balance_snapshots_task.delay(policy_uuids[offset:offset + policies_per_task])
+
+            if self._we_should_sleep(task_number + 1, batch_size):
+                sleep(sleep_duration)
@@ -0,0 +1,29 @@
+"""
+Tests for the backfill_learner_transaction_projection management command.
+"""
+import uuid
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+COMMAND_PATH = (
+    'enterprise_access.apps.subsidy_access_policy.management.commands.backfill_learner_transaction_projection'
+)
+
+
+class TestBackfillLearnerTransactionProjectionCommand(TestCase):
+    """
+    Tests for the backfill_learner_transaction_projection management command.
+    """
+    @mock.patch(COMMAND_PATH + '.backfill_subsidy', return_value=0)
+    def test_every_subsidy_is_backfilled(self, mock_backfill):
+        subsidy_uuids = [str(uuid.uuid4()), str(uuid.uuid4())]
+
+        call_command(
+            'backfill_learner_transaction_projection',
+            '--subsidy-uuid', subsidy_uuids[0],
+            '--subsidy-uuid', subsidy_uuids[1],
+        )
+
+        self.assertEqual([call.args[0] for call in mock_backfill.call_args_list], subsidy_uuids)
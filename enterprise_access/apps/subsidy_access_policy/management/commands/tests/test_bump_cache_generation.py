@@ -0,0 +1,45 @@
+"""
+Tests for the bump_cache_generation management command.
+"""
+from uuid import uuid4
+
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.test import TestCase
+from edx_django_utils.cache import RequestCache
+
+from enterprise_access.apps.subsidy_access_policy.subsidy_api import subsidy_record_cache_key
+
+
+class TestBumpCacheGenerationCommand(TestCase):
+    """
+    Tests for the bump_cache_generation management command.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+
+    def test_only_the_given_scope_is_invalidated(self):
+        subsidy_uuid, other_subsidy_uuid = uuid4(), uuid4()
+        cache_key = subsidy_record_cache_key(subsidy_uuid)
+        other_cache_key = subsidy_record_cache_key(other_subsidy_uuid)
+
+        call_command('bump_cache_generation', scope='subsidy', identifier=str(subsidy_uuid))
+
+        RequestCache.clear_all_namespaces()
+        self.assertNotEqual(subsidy_record_cache_key(subsidy_uuid), cache_key)
+        self.assertEqual(subsidy_record_cache_key(other_subsidy_uuid), other_cache_key)
+
+    def test_global_scope(self):
+        subsidy_uuid = uuid4()
+        cache_key = subsidy_record_cache_key(subsidy_uuid)
+
+        call_command('bump_cache_generation', scope='global')
+
+        RequestCache.clear_all_namespaces()
+        self.assertNotEqual(subsidy_record_cache_key(subsidy_uuid), cache_key)
+
+    def test_identifier_required(self):
+        with self.assertRaises(ValueError):
+            call_command('bump_cache_generation', scope='catalog')
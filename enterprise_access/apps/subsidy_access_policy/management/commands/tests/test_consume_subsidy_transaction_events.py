@@ -0,0 +1,143 @@
+"""
+Tests for the consume_subsidy_transaction_events management command.
+"""
+import uuid
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError
+from django.test import TestCase
+from edx_django_utils.cache import RequestCache
+
+from enterprise_access.apps.events.data import SubsidyTransactionEvent
+from enterprise_access.apps.events.signals import SUBSIDY_TRANSACTION_COMMITTED, SUBSIDY_TRANSACTION_CREATED
+from enterprise_access.apps.events.tests.local_broker import LocalEventBroker
+from enterprise_access.apps.subsidy_access_policy.constants import TransactionStateChoices
+from enterprise_access.apps.subsidy_access_policy.models import LearnerTransactionProjection
+from enterprise_access.apps.subsidy_access_policy.tests.test_ledger_projection_api import transaction_payload
+
+COMMAND_PATH = 'enterprise_access.apps.subsidy_access_policy.management.commands.consume_subsidy_transaction_events'
+
+
+class TestConsumeSubsidyTransactionEventsCommand(TestCase):
+    """
+    Tests for the consume_subsidy_transaction_events management command, against an in-process broker.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+        self.broker = LocalEventBroker()
+        self.consumers = []
+        patcher = mock.patch(COMMAND_PATH + '.create_subsidy_transaction_event_consumer', side_effect=self._consumer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        dead_letter_patcher = mock.patch(COMMAND_PATH + '.send_subsidy_transaction_event_to_dead_letter_topic')
+        self.mock_dead_letter = dead_letter_patcher.start()
+        self.addCleanup(dead_letter_patcher.stop)
+        sleep_patcher = mock.patch(COMMAND_PATH + '.time.sleep')
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def _consumer(self, group_id):
+        consumer = self.broker.consumer(group_id)
+        self.consumers.append(consumer)
+        return consumer
+
+    def _produce(self, event_type, payload):
+        self.broker.produce(settings.SUBSIDY_TRANSACTION_TOPIC_NAME, event_type, SubsidyTransactionEvent(**payload))
+
+    def test_events_are_projected_and_committed(self):
+        created = transaction_payload()
+        committed = {**created, 'state': TransactionStateChoices.COMMITTED, 'modified': '2023-10-01T00:01:00Z'}
+        self._produce(SUBSIDY_TRANSACTION_CREATED.event_type, created)
+        self.broker.produce_error(settings.SUBSIDY_TRANSACTION_TOPIC_NAME, 'broker hiccup')
+        self._produce(SUBSIDY_TRANSACTION_COMMITTED.event_type, committed)
+
+        call_command('consume_subsidy_transaction_events', max_messages=2)
+
+        projection = LearnerTransactionProjection.objects.get(uuid=created['uuid'])
+        self.assertEqual(projection.state, TransactionStateChoices.COMMITTED)
+        self.assertEqual(
+            self.broker.committed_offsets[settings.SUBSIDY_TRANSACTION_CONSUMER_GROUP_ID],
+            {settings.SUBSIDY_TRANSACTION_TOPIC_NAME: 3},
+        )
+        self.assertTrue(self.consumers[0].closed)
+
+    def test_consumption_resumes_from_committed_offset(self):
+        first, second = transaction_payload(), transaction_payload()
+        self._produce(SUBSIDY_TRANSACTION_CREATED.event_type, first)
+        call_command('consume_subsidy_transaction_events', max_messages=1)
+        self._produce(SUBSIDY_TRANSACTION_CREATED.event_type, second)
+
+        with mock.patch(COMMAND_PATH + '.apply_transaction_event') as mock_apply:
+            call_command('consume_subsidy_transaction_events', max_messages=1)
+
+        mock_apply.assert_called_once_with(SUBSIDY_TRANSACTION_CREATED.event_type, second)
+
+    def test_unprocessable_events_are_skipped(self):
+        unprocessable = transaction_payload(subsidy_uuid='not-a-uuid')
+        processable = transaction_payload()
+        self._produce(SUBSIDY_TRANSACTION_CREATED.event_type, unprocessable)
+        self._produce(SUBSIDY_TRANSACTION_CREATED.event_type, processable)
+
+        with self.assertLogs(COMMAND_PATH, level='ERROR'):
+            call_command('consume_subsidy_transaction_events', max_messages=2, group_id=str(uuid.uuid4()))
+
+        self.assertEqual(
+            list(LearnerTransactionProjection.objects.values_list('uuid', flat=True)),
+            [uuid.UUID(processable['uuid'])],
+        )
+        self.mock_dead_letter.assert_called_once()
+        self.assertEqual(self.mock_dead_letter.call_args.args[0].offset(), 0)
+
+    def test_undeserializable_events_are_dead_lettered(self):
+        processable = transaction_payload()
+        self.broker.produce_undeserializable(
+            settings.SUBSIDY_TRANSACTION_TOPIC_NAME, SUBSIDY_TRANSACTION_CREATED.event_type, b'garbage',
+        )
+        self._produce(SUBSIDY_TRANSACTION_CREATED.event_type, processable)
+
+        with self.assertLogs(COMMAND_PATH, level='ERROR'):
+            call_command('consume_subsidy_transaction_events', max_messages=2)
+
+        dead_letter_message = self.mock_dead_letter.call_args.args[0]
+        self.assertEqual((dead_letter_message.offset(), dead_letter_message.value()), (0, b'garbage'))
+        self.assertTrue(LearnerTransactionProjection.objects.filter(uuid=processable['uuid']).exists())
+        self.assertEqual(
+            self.broker.committed_offsets[settings.SUBSIDY_TRANSACTION_CONSUMER_GROUP_ID],
+            {settings.SUBSIDY_TRANSACTION_TOPIC_NAME: 2},
+        )
+
+    def test_transient_errors_are_retried(self):
+        payload = transaction_payload()
+        self._produce(SUBSIDY_TRANSACTION_CREATED.event_type, payload)
+
+        with mock.patch(
+            COMMAND_PATH + '.apply_transaction_event',
+            side_effect=[OperationalError('server closed the connection'), True],
+        ) as mock_apply:
+            call_command('consume_subsidy_transaction_events', max_messages=1)
+
+        self.assertEqual(mock_apply.call_count, 2)
+        self.mock_sleep.assert_called_once_with(1)
+        self.mock_dead_letter.assert_not_called()
+        self.assertEqual(
+            self.broker.committed_offsets[settings.SUBSIDY_TRANSACTION_CONSUMER_GROUP_ID],
+            {settings.SUBSIDY_TRANSACTION_TOPIC_NAME: 1},
+        )
+
+    def test_persistent_errors_exit_without_committing(self):
+        self._produce(SUBSIDY_TRANSACTION_CREATED.event_type, transaction_payload())
+
+        with mock.patch(COMMAND_PATH + '.apply_transaction_event', side_effect=OperationalError('database is down')):
+            with self.assertRaises(CommandError):
+                call_command('consume_subsidy_transaction_events', max_messages=1)
+
+        self.assertEqual(self.mock_sleep.call_args_list, [mock.call(1), mock.call(2), mock.call(4), mock.call(8)])
+        self.mock_dead_letter.assert_not_called()
+        self.assertEqual(self.broker.committed_offsets[settings.SUBSIDY_TRANSACTION_CONSUMER_GROUP_ID], {})
+        self.assertTrue(self.consumers[0].closed)
@@ -0,0 +1,36 @@
+"""
+Tests for the reconcile_policy_spend management command.
+"""
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from enterprise_access.apps.subsidy_access_policy.tests.factories import (
+    PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory
+)
+
+COMMAND_PATH = 'enterprise_access.apps.subsidy_access_policy.management.commands.reconcile_policy_spend'
+
+
+class TestReconcilePolicySpendCommand(TestCase):
+    """
+    Tests for the reconcile_policy_spend management command.
+    """
+    @mock.patch(COMMAND_PATH + '.sleep')
+    @mock.patch(COMMAND_PATH + '.reconcile_policy_spend_task')
+    def test_only_active_spend_limited_policies_reconciled(self, mock_task, mock_sleep):
+        policies = [
+            PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(spend_limit=1000)
+            for _ in range(3)
+        ]
+        PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(spend_limit=None)
+        PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(spend_limit=1000, active=False)
+
+        call_command('reconcile_policy_spend', batch_size=2, sleep_duration=3)
+
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_task.delay.call_args_list),
+            sorted(str(policy.uuid) for policy in policies),
+        )
+        mock_sleep.assert_called_once_with(3)
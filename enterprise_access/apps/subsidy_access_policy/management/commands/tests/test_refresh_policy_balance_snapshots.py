@@ -0,0 +1,34 @@
+"""
+Tests for the refresh_policy_balance_snapshots management command.
+"""
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from enterprise_access.apps.subsidy_access_policy.tests.factories import (
+    PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory
+)
+
+COMMAND_PATH = 'enterprise_access.apps.subsidy_access_policy.management.commands.refresh_policy_balance_snapshots'
+
+
+class TestRefreshPolicyBalanceSnapshotsCommand(TestCase):
+    """
+    Tests for the refresh_policy_balance_snapshots management command.
+    """
+    @mock.patch(COMMAND_PATH + '.sleep')
+    @mock.patch(COMMAND_PATH + '.refresh_policy_balance_snapshots_task')
+    def test_active_policies_refreshed_in_chunks(self, mock_task, mock_sleep):
+        policies = [PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory() for _ in range(5)]
+        PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(active=False)
+
+        call_command('refresh_policy_balance_snapshots', policies_per_task=2, batch_size=2, sleep_duration=3)
+
+        chunks = [call.args[0] for call in mock_task.delay.call_args_list]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            sorted(policy_uuid for chunk in chunks for policy_uuid in chunk),
+            sorted(str(policy.uuid) for policy in policies),
+        )
+        mock_sleep.assert_called_once_with(3)
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.6 on 2026-10-18 21:28
+
+import django.db.models.deletion
+import django_extensions.db.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subsidy_access_policy', '0017_active_assignment_config_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyBalanceSnapshot',
+            fields=[
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('policy', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance_snapshot', serialize=False, to='subsidy_access_policy.subsidyaccesspolicy')),
+                ('total_redeemed', models.IntegerField(help_text='Total amount already transacted via the policy, in USD cents (<= 0).')),
+                ('total_allocated', models.IntegerField(help_text='Total amount of assignments currently allocated via the policy, in USD cents (<= 0).')),
+                ('spend_available', models.IntegerField(help_text='Policy-wide spend available, in USD cents (>= 0).')),
+                ('subsidy_balance', models.IntegerField(help_text="Remaining balance of the policy's subsidy, in USD cents.")),
+                ('subsidy_expiration_datetime', models.DateTimeField(blank=True, help_text="The datetime when the policy's subsidy expires, if ever.", null=True)),
+                ('as_of', models.DateTimeField(db_index=True, help_text='When these balances were last known to be accurate.')),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.6 on 2026-10-18 21:56
+
+import django_extensions.db.fields
+import jsonfield.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subsidy_access_policy', '0018_policy_balance_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectedSubsidy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('subsidy_uuid', models.UUIDField(help_text='The subsidy whose transactions are projected.', unique=True)),
+                ('backfilled_at', models.DateTimeField(help_text="When the subsidy's transactions were last backfilled.")),
+            ],
+            options={
+                'get_latest_by': 'modified',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='LearnerTransactionProjection',
+            fields=[
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('uuid', models.UUIDField(editable=False, help_text='The uuid of the subsidy transaction.', primary_key=True, serialize=False)),
+                ('subsidy_uuid', models.UUIDField(help_text='The subsidy in which the transaction was made.')),
+                ('lms_user_id', models.IntegerField(help_text='The learner for whom the transaction was made.')),
+                ('subsidy_access_policy_uuid', models.UUIDField(blank=True, help_text='The policy via which the transaction was made, if any.', null=True)),
+                ('content_key', models.CharField(help_text='The content for which the transaction was made.', max_length=255)),
+                ('state', models.CharField(help_text='The lifecycle state of the transaction.', max_length=32)),
+                ('quantity', models.BigIntegerField(help_text='The quantity of the transaction, in USD cents (<= 0).')),
+                ('transaction_created', models.DateTimeField(blank=True, help_text='When the transaction was created, per the enterprise-subsidy service.', null=True)),
+                ('transaction_modified', models.DateTimeField(blank=True, help_text='When the transaction was last modified, per the enterprise-subsidy service.', null=True)),
+                ('transaction', jsonfield.fields.JSONField(help_text='The transaction, as serialized by the enterprise-subsidy service.')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subsidy_uuid', 'lms_user_id', 'subsidy_access_policy_uuid', 'content_key'], name='learner_ledger_projection_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.6 on 2026-10-18 22:55
+
+import django.db.models.deletion
+import django_extensions.db.fields
+import jsonfield.fields
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subsidy_access_policy', '0019_learner_transaction_projection'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RedemptionIntent',
+            fields=[
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('uuid', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('lms_user_id', models.IntegerField(help_text='The learner for whom to redeem.')),
+                ('content_key', models.CharField(help_text='The content for which to redeem.', max_length=255)),
+                ('metadata', jsonfield.fields.JSONField(blank=True, help_text='The metadata to create the subsidy transaction with, if any.', null=True)),
+                ('state', models.CharField(choices=[('queued', 'Queued'), ('redeemed', 'Redeemed'), ('failed', 'Failed')], db_index=True, default='queued', help_text='The lifecycle state of the redemption.', max_length=32)),
+                ('reserved_spend', models.IntegerField(default=0, help_text="Spend reserved against the policy's spend limit when the redemption was accepted, in USD cents (>= 0). Released once the redemption is processed.")),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='How many times processing the redemption was attempted.')),
+                ('ledger_transaction', jsonfield.fields.JSONField(blank=True, help_text='The subsidy transaction created for the redemption, if any.', null=True)),
+                ('failure_reason', models.CharField(blank=True, help_text='Why the redemption failed, e.g. a reason the content is not redeemable via the policy.', max_length=255, null=True)),
+                ('failure_detail', jsonfield.fields.JSONField(blank=True, help_text='Details of the failure, e.g. the error payload of the enterprise-subsidy service.', null=True)),
+                ('policy', models.ForeignKey(help_text='The policy to redeem.', on_delete=django.db.models.deletion.CASCADE, related_name='redemption_intents', to='subsidy_access_policy.subsidyaccesspolicy')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['policy', 'lms_user_id', 'content_key', 'state'], name='redemption_intent_lookup_idx')],
+            },
+        ),
+    ]
@@ -2,8 +2,11 @@
 Models for subsidy_access_policy
 """
 import logging
+import random
 import sys
+import time
 from contextlib import contextmanager
+from datetime import timedelta
 from uuid import UUID, uuid4
 
 import requests
@@ -11,14 +14,22 @@ from django.conf import settings
 from django.core.cache import cache as django_cache
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest, Least
+from django.db.transaction import atomic
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_extensions.db.models import TimeStampedModel
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE
 from edx_django_utils.cache.utils import get_cache_key
+from jsonfield.fields import JSONField
 
 from enterprise_access.apps.api_client.lms_client import LmsApiClient
 from enterprise_access.apps.content_assignments import api as assignments_api
 from enterprise_access.utils import is_none, is_not_none
 
 from ..content_assignments.models import AssignmentConfiguration
+from . import spend_api
 from .constants import (
     CREDIT_POLICY_TYPE_PRIORITY,
     REASON_CONTENT_NOT_IN_CATALOG,
@@ -30,20 +41,52 @@ from .constants import (
     REASON_POLICY_SPEND_LIMIT_REACHED,
     REASON_SUBSIDY_EXPIRED,
     AccessMethods,
-    TransactionStateChoices
+    RedemptionIntentStateChoices
 )
 from .content_metadata_api import get_and_cache_catalog_contains_content, get_and_cache_content_metadata
-from .exceptions import ContentPriceNullException, SubsidyAccessPolicyLockAttemptFailed, SubsidyAPIHTTPError
-from .subsidy_api import get_and_cache_transactions_for_learner
+from .evaluation_trace import TIER_REQUEST, TIER_UPSTREAM, get_tiered_cached_response, record_cache_lookup
+from .exceptions import (
+    ContentPriceNullException,
+    SubsidyAccessPolicyLockAttemptFailed,
+    SubsidyAccessPolicySpendReservationFailed,
+    SubsidyAPIHTTPError
+)
+from .lms_api import enterprise_contains_learner
+from .predicates import (
+    COST_CACHED,
+    COST_LOCAL,
+    COST_REMOTE,
+    COST_SHARED_REMOTE,
+    LEARNER_LEDGER_DEPENDENCIES,
+    PREDICATE_CONTENT_IN_CATALOG,
+    PREDICATE_LEARNER_IN_ENTERPRISE,
+    PREDICATE_SUBSIDY_HAS_VALUE,
+    Predicate,
+    evaluate_predicates
+)
+from .subsidy_api import (
+    LearnerLedger,
+    fetch_with_last_known_fallback,
+    get_learner_ledger,
+    invalidate_learner_ledger_cache,
+    invalidate_policy_aggregates_cache,
+    invalidate_subsidy_record_cache,
+    is_subsidy_projected,
+    policy_aggregates_cache_key,
+    subsidy_can_redeem_cache_key,
+    subsidy_record_cache_key
+)
 from .utils import (
     ProxyAwareHistoricalRecords,
     create_idempotency_key_for_transaction,
+    fetch_and_cache_with_single_flight,
     get_versioned_subsidy_client,
-    request_cache,
-    versioned_cache_key
+    request_cache
 )
 
 POLICY_LOCK_RESOURCE_NAME = "subsidy_access_policy"
+POLICY_LOCK_INITIAL_BACKOFF_SECONDS = 0.05
+POLICY_LOCK_MAX_BACKOFF_SECONDS = 0.5
 logger = logging.getLogger(__name__)
 
 
@@ -80,6 +123,39 @@ class SubsidyAccessPolicy(TimeStampedModel):
 
     POLICY_FIELD_NAME = 'policy_type'
 
+    # Spend reserved for the redemption that can_redeem() is checking, which will_exceed_spend_limit() doesn't count.
+    _own_reserved_spend = 0
+
+    # The eligibility checks of can_redeem(), which evaluates them cheapest first (see the predicates module).
+    # Subclasses extend these with their own limits.
+    REDEMPTION_PREDICATES = (
+        Predicate('policy_active', '_check_policy_active', REASON_POLICY_EXPIRED, COST_LOCAL),
+        Predicate(
+            PREDICATE_LEARNER_IN_ENTERPRISE, '_check_learner_in_enterprise',
+            REASON_LEARNER_NOT_IN_ENTERPRISE, COST_SHARED_REMOTE,
+        ),
+        Predicate(
+            PREDICATE_CONTENT_IN_CATALOG, '_check_content_in_catalog', REASON_CONTENT_NOT_IN_CATALOG,
+            COST_SHARED_REMOTE,
+        ),
+        Predicate(
+            'content_has_metadata', '_check_content_has_metadata', REASON_CONTENT_NOT_IN_CATALOG, COST_SHARED_REMOTE,
+            depends_on=[PREDICATE_CONTENT_IN_CATALOG],
+        ),
+        Predicate(
+            'policy_spend_limit', '_check_policy_spend_limit', REASON_POLICY_SPEND_LIMIT_REACHED, COST_SHARED_REMOTE,
+            depends_on=['content_has_metadata'],
+        ),
+        Predicate(
+            'subsidy_active', '_check_subsidy_active', REASON_SUBSIDY_EXPIRED, COST_REMOTE,
+            depends_on=['content_has_metadata'],
+        ),
+        Predicate(
+            PREDICATE_SUBSIDY_HAS_VALUE, '_check_subsidy_has_value', REASON_NOT_ENOUGH_VALUE_IN_SUBSIDY, COST_REMOTE,
+            depends_on=['subsidy_active'],
+        ),
+    )
+
     policy_type = models.CharField(
         max_length=64,
         editable=False,
@@ -270,24 +346,14 @@ class SubsidyAccessPolicy(TimeStampedModel):
 
     def subsidy_record(self):
         """
-        Retrieve this policy's corresponding subsidy record
-        """
-        # don't utilize the cache unless this experimental feature is enabled
-        if not getattr(settings, 'MULTI_POLICY_RESOLUTION_ENABLED', False):
-            logger.info('subsidy_record MULTI_POLICY_RESOLUTION_ENABLED disabled')
-            try:
-                return self.subsidy_client.retrieve_subsidy(subsidy_uuid=self.subsidy_uuid)
-            except requests.exceptions.HTTPError as exc:
-                # when associated subsidy is soft-deleted, the subsidy retrieve API raises an exception.
-                logger.warning('SubsidyAccessPolicy.subsidy_record() raised HTTPError: %s', exc)
-                return {}
+        Retrieve this policy's corresponding subsidy record.
 
-        cache_key = versioned_cache_key(
-            'get_subsidy_record',
-            self.enterprise_customer_uuid,
-            self.subsidy_uuid,
-        )
-        cached_response = request_cache().get_cached_response(cache_key)
+        The record is cached in a ``TieredCache`` (meaning in both the RequestCache,
+        _and_ the django cache for ``SUBSIDY_RECORD_CACHE_TIMEOUT`` seconds), and that cache
+        is invalidated whenever this service writes to the subsidy (see ``redeem()`` and ``allocate()``).
+        """
+        cache_key = subsidy_record_cache_key(self.subsidy_uuid)
+        cached_response = get_tiered_cached_response(cache_key, 'subsidy_record')
         if cached_response.is_found:
             logger.info(
                 'subsidy_record cache hit '
@@ -297,12 +363,17 @@ class SubsidyAccessPolicy(TimeStampedModel):
             return cached_response.value
 
         try:
-            result = self.subsidy_client.retrieve_subsidy(subsidy_uuid=self.subsidy_uuid)
+            result = fetch_with_last_known_fallback(cache_key, lambda: fetch_and_cache_with_single_flight(
+                cache_key,
+                lambda: self.subsidy_client.retrieve_subsidy(subsidy_uuid=self.subsidy_uuid),
+                settings.SUBSIDY_RECORD_CACHE_TIMEOUT,
+            ))
         except requests.exceptions.HTTPError as exc:
+            # when associated subsidy is soft-deleted, the subsidy retrieve API raises an exception.
             logger.warning('SubsidyAccessPolicy.subsidy_record() raised HTTPError: %s', exc)
-            result = {}
-
-        request_cache().set(cache_key, result)
+            # Only remember the failure for the rest of this request, never across requests.
+            DEFAULT_REQUEST_CACHE.set(cache_key, {})
+            return {}
 
         logger.info(
             'subsidy_record cache miss '
@@ -397,50 +468,98 @@ class SubsidyAccessPolicy(TimeStampedModel):
     def aggregates_for_policy(self):
         """
         Returns aggregate transaction data for this policy.
+
+        The aggregates are cached in a ``TieredCache`` for ``POLICY_AGGREGATES_CACHE_TIMEOUT`` seconds,
+        and that cache is invalidated whenever this service writes to the policy (see ``redeem()`` and ``allocate()``).
         """
-        response_payload = self.subsidy_client.list_subsidy_transactions(
-            subsidy_uuid=self.subsidy_uuid,
-            subsidy_access_policy_uuid=self.uuid,
-        )
-        return response_payload['aggregates']
+        cache_key = policy_aggregates_cache_key(self.subsidy_uuid, self.uuid)
+        cached_response = get_tiered_cached_response(cache_key, 'policy_aggregates')
+        if cached_response.is_found:
+            return cached_response.value
+
+        return fetch_with_last_known_fallback(cache_key, lambda: fetch_and_cache_with_single_flight(
+            cache_key,
+            lambda: self.subsidy_client.list_subsidy_transactions(
+                subsidy_uuid=self.subsidy_uuid,
+                subsidy_access_policy_uuid=self.uuid,
+            )['aggregates'],
+            settings.POLICY_AGGREGATES_CACHE_TIMEOUT,
+        ))
+
+    def fresh_balance_snapshot(self):
+        """
+        Returns this policy's ``PolicyBalanceSnapshot``, if it has one that's at most
+        ``POLICY_BALANCE_SNAPSHOT_MAX_AGE`` seconds old, or None.  Only for serving balances to read-only
+        responses, never for the checks of a redemption or allocation.
+        """
+        try:
+            snapshot = self.balance_snapshot  # pylint: disable=no-member
+        except PolicyBalanceSnapshot.DoesNotExist:
+            return None
+        if snapshot.as_of < timezone.now() - timedelta(seconds=settings.POLICY_BALANCE_SNAPSHOT_MAX_AGE):
+            return None
+        return snapshot
+
+    def learner_ledger(self, lms_user_id):
+        """
+        Returns the request-cached, indexed ``LearnerLedger`` of all of this learner's transactions
+        in this policy's subsidy.
+        """
+        return get_learner_ledger(self.subsidy_uuid, lms_user_id)
 
     def transactions_for_learner(self, lms_user_id):
         """
         Returns a request-cached version of all transactions and aggregate quantities
-        for this learner and this policy.
-        """
-        subsidy_transactions = get_and_cache_transactions_for_learner(
-            self.subsidy_uuid, lms_user_id
-        )['transactions']
-        policy_transactions = [
-            transaction for transaction in subsidy_transactions
-            if str(transaction['subsidy_access_policy_uuid']) == str(self.uuid)
-        ]
-        policy_aggregates = {
-            'total_quantity': sum(tx['quantity'] for tx in policy_transactions),
-        }
+        for this learner and this policy, looked up in the learner's indexed ledger.
+        """
+        ledger = self.learner_ledger(lms_user_id)
         return {
-            'transactions': policy_transactions,
-            'aggregates': policy_aggregates,
+            'transactions': ledger.for_policy(self.uuid),
+            'aggregates': {
+                'total_quantity': ledger.total_quantity_for_policy(self.uuid),
+            },
         }
 
     def transactions_for_learner_and_content(self, lms_user_id, content_key):
         """
         Return a dictionary that contains a list of transactions
         and aggregates describing those transactions
-        for the given ``lms_user_id`` and ``content_key``.
+        for the given ``lms_user_id`` and ``content_key``,
+        read from the learner's request-cached ledger.
         """
-        response_payload = self.subsidy_client.list_subsidy_transactions(
-            subsidy_uuid=self.subsidy_uuid,
-            lms_user_id=lms_user_id,
-            content_key=content_key,
-            subsidy_access_policy_uuid=self.uuid,
-        )
+        transactions = self.learner_ledger(lms_user_id).for_policy_and_content_key(self.uuid, content_key)
         return {
-            'transactions': response_payload['results'],
-            'aggregates': response_payload['aggregates'],
+            'transactions': transactions,
+            'aggregates': {
+                'total_quantity': sum(tx['quantity'] for tx in transactions),
+            },
         }
 
+    def subsidy_can_redeem(self, lms_user_id, content_key):
+        """
+        Returns the enterprise-subsidy service's ``can_redeem`` payload for this policy's
+        subsidy, the given learner, and the given content.
+
+        The payload doesn't depend on the policy, only on the subsidy, so it is request-cached
+        per (subsidy, learner, content). This lets every policy that shares a subsidy
+        re-use a single upstream call when many policies are evaluated in the same request.
+        """
+        cache_key = subsidy_can_redeem_cache_key(self.subsidy_uuid, lms_user_id, content_key)
+        cached_response = request_cache().get_cached_response(cache_key)
+        if cached_response.is_found:
+            record_cache_lookup('subsidy_can_redeem', TIER_REQUEST)
+            return cached_response.value
+
+        record_cache_lookup('subsidy_can_redeem', TIER_UPSTREAM)
+        # Fetched for every evaluation, but rarely changes, so it's only remembered as last-known when it does.
+        payload = fetch_with_last_known_fallback(
+            cache_key,
+            lambda: self.subsidy_client.can_redeem(self.subsidy_uuid, lms_user_id, content_key),
+            only_if_changed=True,
+        )
+        request_cache().set(cache_key, payload)
+        return payload
+
     @staticmethod
     def content_would_exceed_limit(spent_amount, limit_to_check, content_price):
         """
@@ -465,73 +584,75 @@ class SubsidyAccessPolicy(TimeStampedModel):
 
         content_price = self.get_content_price(content_key, content_metadata=content_metadata)
 
-        return self.content_would_exceed_limit(self.total_redeemed, self.spend_limit, content_price)
+        # Count both committed spend and spend reserved by other in-flight redemptions, see ``spend_api``.
+        spent_amount = spend_api.get_total_spend(self, excluding_reserved=self._own_reserved_spend) * -1
+        return self.content_would_exceed_limit(spent_amount, self.spend_limit, content_price)
 
-    def can_redeem(self, lms_user_id, content_key, skip_customer_user_check=False):
-        """
-        Check that a given learner can redeem the given content.
-        The ordering of each conditional is intentional based on an expected
-        error message to be shown based on the learners state at the time of
-        accessing the CourseAbout page in FE-app-learner-portal focusing on the
-        user state, catalog state based on content key, then subsidy/policy state
-        based on whether they are active and have spend available for the requested
-        content.
+    def _check_policy_active(self, lms_user_id, content_key):  # pylint: disable=unused-argument
+        return self.active
 
-        Returns:
-            3-tuple of (bool, str, list of dict):
-                * first element is true if the learner can redeem the content,
-                * second element contains a reason code if the content is not redeemable,
-                * third a list of any transactions representing existing redemptions (any state).
-        """
-        # inactive policy
-        if not self.active:
-            return (False, REASON_POLICY_EXPIRED, [])
-
-        # learner not associated to enterprise
-        if not skip_customer_user_check:
-            if not self.lms_api_client.enterprise_contains_learner(self.enterprise_customer_uuid, lms_user_id):
-                return (False, REASON_LEARNER_NOT_IN_ENTERPRISE, [])
-
-        # no content key in catalog
-        if not self.catalog_contains_content_key(content_key):
-            return (False, REASON_CONTENT_NOT_IN_CATALOG, [])
+    def _check_learner_in_enterprise(self, lms_user_id, content_key):  # pylint: disable=unused-argument
+        return enterprise_contains_learner(self.lms_api_client, self.enterprise_customer_uuid, lms_user_id)
 
-        # Wait to fetch content metadata with a call to the enterprise-subsidy
-        # service until we *know* that we'll need it.
-        content_metadata = self.get_content_metadata(content_key)
+    def _check_content_in_catalog(self, lms_user_id, content_key):  # pylint: disable=unused-argument
+        return self.catalog_contains_content_key(content_key)
 
-        # no content key in content metadata
-        if not content_metadata:
-            return (False, REASON_CONTENT_NOT_IN_CATALOG, [])
-
-        # TODO: Add Course Upgrade/Registration Deadline Passed Error here
+    def _check_content_has_metadata(self, lms_user_id, content_key):  # pylint: disable=unused-argument
+        return bool(self.get_content_metadata(content_key))
 
-        # We want to wait to do these checks that might require a call
-        # to the enterprise-subsidy service until we *know* we'll need the data.
-        subsidy_can_redeem_payload = self.subsidy_client.can_redeem(
-            self.subsidy_uuid,
-            lms_user_id,
-            content_key,
-        )
+    def _check_policy_spend_limit(self, lms_user_id, content_key):  # pylint: disable=unused-argument
+        return not self.will_exceed_spend_limit(content_key)
 
+    def _check_subsidy_active(self, lms_user_id, content_key):
         # Refers to a computed property of an EnterpriseSubsidy record
         # that takes into account the start/expiration dates of the subsidy record.
-        active_subsidy = subsidy_can_redeem_payload.get('active', False)
-        existing_transactions = subsidy_can_redeem_payload.get('all_transactions', [])
+        return self.subsidy_can_redeem(lms_user_id, content_key).get('active', False)
 
-        # inactive subsidy?
-        if not active_subsidy:
-            return (False, REASON_SUBSIDY_EXPIRED, [])
+    def _check_subsidy_has_value(self, lms_user_id, content_key):
+        return self.subsidy_can_redeem(lms_user_id, content_key).get('can_redeem', False)
 
-        # can_redeem false from subsidy
-        if not subsidy_can_redeem_payload.get('can_redeem', False):
-            return (False, REASON_NOT_ENOUGH_VALUE_IN_SUBSIDY, existing_transactions)
+    def evaluate_redemption_predicates(
+        self, lms_user_id, content_key, skip_customer_user_check=False, max_cost=None, traced=True,
+    ):
+        """
+        Evaluates this policy's ``REDEMPTION_PREDICATES`` for the given learner and content, cheapest first,
+        until one fails, and returns the resulting ``PredicateEvaluation``, with per-predicate timings.
+        ``max_cost`` and ``traced`` are passed on to ``evaluate_predicates()``.
+        """
+        predicates = self.REDEMPTION_PREDICATES
+        if skip_customer_user_check:
+            predicates = [
+                predicate for predicate in predicates if predicate.name != PREDICATE_LEARNER_IN_ENTERPRISE
+            ]
+        return evaluate_predicates(predicates, self, lms_user_id, content_key, max_cost=max_cost, traced=traced)
 
-        # not enough funds on policy
-        if self.will_exceed_spend_limit(content_key, content_metadata=content_metadata):
-            return (False, REASON_POLICY_SPEND_LIMIT_REACHED, existing_transactions)
+    def can_redeem(self, lms_user_id, content_key, skip_customer_user_check=False, reserved_spend=0):
+        """
+        Check that a given learner can redeem the given content.
+        The checks are this policy's ``REDEMPTION_PREDICATES``, which are evaluated cheapest first,
+        e.g. whether the policy is active, or the learner's limits, before any upstream call.
+        When several checks would fail, the reason returned is that of the cheapest.
+        ``reserved_spend`` is spend already reserved for this very redemption (e.g. by its RedemptionIntent),
+        which isn't counted against the policy's ``spend_limit``.
 
-        return (True, None, existing_transactions)
+        Returns:
+            3-tuple of (bool, str, list of dict):
+                * first element is true if the learner can redeem the content,
+                * second element contains a reason code if the content is not redeemable,
+                * third a list of any transactions representing existing redemptions (any state),
+                  as reported by the enterprise-subsidy service, if it was asked.
+        """
+        self._own_reserved_spend = reserved_spend
+        try:
+            evaluation = self.evaluate_redemption_predicates(lms_user_id, content_key, skip_customer_user_check)
+        finally:
+            self._own_reserved_spend = 0
+
+        existing_transactions = []
+        if evaluation.was_evaluated(PREDICATE_SUBSIDY_HAS_VALUE):
+            existing_transactions = self.subsidy_can_redeem(lms_user_id, content_key).get('all_transactions', [])
+
+        return (evaluation.passed, evaluation.reason, existing_transactions)
 
     def has_credit_available_with_spend_limit(self):
         """
@@ -543,10 +664,7 @@ class SubsidyAccessPolicy(TimeStampedModel):
             return True
 
         # Verify that spend against the policy has not exceeded the spend limit.
-        spent_amount = self.aggregates_for_policy().get('total_quantity') or 0
-        if spent_amount > 0:
-            raise Exception('[SubsidyAccessPolicy.credit_available] Expected a sum of transaction quantities <= 0')
-        positive_spent_amount = spent_amount * -1
+        positive_spent_amount = spend_api.get_total_spend(self)
         if positive_spent_amount >= self.spend_limit:
             return False
 
@@ -569,7 +687,7 @@ class SubsidyAccessPolicy(TimeStampedModel):
 
         # learner not linked to enterprise
         if not skip_customer_user_check:
-            if not self.lms_api_client.enterprise_contains_learner(self.enterprise_customer_uuid, lms_user_id):
+            if not enterprise_contains_learner(self.lms_api_client, self.enterprise_customer_uuid, lms_user_id):
                 logger.info(
                     '[credit_available] learner %s not linked to enterprise %s',
                     lms_user_id,
@@ -631,13 +749,7 @@ class SubsidyAccessPolicy(TimeStampedModel):
         Returns:
             list of str: Transaction UUIDs which should cause the idempotency_key to change.
         """
-        return [
-            transaction['uuid'] for transaction in all_transactions
-            if transaction['state'] == TransactionStateChoices.FAILED or (
-                isinstance(transaction['reversal'], dict) and
-                transaction['reversal'].get('state') == TransactionStateChoices.COMMITTED
-            )
-        ]
+        return LearnerLedger(all_transactions).retryable_transaction_uuids()
 
     def redeem(self, lms_user_id, content_key, all_transactions, metadata=None):
         """
@@ -654,7 +766,7 @@ class SubsidyAccessPolicy(TimeStampedModel):
                 historical_redemptions_uuids=self._redemptions_for_idempotency_key(all_transactions),
             )
             try:
-                return self.subsidy_client.create_subsidy_transaction(
+                ledger_transaction = self.subsidy_client.create_subsidy_transaction(
                     subsidy_uuid=str(self.subsidy_uuid),
                     lms_user_id=lms_user_id,
                     content_key=content_key,
@@ -664,6 +776,20 @@ class SubsidyAccessPolicy(TimeStampedModel):
                 )
             except requests.exceptions.HTTPError as exc:
                 raise SubsidyAPIHTTPError('HTTPError occurred in Subsidy API request.') from exc
+            finally:
+                # Whatever the outcome, the subsidy's view of this learner and content (and its balance)
+                # has possibly changed, so don't let any cached subsidy state outlive it.
+                request_cache().delete(subsidy_can_redeem_cache_key(self.subsidy_uuid, lms_user_id, content_key))
+                invalidate_learner_ledger_cache(self.subsidy_uuid, lms_user_id)
+                invalidate_subsidy_record_cache(self.subsidy_uuid)
+                invalidate_policy_aggregates_cache(self.subsidy_uuid, self.uuid)
+            if is_subsidy_projected(self.subsidy_uuid):
+                # Project the new transaction right away, rather than waiting for its creation event,
+                # so that this learner's subsequent requests see it.
+                LearnerTransactionProjection.project(self.subsidy_uuid, ledger_transaction)
+            if ledger_transaction.get('quantity'):
+                PolicyBalanceSnapshot.record_redemption(self, ledger_transaction['quantity'])
+            return ledger_transaction
         else:
             raise ValueError(f"unknown access method {self.access_method}")
 
@@ -702,38 +828,79 @@ class SubsidyAccessPolicy(TimeStampedModel):
         cache_key_inputs.update({"content_key": content_key} if content_key else {})
         return get_cache_key(**cache_key_inputs)
 
-    def acquire_lock(self, lms_user_id=None, content_key=None) -> str:
+    def acquire_lock(self, lms_user_id=None, content_key=None, wait_timeout=0, lease_timeout=None) -> str:
         """
         Acquire an exclusive lock on this SubsidyAccessPolicy instance.
 
         Memcached devs recommend using add() for locking instead of get()+set(), which rules out TieredCache which only
         exposes get()+set() from django cache.  See: https://github.com/memcached/memcached/issues/163
 
+        The lock is a lease which expires after ``lease_timeout`` seconds (``POLICY_LOCK_LEASE_TIMEOUT`` by default),
+        so that a crashed holder can't keep it forever; long-running holders should call ``renew_lock()``.
+        If the lock is held by someone else, retry with jittered exponential backoff for up to ``wait_timeout``
+        seconds, rather than failing right away.
+
         Returns:
             str: lock ID if a lock was successfully acquired, None otherwise.
         """
+        resource_key = self.lock_resource_key(lms_user_id, content_key)
+        lease_timeout = lease_timeout or settings.POLICY_LOCK_LEASE_TIMEOUT
         lock_id = str(uuid4())
-        if django_cache.add(self.lock_resource_key(lms_user_id, content_key), lock_id):
-            return lock_id
-        else:
-            return None
+        deadline = time.monotonic() + wait_timeout
+        backoff = POLICY_LOCK_INITIAL_BACKOFF_SECONDS
+        while True:
+            if django_cache.add(resource_key, lock_id, lease_timeout):
+                return lock_id
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # "Full jitter", so that waiters which started together don't retry together.
+            time.sleep(min(remaining, random.uniform(0, backoff)))
+            backoff = min(backoff * 2, POLICY_LOCK_MAX_BACKOFF_SECONDS)
+
+    def renew_lock(self, lock_id, lms_user_id=None, content_key=None, lease_timeout=None) -> bool:
+        """
+        Extend the lease of a lock on this SubsidyAccessPolicy instance, if it's still held by ``lock_id``.
 
-    def release_lock(self, lms_user_id=None, content_key=None) -> None:
+        Returns:
+            bool: True if the lease was renewed, False if the lock was lost (e.g. its lease already expired).
+        """
+        resource_key = self.lock_resource_key(lms_user_id, content_key)
+        if django_cache.get(resource_key) != lock_id:
+            return False
+        return django_cache.touch(resource_key, lease_timeout or settings.POLICY_LOCK_LEASE_TIMEOUT)
+
+    def release_lock(self, lms_user_id=None, content_key=None, lock_id=None) -> None:
         """
         Release an exclusive lock on this SubsidyAccessPolicy instance.
+
+        If ``lock_id`` is given, the lock is only released if it's still held by that ``lock_id``, so that a slow
+        holder whose lease expired doesn't release a lock that has since been acquired by someone else.
+        The django cache API has no atomic compare-and-delete, so this narrows (rather than closes) that window.
+        Without a ``lock_id``, the lock is released unconditionally.
         """
-        django_cache.delete(self.lock_resource_key(lms_user_id, content_key))
+        resource_key = self.lock_resource_key(lms_user_id, content_key)
+        if lock_id is not None and django_cache.get(resource_key) != lock_id:
+            logger.warning(
+                f'Not releasing lock on SubsidyAccessPolicy {self} with lms_user_id={lms_user_id}, '
+                f'content_key={content_key}, since its lease for lock_id={lock_id} expired.'
+            )
+            return
+        django_cache.delete(resource_key)
 
     @contextmanager
-    def lock(self, lms_user_id=None, content_key=None):
+    def lock(self, lms_user_id=None, content_key=None, wait_timeout=None):
         """
-        Context manager for locking this SubsidyAccessPolicy instance.
+        Context manager for locking this SubsidyAccessPolicy instance, waiting up to ``wait_timeout``
+        seconds (``POLICY_LOCK_WAIT_TIMEOUT`` by default) for another holder to release it.
 
         Raises:
             SubsidyAccessPolicyLockAttemptFailed:
                 Raises this if there's another distributed process locking this SubsidyAccessPolicy.
         """
-        lock_id = self.acquire_lock(lms_user_id, content_key)
+        if wait_timeout is None:
+            wait_timeout = settings.POLICY_LOCK_WAIT_TIMEOUT
+        lock_id = self.acquire_lock(lms_user_id, content_key, wait_timeout=wait_timeout)
         if not lock_id:
             raise SubsidyAccessPolicyLockAttemptFailed(
                 f"Failed to acquire lock on SubsidyAccessPolicy {self} with lms_user_id={lms_user_id}, "
@@ -742,7 +909,77 @@ class SubsidyAccessPolicy(TimeStampedModel):
         try:
             yield lock_id
         finally:
-            self.release_lock(lms_user_id, content_key)
+            self.release_lock(lms_user_id, content_key, lock_id=lock_id)
+
+    def redemption_lock_kwargs(self, lms_user_id, content_key):
+        """
+        Returns the lock kwargs (see ``lock()``) for the narrowest lock that keeps the per-learner checks
+        of ``can_redeem()`` consistent with a subsequent ``redeem()``.
+
+        By default, that's a lock on the (learner, content) pair, which prevents duplicate redemptions.
+        Sub-classes whose per-learner limits span content should lock the whole learner instead.
+        Policy-wide limits are *not* protected by this lock, see ``reserve_spend()``.
+        """
+        return {'lms_user_id': lms_user_id, 'content_key': content_key}
+
+    @contextmanager
+    def redemption_lock(self, lms_user_id, content_key):
+        """
+        Context manager for locking this SubsidyAccessPolicy instance for a single redemption,
+        such that unrelated learners can redeem in parallel.
+
+        Raises:
+            SubsidyAccessPolicyLockAttemptFailed:
+                Raises this if there's another distributed process holding the same redemption lock.
+        """
+        with self.lock(**self.redemption_lock_kwargs(lms_user_id, content_key)) as lock_id:
+            yield lock_id
+
+    def renew_redemption_lock(self, lock_id, lms_user_id, content_key):
+        """
+        Extend the lease of a lock acquired via ``redemption_lock()``.
+
+        Raises:
+            SubsidyAccessPolicyLockAttemptFailed:
+                Raises this if the lock was lost, in which case it's unsafe to proceed with the redemption.
+        """
+        if not self.renew_lock(lock_id, **self.redemption_lock_kwargs(lms_user_id, content_key)):
+            raise SubsidyAccessPolicyLockAttemptFailed(
+                f"Lost the redemption lock on SubsidyAccessPolicy {self} with lms_user_id={lms_user_id}, "
+                f"content_key={content_key}."
+            )
+
+    @contextmanager
+    def reserve_spend(self, content_price):
+        """
+        Context manager that reserves ``content_price`` against this policy's ``spend_limit`` for the duration
+        of a redemption (see ``spend_api``).  This protects the policy-wide spend limit from concurrent
+        redemptions without serializing them behind a policy-wide lock.
+
+        The reservation is committed if the context exits normally (i.e. the subsidy transaction was created),
+        and rolled back if it raises.  Reservations of crashed processes expire after one to two times
+        ``POLICY_SPEND_RESERVATION_TIMEOUT`` seconds.
+
+        Raises:
+            SubsidyAccessPolicySpendReservationFailed:
+                Raises this if committed spend, plus spend reserved by other in-flight redemptions,
+                plus ``content_price`` would exceed the ``spend_limit``.
+        """
+        if self.spend_limit is None or not content_price:
+            yield
+            return
+
+        reservation = spend_api.reserve_spend(self, content_price)
+        if not reservation:
+            raise SubsidyAccessPolicySpendReservationFailed(
+                f"Failed to reserve {content_price} of spend on SubsidyAccessPolicy {self}."
+            )
+        try:
+            yield
+        except Exception:
+            spend_api.rollback_spend(self, reservation)
+            raise
+        spend_api.commit_spend(self, reservation)
 
     @classmethod
     def resolve_policy(cls, redeemable_policies):
@@ -825,33 +1062,37 @@ class PerLearnerEnrollmentCreditAccessPolicy(CreditPolicyMixin, SubsidyAccessPol
         'assignment_configuration': (is_none, 'must not relate to an AssignmentConfiguration.'),
     }
 
+    REDEMPTION_PREDICATES = SubsidyAccessPolicy.REDEMPTION_PREDICATES + (
+        Predicate(
+            'learner_enrollment_limit', '_check_learner_enrollment_limit',
+            REASON_LEARNER_MAX_ENROLLMENTS_REACHED, COST_CACHED,
+            depends_on=LEARNER_LEDGER_DEPENDENCIES,
+        ),
+    )
+
     class Meta:
         """
         Metaclass for PerLearnerEnrollmentCreditAccessPolicy.
         """
         proxy = True
 
-    def can_redeem(self, lms_user_id, content_key, skip_customer_user_check=False):
+    def redemption_lock_kwargs(self, lms_user_id, content_key):
         """
-        Checks if the given lms_user_id has a number of existing subsidy transactions
-        LTE to the learner enrollment cap declared by this policy.
+        The per-learner enrollment limit spans content, so lock the whole learner if there is one.
         """
-        # perform generic access checks
-        should_attempt_redemption, reason, existing_redemptions = \
-            super().can_redeem(lms_user_id, content_key, skip_customer_user_check)
-        if not should_attempt_redemption:
-            return (False, reason, existing_redemptions)
+        if self.per_learner_enrollment_limit is not None:
+            return {'lms_user_id': lms_user_id}
+        return super().redemption_lock_kwargs(lms_user_id, content_key)
 
-        has_per_learner_enrollment_limit = self.per_learner_enrollment_limit is not None
-        if has_per_learner_enrollment_limit:
-            # only retrieve transactions if there is a per-learner enrollment limit
-            learner_transactions_count = len(self.transactions_for_learner(lms_user_id)['transactions'])
-            # check whether learner exceeded the per-learner enrollment limit
-            if learner_transactions_count >= self.per_learner_enrollment_limit:
-                return (False, REASON_LEARNER_MAX_ENROLLMENTS_REACHED, existing_redemptions)
-
-        # learner can redeem the subsidy access policy
-        return (True, None, existing_redemptions)
+    def _check_learner_enrollment_limit(self, lms_user_id, content_key):  # pylint: disable=unused-argument
+        """
+        Checks if the given lms_user_id has a number of existing subsidy transactions
+        less than the learner enrollment cap declared by this policy.
+        """
+        if self.per_learner_enrollment_limit is None:
+            return True
+        learner_transactions_count = len(self.transactions_for_learner(lms_user_id)['transactions'])
+        return learner_transactions_count < self.per_learner_enrollment_limit
 
     def credit_available(self, lms_user_id, skip_customer_user_check=False):
         """
@@ -895,37 +1136,37 @@ class PerLearnerSpendCreditAccessPolicy(CreditPolicyMixin, SubsidyAccessPolicy):
         'per_learner_enrollment_limit': (is_none, 'must not define a per-learner enrollment limit.'),
     }
 
+    REDEMPTION_PREDICATES = SubsidyAccessPolicy.REDEMPTION_PREDICATES + (
+        Predicate(
+            'learner_spend_limit', '_check_learner_spend_limit', REASON_LEARNER_MAX_SPEND_REACHED, COST_CACHED,
+            depends_on=LEARNER_LEDGER_DEPENDENCIES + ('content_has_metadata',),
+        ),
+    )
+
     class Meta:
         """
         Metaclass for PerLearnerSpendCreditAccessPolicy.
         """
         proxy = True
 
-    def can_redeem(self, lms_user_id, content_key, skip_customer_user_check=False):
+    def redemption_lock_kwargs(self, lms_user_id, content_key):
         """
-        Determines whether learner can redeem a subsidy access policy given the
-        limits specified on the policy.
+        The per-learner spend limit spans content, so lock the whole learner if there is one.
         """
-        # perform generic access checks
-        should_attempt_redemption, reason, existing_redemptions = super().can_redeem(
-            lms_user_id,
-            content_key,
-            skip_customer_user_check,
-        )
-        if not should_attempt_redemption:
-            return (False, reason, existing_redemptions)
+        if self.per_learner_spend_limit is not None:
+            return {'lms_user_id': lms_user_id}
+        return super().redemption_lock_kwargs(lms_user_id, content_key)
 
-        has_per_learner_spend_limit = self.per_learner_spend_limit is not None
-        if has_per_learner_spend_limit:
-            # only retrieve transactions if there is a per-learner spend limit
-            existing_learner_transaction_aggregates = self.transactions_for_learner(lms_user_id)['aggregates']
-            spent_amount = existing_learner_transaction_aggregates.get('total_quantity') or 0
-            content_price = self.get_content_price(content_key)
-            if self.content_would_exceed_limit(spent_amount, self.per_learner_spend_limit, content_price):
-                return (False, REASON_LEARNER_MAX_SPEND_REACHED, existing_redemptions)
-
-        # learner can redeem the subsidy access policy
-        return (True, None, existing_redemptions)
+    def _check_learner_spend_limit(self, lms_user_id, content_key):
+        """
+        Checks if redeeming the given content would keep the given lms_user_id's spend
+        within the per-learner spend limit declared by this policy.
+        """
+        if self.per_learner_spend_limit is None:
+            return True
+        spent_amount = self.transactions_for_learner(lms_user_id)['aggregates'].get('total_quantity') or 0
+        content_price = self.get_content_price(content_key)
+        return not self.content_would_exceed_limit(spent_amount, self.per_learner_spend_limit, content_price)
 
     def credit_available(self, lms_user_id, skip_customer_user_check=False):
         """
@@ -991,9 +1232,15 @@ class AssignedLearnerCreditAccessPolicy(CreditPolicyMixin, SubsidyAccessPolicy):
         """
         Total amount of assignments currently allocated via this policy.
 
+        May have been pre-computed in bulk for a page of policies, see
+        ``api.prefetch_policy_aggregates()``.
+
         Returns:
             int: Negative USD cents representing the total amount of currently allocated assignments.
         """
+        prefetched_total_allocated = getattr(self, '_prefetched_total_allocated', None)
+        if prefetched_total_allocated is not None:
+            return prefetched_total_allocated
         return assignments_api.get_allocated_quantity_for_configuration(
             self.assignment_configuration,
         )
@@ -1010,7 +1257,7 @@ class AssignedLearnerCreditAccessPolicy(CreditPolicyMixin, SubsidyAccessPolicy):
         # self.total_allocated is NEGATIVE USD Cents representing currently allocated assignments.
         return max(0, super().spend_available + self.total_allocated)
 
-    def can_redeem(self, lms_user_id, content_key, skip_customer_user_check=False):
+    def can_redeem(self, lms_user_id, content_key, skip_customer_user_check=False, reserved_spend=0):
         raise NotImplementedError
 
     def redeem(self, lms_user_id, content_key, all_transactions, metadata=None):
@@ -1088,9 +1335,284 @@ class AssignedLearnerCreditAccessPolicy(CreditPolicyMixin, SubsidyAccessPolicy):
           content_key: Typically a course key (although theoretically could be *any* content identifier).
           content_price_cents: A *negative* integer reflecting the current price of the content in USD cents.
         """
-        return assignments_api.allocate_assignments(
+        allocation_result = assignments_api.allocate_assignments(
             self.assignment_configuration,
             learner_emails,
             content_key,
             content_price_cents,
         )
+        invalidate_subsidy_record_cache(self.subsidy_uuid)
+        invalidate_policy_aggregates_cache(self.subsidy_uuid, self.uuid)
+        self._prefetched_total_allocated = None  # pylint: disable=attribute-defined-outside-init
+        PolicyBalanceSnapshot.record_allocation(self, self.total_allocated)
+        return allocation_result
+
+
+class PolicyBalanceSnapshot(TimeStampedModel):
+    """
+    A locally materialized snapshot of a policy's balances, and of its subsidy's balance and expiration,
+    so that reading the balances of many policies takes one query instead of calls to the enterprise-subsidy service.
+
+    Snapshots are refreshed in bulk from the subsidy service (see ``api.refresh_policy_balance_snapshots()``),
+    which sets ``as_of``, and adjusted in between by this service's own redemptions and allocations, which only
+    sets ``modified``, since they don't account for upstream changes, e.g. reversals.  They may be stale, so they
+    must never be used for the authoritative checks of a redemption or allocation.
+
+    .. no_pii: This model has no PII
+    """
+    policy = models.OneToOneField(
+        SubsidyAccessPolicy,
+        related_name='balance_snapshot',
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    total_redeemed = models.IntegerField(
+        help_text='Total amount already transacted via the policy, in USD cents (<= 0).',
+    )
+    total_allocated = models.IntegerField(
+        help_text='Total amount of assignments currently allocated via the policy, in USD cents (<= 0).',
+    )
+    spend_available = models.IntegerField(
+        help_text='Policy-wide spend available, in USD cents (>= 0).',
+    )
+    subsidy_balance = models.IntegerField(
+        help_text="Remaining balance of the policy's subsidy, in USD cents.",
+    )
+    subsidy_expiration_datetime = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="The datetime when the policy's subsidy expires, if ever.",
+    )
+    as_of = models.DateTimeField(
+        db_index=True,
+        help_text='When these balances were last known to be accurate.',
+    )
+
+    @classmethod
+    def record_redemption(cls, policy, quantity):
+        """
+        Adjusts existing snapshots for a redemption of ``quantity`` (negative USD cents) via the given policy,
+        which also reduces the subsidy balance of every other policy of the same subsidy.
+        """
+        cls.objects.filter(policy__subsidy_uuid=policy.subsidy_uuid).update(
+            subsidy_balance=F('subsidy_balance') + quantity,
+            modified=timezone.now(),
+        )
+        cls.objects.filter(policy=policy).update(
+            total_redeemed=F('total_redeemed') + quantity,
+            spend_available=Greatest(F('spend_available') + quantity, 0),
+        )
+        cls.objects.filter(policy__subsidy_uuid=policy.subsidy_uuid).update(
+            spend_available=Greatest(Least(F('spend_available'), F('subsidy_balance')), 0),
+        )
+
+    @classmethod
+    def record_allocation(cls, policy, total_allocated):
+        """
+        Adjusts the existing snapshot of the given assigned-credit policy for its new ``total_allocated``.
+        """
+        cls.objects.filter(policy=policy).update(
+            spend_available=Greatest(F('spend_available') + total_allocated - F('total_allocated'), 0),
+            total_allocated=total_allocated,
+            modified=timezone.now(),
+        )
+
+    def __str__(self):
+        return f'<{self.__class__.__name__} policy={self.policy_id} as_of={self.as_of}>'
+
+
+class LearnerTransactionProjection(TimeStampedModel):
+    """
+    A local projection of one subsidy transaction, kept up to date from the subsidy transaction lifecycle
+    events that the enterprise-subsidy service produces (see ``ledger_projection_api``), so that a learner's
+    transactions can be read with one indexed query instead of paging through the subsidy service's API.
+
+    .. no_pii: This model has no PII
+    """
+    uuid = models.UUIDField(
+        primary_key=True,
+        editable=False,
+        help_text='The uuid of the subsidy transaction.',
+    )
+    subsidy_uuid = models.UUIDField(
+        help_text='The subsidy in which the transaction was made.',
+    )
+    lms_user_id = models.IntegerField(
+        help_text='The learner for whom the transaction was made.',
+    )
+    subsidy_access_policy_uuid = models.UUIDField(
+        null=True,
+        blank=True,
+        help_text='The policy via which the transaction was made, if any.',
+    )
+    content_key = models.CharField(
+        max_length=255,
+        help_text='The content for which the transaction was made.',
+    )
+    state = models.CharField(
+        max_length=32,
+        help_text='The lifecycle state of the transaction.',
+    )
+    quantity = models.BigIntegerField(
+        help_text='The quantity of the transaction, in USD cents (<= 0).',
+    )
+    transaction_created = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the transaction was created, per the enterprise-subsidy service.',
+    )
+    transaction_modified = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the transaction was last modified, per the enterprise-subsidy service.',
+    )
+    transaction = JSONField(
+        help_text='The transaction, as serialized by the enterprise-subsidy service.',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['subsidy_uuid', 'lms_user_id', 'subsidy_access_policy_uuid', 'content_key'],
+                name='learner_ledger_projection_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'<{self.__class__.__name__} uuid={self.uuid} state={self.state}>'
+
+    @classmethod
+    def project(cls, subsidy_uuid, ledger_transaction):
+        """
+        Creates or updates the projection of the given transaction in the given subsidy, as serialized by the
+        enterprise-subsidy service, unless the projection already reflects it, or a later modification of it (events may
+        arrive out of order, or more than once).
+
+        Returns:
+          A tuple of (projection, whether it was created or updated).
+        """
+        transaction_created, transaction_modified = (
+            parse_datetime(value) if isinstance(value, str) else value
+            for value in (ledger_transaction.get('created'), ledger_transaction.get('modified'))
+        )
+
+        with atomic():
+            existing = cls.objects.select_for_update().filter(uuid=ledger_transaction['uuid']).first()
+            if existing and (existing.transaction == ledger_transaction or (
+                existing.transaction_modified and transaction_modified
+                and transaction_modified < existing.transaction_modified
+            )):
+                return existing, False
+            projection, _ = cls.objects.update_or_create(
+                uuid=ledger_transaction['uuid'],
+                defaults={
+                    'subsidy_uuid': subsidy_uuid,
+                    'lms_user_id': ledger_transaction['lms_user_id'],
+                    'subsidy_access_policy_uuid': ledger_transaction.get('subsidy_access_policy_uuid'),
+                    'content_key': ledger_transaction['content_key'],
+                    'state': ledger_transaction['state'],
+                    'quantity': ledger_transaction['quantity'],
+                    'transaction_created': transaction_created,
+                    'transaction_modified': transaction_modified,
+                    'transaction': ledger_transaction,
+                },
+            )
+        return projection, True
+
+
+class ProjectedSubsidy(TimeStampedModel):
+    """
+    Marks a subsidy whose transactions have all been backfilled into ``LearnerTransactionProjection`` records,
+    which from then on may be read instead of the enterprise-subsidy service's API.
+
+    .. no_pii: This model has no PII
+    """
+    subsidy_uuid = models.UUIDField(
+        unique=True,
+        help_text='The subsidy whose transactions are projected.',
+    )
+    backfilled_at = models.DateTimeField(
+        help_text="When the subsidy's transactions were last backfilled.",
+    )
+
+    def __str__(self):
+        return f'<{self.__class__.__name__} subsidy_uuid={self.subsidy_uuid}>'
+
+
+class RedemptionIntent(TimeStampedModel):
+    """
+    A redemption of a policy by a learner for some content, accepted by the ``redeem`` endpoint in asynchronous
+    mode, and carried out later by ``process_redemption_intent_task`` (see ``redemption_api``), so that no
+    web worker waits on the subsidy transaction, which includes the LMS enrollment.
+
+    .. no_pii: This model has no PII
+    """
+    uuid = models.UUIDField(
+        primary_key=True,
+        default=uuid4,
+        editable=False,
+        unique=True,
+    )
+    policy = models.ForeignKey(
+        SubsidyAccessPolicy,
+        related_name='redemption_intents',
+        on_delete=models.CASCADE,
+        help_text='The policy to redeem.',
+    )
+    lms_user_id = models.IntegerField(
+        help_text='The learner for whom to redeem.',
+    )
+    content_key = models.CharField(
+        max_length=255,
+        help_text='The content for which to redeem.',
+    )
+    metadata = JSONField(
+        null=True,
+        blank=True,
+        help_text='The metadata to create the subsidy transaction with, if any.',
+    )
+    state = models.CharField(
+        max_length=32,
+        choices=RedemptionIntentStateChoices.CHOICES,
+        default=RedemptionIntentStateChoices.QUEUED,
+        db_index=True,
+        help_text='The lifecycle state of the redemption.',
+    )
+    reserved_spend = models.IntegerField(
+        default=0,
+        help_text=(
+            "Spend reserved against the policy's spend limit when the redemption was accepted, in USD cents (>= 0). "
+            "Released once the redemption is processed."
+        ),
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text='How many times processing the redemption was attempted.',
+    )
+    ledger_transaction = JSONField(
+        null=True,
+        blank=True,
+        help_text='The subsidy transaction created for the redemption, if any.',
+    )
+    failure_reason = models.CharField(
+        max_length=255,
+        null=True,
+        blank=True,
+        help_text='Why the redemption failed, e.g. a reason the content is not redeemable via the policy.',
+    )
+    failure_detail = JSONField(
+        null=True,
+        blank=True,
+        help_text='Details of the failure, e.g. the error payload of the enterprise-subsidy service.',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['policy', 'lms_user_id', 'content_key', 'state'],
+                name='redemption_intent_lookup_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'<{self.__class__.__name__} uuid={self.uuid} state={self.state}>'
@@ -0,0 +1,143 @@
+"""
+Named eligibility predicates for SubsidyAccessPolicies, and their cost-ordered evaluation.
+
+Each predicate declares what answering it may cost, and which other predicates must hold before it's
+even meaningful (e.g. there's no content metadata to price content that isn't in the catalog).  The evaluator
+runs the cheapest predicate whose dependencies hold, and stops at the first one that fails, so that a policy
+which can't be redeemed for some locally known reason never waits on a remote service to find out.
+Each evaluated predicate is also recorded as a step of the request's evaluation trace, if any
+(see the ``evaluation_trace`` module).
+"""
+import logging
+import time
+from contextlib import nullcontext
+
+from .evaluation_trace import traced_step
+
+logger = logging.getLogger(__name__)
+
+# Relative costs of answering a predicate.
+# Answered from the policy record itself.
+COST_LOCAL = 0
+# Answered from data that's cached across requests, but synced incrementally with (at most) one upstream call per
+# request, e.g. a learner's ledger.  Since the sync isn't shared with other learners, such predicates should depend on
+# the predicates answered from shared data that would turn the learner away first (see LEARNER_LEDGER_DEPENDENCIES).
+COST_CACHED = 1
+# Answered from remote data that's cached across requests, e.g. catalog inclusion, or policy aggregates.
+COST_SHARED_REMOTE = 2
+# Answered from remote data that's only cached for the rest of the request, e.g. the subsidy's can_redeem payload.
+COST_REMOTE = 3
+
+# Names of predicates that callers single out.
+PREDICATE_LEARNER_IN_ENTERPRISE = 'learner_in_enterprise'
+PREDICATE_CONTENT_IN_CATALOG = 'content_in_catalog'
+PREDICATE_SUBSIDY_HAS_VALUE = 'subsidy_has_value'
+
+# The predicates that must hold before a learner's ledger is synced for a ``COST_CACHED`` predicate.
+LEARNER_LEDGER_DEPENDENCIES = (PREDICATE_LEARNER_IN_ENTERPRISE, PREDICATE_CONTENT_IN_CATALOG)
+
+
+class Predicate:
+    """
+    A named check of whether a policy can be redeemed by a learner for some content.
+
+    ``check`` names a method of the policy, which is called with the learner's lms_user_id and the content_key,
+    and returns true if the predicate holds.  If it doesn't, the content isn't redeemable via the policy,
+    for ``reason``.
+    """
+
+    def __init__(self, name, check, reason, cost, depends_on=()):
+        self.name = name
+        self.check = check
+        self.reason = reason
+        self.cost = cost
+        self.depends_on = tuple(depends_on)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} name={self.name} cost={self.cost}>'
+
+
+class PredicateEvaluation:
+    """
+    The outcome of evaluating some predicates: the predicate that failed, if any,
+    and the outcome and wall time, in seconds, of every predicate that was evaluated, in order.
+    """
+
+    def __init__(self):
+        self.failed_predicate = None
+        self.timings = []
+
+    @property
+    def passed(self):
+        return self.failed_predicate is None
+
+    @property
+    def reason(self):
+        return self.failed_predicate.reason if self.failed_predicate else None
+
+    def was_evaluated(self, name):
+        return any(evaluated_name == name for evaluated_name, _, _ in self.timings)
+
+
+def predicates_up_to_cost(predicates, max_cost):
+    """
+    Returns those of the given predicates that cost at most ``max_cost``, and whose dependencies among the given
+    predicates (transitively) do too, in their original order.
+    """
+    given_names = {predicate.name for predicate in predicates}
+    selected = [predicate for predicate in predicates if predicate.cost <= max_cost]
+    while True:
+        selected_names = {predicate.name for predicate in selected}
+        remaining = [
+            predicate for predicate in selected
+            if all(name in selected_names or name not in given_names for name in predicate.depends_on)
+        ]
+        if len(remaining) == len(selected):
+            return remaining
+        selected = remaining
+
+
+def evaluate_predicates(predicates, policy, lms_user_id, content_key, max_cost=None, traced=True):
+    """
+    Evaluates the given predicates for the given policy, learner and content, cheapest first, among those whose
+    dependencies hold (ties go to the earliest declared), until one fails.  Dependencies on predicates that aren't
+    given are considered to hold.  With ``max_cost``, only the predicates returned by ``predicates_up_to_cost()``
+    are evaluated.  Unless ``traced`` is false, each evaluated predicate is recorded in the evaluation trace.
+
+    Returns:
+      A ``PredicateEvaluation``.
+    """
+    if max_cost is not None:
+        predicates = predicates_up_to_cost(list(predicates), max_cost)
+    pending = list(predicates)
+    pending_names = {predicate.name for predicate in pending}
+    evaluation = PredicateEvaluation()
+    while pending:
+        predicate = min(
+            (
+                predicate for predicate in pending
+                if not pending_names.intersection(predicate.depends_on)
+            ),
+            key=lambda predicate: predicate.cost,
+            default=None,
+        )
+        if predicate is None:
+            raise ValueError(f'Predicates {sorted(pending_names)} have circular dependencies')
+        started_at = time.perf_counter()
+        with traced_step(policy.uuid, predicate.name) if traced else nullcontext() as step:
+            holds = bool(getattr(policy, predicate.check)(lms_user_id, content_key))
+            if step is not None:
+                step['holds'] = holds
+        evaluation.timings.append((predicate.name, holds, time.perf_counter() - started_at))
+        if not holds:
+            evaluation.failed_predicate = predicate
+            break
+        pending.remove(predicate)
+        pending_names.discard(predicate.name)
+
+    logger.debug(
+        '[evaluate_predicates] %s for lms_user_id=%s, content_key=%s: %s',
+        policy.uuid, lms_user_id, content_key,
+        ', '.join(f'{name}={holds} ({elapsed:.4f}s)' for name, holds, elapsed in evaluation.timings),
+    )
+    return evaluation
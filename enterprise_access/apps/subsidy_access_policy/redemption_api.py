@@ -0,0 +1,237 @@
+"""
+Python API for redeeming SubsidyAccessPolicies asynchronously.
+
+A redemption is first *accepted*: under the policy's redemption lock, the learner's ability to redeem is checked
+and the content's price is reserved against the policy's spend limit, and a ``RedemptionIntent`` is persisted.
+It's then *processed* by ``process_redemption_intent_task``, like a synchronous redemption: under the same lock,
+``can_redeem()`` is checked again, not counting the intent's own reservation, and the subsidy transaction is created.
+The reservation is held throughout, and only committed once the transaction exists.  Since that may take longer than
+spend reservations last in the cache (see ``spend_api``), a queued intent's reservation is handed off from the cache
+counter to its own ``reserved_spend`` once the intent is persisted, and counted from there.
+The redemption event is emitted by ``send_redemption_intent_event_task`` once the intent is redeemed.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import F
+
+from enterprise_access.apps.events.signals import SUBSIDY_REDEEMED
+from enterprise_access.apps.events.utils import send_subsidy_redemption_event_to_event_bus
+
+from . import spend_api
+from .constants import REASON_SUBSIDY_TRANSACTION_REFUSED, RedemptionIntentStateChoices
+from .exceptions import SubsidyAccessPolicySpendReservationFailed, SubsidyAPIHTTPError
+from .models import RedemptionIntent
+
+logger = logging.getLogger(__name__)
+
+
+def _enqueue_redemption_intent_processing(intent):
+    # Imported here because the tasks module imports this one.
+    from .tasks import process_redemption_intent_task  # pylint: disable=import-outside-toplevel,cyclic-import
+    transaction.on_commit(lambda: process_redemption_intent_task.delay(str(intent.uuid)))
+
+
+def _enqueue_redemption_intent_event(intent):
+    # Imported here because the tasks module imports this one.
+    from .tasks import send_redemption_intent_event_task  # pylint: disable=import-outside-toplevel,cyclic-import
+    transaction.on_commit(lambda: send_redemption_intent_event_task.delay(str(intent.uuid)))
+
+
+def _hand_off_reserved_spend(policy, reservation):
+    """
+    Releases the given ``SpendReservation`` from the policy's reservation counters once the current
+    transaction commits, i.e. once the intent that now holds the reservation is counted instead.
+    """
+    transaction.on_commit(lambda: spend_api.rollback_spend(policy, reservation))
+
+
+def accept_redemption(policy, lms_user_id, content_key, metadata=None):
+    """
+    Accepts a redemption of the given policy by the given learner for the given content, to be processed
+    asynchronously.  A redemption for the same learner and content that's still queued is returned as-is,
+    rather than accepted again.
+
+    Returns:
+        3-tuple of (bool, str, RedemptionIntent), like ``SubsidyAccessPolicy.can_redeem()``: whether the redemption
+        was accepted, the reason why not, and the queued intent, if it was.
+
+    Raises:
+        SubsidyAccessPolicyLockAttemptFailed: If another process holds the same redemption lock.
+        SubsidyAccessPolicySpendReservationFailed: If the content's price couldn't be reserved against the
+          policy's spend limit, because of other in-flight redemptions.
+    """
+    with policy.redemption_lock(lms_user_id, content_key):
+        queued_intent = RedemptionIntent.objects.filter(
+            policy=policy,
+            lms_user_id=lms_user_id,
+            content_key=content_key,
+            state=RedemptionIntentStateChoices.QUEUED,
+        ).first()
+        if queued_intent:
+            return (True, None, queued_intent)
+
+        can_redeem, reason, _ = policy.can_redeem(lms_user_id, content_key)
+        if not can_redeem:
+            return (False, reason, None)
+
+        content_price = policy.get_content_price(content_key)
+        reservation = None
+        if policy.spend_limit is not None and content_price:
+            reservation = spend_api.reserve_spend(policy, content_price)
+            if not reservation:
+                raise SubsidyAccessPolicySpendReservationFailed(
+                    f"Failed to reserve {content_price} of spend on SubsidyAccessPolicy {policy}."
+                )
+
+        try:
+            with transaction.atomic():
+                intent = RedemptionIntent.objects.create(
+                    policy=policy,
+                    lms_user_id=lms_user_id,
+                    content_key=content_key,
+                    metadata=metadata,
+                    reserved_spend=reservation.amount if reservation else 0,
+                )
+                if reservation:
+                    _hand_off_reserved_spend(policy, reservation)
+                _enqueue_redemption_intent_processing(intent)
+        except Exception:
+            if reservation:
+                spend_api.rollback_spend(policy, reservation)
+            raise
+
+    logger.info(
+        '[accept_redemption] Accepted %s for policy %s, lms_user_id=%s, content_key=%s',
+        intent, policy.uuid, lms_user_id, content_key,
+    )
+    return (True, None, intent)
+
+
+def _release_reserved_spend(intent):
+    """
+    Releases the spend reserved by the given intent, if any.
+    """
+    if not intent.reserved_spend:
+        return
+    intent.reserved_spend = 0
+    intent.save(update_fields=['reserved_spend', 'modified'])
+
+
+def fail_redemption_intent(intent, reason, detail=None):
+    """
+    Marks the given intent as failed, for the given reason, releasing any spend it still reserves.
+    """
+    _release_reserved_spend(intent)
+    intent.state = RedemptionIntentStateChoices.FAILED
+    intent.failure_reason = reason
+    intent.failure_detail = detail
+    intent.save(update_fields=['state', 'failure_reason', 'failure_detail', 'modified'])
+    logger.warning('[process_redemption_intent] %s failed: %s %s', intent, reason, detail or '')
+    return intent
+
+
+def _adjust_reserved_spend(intent, content_price):
+    """
+    Makes the spend reserved by the given intent match the given (current) content price, reserving any difference,
+    or releasing any excess.
+
+    Raises:
+        SubsidyAccessPolicySpendReservationFailed: If the difference couldn't be reserved against the policy's
+          spend limit, because of other in-flight redemptions.
+    """
+    policy = intent.policy
+    if policy.spend_limit is None or not content_price:
+        _release_reserved_spend(intent)
+        return
+    difference = content_price - intent.reserved_spend
+    reservation = None
+    if difference > 0:
+        reservation = spend_api.reserve_spend(policy, difference)
+        if not reservation:
+            raise SubsidyAccessPolicySpendReservationFailed(
+                f"Failed to reserve {difference} of spend on SubsidyAccessPolicy {policy}."
+            )
+    if difference:
+        intent.reserved_spend = content_price
+        intent.save(update_fields=['reserved_spend', 'modified'])
+    if reservation:
+        _hand_off_reserved_spend(policy, reservation)
+
+
+def process_redemption_intent(intent_uuid):
+    """
+    Processes the queued intent with the given uuid, like a synchronous redemption would: under the policy's
+    redemption lock, checks ``can_redeem()`` again, and creates the subsidy transaction.  The spend reserved when
+    the intent was accepted is kept throughout, so that concurrent redemptions can't take it in the meantime:
+    ``can_redeem()`` doesn't count it against the spend limit, it's adjusted if the content's price changed since,
+    and it's committed once the transaction is created.  Intents that aren't queued (anymore) are left as they are.
+
+    Refusals by the enterprise-subsidy service (4xx responses) fail the intent, releasing its reservation,
+    whereas other errors are raised, for the caller to retry later, with the reservation still held.
+
+    Returns:
+        The intent, or None if there's no such intent.
+
+    Raises:
+        SubsidyAccessPolicyLockAttemptFailed: If another process holds the same redemption lock.
+        SubsidyAccessPolicySpendReservationFailed: If an increase of the content's price couldn't be reserved
+          against the policy's spend limit, because of other in-flight redemptions.
+        SubsidyAPIHTTPError: If the enterprise-subsidy service failed to create the transaction (5xx responses).
+    """
+    intent = RedemptionIntent.objects.select_related('policy').filter(uuid=intent_uuid).first()
+    if not intent or intent.state != RedemptionIntentStateChoices.QUEUED:
+        logger.info('[process_redemption_intent] Skipping intent %s, which is not queued: %s', intent_uuid, intent)
+        return intent
+
+    policy = intent.policy
+    RedemptionIntent.objects.filter(uuid=intent.uuid).update(attempts=F('attempts') + 1)
+    with policy.redemption_lock(intent.lms_user_id, intent.content_key) as lock_id:
+        can_redeem, reason, existing_transactions = policy.can_redeem(
+            intent.lms_user_id, intent.content_key, reserved_spend=intent.reserved_spend,
+        )
+        if not can_redeem:
+            return fail_redemption_intent(intent, reason)
+
+        # can_redeem() may have taken a while, so make sure we still hold the lock for the redemption.
+        policy.renew_redemption_lock(lock_id, intent.lms_user_id, intent.content_key)
+        _adjust_reserved_spend(intent, policy.get_content_price(intent.content_key))
+        try:
+            ledger_transaction = policy.redeem(
+                intent.lms_user_id, intent.content_key, existing_transactions, intent.metadata,
+            )
+        except SubsidyAPIHTTPError as exc:
+            if exc.error_response is not None and exc.error_response.status_code < 500:
+                return fail_redemption_intent(intent, REASON_SUBSIDY_TRANSACTION_REFUSED, exc.error_payload())
+            raise
+
+        # Counted as committed before the intent stops counting as reserved, i.e. at least once.
+        if intent.reserved_spend:
+            spend_api.record_committed_spend(policy, intent.reserved_spend)
+        with transaction.atomic():
+            intent.state = RedemptionIntentStateChoices.REDEEMED
+            intent.ledger_transaction = ledger_transaction
+            intent.reserved_spend = 0
+            intent.save(update_fields=['state', 'ledger_transaction', 'reserved_spend', 'modified'])
+            _enqueue_redemption_intent_event(intent)
+
+    logger.info('[process_redemption_intent] Redeemed %s: transaction %s', intent, ledger_transaction.get('uuid'))
+    return intent
+
+
+def send_redemption_intent_event(intent_uuid):
+    """
+    Emits the redemption event of the redeemed intent with the given uuid, like a synchronous redemption would.
+    """
+    intent = RedemptionIntent.objects.get(uuid=intent_uuid)
+    if intent.state != RedemptionIntentStateChoices.REDEEMED:
+        logger.warning('[send_redemption_intent_event] Not sending event of %s, which is not redeemed', intent)
+        return
+    send_subsidy_redemption_event_to_event_bus(
+        SUBSIDY_REDEEMED.event_type,
+        {
+            'lms_user_id': intent.lms_user_id,
+            'content_key': intent.content_key,
+            'metadata': intent.metadata,
+        },
+    )
@@ -0,0 +1,249 @@
+"""
+Python API for reserving, committing, and reconciling spend
+against the ``spend_limit`` of subsidy access policies.
+
+Each policy has counters in the django cache, all in positive USD cents:
+
+  * ``reserved``: spend reserved by in-flight redemptions, which haven't resolved yet.  Reservations are counted
+    per window of ``POLICY_SPEND_RESERVATION_TIMEOUT`` seconds, in a counter that lives for two windows, and only the
+    counters of the current and previous windows are counted.  So a reservation whose process crashed expires after
+    one to two windows, and ``commit_spend()`` and ``rollback_spend()`` only ever decrement the counter that holds
+    their ``SpendReservation``, which never under-counts the reservations still in flight.  Queued
+    ``RedemptionIntents`` hold their reservations in their own ``reserved_spend`` rows instead, which outlive
+    the counters, so reserved spend is the sum of both.
+  * ``committed``: spend already redeemed via the policy.  Seeded from the policy's
+    transaction aggregates on a miss, incremented locally on every committed redemption,
+    and periodically reconciled against the enterprise-subsidy service.
+
+Counters are only ever changed with the cache's atomic ``add()``, ``incr()`` and ``decr()``,
+so that spend-limit checks don't need a policy-wide lock nor a remote call.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db.models import Sum
+from edx_django_utils.cache.utils import get_cache_key
+
+from .constants import RedemptionIntentStateChoices
+from .subsidy_api import invalidate_policy_aggregates_cache
+
+logger = logging.getLogger(__name__)
+
+RESERVED_SPEND_RESOURCE_NAME = 'subsidy_access_policy_reserved_spend'
+COMMITTED_SPEND_RESOURCE_NAME = 'subsidy_access_policy_committed_spend'
+
+
+class SpendReservation:
+    """
+    Spend reserved against the ``spend_limit`` of a policy by ``reserve_spend()``, in positive USD cents,
+    along with the reservation counter that holds it.
+    """
+
+    def __init__(self, amount, cache_key):
+        self.amount = amount
+        self.cache_key = cache_key
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} amount={self.amount}>'
+
+
+def _reservation_window():
+    return int(time.time() // settings.POLICY_SPEND_RESERVATION_TIMEOUT)
+
+
+def reserved_spend_cache_key(policy_uuid, window):
+    return get_cache_key(resource=RESERVED_SPEND_RESOURCE_NAME, uuid=policy_uuid, window=window)
+
+
+def reserved_spend_cache_keys(policy_uuid):
+    """
+    Returns the keys of the reservation counters of the given policy that currently count, oldest first.
+    """
+    window = _reservation_window()
+    return [reserved_spend_cache_key(policy_uuid, window - 1), reserved_spend_cache_key(policy_uuid, window)]
+
+
+def committed_spend_cache_key(policy_uuid):
+    return get_cache_key(resource=COMMITTED_SPEND_RESOURCE_NAME, uuid=policy_uuid)
+
+
+def _increment(cache_key, amount, timeout):
+    """
+    Atomically adds ``amount`` to the counter at ``cache_key``, creating it if necessary.
+    Returns the new value, or None if the counter could not be incremented.
+    """
+    for _ in range(2):
+        django_cache.add(cache_key, 0, timeout)
+        try:
+            return django_cache.incr(cache_key, amount)
+        except ValueError:
+            # The counter expired between add() and incr(), so try again once.
+            continue
+    return None
+
+
+def _decrement(cache_key, amount):
+    """
+    Atomically removes ``amount`` from the counter at ``cache_key``, if it still exists.
+    """
+    try:
+        django_cache.decr(cache_key, amount)
+    except ValueError:
+        # The counter already expired, so there's nothing to decrement.
+        pass
+
+
+def _redeemed_spend_from_aggregates(policy):
+    """
+    Returns the positive USD cents redeemed via the given policy, according to its transaction aggregates.
+    """
+    spent_amount = policy.aggregates_for_policy().get('total_quantity') or 0
+    if spent_amount > 0:
+        raise Exception('[spend_api] Expected a sum of transaction quantities <= 0')
+    return spent_amount * -1
+
+
+def get_queued_intent_spend(policy):
+    """
+    Returns the positive USD cents reserved against the given policy by its queued RedemptionIntents.
+    """
+    return policy.redemption_intents.filter(
+        state=RedemptionIntentStateChoices.QUEUED,
+    ).aggregate(total=Sum('reserved_spend'))['total'] or 0
+
+
+def get_reserved_spend(policy):
+    """
+    Returns the positive USD cents currently reserved by in-flight redemptions against the given policy,
+    including queued RedemptionIntents.  The counters are read first, so that a reservation handed off from
+    the counters to an intent (see ``redemption_api``) is counted at least once.
+    """
+    reserved_spend = sum(django_cache.get_many(reserved_spend_cache_keys(policy.uuid)).values())
+    return reserved_spend + get_queued_intent_spend(policy)
+
+
+def get_committed_spend(policy):
+    """
+    Returns the positive USD cents already redeemed via the given policy.  Only the first call after
+    the counter is created (or expires) makes a remote call, to seed the counter from the policy's aggregates.
+    """
+    cache_key = committed_spend_cache_key(policy.uuid)
+    committed_spend = django_cache.get(cache_key)
+    if committed_spend is not None:
+        return committed_spend
+
+    committed_spend = _redeemed_spend_from_aggregates(policy)
+    # If another process seeded the counter in the meantime, theirs wins.
+    if not django_cache.add(cache_key, committed_spend, settings.POLICY_COMMITTED_SPEND_TIMEOUT):
+        committed_spend = django_cache.get(cache_key, committed_spend)
+    return committed_spend
+
+
+def get_total_spend(policy, excluding_reserved=0):
+    """
+    Returns the positive USD cents counted against the ``spend_limit`` of the given policy,
+    i.e. both committed and reserved spend, less ``excluding_reserved`` of the reserved spend
+    (e.g. the caller's own reservation).
+    """
+    return get_committed_spend(policy) + max(get_reserved_spend(policy) - excluding_reserved, 0)
+
+
+def reserve_spend(policy, amount):
+    """
+    Atomically reserves ``amount`` positive USD cents against the ``spend_limit`` of the given policy.
+
+    Returns:
+        SpendReservation: The reservation, to commit or roll back, or None if committed spend, plus spend
+            reserved by other in-flight redemptions, plus ``amount`` would exceed the ``spend_limit``.
+    """
+    cache_key = reserved_spend_cache_key(policy.uuid, _reservation_window())
+    committed_spend = get_committed_spend(policy)
+    if _increment(cache_key, amount, 2 * settings.POLICY_SPEND_RESERVATION_TIMEOUT) is None:
+        return None
+    reservation = SpendReservation(amount, cache_key)
+
+    reserved_spend = get_reserved_spend(policy)
+
+    # content_would_exceed_limit() expects spend as a quantity <= 0.
+    spent_amount = -1 * (committed_spend + reserved_spend - amount)
+    if policy.content_would_exceed_limit(spent_amount, policy.spend_limit, amount):
+        rollback_spend(policy, reservation)
+        logger.info(
+            '[reserve_spend] Refused to reserve %s for policy %s with %s committed and %s reserved.',
+            amount, policy.uuid, committed_spend, reserved_spend - amount,
+        )
+        return None
+    return reservation
+
+
+def record_committed_spend(policy, amount):
+    """
+    Adds ``amount`` positive USD cents to the committed spend of the given policy, after the corresponding
+    subsidy transaction was successfully created.  Callers release the reservation *afterwards*,
+    so that the amount is always counted at least once.
+    """
+    try:
+        django_cache.incr(committed_spend_cache_key(policy.uuid), amount)
+    except ValueError:
+        # The committed counter doesn't exist, so the next seed from aggregates will include this spend.
+        pass
+
+
+def commit_spend(policy, reservation):
+    """
+    Moves the given ``SpendReservation`` to committed spend, after the corresponding
+    subsidy transaction was successfully created.
+    """
+    record_committed_spend(policy, reservation.amount)
+    rollback_spend(policy, reservation)
+
+
+def rollback_spend(policy, reservation):  # pylint: disable=unused-argument
+    """
+    Releases the given ``SpendReservation``, e.g. after the corresponding redemption failed.
+    """
+    # If the counter expired, so did the reservation, which it alone held.
+    _decrement(reservation.cache_key, reservation.amount)
+
+
+def reconcile_spend(policy):
+    """
+    Corrects the committed spend of the given policy to match the transaction aggregates of
+    the enterprise-subsidy service, which may differ because of e.g. reversals, or writes by other services.
+
+    Commits that land while this runs are never lost: we apply the difference between the fresh aggregates
+    and the counter as it was *before* fetching them, so at worst such a commit is counted twice
+    until the next reconciliation, which errs on the side of not overspending.
+
+    Returns:
+        int: The correction applied to the committed spend, in USD cents.
+    """
+    cache_key = committed_spend_cache_key(policy.uuid)
+    committed_spend_before = django_cache.get(cache_key)
+
+    invalidate_policy_aggregates_cache(policy.subsidy_uuid, policy.uuid)
+    redeemed_spend = _redeemed_spend_from_aggregates(policy)
+
+    if committed_spend_before is None:
+        # Nothing to correct, just seed the counter (unless another process did so in the meantime).
+        django_cache.add(cache_key, redeemed_spend, settings.POLICY_COMMITTED_SPEND_TIMEOUT)
+        correction = 0
+    else:
+        correction = redeemed_spend - committed_spend_before
+        try:
+            if correction > 0:
+                django_cache.incr(cache_key, correction)
+            elif correction < 0:
+                django_cache.decr(cache_key, -correction)
+        except ValueError:
+            # The counter expired in the meantime, so just seed it.
+            django_cache.add(cache_key, redeemed_spend, settings.POLICY_COMMITTED_SPEND_TIMEOUT)
+
+    if correction:
+        logger.warning(
+            '[reconcile_spend] Corrected committed spend of policy %s by %s to match subsidy aggregates.',
+            policy.uuid, correction,
+        )
+    return correction
@@ -4,15 +4,37 @@ with transaction and subsidy/ledger data
 from the enterprise-subsidy service.
 """
 import logging
+import math
 from collections import defaultdict
+from urllib.parse import parse_qs, urlencode, urlparse
 
 import requests
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from edx_django_utils.cache import TieredCache
 
+from enterprise_access.apps.api_client.circuit_breaker import CircuitBreakerOpen
+
+from .constants import TransactionStateChoices
+from .evaluation_trace import TIER_PROJECTION, TIER_REQUEST, TIER_SHARED, TIER_UPSTREAM, record_cache_lookup
 from .exceptions import SubsidyAPIHTTPError
-from .utils import get_versioned_subsidy_client, request_cache, versioned_cache_key
+from .utils import (
+    fetch_and_cache_with_single_flight,
+    get_versioned_subsidy_client,
+    map_with_bounded_concurrency,
+    request_cache,
+    versioned_cache_key
+)
 
 logger = logging.getLogger(__name__)
 
+DEGRADED_RESPONSES_ALLOWED_CACHE_KEY = 'degraded_responses_allowed'
+DEGRADED_RESPONSE_CACHE_KEY = 'degraded_response'
+
+# Query parameter that limits a transaction list to transactions modified at or after the given timestamp.
+LEARNER_LEDGER_HIGH_WATER_MARK_PARAM = 'modified__gte'
+
 
 class TransactionPolicyMismatchError(Exception):
     """
@@ -23,50 +45,419 @@ class TransactionPolicyMismatchError(Exception):
 
 
 def learner_transaction_cache_key(subsidy_uuid, lms_user_id):
-    return versioned_cache_key('get_transactions_for_learner', subsidy_uuid, lms_user_id)
+    return versioned_cache_key('get_transactions_for_learner', subsidy_uuid, lms_user_id, subsidy=subsidy_uuid)
+
+
+def learner_ledger_cache_key(subsidy_uuid, lms_user_id):
+    return versioned_cache_key('learner_ledger', subsidy_uuid, lms_user_id, subsidy=subsidy_uuid)
+
+
+def indexed_learner_ledger_cache_key(subsidy_uuid, lms_user_id):
+    return versioned_cache_key('indexed_learner_ledger', subsidy_uuid, lms_user_id, subsidy=subsidy_uuid)
+
+
+def invalidate_learner_ledger_cache(subsidy_uuid, lms_user_id):
+    """
+    Removes the cached transactions of the given learner in the given subsidy, both for the current request
+    and across requests.  Should be called after anything that creates transactions for the learner.
+    """
+    request_cache().delete(learner_transaction_cache_key(subsidy_uuid, lms_user_id))
+    request_cache().delete(indexed_learner_ledger_cache_key(subsidy_uuid, lms_user_id))
+    TieredCache.delete_all_tiers(learner_ledger_cache_key(subsidy_uuid, lms_user_id))
+
+
+def subsidy_record_cache_key(subsidy_uuid):
+    return versioned_cache_key('get_subsidy_record', subsidy_uuid, subsidy=subsidy_uuid)
+
+
+def invalidate_subsidy_record_cache(subsidy_uuid):
+    """
+    Removes the cached subsidy record for the given subsidy from all cache tiers.
+    Should be called after anything that changes the subsidy's balance.
+    """
+    TieredCache.delete_all_tiers(subsidy_record_cache_key(subsidy_uuid))
+
+
+def policy_aggregates_cache_key(subsidy_uuid, policy_uuid):
+    return versioned_cache_key('aggregates_for_policy', subsidy_uuid, policy_uuid, subsidy=subsidy_uuid)
+
+
+def invalidate_policy_aggregates_cache(subsidy_uuid, policy_uuid):
+    """
+    Removes the cached transaction aggregates for the given policy from all cache tiers.
+    Should be called after anything that creates or changes transactions of the policy.
+    """
+    TieredCache.delete_all_tiers(policy_aggregates_cache_key(subsidy_uuid, policy_uuid))
+
+
+def subsidy_can_redeem_cache_key(subsidy_uuid, lms_user_id, content_key):
+    return versioned_cache_key('subsidy_can_redeem', subsidy_uuid, lms_user_id, content_key, subsidy=subsidy_uuid)
+
+
+def last_known_cache_key(cache_key):
+    return f'{cache_key}:last-known'
+
+
+def allow_degraded_responses():
+    """
+    Opts the current request in to being served last-known subsidy data while the subsidy service's circuit
+    breaker is open.  Only read-only endpoints may do this, never anything that redeems or spends.
+    """
+    request_cache().set(DEGRADED_RESPONSES_ALLOWED_CACHE_KEY, True)
+
+
+def is_degraded_response():
+    """
+    Returns True if any last-known subsidy data was served in place of live data during the current request.
+    """
+    return request_cache().get_cached_response(DEGRADED_RESPONSE_CACHE_KEY).is_found
+
+
+def remember_last_known_value(cache_key, value, only_if_changed=False):
+    """
+    Remembers ``value`` for ``SUBSIDY_LAST_KNOWN_DATA_TIMEOUT`` seconds as the last-known value for ``cache_key``.
+    With ``only_if_changed``, an equal last-known value isn't written again, which suits values that are
+    fetched on every request, but rarely change.
+    """
+    key = last_known_cache_key(cache_key)
+    if only_if_changed and django_cache.get(key) == value:
+        return
+    django_cache.set(key, value, settings.SUBSIDY_LAST_KNOWN_DATA_TIMEOUT)
+
+
+def fetch_with_last_known_fallback(cache_key, fetch, remember=True, only_if_changed=False):
+    """
+    Returns ``fetch()``, and, unless ``remember`` is false, remembers it as the last-known value for ``cache_key``
+    (see ``remember_last_known_value()``, to which ``only_if_changed`` is passed on).  If the subsidy service's
+    circuit breaker is open, and the current request allows degraded responses, returns the last-known value instead
+    (if any) and marks the response as degraded.
+    """
+    try:
+        value = fetch()
+    except CircuitBreakerOpen:
+        if not request_cache().get_cached_response(DEGRADED_RESPONSES_ALLOWED_CACHE_KEY).is_found:
+            raise
+        last_known_value = django_cache.get(last_known_cache_key(cache_key))
+        if last_known_value is None:
+            raise
+        logger.warning('Subsidy service circuit breaker is open, serving last-known value for %s', cache_key)
+        request_cache().set(DEGRADED_RESPONSE_CACHE_KEY, True)
+        return last_known_value
+    if remember:
+        remember_last_known_value(cache_key, value, only_if_changed=only_if_changed)
+    return value
+
+
+def projected_subsidy_cache_key(subsidy_uuid):
+    return versioned_cache_key('is_subsidy_projected', subsidy_uuid, subsidy=subsidy_uuid)
+
+
+def is_subsidy_projected(subsidy_uuid):
+    """
+    Returns true if the transactions of the given subsidy may be read from the local learner ledger projection
+    (see the ``ledger_projection_api`` module), i.e. if ``LEARNER_LEDGER_PROJECTION_ENABLED`` is set, and the
+    subsidy's transactions have been backfilled into it.  Request-cached.
+    """
+    if not settings.LEARNER_LEDGER_PROJECTION_ENABLED:
+        return False
+
+    cache_key = projected_subsidy_cache_key(subsidy_uuid)
+    cached_response = request_cache().get_cached_response(cache_key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    # Looked up by name because the models module imports this one.
+    projected_subsidy_model = apps.get_model('subsidy_access_policy.ProjectedSubsidy')
+    is_projected = projected_subsidy_model.objects.filter(subsidy_uuid=subsidy_uuid).exists()
+    request_cache().set(cache_key, is_projected)
+    return is_projected
+
+
+def get_projected_transactions(subsidy_uuid, lms_user_id):
+    """
+    Returns the transactions of a learner in a given subsidy from the local learner ledger projection,
+    as serialized by the enterprise-subsidy service, in the order they were created.
+    """
+    projection_model = apps.get_model('subsidy_access_policy.LearnerTransactionProjection')
+    projections = projection_model.objects.filter(
+        subsidy_uuid=subsidy_uuid,
+        lms_user_id=lms_user_id,
+    ).order_by('transaction_created', 'created')
+    return [projection.transaction for projection in projections]
 
 
 def get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id):
     """
     Get all transactions for a learner in a given subsidy.  This can
     include transactions from multiple access policies.
+
+    The transactions are read from the local learner ledger projection if the subsidy is projected,
+    or else synced incrementally from a cross-request ledger cache, see ``sync_learner_ledger()``,
+    and cached for the rest of the request.
     """
     cache_key = learner_transaction_cache_key(subsidy_uuid, lms_user_id)
     cached_response = request_cache().get_cached_response(cache_key)
+    if cached_response.is_found:
+        record_cache_lookup('learner_transactions', TIER_REQUEST)
+        return cached_response.value
+
+    if is_subsidy_projected(subsidy_uuid):
+        record_cache_lookup('learner_transactions', TIER_PROJECTION)
+        result = {
+            'transactions': get_projected_transactions(subsidy_uuid, lms_user_id),
+            'aggregates': {},
+        }
+        request_cache().set(cache_key, result)
+        return result
+
+    # The last-known transactions are remembered by sync_learner_ledger(), only when the ledger changes.
+    result = fetch_with_last_known_fallback(
+        cache_key,
+        lambda: _learner_transactions_result(sync_learner_ledger(subsidy_uuid, lms_user_id)),
+        remember=False,
+    )
+    request_cache().set(cache_key, result)
+    return result
+
+
+class LearnerLedger:
+    """
+    An indexed, read-only view of a learner's transactions in a subsidy, built once, so that looking up
+    the transactions of a policy, of a content key, or in a state, or a policy's totals, doesn't scan them all.
+    Transactions keep their original order within each index.
+    """
+
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self._by_policy = defaultdict(list)
+        self._by_content_key = defaultdict(list)
+        self._by_policy_and_content_key = defaultdict(list)
+        self._by_state = defaultdict(list)
+        self._total_quantity_by_policy = defaultdict(int)
+        for transaction in transactions:
+            policy_uuid = self._policy_key(transaction.get('subsidy_access_policy_uuid'))
+            content_key = transaction.get('content_key')
+            self._by_policy[policy_uuid].append(transaction)
+            self._by_content_key[content_key].append(transaction)
+            self._by_policy_and_content_key[(policy_uuid, content_key)].append(transaction)
+            self._by_state[transaction.get('state')].append(transaction)
+            self._total_quantity_by_policy[policy_uuid] += transaction.get('quantity') or 0
+
+    @staticmethod
+    def _policy_key(policy_uuid):
+        return str(policy_uuid) if policy_uuid is not None else None
+
+    def policy_uuids(self):
+        """
+        Returns the uuids, as strings, of every policy via which the learner has transactions.
+        """
+        return set(self._by_policy)
+
+    def for_policy(self, policy_uuid):
+        return self._by_policy.get(self._policy_key(policy_uuid), [])
+
+    def for_content_key(self, content_key):
+        return self._by_content_key.get(content_key, [])
+
+    def for_policy_and_content_key(self, policy_uuid, content_key):
+        return self._by_policy_and_content_key.get((self._policy_key(policy_uuid), content_key), [])
+
+    def in_state(self, state):
+        return self._by_state.get(state, [])
+
+    def total_quantity_for_policy(self, policy_uuid):
+        return self._total_quantity_by_policy.get(self._policy_key(policy_uuid), 0)
+
+    def retryable_transaction_uuids(self):
+        """
+        Returns the uuids of the failed transactions, and of those with a committed reversal,
+        in their original order.
+        """
+        failed_uuids = {transaction['uuid'] for transaction in self.in_state(TransactionStateChoices.FAILED)}
+        return [
+            transaction['uuid'] for transaction in self.transactions
+            if transaction['uuid'] in failed_uuids or (
+                isinstance(transaction.get('reversal'), dict) and
+                transaction['reversal'].get('state') == TransactionStateChoices.COMMITTED
+            )
+        ]
+
+
+def get_learner_ledger(subsidy_uuid, lms_user_id):
+    """
+    Returns a ``LearnerLedger`` of all transactions for a learner in a given subsidy (see
+    ``get_and_cache_transactions_for_learner()``), built at most once per request.
+    """
+    cache_key = indexed_learner_ledger_cache_key(subsidy_uuid, lms_user_id)
+    cached_response = request_cache().get_cached_response(cache_key)
     if cached_response.is_found:
         return cached_response.value
 
+    ledger = LearnerLedger(get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)['transactions'])
+    request_cache().set(cache_key, ledger)
+    return ledger
+
+
+def _learner_transactions_result(ledger):
+    return {
+        'transactions': ledger['transactions'],
+        # TODO: this is some tech. debt  we're going to live with
+        # for the moment in pursuit of https://2u-internal.atlassian.net/browse/ENT-7222
+        'aggregates': {},
+    }
+
+
+def _remember_learner_ledger(subsidy_uuid, lms_user_id, ledger):
+    """
+    Remembers the transactions of a newly fetched or changed learner ledger as the last-known ones.
+    """
+    remember_last_known_value(
+        learner_transaction_cache_key(subsidy_uuid, lms_user_id),
+        _learner_transactions_result(ledger),
+    )
+    return ledger
+
+
+def _learner_ledger(transactions):
+    """
+    Returns a learner ledger of the given transactions, whose high-water mark is the latest time any of them
+    was modified, or None if that can't be determined.
+    """
+    modified_times = [transaction.get('modified') for transaction in transactions]
+    return {
+        'transactions': transactions,
+        'high_water_mark': max(modified_times) if modified_times and all(modified_times) else None,
+    }
+
+
+def _merge_transactions(transactions, changed_transactions):
+    """
+    Returns ``transactions``, with changed transactions replaced in place, and new transactions appended.
+    """
+    changed_by_uuid = {transaction['uuid']: transaction for transaction in changed_transactions}
+    merged = [changed_by_uuid.pop(transaction['uuid'], transaction) for transaction in transactions]
+    merged.extend(changed_by_uuid.values())
+    return merged
+
+
+def sync_learner_ledger(subsidy_uuid, lms_user_id):
+    """
+    Returns the ledger of all transactions for a learner in a given subsidy, as a dictionary with
+    ``transactions`` and their ``high_water_mark``.
+
+    The ledger is cached across requests for ``LEARNER_LEDGER_CACHE_TIMEOUT`` seconds, and every call fetches only
+    the transactions modified since its high-water mark, so that the cost of a sync is proportional to the learner's
+    new activity rather than to their lifetime activity.  The cached ledger is only rewritten when any of them actually
+    changed.  The ledger is fetched in full, with concurrent misses
+    coalesced, when it's not cached, when its high-water mark is unknown, or when it has transactions that are still
+    in flight: their later state changes (e.g. to ``failed``) may be filtered out of the subsidy service's lists.
+    Reversals of committed transactions may be picked up only when the ledger expires.
+    """
+    cache_key = learner_ledger_cache_key(subsidy_uuid, lms_user_id)
+    cached_response = TieredCache.get_cached_response(cache_key)
+    ledger = cached_response.value if cached_response.is_found else None
+    if ledger is None or ledger['high_water_mark'] is None or any(
+        transaction.get('state') in (TransactionStateChoices.CREATED, TransactionStateChoices.PENDING)
+        for transaction in ledger['transactions']
+    ):
+        record_cache_lookup('learner_ledger', TIER_UPSTREAM)
+        return fetch_and_cache_with_single_flight(
+            cache_key,
+            lambda: _remember_learner_ledger(
+                subsidy_uuid,
+                lms_user_id,
+                _learner_ledger(_fetch_transactions_for_learner(subsidy_uuid, lms_user_id)),
+            ),
+            settings.LEARNER_LEDGER_CACHE_TIMEOUT,
+        )
+
+    record_cache_lookup('learner_ledger', TIER_SHARED)
+    record_cache_lookup('learner_ledger_changes', TIER_UPSTREAM)
+    changed_transactions = _fetch_transactions_for_learner(
+        subsidy_uuid,
+        lms_user_id,
+        **{LEARNER_LEDGER_HIGH_WATER_MARK_PARAM: ledger['high_water_mark']},
+    )
+    # The high-water mark filter is inclusive, so the transactions modified at the mark itself come back every time.
+    cached_versions = {(transaction['uuid'], transaction.get('modified')) for transaction in ledger['transactions']}
+    changed_transactions = [
+        transaction for transaction in changed_transactions
+        if (transaction['uuid'], transaction.get('modified')) not in cached_versions
+    ]
+    if not changed_transactions:
+        return ledger
+
+    ledger = _learner_ledger(_merge_transactions(ledger['transactions'], changed_transactions))
+    TieredCache.set_all_tiers(cache_key, ledger, settings.LEARNER_LEDGER_CACHE_TIMEOUT)
+    return _remember_learner_ledger(subsidy_uuid, lms_user_id, ledger)
+
+
+def _remaining_page_urls(next_page, count, page_size):
+    """
+    Returns the URLs of all pages from ``next_page`` on, given the total ``count`` of results and the ``page_size``
+    of the first page, or None if they can't be determined (e.g. ``next_page`` isn't page-number based).
+    """
+    parsed_url = urlparse(next_page)
+    query_params = parse_qs(parsed_url.query)
+    if not count or not page_size or len(query_params.get('page', [])) != 1:
+        return None
+    first_page_number = int(query_params['page'][0])
+    return [
+        parsed_url._replace(query=urlencode({**query_params, 'page': [page_number]}, doseq=True)).geturl()
+        for page_number in range(first_page_number, math.ceil(count / page_size) + 1)
+    ]
+
+
+def _fetch_transactions_for_learner(subsidy_uuid, lms_user_id, **filters):
+    """
+    Fetches all pages of transactions for a learner in a given subsidy, optionally filtered by the given
+    query parameters, and returns them as a list.
+
+    Once the first page reveals how many pages there are, the rest of them are fetched, concurrently if
+    ``SUBSIDY_TRANSACTIONS_FETCH_MAX_WORKERS`` is above 1 (see ``map_with_bounded_concurrency()``),
+    and concatenated in order.
+    """
     client = get_versioned_subsidy_client()
+    if settings.SUBSIDY_TRANSACTIONS_PAGE_SIZE:
+        filters['page_size'] = settings.SUBSIDY_TRANSACTIONS_PAGE_SIZE
     try:
         response_payload = client.list_subsidy_transactions(
             subsidy_uuid=subsidy_uuid,
             lms_user_id=lms_user_id,
             include_aggregates=False,
+            **filters,
         )
     except requests.exceptions.HTTPError as exc:
         raise SubsidyAPIHTTPError('HTTPError occurred in Subsidy API request.') from exc
 
-    result = {
-        'transactions': response_payload['results'],
-        # TODO: this is some tech. debt  we're going to live with
-        # for the moment in pursuit of https://2u-internal.atlassian.net/browse/ENT-7222
-        'aggregates': {},
-    }
+    transactions = response_payload['results']
     next_page = response_payload.get('next')
+    remaining_page_urls = None
+    if next_page:
+        remaining_page_urls = _remaining_page_urls(next_page, response_payload.get('count'), len(transactions))
+    if remaining_page_urls:
+        pages = map_with_bounded_concurrency(
+            lambda page_url: client.client.get(page_url).json()['results'],
+            remaining_page_urls,
+            max_workers=settings.SUBSIDY_TRANSACTIONS_FETCH_MAX_WORKERS,
+        )
+        for page in pages:
+            transactions.extend(page)
+        next_page = None
     while next_page:
         next_response = client.client.get(next_page)
         next_payload = next_response.json()
-        result['transactions'].extend(next_payload['results'])
+        transactions.extend(next_payload['results'])
         next_page = next_payload.get('next')
 
     logger.info(
-        'Fetched transactions for subsidy %s and lms_user_id %s. Number transactions = %s',
+        'Fetched transactions for subsidy %s and lms_user_id %s with filters %s. Number transactions = %s',
         subsidy_uuid,
         lms_user_id,
-        len(result['transactions']),
+        filters,
+        len(transactions),
     )
-    request_cache().set(cache_key, result)
-    return result
+    return transactions
 
 
 def get_redemptions_by_content_and_policy_for_learner(policies, lms_user_id):
@@ -97,20 +488,24 @@ def get_redemptions_by_content_and_policy_for_learner(policies, lms_user_id):
 
     result = defaultdict(lambda: defaultdict(list))
 
-    for subsidy_uuid, policies_with_subsidy in policies_by_subsidy_uuid.items():
-        logger.info(f'Fetching learner transactions for subsidy {subsidy_uuid} via policies {policies_with_subsidy}')
-        transactions_in_subsidy = get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)['transactions']
-        for redemption in transactions_in_subsidy:
-            transaction_uuid = redemption['uuid']
-            content_key = redemption['content_key']
-            subsidy_access_policy_uuid = redemption['subsidy_access_policy_uuid']
-
+    # The learner's transactions in each subsidy are fetched concurrently, and merged in the order of the policies.
+    ledgers_by_subsidy = map_with_bounded_concurrency(
+        lambda subsidy_uuid: get_learner_ledger(subsidy_uuid, lms_user_id),
+        policies_by_subsidy_uuid,
+        max_workers=settings.SUBSIDY_TRANSACTIONS_FETCH_MAX_WORKERS,
+    )
+    for (subsidy_uuid, policies_with_subsidy), ledger in zip(policies_by_subsidy_uuid.items(), ledgers_by_subsidy):
+        logger.info(f'Fetched learner transactions for subsidy {subsidy_uuid} via policies {policies_with_subsidy}')
+        for subsidy_access_policy_uuid in ledger.policy_uuids():
+            redemptions = ledger.for_policy(subsidy_access_policy_uuid)
             if subsidy_access_policy_uuid in policies_with_subsidy:
-                result[content_key][subsidy_access_policy_uuid].append(redemption)
+                for redemption in redemptions:
+                    result[redemption['content_key']][subsidy_access_policy_uuid].append(redemption)
             else:
-                logger.warning(
-                    f"Transaction {transaction_uuid} has unmatched policy uuid for subsidy {subsidy_uuid}: "
-                    f"Found policy uuid {subsidy_access_policy_uuid} that is no longer tied to this subsidy."
-                )
+                for redemption in redemptions:
+                    logger.warning(
+                        f"Transaction {redemption['uuid']} has unmatched policy uuid for subsidy {subsidy_uuid}: "
+                        f"Found policy uuid {subsidy_access_policy_uuid} that is no longer tied to this subsidy."
+                    )
 
     return result
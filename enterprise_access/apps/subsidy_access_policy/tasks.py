@@ -0,0 +1,132 @@
+"""
+Tasks for subsidy_access_policy app.
+"""
+
+import logging
+
+from celery import shared_task
+
+from enterprise_access.tasks import LoggedTaskWithRetry
+
+from . import redemption_api, spend_api
+from .api import get_subsidy_access_policy, refresh_policy_balance_snapshots
+from .constants import REASON_REDEMPTION_RETRIES_EXHAUSTED, RedemptionIntentStateChoices
+from .content_metadata_api import refresh_catalog_contains_content, refresh_content_metadata_for_keys
+from .exceptions import SubsidyAccessPolicyLockAttemptFailed, SubsidyAccessPolicySpendReservationFailed
+from .models import RedemptionIntent, SubsidyAccessPolicy
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(base=LoggedTaskWithRetry)
+def reconcile_policy_spend_task(policy_uuid):
+    """
+    Reconcile the locally committed spend of the given policy against the enterprise-subsidy service.
+
+    Args:
+        policy_uuid (str): UUID of the SubsidyAccessPolicy to reconcile.
+
+    Raises:
+        HTTPError if the subsidy API call fails with an HTTPError.
+    """
+    policy = get_subsidy_access_policy(policy_uuid)
+    if not policy:
+        logger.warning(f'SubsidyAccessPolicy not found with UUID: {policy_uuid}')
+        return
+    spend_api.reconcile_spend(policy)
+
+
+@shared_task(base=LoggedTaskWithRetry)
+def refresh_policy_balance_snapshots_task(policy_uuids):
+    """
+    Refresh the balance snapshots of the given policies from the enterprise-subsidy service.
+
+    Args:
+        policy_uuids (list of str): UUIDs of the SubsidyAccessPolicies to refresh.
+
+    Raises:
+        HTTPError if the subsidy API call fails with an HTTPError.
+    """
+    policies = SubsidyAccessPolicy.objects.filter(uuid__in=policy_uuids)
+    refresh_policy_balance_snapshots(policies)
+
+
+@shared_task(base=LoggedTaskWithRetry)
+def refresh_content_metadata_task(enterprise_customer_uuid, content_keys, timeout=None):
+    """
+    Refresh the cached (stale) content metadata of the given content keys for the given customer.
+
+    Args:
+        enterprise_customer_uuid (str): UUID of the enterprise customer.
+        content_keys (list of str): The content keys to refresh.
+        timeout (int): How long, in seconds, the refreshed metadata stays fresh.
+
+    Raises:
+        HTTPError if the subsidy API call fails with an HTTPError.
+    """
+    refresh_content_metadata_for_keys(enterprise_customer_uuid, content_keys, timeout)
+
+
+@shared_task(base=LoggedTaskWithRetry)
+def refresh_catalog_contains_content_task(enterprise_catalog_uuid, content_keys, timeout=None):
+    """
+    Refresh the cached (stale) inclusion of the given content keys in the given catalog.
+
+    Args:
+        enterprise_catalog_uuid (str): UUID of the enterprise catalog.
+        content_keys (list of str): The content keys to refresh.
+        timeout (int): How long, in seconds, the refreshed answers stay fresh.
+
+    Raises:
+        HTTPError if the enterprise-catalog API call fails with an HTTPError.
+    """
+    refresh_catalog_contains_content(enterprise_catalog_uuid, content_keys, timeout)
+
+
+class RedemptionIntentTask(LoggedTaskWithRetry):  # pylint: disable=abstract-method
+    """
+    Base task for processing redemption intents, which also retries while the redemption lock is held elsewhere,
+    or while the policy's spend is reserved by other in-flight redemptions, and which fails the intent
+    once it's out of retries.
+    """
+    autoretry_for = LoggedTaskWithRetry.autoretry_for + (
+        SubsidyAccessPolicyLockAttemptFailed,
+        SubsidyAccessPolicySpendReservationFailed,
+    )
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        super().on_failure(exc, task_id, args, kwargs, einfo)
+        intent_uuid = args[0] if args else kwargs.get('intent_uuid')
+        intent = RedemptionIntent.objects.filter(
+            uuid=intent_uuid,
+            state=RedemptionIntentStateChoices.QUEUED,
+        ).first()
+        if intent:
+            redemption_api.fail_redemption_intent(
+                intent, REASON_REDEMPTION_RETRIES_EXHAUSTED, {'error': f'{exc.__class__.__name__}: {exc}'},
+            )
+
+
+@shared_task(base=RedemptionIntentTask)
+def process_redemption_intent_task(intent_uuid):
+    """
+    Process the given queued redemption intent, i.e. create its subsidy transaction.
+
+    Args:
+        intent_uuid (str): UUID of the RedemptionIntent to process.
+
+    Raises:
+        HTTPError if the subsidy API call fails with a server error.
+    """
+    redemption_api.process_redemption_intent(intent_uuid)
+
+
+@shared_task(base=LoggedTaskWithRetry)
+def send_redemption_intent_event_task(intent_uuid):
+    """
+    Emit the redemption event of the given redeemed redemption intent.
+
+    Args:
+        intent_uuid (str): UUID of the RedemptionIntent.
+    """
+    redemption_api.send_redemption_intent_event(intent_uuid)
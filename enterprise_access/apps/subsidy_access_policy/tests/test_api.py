@@ -0,0 +1,271 @@
+"""
+Tests for the subsidy_access_policy Python API.
+"""
+from datetime import datetime, timezone
+from unittest.mock import patch
+from uuid import uuid4
+
+from django.core.cache import cache as django_cache
+from django.test import TestCase, override_settings
+from edx_django_utils.cache import RequestCache
+
+from enterprise_access.apps.content_assignments.models import AssignmentConfiguration
+from enterprise_access.apps.content_assignments.tests.factories import LearnerContentAssignmentFactory
+from enterprise_access.apps.subsidy_access_policy import api as policy_api
+from enterprise_access.apps.subsidy_access_policy.constants import REASON_CONTENT_NOT_IN_CATALOG, REASON_POLICY_EXPIRED
+from enterprise_access.apps.subsidy_access_policy.models import PolicyBalanceSnapshot
+from enterprise_access.apps.subsidy_access_policy.tests.factories import (
+    AssignedLearnerCreditAccessPolicyFactory,
+    PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory
+)
+from enterprise_access.apps.subsidy_access_policy.tests.test_models import MockPolicyDependenciesMixin
+
+
+class BatchRedeemabilityTests(MockPolicyDependenciesMixin, TestCase):
+    """
+    Tests for ``prefetch_redeemability_facts()`` and ``evaluate_policies_for_content_key()``.
+    """
+    lms_user_id = 12345
+
+    def setUp(self):
+        super().setUp()
+        self.customer_uuid = uuid4()
+        self.subsidy_uuid = uuid4()
+        self.catalog_uuid = uuid4()
+        # Three policies sharing one subsidy and one catalog, plus an inactive one.
+        self.policies = [
+            PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(
+                enterprise_customer_uuid=self.customer_uuid,
+                subsidy_uuid=self.subsidy_uuid,
+                catalog_uuid=self.catalog_uuid,
+                spend_limit=None,
+            )
+            for _ in range(3)
+        ] + [
+            PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(
+                enterprise_customer_uuid=self.customer_uuid,
+                active=False,
+            ),
+        ]
+        bulk_contains_keys_patcher = patch(
+            'enterprise_access.apps.subsidy_access_policy.api.get_and_cache_catalogs_contain_content'
+        )
+        self.mock_bulk_contains_keys = bulk_contains_keys_patcher.start()
+        self.addCleanup(bulk_contains_keys_patcher.stop)
+        bulk_metadata_patcher = patch(
+            'enterprise_access.apps.subsidy_access_policy.api.get_and_cache_content_metadata_for_keys'
+        )
+        self.mock_bulk_metadata = bulk_metadata_patcher.start()
+        self.addCleanup(bulk_metadata_patcher.stop)
+        self.mock_catalog_contains_content_key.return_value = True
+        self.mock_get_content_metadata.return_value = {'content_price': 100}
+        self.mock_subsidy_client.can_redeem.return_value = {
+            'can_redeem': True,
+            'active': True,
+            'all_transactions': [],
+        }
+
+    def test_subsidy_can_redeem_fetched_once_per_subsidy_and_content(self):
+        """
+        The subsidy can_redeem payload is fetched once per (subsidy, content_key), no matter how many
+        policies share the subsidy, and evaluating the matrix afterwards makes no further calls.
+        """
+        content_keys = ['course-v1:edX+A+1T2023', 'course-v1:edX+B+1T2023']
+
+        policy_api.prefetch_redeemability_facts(self.policies, self.lms_user_id, content_keys)
+        self.assertEqual(self.mock_subsidy_client.can_redeem.call_count, len(content_keys))
+        self.mock_bulk_metadata.assert_called_once_with(self.customer_uuid, content_keys)
+
+        for content_key in content_keys:
+            redeemable, non_redeemable = policy_api.evaluate_policies_for_content_key(
+                self.policies, self.lms_user_id, content_key,
+            )
+            self.assertEqual(redeemable, self.policies[:3])
+            self.assertEqual(list(non_redeemable), [REASON_POLICY_EXPIRED])
+
+        self.assertEqual(self.mock_subsidy_client.can_redeem.call_count, len(content_keys))
+
+    def test_prefetch_skips_facts_a_serial_evaluation_would_skip(self):
+        """
+        Content not in any catalog should not cause metadata or subsidy can_redeem fetches.
+        """
+        self.mock_catalog_contains_content_key.return_value = False
+
+        policy_api.prefetch_redeemability_facts(self.policies, self.lms_user_id, ['course-v1:edX+A+1T2023'])
+
+        # Catalog inclusion is checked in bulk, and then once for the single distinct catalog of the active policies.
+        self.mock_bulk_contains_keys.assert_called_once()
+        self.assertEqual(list(self.mock_bulk_contains_keys.call_args.args[0]), [self.catalog_uuid])
+        self.assertEqual(self.mock_catalog_contains_content_key.call_count, 1)
+        self.mock_bulk_metadata.assert_called_once_with(self.customer_uuid, [])
+        self.assertFalse(self.mock_get_content_metadata.called)
+        self.assertFalse(self.mock_subsidy_client.can_redeem.called)
+
+        _, non_redeemable = policy_api.evaluate_policies_for_content_key(
+            self.policies[:3], self.lms_user_id, 'course-v1:edX+A+1T2023',
+        )
+        self.assertEqual(non_redeemable[REASON_CONTENT_NOT_IN_CATALOG], self.policies[:3])
+
+    def test_prefetch_skips_subsidy_for_learners_at_their_limit(self):
+        """
+        Policies turned away by a cheaper predicate, e.g. the learner's enrollment cap, should not cause subsidy
+        can_redeem fetches, whereas the rest of the policies of the subsidy still do.
+        """
+        capped_policy, *other_policies = self.policies[:3]
+        capped_policy.per_learner_enrollment_limit = 1
+        for policy in other_policies:
+            policy.per_learner_enrollment_limit = None
+        self.mock_transactions_cache_for_learner.return_value = {
+            'transactions': [{'uuid': str(uuid4()), 'subsidy_access_policy_uuid': str(capped_policy.uuid)}],
+            'aggregates': {},
+        }
+
+        policy_api.prefetch_redeemability_facts([capped_policy], self.lms_user_id, ['course-v1:edX+A+1T2023'])
+
+        self.assertFalse(self.mock_subsidy_client.can_redeem.called)
+
+        policy_api.prefetch_redeemability_facts(self.policies, self.lms_user_id, ['course-v1:edX+A+1T2023'])
+
+        self.mock_subsidy_client.can_redeem.assert_called_once_with(
+            self.subsidy_uuid, self.lms_user_id, 'course-v1:edX+A+1T2023',
+        )
+
+    @override_settings(POLICY_EVALUATION_MAX_WORKERS=4)
+    def test_concurrent_evaluation_is_deterministic(self):
+        """
+        Concurrent evaluation yields the same buckets, in the same order, as serial evaluation.
+        """
+        content_key = 'course-v1:edX+A+1T2023'
+        policy_api.prefetch_redeemability_facts(self.policies, self.lms_user_id, [content_key])
+
+        redeemable, non_redeemable = policy_api.evaluate_policies_for_content_key(
+            self.policies, self.lms_user_id, content_key,
+        )
+
+        self.assertEqual(redeemable, self.policies[:3])
+        self.assertEqual(dict(non_redeemable), {REASON_POLICY_EXPIRED: self.policies[3:]})
+        self.assertEqual(self.mock_subsidy_client.can_redeem.call_count, 1)
+
+
+class PrefetchPolicyAggregatesTests(MockPolicyDependenciesMixin, TestCase):
+    """
+    Tests for ``prefetch_policy_aggregates()``.
+    """
+    def setUp(self):
+        super().setUp()
+        self.subsidy_uuid = uuid4()
+        self.direct_policies = [
+            PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(subsidy_uuid=self.subsidy_uuid)
+            for _ in range(3)
+        ]
+        self.assigned_policy = AssignedLearnerCreditAccessPolicyFactory(
+            subsidy_uuid=self.subsidy_uuid,
+            spend_limit=10000,
+            assignment_configuration=AssignmentConfiguration.objects.create(),
+        )
+        LearnerContentAssignmentFactory.create(
+            assignment_configuration=self.assigned_policy.assignment_configuration,
+            content_quantity=-1000,
+        )
+        self.mock_subsidy_client.retrieve_subsidy.return_value = {'current_balance': 50000}
+        self.mock_subsidy_client.list_subsidy_transactions.return_value = {
+            'results': [],
+            'aggregates': {'total_quantity': -200},
+        }
+
+    def test_prefetch_policy_aggregates(self):
+        """
+        The subsidy record is fetched once per subsidy, aggregates once per policy, and allocated totals
+        in one query; afterwards, serializing the aggregates makes no further calls or queries.
+        """
+        policies = self.direct_policies + [self.assigned_policy]
+
+        with self.assertNumQueries(1):
+            policy_api.prefetch_policy_aggregates(policies)
+
+        self.assertEqual(self.mock_subsidy_client.retrieve_subsidy.call_count, 1)
+        self.assertEqual(self.mock_subsidy_client.list_subsidy_transactions.call_count, len(policies))
+
+        with self.assertNumQueries(0):
+            for policy in policies:
+                self.assertEqual(policy.total_redeemed, -200)
+            self.assertEqual(self.assigned_policy.total_allocated, -1000)
+            self.assertEqual(self.assigned_policy.spend_available, 10000 - 200 - 1000)
+
+        self.assertEqual(self.mock_subsidy_client.retrieve_subsidy.call_count, 1)
+        self.assertEqual(self.mock_subsidy_client.list_subsidy_transactions.call_count, len(policies))
+
+
+class PolicyBalanceSnapshotTests(MockPolicyDependenciesMixin, TestCase):
+    """
+    Tests for ``refresh_policy_balance_snapshots()``, and the adjustments of ``PolicyBalanceSnapshot`` records.
+    """
+    def setUp(self):
+        super().setUp()
+        self.subsidy_uuid = uuid4()
+        self.policies = [
+            PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(subsidy_uuid=self.subsidy_uuid, spend_limit=limit)
+            for limit in (None, 1000)
+        ]
+        self.assigned_policy = AssignedLearnerCreditAccessPolicyFactory(
+            subsidy_uuid=self.subsidy_uuid,
+            spend_limit=10000,
+            assignment_configuration=AssignmentConfiguration.objects.create(),
+        )
+        LearnerContentAssignmentFactory.create(
+            assignment_configuration=self.assigned_policy.assignment_configuration,
+            content_quantity=-1000,
+        )
+        self.mock_subsidy_client.retrieve_subsidy.return_value = {
+            'current_balance': 50000,
+            'expiration_datetime': '2030-01-01 12:00:00Z',
+        }
+        self.mock_subsidy_client.list_subsidy_transactions.return_value = {
+            'results': [],
+            'aggregates': {'total_quantity': -200},
+        }
+
+    def _snapshot_values(self, policy):
+        policy.balance_snapshot.refresh_from_db()
+        snapshot = policy.balance_snapshot
+        return (snapshot.total_redeemed, snapshot.total_allocated, snapshot.spend_available, snapshot.subsidy_balance)
+
+    def test_refresh_policy_balance_snapshots(self):
+        policies = self.policies + [self.assigned_policy]
+
+        snapshots = policy_api.refresh_policy_balance_snapshots(policies)
+
+        self.assertEqual(self.mock_subsidy_client.retrieve_subsidy.call_count, 1)
+        self.assertEqual(
+            [(s.total_redeemed, s.total_allocated, s.spend_available, s.subsidy_balance) for s in snapshots],
+            [(-200, 0, 50000, 50000), (-200, 0, 800, 50000), (-200, -1000, 8800, 50000)],
+        )
+        self.assertEqual(snapshots[0].subsidy_expiration_datetime, datetime(2030, 1, 1, 12, tzinfo=timezone.utc))
+
+        # Refreshing again updates the existing snapshots.
+        self.mock_subsidy_client.list_subsidy_transactions.return_value['aggregates']['total_quantity'] = -300
+        RequestCache.clear_all_namespaces()
+        django_cache.clear()
+        policy_api.refresh_policy_balance_snapshots(policies)
+        self.assertEqual(PolicyBalanceSnapshot.objects.count(), 3)
+        self.assertEqual(self._snapshot_values(self.policies[1]), (-300, 0, 700, 50000))
+
+    def test_record_redemption(self):
+        policy_api.refresh_policy_balance_snapshots(self.policies + [self.assigned_policy])
+        refreshed_as_of = PolicyBalanceSnapshot.objects.get(policy=self.policies[1]).as_of
+
+        PolicyBalanceSnapshot.record_redemption(self.policies[1], -500)
+
+        self.assertEqual(self._snapshot_values(self.policies[1]), (-700, 0, 300, 49500))
+        # Local adjustments don't make the snapshot any fresher.
+        self.assertEqual(PolicyBalanceSnapshot.objects.get(policy=self.policies[1]).as_of, refreshed_as_of)
+        # Other policies of the same subsidy only see the subsidy balance go down.
+        self.assertEqual(self._snapshot_values(self.policies[0]), (-200, 0, 49500, 49500))
+        self.assertEqual(self._snapshot_values(self.assigned_policy), (-200, -1000, 8800, 49500))
+
+    def test_record_allocation(self):
+        policy_api.refresh_policy_balance_snapshots([self.assigned_policy])
+
+        PolicyBalanceSnapshot.record_allocation(self.assigned_policy, -1500)
+
+        self.assertEqual(self._snapshot_values(self.assigned_policy), (-200, -1500, 8300, 50000))
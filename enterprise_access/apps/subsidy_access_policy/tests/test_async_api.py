@@ -0,0 +1,71 @@
+"""
+Tests for the subsidy_access_policy async Python API.
+"""
+import asyncio
+from unittest import mock
+
+import requests
+from django.test import TestCase
+from edx_django_utils.cache import RequestCache
+
+from enterprise_access.apps.subsidy_access_policy import async_api
+from enterprise_access.apps.subsidy_access_policy.content_metadata_api import get_and_cache_catalog_contains_content
+from enterprise_access.apps.subsidy_access_policy.tests.factories import (
+    PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory
+)
+from enterprise_access.apps.subsidy_access_policy.tests.test_models import MockPolicyDependenciesMixin
+
+
+class AsyncApiTests(MockPolicyDependenciesMixin, TestCase):
+    """
+    Tests for the async counterparts of the policy's remote facts.
+    """
+    def setUp(self):
+        super().setUp()
+        self.policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory()
+        self.mock_subsidy_client.retrieve_subsidy.return_value = {'current_balance': 1000}
+        self.mock_subsidy_client.list_subsidy_transactions.return_value = {
+            'results': [],
+            'aggregates': {'total_quantity': -200},
+        }
+
+    def test_facts_are_fetched_concurrently_and_shared_with_sync_callers(self):
+        async def _gather():
+            return await asyncio.gather(
+                async_api.aget_subsidy_record(self.policy),
+                async_api.aget_subsidy_record(self.policy),
+                async_api.aget_policy_aggregates(self.policy),
+            )
+
+        subsidy_record, same_subsidy_record, aggregates = asyncio.run(_gather())
+
+        self.assertEqual(subsidy_record, {'current_balance': 1000})
+        self.assertEqual(same_subsidy_record, subsidy_record)
+        self.assertEqual(aggregates, {'total_quantity': -200})
+        self.mock_subsidy_client.retrieve_subsidy.assert_called_once_with(subsidy_uuid=self.policy.subsidy_uuid)
+
+        # The sync accessors read the same cache entries.
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(self.policy.subsidy_record(), subsidy_record)
+        self.assertEqual(self.policy.aggregates_for_policy(), aggregates)
+        self.assertEqual(self.mock_subsidy_client.retrieve_subsidy.call_count, 1)
+        self.assertEqual(self.mock_subsidy_client.list_subsidy_transactions.call_count, 1)
+
+    def test_subsidy_record_failures_are_not_cached(self):
+        self.mock_subsidy_client.retrieve_subsidy.side_effect = requests.exceptions.HTTPError('gone')
+
+        self.assertEqual(asyncio.run(async_api.aget_subsidy_record(self.policy)), {})
+        self.assertEqual(asyncio.run(async_api.aget_subsidy_record(self.policy)), {})
+
+        self.assertEqual(self.mock_subsidy_client.retrieve_subsidy.call_count, 2)
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.content_metadata_api.EnterpriseCatalogApiClient')
+    def test_catalog_contains_content(self, mock_catalog_client_class):
+        mock_catalog_client_class.return_value.contains_content_items.return_value = False
+
+        self.assertFalse(asyncio.run(async_api.aget_catalog_contains_content(self.policy.catalog_uuid, 'edX+DemoX')))
+        self.assertFalse(get_and_cache_catalog_contains_content(self.policy.catalog_uuid, 'edX+DemoX'))
+
+        mock_catalog_client_class.return_value.contains_content_items.assert_called_once_with(
+            self.policy.catalog_uuid, ['edX+DemoX'],
+        )
@@ -0,0 +1,251 @@
+"""
+Tests for the content_metadata_api module.
+"""
+import uuid
+from unittest import mock
+
+from django.core.cache import cache as django_cache
+from django.test import TestCase
+from edx_django_utils.cache import RequestCache
+
+from ..content_metadata_api import (
+    _fresh_marker_cache_key,
+    catalog_contains_content_cache_key,
+    content_metadata_cache_key,
+    get_and_cache_catalog_contains_content,
+    get_and_cache_catalogs_contain_content,
+    get_and_cache_content_metadata,
+    get_and_cache_content_metadata_for_keys
+)
+from ..tasks import refresh_content_metadata_task
+
+
+@mock.patch('enterprise_access.apps.subsidy_access_policy.content_metadata_api.EnterpriseCatalogApiClient')
+@mock.patch('enterprise_access.apps.subsidy_access_policy.content_metadata_api.CATALOG_CONTAINS_CONTENT_CHUNK_SIZE', 3)
+class CatalogsContainContentTests(TestCase):
+    """
+    Tests the ``get_and_cache_catalogs_contain_content`` function.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+        self.catalog_a = uuid.uuid4()
+        self.catalog_b = uuid.uuid4()
+        self.content_keys = [f'course-v1:edX+{index}+1T2023' for index in range(5)]
+        # catalog_a contains only the first content key, catalog_b contains none.
+        self.contained = {(self.catalog_a, self.content_keys[0])}
+
+    def _contains_content_items(self, catalog_uuid, content_ids):
+        return any((catalog_uuid, content_id) in self.contained for content_id in content_ids)
+
+    def test_bulk_catalog_inclusion(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        mock_client.contains_content_items.side_effect = self._contains_content_items
+
+        result = get_and_cache_catalogs_contain_content(
+            # Duplicate catalogs, e.g. shared across policies, are only checked once.
+            [self.catalog_a, self.catalog_b, self.catalog_a],
+            self.content_keys,
+        )
+
+        self.assertEqual(result, {
+            (catalog_uuid, content_key): (catalog_uuid, content_key) in self.contained
+            for catalog_uuid in (self.catalog_a, self.catalog_b)
+            for content_key in self.content_keys
+        })
+        # catalog_b: two negative chunks.  catalog_a: one negative chunk, and one positive chunk resolved per key.
+        self.assertEqual(mock_client.contains_content_items.call_count, 2 + 2 + 3)
+
+        # Answers are cached across requests, and shared with the single-key variant.
+        mock_client.contains_content_items.reset_mock()
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(
+            get_and_cache_catalogs_contain_content([self.catalog_a, self.catalog_b], self.content_keys),
+            result,
+        )
+        self.assertTrue(get_and_cache_catalog_contains_content(self.catalog_a, self.content_keys[0]))
+        self.assertFalse(get_and_cache_catalog_contains_content(self.catalog_b, self.content_keys[0]))
+        mock_client.contains_content_items.assert_not_called()
+
+    def test_only_misses_are_fetched(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        mock_client.contains_content_items.side_effect = self._contains_content_items
+        get_and_cache_catalog_contains_content(self.catalog_b, self.content_keys[0])
+        mock_client.contains_content_items.reset_mock()
+
+        get_and_cache_catalogs_contain_content([self.catalog_b], self.content_keys)
+
+        mock_client.contains_content_items.assert_has_calls([
+            mock.call(self.catalog_b, self.content_keys[1:4]),
+            mock.call(self.catalog_b, self.content_keys[4:]),
+        ])
+        self.assertEqual(mock_client.contains_content_items.call_count, 2)
+
+    def test_every_key_contained(self, mock_client_class):
+        """
+        Once a catalog is known to contain most keys, they're checked one by one, with no more calls than keys.
+        """
+        mock_client = mock_client_class.return_value
+        mock_client.contains_content_items.return_value = True
+
+        get_and_cache_catalogs_contain_content([self.catalog_a], self.content_keys)
+
+        # Only the first chunk is checked as a whole, until the hit rate is known.
+        self.assertEqual(mock_client.contains_content_items.call_count, len(self.content_keys) + 1)
+
+        mock_client.contains_content_items.reset_mock()
+        RequestCache.clear_all_namespaces()
+        other_content_keys = [f'course-v1:edX+{index}+2T2023' for index in range(5)]
+
+        result = get_and_cache_catalogs_contain_content([self.catalog_a], other_content_keys)
+
+        self.assertTrue(all(result.values()))
+        self.assertEqual(mock_client.contains_content_items.call_count, len(other_content_keys))
+
+    def test_sparse_hits_are_bisected(self, mock_client_class):
+        mock_client = mock_client_class.return_value
+        mock_client.contains_content_items.side_effect = self._contains_content_items
+        content_keys = [f'course-v1:edX+{index}+1T2023' for index in range(16)]
+        self.contained = {(self.catalog_a, content_keys[9])}
+
+        with mock.patch(
+            'enterprise_access.apps.subsidy_access_policy.content_metadata_api.CATALOG_CONTAINS_CONTENT_CHUNK_SIZE', 8,
+        ):
+            result = get_and_cache_catalogs_contain_content([self.catalog_a], content_keys)
+
+        contained_keys = [content_key for (_, content_key), contained in result.items() if contained]
+        self.assertEqual(contained_keys, [content_keys[9]])
+        # One call per chunk, then halves of the second chunk: [8:12], [8:10], [8:9], [10:12] and [12:16].
+        self.assertEqual(mock_client.contains_content_items.call_count, 2 + 5)
+
+
+@mock.patch('enterprise_access.apps.subsidy_access_policy.content_metadata_api.get_versioned_subsidy_client')
+class ContentMetadataForKeysTests(TestCase):
+    """
+    Tests the ``get_and_cache_content_metadata_for_keys`` function.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+        self.customer_uuid = uuid.uuid4()
+        self.content_keys = [f'course-v1:edX+{index}+1T2023' for index in range(4)]
+
+    @staticmethod
+    def _get_subsidy_content_data(enterprise_customer_uuid, content_key):  # pylint: disable=unused-argument
+        return {'content_key': content_key, 'content_price': 100}
+
+    def test_bulk_content_metadata(self, mock_get_client):
+        mock_client = mock_get_client.return_value
+        mock_client.get_subsidy_content_data.side_effect = self._get_subsidy_content_data
+
+        result = get_and_cache_content_metadata_for_keys(
+            self.customer_uuid,
+            # Duplicate content keys are only fetched once.
+            self.content_keys + self.content_keys[:1],
+        )
+
+        self.assertEqual(result, {
+            content_key: self._get_subsidy_content_data(self.customer_uuid, content_key)
+            for content_key in self.content_keys
+        })
+        self.assertEqual(mock_client.get_subsidy_content_data.call_count, len(self.content_keys))
+
+        # Metadata is cached across requests, and shared with the single-key variant.
+        mock_client.get_subsidy_content_data.reset_mock()
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(get_and_cache_content_metadata_for_keys(self.customer_uuid, self.content_keys), result)
+        self.assertEqual(
+            get_and_cache_content_metadata(self.customer_uuid, self.content_keys[0]),
+            result[self.content_keys[0]],
+        )
+        mock_client.get_subsidy_content_data.assert_not_called()
+
+    def test_only_misses_are_fetched(self, mock_get_client):
+        mock_client = mock_get_client.return_value
+        mock_client.get_subsidy_content_data.side_effect = self._get_subsidy_content_data
+        get_and_cache_content_metadata(self.customer_uuid, self.content_keys[0])
+        RequestCache.clear_all_namespaces()
+        get_and_cache_content_metadata(self.customer_uuid, self.content_keys[1])
+        mock_client.get_subsidy_content_data.reset_mock()
+
+        with mock.patch(
+            'enterprise_access.apps.subsidy_access_policy.content_metadata_api.CONTENT_METADATA_FETCH_MAX_WORKERS', 2,
+        ):
+            get_and_cache_content_metadata_for_keys(self.customer_uuid, self.content_keys)
+
+        self.assertCountEqual(
+            mock_client.get_subsidy_content_data.call_args_list,
+            [mock.call(self.customer_uuid, content_key) for content_key in self.content_keys[2:]],
+        )
+
+
+@mock.patch('enterprise_access.apps.subsidy_access_policy.content_metadata_api.EnterpriseCatalogApiClient')
+@mock.patch('enterprise_access.apps.subsidy_access_policy.content_metadata_api.get_versioned_subsidy_client')
+class StaleWhileRevalidateTests(TestCase):
+    """
+    Tests that stale content metadata and catalog inclusion are served, and refreshed in the background.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+        self.customer_uuid = uuid.uuid4()
+        self.catalog_uuid = uuid.uuid4()
+        self.content_key = 'course-v1:edX+DemoX+1T2023'
+
+    def _expire_soft_timeout(self, cache_key):
+        django_cache.delete(_fresh_marker_cache_key(cache_key))
+        RequestCache.clear_all_namespaces()
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.tasks.refresh_content_metadata_task')
+    def test_stale_metadata_is_served_and_refreshed_once(self, mock_refresh_task, mock_get_client, _):
+        mock_client = mock_get_client.return_value
+        mock_client.get_subsidy_content_data.return_value = {'content_price': 100}
+        get_and_cache_content_metadata(self.customer_uuid, self.content_key)
+        mock_client.get_subsidy_content_data.return_value = {'content_price': 200}
+
+        self._expire_soft_timeout(content_metadata_cache_key(self.customer_uuid, self.content_key))
+        for _ in range(3):
+            RequestCache.clear_all_namespaces()
+            self.assertEqual(
+                get_and_cache_content_metadata(self.customer_uuid, self.content_key),
+                {'content_price': 100},
+            )
+
+        mock_client.get_subsidy_content_data.assert_called_once()
+        mock_refresh_task.delay.assert_called_once_with(str(self.customer_uuid), [self.content_key], None)
+
+        # Once the refresh ran, the fresh value is served.
+        refresh_content_metadata_task(*mock_refresh_task.delay.call_args.args)
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(
+            get_and_cache_content_metadata(self.customer_uuid, self.content_key),
+            {'content_price': 200},
+        )
+
+    def test_hard_timeout_blocks_on_upstream(self, mock_get_client, _):
+        mock_client = mock_get_client.return_value
+        mock_client.get_subsidy_content_data.return_value = {'content_price': 100}
+        get_and_cache_content_metadata(self.customer_uuid, self.content_key)
+
+        django_cache.delete(content_metadata_cache_key(self.customer_uuid, self.content_key))
+        RequestCache.clear_all_namespaces()
+        get_and_cache_content_metadata(self.customer_uuid, self.content_key)
+
+        self.assertEqual(mock_client.get_subsidy_content_data.call_count, 2)
+
+    def test_stale_catalog_inclusion_is_refreshed_in_the_background(self, _, mock_catalog_client_class):
+        mock_catalog_client = mock_catalog_client_class.return_value
+        mock_catalog_client.contains_content_items.return_value = False
+        self.assertFalse(get_and_cache_catalog_contains_content(self.catalog_uuid, self.content_key))
+        mock_catalog_client.contains_content_items.return_value = True
+
+        self._expire_soft_timeout(catalog_contains_content_cache_key(self.catalog_uuid, self.content_key))
+        # The stale answer is served; celery tasks run eagerly in tests, so the refresh completes right away.
+        self.assertFalse(get_and_cache_catalog_contains_content(self.catalog_uuid, self.content_key))
+
+        RequestCache.clear_all_namespaces()
+        self.assertTrue(get_and_cache_catalog_contains_content(self.catalog_uuid, self.content_key))
+        self.assertEqual(mock_catalog_client.contains_content_items.call_count, 2)
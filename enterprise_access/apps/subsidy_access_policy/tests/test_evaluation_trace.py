@@ -0,0 +1,120 @@
+"""
+Tests for the evaluation_trace module.
+"""
+from django.core.cache import cache as django_cache
+from django.test import TestCase
+from edx_django_utils.cache import RequestCache, TieredCache
+
+from ..evaluation_trace import (
+    TIER_REQUEST,
+    TIER_SHARED,
+    TIER_UPSTREAM,
+    get_evaluation_trace,
+    get_tiered_cached_response,
+    record_cache_lookup,
+    start_evaluation_trace,
+    traced_step
+)
+from ..predicates import COST_LOCAL, Predicate, evaluate_predicates
+from ..utils import map_with_bounded_concurrency
+
+
+class StubPolicy:
+    """
+    A policy with a single check, which looks up a fact.
+    """
+    uuid = 'the-policy-uuid'
+
+    def _check_fact(self, lms_user_id, content_key):  # pylint: disable=unused-argument
+        record_cache_lookup('fact', TIER_SHARED)
+        return False
+
+
+class EvaluationTraceTests(TestCase):
+    """
+    Tests for recording evaluation traces.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+
+    def test_nothing_recorded_unless_started(self):
+        with traced_step('the-policy-uuid', 'check') as step:
+            record_cache_lookup('fact', TIER_UPSTREAM)
+
+        self.assertIsNone(step)
+        self.assertIsNone(get_evaluation_trace())
+
+    def test_lookups_are_attributed_to_steps(self):
+        trace = start_evaluation_trace()
+
+        record_cache_lookup('before', TIER_REQUEST)
+        with traced_step(None, 'prefetch'):
+            record_cache_lookup('prefetched', TIER_UPSTREAM)
+        with traced_step('the-policy-uuid', 'outer') as outer_step:
+            outer_step['holds'] = True  # pylint: disable=unsupported-assignment-operation
+            with traced_step('the-policy-uuid', 'inner'):
+                record_cache_lookup('inner_fact', TIER_SHARED)
+            record_cache_lookup('outer_fact', TIER_REQUEST)
+
+        trace_dict = trace.as_dict()
+        self.assertEqual(trace_dict['unattributed_lookups'], [{'resource': 'before', 'tier': TIER_REQUEST}])
+        self.assertEqual(
+            [(step['check'], step['lookups']) for step in trace_dict['steps']],
+            [('prefetch', [{'resource': 'prefetched', 'tier': TIER_UPSTREAM}])],
+        )
+        [policy_trace] = trace_dict['policies']
+        self.assertEqual(policy_trace['policy_uuid'], 'the-policy-uuid')
+        self.assertEqual(
+            [(step['check'], step['holds'], step['lookups']) for step in policy_trace['steps']],
+            [
+                ('inner', None, [{'resource': 'inner_fact', 'tier': TIER_SHARED}]),
+                ('outer', True, [{'resource': 'outer_fact', 'tier': TIER_REQUEST}]),
+            ],
+        )
+        self.assertTrue(all(step['elapsed_ms'] >= 0 for step in policy_trace['steps']))
+
+    def test_steps_on_worker_threads(self):
+        trace = start_evaluation_trace()
+
+        def _step(policy_uuid):
+            with traced_step(policy_uuid, 'check'):
+                record_cache_lookup(f'fact-{policy_uuid}', TIER_SHARED)
+
+        map_with_bounded_concurrency(_step, ['policy-1', 'policy-2', 'policy-3'], max_workers=3)
+
+        policy_traces = sorted(trace.as_dict()['policies'], key=lambda policy_trace: policy_trace['policy_uuid'])
+        self.assertEqual(
+            [
+                (policy_trace['policy_uuid'], policy_trace['steps'][0]['lookups'][0]['resource'])
+                for policy_trace in policy_traces
+            ],
+            [('policy-1', 'fact-policy-1'), ('policy-2', 'fact-policy-2'), ('policy-3', 'fact-policy-3')],
+        )
+
+    def test_get_tiered_cached_response(self):
+        TieredCache.set_all_tiers('the-key', 'the-value', 60)
+        RequestCache.clear_all_namespaces()
+        trace = start_evaluation_trace()
+
+        self.assertFalse(get_tiered_cached_response('another-key', 'fact').is_found)
+        self.assertEqual(get_tiered_cached_response('the-key', 'fact').value, 'the-value')
+        self.assertEqual(get_tiered_cached_response('the-key', 'fact').value, 'the-value')
+
+        self.assertEqual(
+            [lookup['tier'] for lookup in trace.as_dict()['unattributed_lookups']],
+            [TIER_UPSTREAM, TIER_SHARED, TIER_REQUEST],
+        )
+
+    def test_predicates_are_traced(self):
+        trace = start_evaluation_trace()
+        predicates = (Predicate('fact', '_check_fact', 'reason', COST_LOCAL),)
+
+        evaluate_predicates(predicates, StubPolicy(), 1, 'the-content')
+
+        [policy_trace] = trace.as_dict()['policies']
+        [step] = policy_trace['steps']
+        self.assertEqual(step['check'], 'fact')
+        self.assertFalse(step['holds'])
+        self.assertEqual(step['lookups'], [{'resource': 'fact', 'tier': TIER_SHARED}])
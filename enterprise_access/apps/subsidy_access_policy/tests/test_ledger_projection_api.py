@@ -0,0 +1,141 @@
+"""
+Tests for the ledger_projection_api module.
+"""
+import uuid
+from unittest import mock
+
+from django.core.cache import cache as django_cache
+from django.test import TestCase, override_settings
+from edx_django_utils.cache import RequestCache
+
+from enterprise_access.apps.events.signals import (
+    ACCESS_POLICY_CREATED,
+    SUBSIDY_TRANSACTION_COMMITTED,
+    SUBSIDY_TRANSACTION_CREATED,
+    SUBSIDY_TRANSACTION_REVERSED
+)
+
+from ..constants import TransactionStateChoices
+from ..ledger_projection_api import apply_transaction_event, backfill_subsidy
+from ..models import LearnerTransactionProjection, ProjectedSubsidy
+from ..subsidy_api import get_and_cache_transactions_for_learner, is_subsidy_projected
+from .factories import PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory
+
+CLIENT_PATH = 'enterprise_access.apps.subsidy_access_policy.ledger_projection_api.get_versioned_subsidy_client'
+
+
+def transaction_payload(**kwargs):
+    """
+    Returns a subsidy transaction, as serialized by the enterprise-subsidy service, with the given overrides.
+    """
+    payload = {
+        'uuid': str(uuid.uuid4()),
+        'subsidy_uuid': str(uuid.uuid4()),
+        'lms_user_id': 1,
+        'content_key': 'course-v1:edX+DemoX+Demo',
+        'subsidy_access_policy_uuid': str(uuid.uuid4()),
+        'state': TransactionStateChoices.CREATED,
+        'quantity': -100,
+        'idempotency_key': 'the-idempotency-key',
+        'created': '2023-10-01T00:00:00Z',
+        'modified': '2023-10-01T00:00:00Z',
+        'reversal': None,
+    }
+    payload.update(kwargs)
+    return payload
+
+
+@override_settings(LEARNER_LEDGER_PROJECTION_ENABLED=True)
+class LedgerProjectionTests(TestCase):
+    """
+    Tests projecting subsidy transactions, and reading them from the projection.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+        self.policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory()
+        self.transaction = transaction_payload(
+            subsidy_uuid=str(self.policy.subsidy_uuid),
+            subsidy_access_policy_uuid=str(self.policy.uuid),
+        )
+
+    def test_events_update_the_projection_in_order(self):
+        committed = {**self.transaction, 'state': TransactionStateChoices.COMMITTED, 'modified': '2023-10-01T00:01:00Z'}
+        reversed_transaction = {
+            **committed,
+            'modified': '2023-10-02T00:00:00Z',
+            'reversal': {
+                'uuid': str(uuid.uuid4()),
+                'state': TransactionStateChoices.COMMITTED,
+                'quantity': 100,
+                'modified': '2023-10-02T00:00:00Z',
+            },
+        }
+
+        self.assertTrue(apply_transaction_event(SUBSIDY_TRANSACTION_CREATED.event_type, self.transaction))
+        self.assertTrue(apply_transaction_event(SUBSIDY_TRANSACTION_COMMITTED.event_type, committed))
+        self.assertTrue(apply_transaction_event(SUBSIDY_TRANSACTION_REVERSED.event_type, reversed_transaction))
+        # A late, redelivered creation event doesn't undo the later changes.
+        self.assertFalse(apply_transaction_event(SUBSIDY_TRANSACTION_CREATED.event_type, self.transaction))
+        # Nor does an event of some other type.
+        self.assertFalse(apply_transaction_event(ACCESS_POLICY_CREATED.event_type, self.transaction))
+
+        projection = LearnerTransactionProjection.objects.get(uuid=self.transaction['uuid'])
+        self.assertEqual(projection.state, TransactionStateChoices.COMMITTED)
+        self.assertEqual(projection.transaction, reversed_transaction)
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.ledger_projection_api.invalidate_learner_ledger_cache')
+    def test_events_invalidate_learner_ledger(self, mock_invalidate):
+        apply_transaction_event(SUBSIDY_TRANSACTION_CREATED.event_type, self.transaction)
+        apply_transaction_event(SUBSIDY_TRANSACTION_CREATED.event_type, self.transaction)
+
+        mock_invalidate.assert_called_once_with(str(self.policy.subsidy_uuid), 1)
+
+    @mock.patch(CLIENT_PATH)
+    def test_backfill_projects_every_page(self, mock_client_getter):
+        mock_client = mock_client_getter.return_value
+        other_transaction = transaction_payload(lms_user_id=2, created='2023-09-01T00:00:00Z')
+        mock_client.list_subsidy_transactions.return_value = {'results': [self.transaction], 'next': 'page-2'}
+        mock_client.client.get.return_value.json.return_value = {'results': [other_transaction], 'next': None}
+
+        self.assertFalse(is_subsidy_projected(self.policy.subsidy_uuid))
+        self.assertEqual(backfill_subsidy(self.policy.subsidy_uuid), 2)
+
+        self.assertTrue(is_subsidy_projected(self.policy.subsidy_uuid))
+        self.assertEqual(
+            set(LearnerTransactionProjection.objects.values_list('subsidy_uuid', flat=True)),
+            {self.policy.subsidy_uuid},
+        )
+        mock_client.client.get.assert_called_once_with('page-2')
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.models.get_versioned_subsidy_client')
+    def test_projected_subsidy_is_read_locally(self, mock_client_getter):
+        other_content_transaction = {
+            **transaction_payload(subsidy_uuid=self.transaction['subsidy_uuid']),
+            'subsidy_access_policy_uuid': str(self.policy.uuid),
+            'content_key': 'course-v1:edX+Other+Demo',
+        }
+        apply_transaction_event(SUBSIDY_TRANSACTION_CREATED.event_type, self.transaction)
+        apply_transaction_event(SUBSIDY_TRANSACTION_CREATED.event_type, other_content_transaction)
+        ProjectedSubsidy.objects.create(subsidy_uuid=self.policy.subsidy_uuid, backfilled_at='2023-10-01T00:00:00Z')
+
+        with mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.sync_learner_ledger') as mock_sync:
+            self.assertEqual(
+                get_and_cache_transactions_for_learner(self.policy.subsidy_uuid, 1)['transactions'],
+                [self.transaction, other_content_transaction],
+            )
+            mock_sync.assert_not_called()
+        self.assertTrue(self.policy.has_redeemed(1, self.transaction['content_key']))
+        self.assertEqual(
+            self.policy.transactions_for_learner_and_content(1, self.transaction['content_key']),
+            {'transactions': [self.transaction], 'aggregates': {'total_quantity': -100}},
+        )
+        self.assertFalse(self.policy.has_redeemed(2, self.transaction['content_key']))
+        mock_client_getter.return_value.list_subsidy_transactions.assert_not_called()
+
+    @override_settings(LEARNER_LEDGER_PROJECTION_ENABLED=False)
+    def test_projection_not_read_unless_enabled(self):
+        ProjectedSubsidy.objects.create(subsidy_uuid=self.policy.subsidy_uuid, backfilled_at='2023-10-01T00:00:00Z')
+
+        self.assertFalse(is_subsidy_projected(self.policy.subsidy_uuid))
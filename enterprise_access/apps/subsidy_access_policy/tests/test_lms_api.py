@@ -0,0 +1,79 @@
+"""
+Tests for the lms_api module.
+"""
+import uuid
+from unittest import mock
+
+import requests
+from django.core.cache import cache as django_cache
+from django.test import TestCase
+from edx_django_utils.cache import RequestCache
+
+from ..lms_api import enterprise_contains_learner, enterprise_contains_learners, invalidate_learner_membership_cache
+
+
+@mock.patch('enterprise_access.apps.subsidy_access_policy.lms_api.LEARNER_MEMBERSHIP_CHUNK_SIZE', 2)
+class LearnerMembershipTests(TestCase):
+    """
+    Tests the cached learner membership checks.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+        self.customer_uuid = uuid.uuid4()
+        self.lms_api_client = mock.Mock()
+
+    def test_membership_is_cached_in_both_tiers(self):
+        self.lms_api_client.enterprise_contains_learner.return_value = True
+
+        self.assertTrue(enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1))
+        self.assertTrue(enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1))
+        RequestCache.clear_all_namespaces()
+        self.assertTrue(enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1))
+
+        self.lms_api_client.enterprise_contains_learner.assert_called_once_with(self.customer_uuid, 1)
+
+    def test_non_membership_is_only_request_cached(self):
+        self.lms_api_client.enterprise_contains_learner.return_value = False
+
+        self.assertFalse(enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1))
+        self.assertFalse(enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1))
+        self.assertEqual(self.lms_api_client.enterprise_contains_learner.call_count, 1)
+
+        RequestCache.clear_all_namespaces()
+        self.lms_api_client.enterprise_contains_learner.return_value = True
+        self.assertTrue(enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1))
+
+    def test_bulk_checks_only_uncached_learners(self):
+        self.lms_api_client.enterprise_contains_learner.return_value = True
+        enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1)
+        RequestCache.clear_all_namespaces()
+        self.lms_api_client.get_enterprise_learner_ids.side_effect = [{2}, {4}, requests.exceptions.HTTPError()]
+
+        memberships = enterprise_contains_learners(self.lms_api_client, self.customer_uuid, [1, 2, 3, 4, 5, 6, 7])
+
+        self.assertEqual(memberships, {1: True, 2: True, 3: False, 4: True, 5: False, 6: False, 7: False})
+        self.assertEqual(
+            [call.args for call in self.lms_api_client.get_enterprise_learner_ids.call_args_list],
+            [(self.customer_uuid, [2, 3]), (self.customer_uuid, [4, 5]), (self.customer_uuid, [6, 7])],
+        )
+
+        # Learners whose check failed aren't cached across requests.
+        RequestCache.clear_all_namespaces()
+        self.lms_api_client.get_enterprise_learner_ids.side_effect = None
+        self.lms_api_client.get_enterprise_learner_ids.return_value = {6}
+        memberships = enterprise_contains_learners(self.lms_api_client, self.customer_uuid, [1, 2, 4, 6, 7])
+        self.assertEqual(memberships, {1: True, 2: True, 4: True, 6: True, 7: False})
+        self.lms_api_client.get_enterprise_learner_ids.assert_called_with(self.customer_uuid, [6, 7])
+
+    def test_invalidate(self):
+        self.lms_api_client.enterprise_contains_learner.return_value = True
+        enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1)
+        enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 2)
+
+        invalidate_learner_membership_cache(self.customer_uuid, ['1'])
+        self.lms_api_client.enterprise_contains_learner.return_value = False
+
+        self.assertFalse(enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 1))
+        self.assertTrue(enterprise_contains_learner(self.lms_api_client, self.customer_uuid, 2))
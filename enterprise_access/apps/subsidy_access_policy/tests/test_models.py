@@ -1,6 +1,8 @@
 """
 Tests for subsidy_access_policy models.
 """
+import threading
+import time
 from datetime import datetime, timedelta
 from unittest.mock import PropertyMock, patch
 from uuid import uuid4
@@ -11,8 +13,11 @@ import requests
 from django.core.cache import cache as django_cache
 from django.core.exceptions import ValidationError
 from django.test import TestCase, override_settings
+from edx_django_utils.cache import RequestCache
 
 from enterprise_access.apps.content_assignments.models import AssignmentConfiguration
+from enterprise_access.apps.subsidy_access_policy import spend_api
+from enterprise_access.apps.subsidy_access_policy.api import refresh_policy_balance_snapshots
 from enterprise_access.apps.subsidy_access_policy.constants import (
     REASON_CONTENT_NOT_IN_CATALOG,
     REASON_LEARNER_MAX_ENROLLMENTS_REACHED,
@@ -23,10 +28,12 @@ from enterprise_access.apps.subsidy_access_policy.constants import (
     REASON_POLICY_SPEND_LIMIT_REACHED,
     REASON_SUBSIDY_EXPIRED
 )
+from enterprise_access.apps.subsidy_access_policy.exceptions import SubsidyAccessPolicySpendReservationFailed
 from enterprise_access.apps.subsidy_access_policy.models import (
     AssignedLearnerCreditAccessPolicy,
     PerLearnerEnrollmentCreditAccessPolicy,
     PerLearnerSpendCreditAccessPolicy,
+    PolicyBalanceSnapshot,
     SubsidyAccessPolicy,
     SubsidyAccessPolicyLockAttemptFailed
 )
@@ -53,13 +60,15 @@ class MockPolicyDependenciesMixin:
         Initialize mocked service clients.
         """
         super().setUp()
+        # Policy records are shared across tests, so don't let request-cached values leak between them.
+        RequestCache.clear_all_namespaces()
         subsidy_client_patcher = patch.object(
             SubsidyAccessPolicy, 'subsidy_client'
         )
         self.mock_subsidy_client = subsidy_client_patcher.start()
 
         transactions_cache_for_learner_patcher = patch(
-            'enterprise_access.apps.subsidy_access_policy.models.get_and_cache_transactions_for_learner'
+            'enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner'
         )
         self.mock_transactions_cache_for_learner = transactions_cache_for_learner_patcher.start()
 
@@ -240,6 +249,9 @@ class SubsidyAccessPolicyTests(MockPolicyDependenciesMixin, TestCase):
             },
             'transactions_for_policy': {'results': [], 'aggregates': {'total_quantity': -200}},
             'expected_policy_can_redeem': (False, REASON_LEARNER_MAX_ENROLLMENTS_REACHED, []),
+            # The learner's enrollment count is the cheapest check, so nothing remote is fetched.
+            'expect_content_metadata_fetch': False,
+            'expect_transaction_fetch': False,
         },
         {
             # The subsidy is redeemable, but another redemption would exceed the policy-wide ``spend_limit``.
@@ -260,6 +272,8 @@ class SubsidyAccessPolicyTests(MockPolicyDependenciesMixin, TestCase):
             },
             'transactions_for_policy': {'results': [], 'aggregates': {'total_quantity': -10001}},
             'expected_policy_can_redeem': (False, REASON_POLICY_SPEND_LIMIT_REACHED, []),
+            # The policy-wide spend is checked before the subsidy is asked.
+            'expect_transaction_fetch': False,
         },
         {
             # The subsidy access policy is not active, every other check would succeed.
@@ -334,6 +348,26 @@ class SubsidyAccessPolicyTests(MockPolicyDependenciesMixin, TestCase):
         else:
             self.assertFalse(self.mock_subsidy_client.can_redeem.called)
 
+    @ddt.data(
+        {'catalog_contains_content': False, 'enterprise_contains_learner': True},
+        {'catalog_contains_content': True, 'enterprise_contains_learner': False},
+    )
+    @ddt.unpack
+    def test_learner_ledger_not_synced_for_turned_away_learner(
+        self, catalog_contains_content, enterprise_contains_learner,
+    ):
+        """
+        Test that the per-learner limits, which sync the learner's ledger from the subsidy service,
+        aren't checked for content outside the catalog, or for learners outside the enterprise.
+        """
+        self.mock_lms_api_client.enterprise_contains_learner.return_value = enterprise_contains_learner
+        self.mock_catalog_contains_content_key.return_value = catalog_contains_content
+
+        can_redeem, _, _ = self.per_learner_enroll_policy.can_redeem(self.lms_user_id, self.course_id)
+
+        self.assertFalse(can_redeem)
+        self.mock_transactions_cache_for_learner.assert_not_called()
+
     @ddt.data(
         {
             # Happy path: content in catalog, learner in enterprise, subsidy has value,
@@ -403,6 +437,8 @@ class SubsidyAccessPolicyTests(MockPolicyDependenciesMixin, TestCase):
             },
             'transactions_for_policy': {'results': [], 'aggregates': {'total_quantity': -200}},
             'expected_policy_can_redeem': (False, REASON_LEARNER_MAX_SPEND_REACHED, []),
+            # The learner's spend is checked before the subsidy is asked.
+            'expect_transaction_fetch': False,
         },
         {
             # The subsidy is redeemable, but another redemption would exceed the policy-wide ``spend_limit``.
@@ -417,12 +453,14 @@ class SubsidyAccessPolicyTests(MockPolicyDependenciesMixin, TestCase):
                     'subsidy_access_policy_uuid': str(ACTIVE_LEARNER_SPEND_CAP_POLICY_UUID),
                     'uuid': str(uuid4()),
                     'content_key': 'anything',
-                    'quantity': 100,
+                    'quantity': -100,
                 }],
                 'aggregates': {'total_quantity': -100}
             },
             'transactions_for_policy': {'results': [], 'aggregates': {'total_quantity': -15000}},
             'expected_policy_can_redeem': (False, REASON_POLICY_SPEND_LIMIT_REACHED, []),
+            # The policy-wide spend is checked before the subsidy is asked.
+            'expect_transaction_fetch': False,
         },
         {
             # The subsidy access policy is not active, every other check would succeed.
@@ -554,6 +592,101 @@ class SubsidyAccessPolicyTests(MockPolicyDependenciesMixin, TestCase):
                 pass
         self.per_learner_enroll_policy.release_lock()
 
+    def test_acquire_lock_waits_for_release(self):
+        """
+        A waiting acquirer gets the lock once the holder releases it, and gives up after its wait timeout.
+        """
+        holder_lock_id = self.per_learner_enroll_policy.acquire_lock()
+        self.assertIsNone(self.per_learner_enroll_policy.acquire_lock(wait_timeout=0.2))
+
+        releaser = threading.Timer(
+            0.1, self.per_learner_enroll_policy.release_lock, kwargs={'lock_id': holder_lock_id},
+        )
+        releaser.start()
+        waiter_lock_id = self.per_learner_enroll_policy.acquire_lock(wait_timeout=5)
+        releaser.join()
+
+        self.assertIsNotNone(waiter_lock_id)
+        self.assertNotEqual(waiter_lock_id, holder_lock_id)
+        self.per_learner_enroll_policy.release_lock(lock_id=waiter_lock_id)
+
+    def test_release_lock_checks_owner(self):
+        """
+        A holder whose lease expired can neither renew nor release the lock of the next holder,
+        while the current holder can renew its lease.
+        """
+        policy = self.per_learner_enroll_policy
+        stale_lock_id = policy.acquire_lock(lms_user_id=1, lease_timeout=0.1)
+        time.sleep(0.2)
+        current_lock_id = policy.acquire_lock(lms_user_id=1, lease_timeout=0.3)
+        self.assertIsNotNone(current_lock_id)
+
+        self.assertFalse(policy.renew_lock(stale_lock_id, lms_user_id=1))
+        policy.release_lock(lms_user_id=1, lock_id=stale_lock_id)
+        self.assertIsNone(policy.acquire_lock(lms_user_id=1))
+
+        self.assertTrue(policy.renew_lock(current_lock_id, lms_user_id=1, lease_timeout=30))
+        time.sleep(0.4)
+        self.assertIsNone(policy.acquire_lock(lms_user_id=1))
+
+        policy.release_lock(lms_user_id=1, lock_id=current_lock_id)
+        self.assertIsNotNone(policy.acquire_lock(lms_user_id=1))
+
+    def test_redemption_lock_scope(self):
+        """
+        Redemption locks only contend for the same learner (and content, when the policy has no
+        per-learner limit), never across unrelated learners.
+        """
+        no_learner_limit_policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(
+            per_learner_enrollment_limit=None,
+        )
+        with self.per_learner_enroll_policy.redemption_lock(1, 'course-a'):
+            with self.per_learner_enroll_policy.redemption_lock(2, 'course-a'):
+                pass
+            with pytest.raises(SubsidyAccessPolicyLockAttemptFailed):
+                with self.per_learner_enroll_policy.redemption_lock(1, 'course-b'):
+                    pass
+
+        with no_learner_limit_policy.redemption_lock(1, 'course-a'):
+            with no_learner_limit_policy.redemption_lock(1, 'course-b'):
+                pass
+            with pytest.raises(SubsidyAccessPolicyLockAttemptFailed):
+                with no_learner_limit_policy.redemption_lock(1, 'course-a'):
+                    pass
+
+    def test_reserve_spend(self):
+        """
+        Concurrent spend reservations are counted against the spend limit, committed on success,
+        and rolled back on failure.
+        """
+        policy = self.per_learner_enroll_policy
+        self.mock_subsidy_client.list_subsidy_transactions.return_value = {
+            'results': [],
+            'aggregates': {'total_quantity': -4000},
+        }
+        # 10000 limit - 4000 redeemed leaves room for one 5000 redemption in flight, but not two.
+        with policy.reserve_spend(5000):
+            with pytest.raises(SubsidyAccessPolicySpendReservationFailed):
+                with policy.reserve_spend(5000):
+                    pass
+            with policy.reserve_spend(500):
+                pass
+            self.assertEqual(spend_api.get_reserved_spend(policy), 5000)
+        self.assertEqual(spend_api.get_reserved_spend(policy), 0)
+        self.assertEqual(spend_api.get_committed_spend(policy), 9500)
+
+        with pytest.raises(ValueError):
+            with policy.reserve_spend(400):
+                raise ValueError('the subsidy transaction was not created')
+        self.assertEqual(spend_api.get_reserved_spend(policy), 0)
+        self.assertEqual(spend_api.get_committed_spend(policy), 9500)
+
+        with pytest.raises(SubsidyAccessPolicySpendReservationFailed):
+            with policy.reserve_spend(500):
+                pass
+        # The committed spend was only seeded from aggregates once.
+        self.assertEqual(self.mock_subsidy_client.list_subsidy_transactions.call_count, 1)
+
     def test_content_would_exceed_limit_positive_spent_amount(self):
         """
         Ensures that passing a positive spent_amount will raise an exception.
@@ -587,6 +720,92 @@ class SubsidyAccessPolicyTests(MockPolicyDependenciesMixin, TestCase):
         self.assertIsNone(policy.is_subsidy_active)
         self.assertEqual(policy.subsidy_balance(), 0)
 
+    def test_subsidy_record_cached_across_requests_until_redeemed(self):
+        """
+        The subsidy record survives the end of a request, but is invalidated by a redemption.
+        """
+        self.mock_subsidy_client.retrieve_subsidy.return_value = {'id': 123455, 'current_balance': 100}
+        policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory.create()
+
+        policy.subsidy_record()
+        RequestCache.clear_all_namespaces()
+        policy.subsidy_record()
+        self.assertEqual(self.mock_subsidy_client.retrieve_subsidy.call_count, 1)
+
+        self.mock_subsidy_client.create_subsidy_transaction.return_value = {'uuid': str(uuid4())}
+        policy.redeem(12345, 'course-v1:edX+A+1T2023', [])
+        policy.subsidy_record()
+        self.assertEqual(self.mock_subsidy_client.retrieve_subsidy.call_count, 2)
+
+    def test_aggregates_for_policy_cached_until_redeemed(self):
+        """
+        Rendering the aggregate-derived properties of a policy costs one upstream call, and a redemption
+        invalidates the cached aggregates.
+        """
+        self.mock_subsidy_client.retrieve_subsidy.return_value = {'current_balance': 1000}
+        self.mock_subsidy_client.list_subsidy_transactions.return_value = {
+            'results': [],
+            'aggregates': {'total_quantity': -100},
+        }
+        policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory.create(spend_limit=500)
+
+        self.assertEqual(policy.total_redeemed, -100)
+        self.assertEqual(policy.spend_available, 400)
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(policy.total_redeemed, -100)
+        self.assertEqual(self.mock_subsidy_client.list_subsidy_transactions.call_count, 1)
+
+        self.mock_subsidy_client.create_subsidy_transaction.return_value = {'uuid': str(uuid4())}
+        policy.redeem(12345, 'course-v1:edX+A+1T2023', [])
+        policy.aggregates_for_policy()
+        self.assertEqual(self.mock_subsidy_client.list_subsidy_transactions.call_count, 2)
+
+    def test_redeem_adjusts_balance_snapshot(self):
+        self.mock_subsidy_client.retrieve_subsidy.return_value = {'current_balance': 1000}
+        self.mock_subsidy_client.list_subsidy_transactions.return_value = {
+            'results': [],
+            'aggregates': {'total_quantity': -100},
+        }
+        policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory.create(spend_limit=500)
+        refresh_policy_balance_snapshots([policy])
+
+        self.mock_subsidy_client.create_subsidy_transaction.return_value = {'uuid': str(uuid4()), 'quantity': -300}
+        policy.redeem(12345, 'course-v1:edX+A+1T2023', [])
+
+        snapshot = PolicyBalanceSnapshot.objects.get(policy=policy)
+        self.assertEqual(
+            (snapshot.total_redeemed, snapshot.spend_available, snapshot.subsidy_balance),
+            (-400, 100, 700),
+        )
+
+    def test_redemptions_read_from_learner_ledger(self):
+        policy = self.per_learner_enroll_policy
+        redemption = {
+            'uuid': str(uuid4()),
+            'subsidy_access_policy_uuid': str(policy.uuid),
+            'content_key': self.course_id,
+            'quantity': -100,
+        }
+        self.mock_transactions_cache_for_learner.return_value = {
+            'transactions': [redemption, {**redemption, 'uuid': str(uuid4()), 'content_key': 'other'}],
+            'aggregates': {},
+        }
+
+        self.assertTrue(policy.has_redeemed(self.lms_user_id, self.course_id))
+        self.assertEqual(policy.redemptions(self.lms_user_id, self.course_id), [redemption])
+        self.assertEqual(policy.remaining_balance_per_user(self.lms_user_id), 3)
+
+        self.mock_transactions_cache_for_learner.assert_called_once_with(policy.subsidy_uuid, self.lms_user_id)
+        self.mock_subsidy_client.list_subsidy_transactions.assert_not_called()
+
+    def test_subsidy_record_http_error_not_cached_across_requests(self):
+        self.mock_subsidy_client.retrieve_subsidy.side_effect = requests.exceptions.HTTPError
+        policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory.create()
+        self.assertEqual(policy.subsidy_record(), {})
+        RequestCache.clear_all_namespaces()
+        self.assertEqual(policy.subsidy_record(), {})
+        self.assertEqual(self.mock_subsidy_client.retrieve_subsidy.call_count, 2)
+
 
 class SubsidyAccessPolicyResolverTests(TestCase):
     """ SubsidyAccessPolicy.resolve_policy() tests. """
@@ -596,6 +815,8 @@ class SubsidyAccessPolicyResolverTests(TestCase):
         Initialize mocked service clients.
         """
         super().setUp()
+        # Policy records are shared across tests, so don't let request-cached values leak between them.
+        RequestCache.clear_all_namespaces()
         yesterday = datetime.utcnow() - timedelta(days=1)
         tomorrow = datetime.utcnow() + timedelta(days=1)
         day_after_tomorrow = datetime.utcnow() + timedelta(days=2)
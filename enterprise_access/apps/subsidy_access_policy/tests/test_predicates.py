@@ -0,0 +1,108 @@
+"""
+Tests for the predicates module.
+"""
+from unittest import TestCase, mock
+
+from ..predicates import COST_CACHED, COST_LOCAL, COST_REMOTE, COST_SHARED_REMOTE, Predicate, evaluate_predicates
+
+
+class StubPolicy:
+    """
+    A policy whose checks record the order they're called in, and return preset outcomes.
+    """
+    uuid = 'the-policy-uuid'
+
+    def __init__(self, **outcomes):
+        self.outcomes = outcomes
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith('_check_'):
+            predicate_name = name[len('_check_'):]
+
+            def check(lms_user_id, content_key):  # pylint: disable=unused-argument
+                self.calls.append(predicate_name)
+                return self.outcomes.get(predicate_name, True)
+            return check
+        raise AttributeError(name)
+
+
+def predicate(name, cost, depends_on=()):
+    return Predicate(name, f'_check_{name}', f'reason_{name}', cost, depends_on=depends_on)
+
+
+class EvaluatePredicatesTests(TestCase):
+    """
+    Tests for ``evaluate_predicates()``.
+    """
+    def test_cheapest_first_then_declaration_order(self):
+        policy = StubPolicy()
+        predicates = (
+            predicate('remote', COST_REMOTE),
+            predicate('cached_a', COST_CACHED),
+            predicate('local', COST_LOCAL),
+            predicate('cached_b', COST_CACHED),
+        )
+
+        evaluation = evaluate_predicates(predicates, policy, 1, 'the-content')
+
+        self.assertTrue(evaluation.passed)
+        self.assertIsNone(evaluation.reason)
+        self.assertEqual(policy.calls, ['local', 'cached_a', 'cached_b', 'remote'])
+        self.assertEqual([name for name, _, _ in evaluation.timings], policy.calls)
+
+    def test_dependencies_are_evaluated_first(self):
+        policy = StubPolicy()
+        predicates = (
+            predicate('cheap_dependent', COST_LOCAL, depends_on=('expensive',)),
+            predicate('expensive', COST_REMOTE),
+            predicate('missing_dependency', COST_CACHED, depends_on=('not_given',)),
+        )
+
+        evaluate_predicates(predicates, policy, 1, 'the-content')
+
+        self.assertEqual(policy.calls, ['missing_dependency', 'expensive', 'cheap_dependent'])
+
+    def test_stops_at_first_failure(self):
+        policy = StubPolicy(cached=False)
+        predicates = (
+            predicate('remote', COST_REMOTE),
+            predicate('cached', COST_CACHED),
+            predicate('local', COST_LOCAL),
+        )
+
+        evaluation = evaluate_predicates(predicates, policy, 1, 'the-content')
+
+        self.assertFalse(evaluation.passed)
+        self.assertEqual(evaluation.reason, 'reason_cached')
+        self.assertEqual(policy.calls, ['local', 'cached'])
+        self.assertTrue(evaluation.was_evaluated('cached'))
+        self.assertFalse(evaluation.was_evaluated('remote'))
+        self.assertEqual(evaluation.timings[-1][:2], ('cached', False))
+
+    def test_circular_dependencies(self):
+        predicates = (
+            predicate('a', COST_LOCAL, depends_on=('b',)),
+            predicate('b', COST_LOCAL, depends_on=('a',)),
+        )
+
+        with self.assertRaisesRegex(ValueError, 'circular'):
+            evaluate_predicates(predicates, mock.Mock(), 1, 'the-content')
+
+    def test_max_cost(self):
+        """
+        Only the predicates up to the given cost, whose dependencies are too, are evaluated.
+        """
+        policy = StubPolicy()
+        predicates = (
+            predicate('local', COST_LOCAL),
+            predicate('shared', COST_SHARED_REMOTE),
+            predicate('cached', COST_CACHED, depends_on=('shared',)),
+            predicate('cached_after_remote', COST_CACHED, depends_on=('remote',)),
+            predicate('remote', COST_REMOTE),
+        )
+
+        evaluation = evaluate_predicates(predicates, policy, 1, 'the-content', max_cost=COST_SHARED_REMOTE)
+
+        self.assertTrue(evaluation.passed)
+        self.assertEqual(policy.calls, ['local', 'shared', 'cached'])
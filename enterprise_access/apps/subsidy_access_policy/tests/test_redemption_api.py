@@ -0,0 +1,273 @@
+"""
+Tests for the ``redemption_api.py`` module of the subsidy_access_policy app.
+"""
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+import requests
+from django.core.cache import cache as django_cache
+from django.test import TestCase
+
+from enterprise_access.apps.events.signals import SUBSIDY_REDEEMED
+from enterprise_access.apps.subsidy_access_policy import redemption_api, spend_api
+from enterprise_access.apps.subsidy_access_policy.constants import (
+    REASON_CONTENT_NOT_IN_CATALOG,
+    REASON_REDEMPTION_RETRIES_EXHAUSTED,
+    REASON_SUBSIDY_TRANSACTION_REFUSED,
+    RedemptionIntentStateChoices
+)
+from enterprise_access.apps.subsidy_access_policy.exceptions import (
+    SubsidyAccessPolicySpendReservationFailed,
+    SubsidyAPIHTTPError
+)
+from enterprise_access.apps.subsidy_access_policy.models import PerLearnerEnrollmentCreditAccessPolicy, RedemptionIntent
+from enterprise_access.apps.subsidy_access_policy.tasks import process_redemption_intent_task
+from enterprise_access.apps.subsidy_access_policy.tests.factories import (
+    PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory
+)
+from enterprise_access.apps.subsidy_access_policy.tests.test_models import MockPolicyDependenciesMixin
+from enterprise_access.apps.subsidy_access_policy.utils import request_cache
+
+
+def http_error(status_code):
+    """
+    Returns an ``HTTPError`` for a response with the given status code.
+    """
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = b'{"detail": "nope"}'  # pylint: disable=protected-access
+    return requests.exceptions.HTTPError(response=response)
+
+
+class RedemptionApiTests(MockPolicyDependenciesMixin, TestCase):
+    """
+    Tests for accepting and processing asynchronous redemptions.
+    """
+    lms_user_id = 12345
+    content_key = 'course-v1:edX+A+1T2023'
+
+    def setUp(self):
+        super().setUp()
+        self.policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(spend_limit=10000)
+        self.mock_get_content_metadata.return_value = {'content_price': 3000}
+        self.mock_subsidy_client.list_subsidy_transactions.return_value = {
+            'results': [],
+            'aggregates': {'total_quantity': -1000},
+        }
+        can_redeem_patcher = mock.patch.object(
+            PerLearnerEnrollmentCreditAccessPolicy,
+            'can_redeem',
+            return_value=(True, None, []),
+        )
+        self.mock_can_redeem = can_redeem_patcher.start()
+        self.addCleanup(can_redeem_patcher.stop)
+        self.transaction_record = {'uuid': str(uuid4()), 'quantity': -3000}
+        self.mock_subsidy_client.create_subsidy_transaction.return_value = self.transaction_record
+
+    def accept(self):
+        """
+        Accepts a redemption, without processing it.  Returns the result, and the mocked enqueuing of its processing.
+        """
+        with mock.patch.object(process_redemption_intent_task, 'delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = redemption_api.accept_redemption(
+                    self.policy, self.lms_user_id, self.content_key, metadata={'foo': 'bar'},
+                )
+        return result, mock_delay
+
+    def test_accept_redemption(self):
+        (accepted, reason, intent), mock_delay = self.accept()
+
+        self.assertTrue(accepted)
+        self.assertIsNone(reason)
+        self.assertEqual(intent.state, RedemptionIntentStateChoices.QUEUED)
+        self.assertEqual(intent.metadata, {'foo': 'bar'})
+        self.assertEqual(intent.reserved_spend, 3000)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 3000)
+        # The reservation was handed off from the (expiring) counter to the intent.
+        self.assertEqual(spend_api.get_queued_intent_spend(self.policy), 3000)
+        mock_delay.assert_called_once_with(str(intent.uuid))
+        self.mock_subsidy_client.create_subsidy_transaction.assert_not_called()
+
+        # The queued redemption is returned as-is, rather than accepted (and reserved) again.
+        (accepted, _, same_intent), mock_delay = self.accept()
+
+        self.assertTrue(accepted)
+        self.assertEqual(same_intent, intent)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 3000)
+        mock_delay.assert_not_called()
+
+    def test_accept_redemption_not_redeemable(self):
+        self.mock_can_redeem.return_value = (False, REASON_CONTENT_NOT_IN_CATALOG, [])
+
+        (accepted, reason, intent), mock_delay = self.accept()
+
+        self.assertFalse(accepted)
+        self.assertEqual(reason, REASON_CONTENT_NOT_IN_CATALOG)
+        self.assertIsNone(intent)
+        mock_delay.assert_not_called()
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 0)
+
+    def test_accept_redemption_spend_reservation_failed(self):
+        self.assertTrue(spend_api.reserve_spend(self.policy, 7000))
+
+        with pytest.raises(SubsidyAccessPolicySpendReservationFailed):
+            self.accept()
+
+        self.assertFalse(RedemptionIntent.objects.exists())
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 7000)
+
+    @mock.patch.object(redemption_api, 'send_subsidy_redemption_event_to_event_bus')
+    def test_process_redemption_intent(self, mock_send_event):
+        (_, _, intent), _ = self.accept()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            redemption_api.process_redemption_intent(intent.uuid)
+
+        intent.refresh_from_db()
+        self.assertEqual(intent.state, RedemptionIntentStateChoices.REDEEMED)
+        self.assertEqual(intent.ledger_transaction, self.transaction_record)
+        self.assertEqual(intent.attempts, 1)
+        self.assertEqual(intent.reserved_spend, 0)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 0)
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 4000)
+        create_transaction_kwargs = self.mock_subsidy_client.create_subsidy_transaction.call_args.kwargs
+        self.assertEqual(create_transaction_kwargs['metadata'], {'foo': 'bar'})
+        mock_send_event.assert_called_once_with(
+            SUBSIDY_REDEEMED.event_type,
+            {'lms_user_id': self.lms_user_id, 'content_key': self.content_key, 'metadata': {'foo': 'bar'}},
+        )
+
+        # Intents that aren't queued anymore are left as they are.
+        redemption_api.process_redemption_intent(intent.uuid)
+        self.mock_subsidy_client.create_subsidy_transaction.assert_called_once()
+
+    def test_process_redemption_intent_no_longer_redeemable(self):
+        (_, _, intent), _ = self.accept()
+        self.mock_can_redeem.return_value = (False, REASON_CONTENT_NOT_IN_CATALOG, [])
+
+        redemption_api.process_redemption_intent(intent.uuid)
+
+        intent.refresh_from_db()
+        self.assertEqual(intent.state, RedemptionIntentStateChoices.FAILED)
+        self.assertEqual(intent.failure_reason, REASON_CONTENT_NOT_IN_CATALOG)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 0)
+        self.mock_subsidy_client.create_subsidy_transaction.assert_not_called()
+
+    def test_process_redemption_intent_refused(self):
+        (_, _, intent), _ = self.accept()
+        self.mock_subsidy_client.create_subsidy_transaction.side_effect = http_error(422)
+
+        redemption_api.process_redemption_intent(intent.uuid)
+
+        intent.refresh_from_db()
+        self.assertEqual(intent.state, RedemptionIntentStateChoices.FAILED)
+        self.assertEqual(intent.failure_reason, REASON_SUBSIDY_TRANSACTION_REFUSED)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 0)
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 1000)
+
+    def test_process_redemption_intent_server_error(self):
+        """
+        Server errors are raised, for the task to retry, leaving the intent queued.
+        """
+        (_, _, intent), _ = self.accept()
+        self.mock_subsidy_client.create_subsidy_transaction.side_effect = http_error(503)
+
+        with pytest.raises(SubsidyAPIHTTPError):
+            redemption_api.process_redemption_intent(intent.uuid)
+
+        # The reservation is still held for the retry.
+        intent.refresh_from_db()
+        self.assertEqual(intent.state, RedemptionIntentStateChoices.QUEUED)
+        self.assertEqual(intent.reserved_spend, 3000)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 3000)
+
+    def test_process_redemption_intent_holds_reservation(self):
+        """
+        The intent's reservation isn't released while it's processed: can_redeem() is told not to count it,
+        and concurrent redemptions can't take it.
+        """
+        (_, _, intent), _ = self.accept()
+
+        def can_redeem(lms_user_id, content_key, reserved_spend=0):  # pylint: disable=unused-argument
+            self.assertEqual(spend_api.get_total_spend(self.policy, excluding_reserved=reserved_spend), 1000)
+            # 1000 committed + 3000 held by the intent leaves no room for another 6000.
+            self.assertFalse(spend_api.reserve_spend(self.policy, 6000))
+            return (True, None, [])
+
+        self.mock_can_redeem.side_effect = can_redeem
+
+        redemption_api.process_redemption_intent(intent.uuid)
+
+        self.mock_can_redeem.assert_called_with(self.lms_user_id, self.content_key, reserved_spend=3000)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 0)
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 4000)
+
+    def test_queued_intent_reservation_outlives_counter(self):
+        """
+        A queued intent's reservation keeps counting against the spend limit after the reservation counter expires,
+        and is committed without touching the reservations of other in-flight redemptions.
+        """
+        (_, _, intent), _ = self.accept()
+        django_cache.delete_many(spend_api.reserved_spend_cache_keys(self.policy.uuid))
+
+        # 1000 committed + 3000 held by the intent leaves no room for another 6000.
+        self.assertFalse(spend_api.reserve_spend(self.policy, 6000))
+        self.assertTrue(spend_api.reserve_spend(self.policy, 5000))
+
+        redemption_api.process_redemption_intent(intent.uuid)
+
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 5000)
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 4000)
+
+    def test_process_redemption_intent_price_changed(self):
+        """
+        The intent's reservation is adjusted to the content's current price before the transaction is created.
+        """
+        (_, _, intent), _ = self.accept()
+        self.mock_get_content_metadata.return_value = {'content_price': 2000}
+
+        redemption_api.process_redemption_intent(intent.uuid)
+
+        intent.refresh_from_db()
+        self.assertEqual(intent.state, RedemptionIntentStateChoices.REDEEMED)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 0)
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 3000)
+
+    def test_process_redemption_intent_task_retries_exhausted(self):
+        (_, _, intent), _ = self.accept()
+        lock_kwargs = self.policy.redemption_lock_kwargs(self.lms_user_id, self.content_key)
+        self.policy.acquire_lock(**lock_kwargs)
+
+        process_redemption_intent_task.apply(args=(str(intent.uuid),))
+
+        intent.refresh_from_db()
+        self.assertEqual(intent.state, RedemptionIntentStateChoices.FAILED)
+        self.assertEqual(intent.failure_reason, REASON_REDEMPTION_RETRIES_EXHAUSTED)
+        self.assertGreater(intent.attempts, 1)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 0)
+        self.mock_subsidy_client.create_subsidy_transaction.assert_not_called()
+
+    def test_process_redemption_intent_tasks_get_own_request_cache(self):
+        """
+        Tasks run one after another in the same (worker) thread don't see each other's request-cached data.
+        """
+        (_, _, intent), _ = self.accept()
+        other_intent = RedemptionIntent.objects.create(
+            policy=self.policy, lms_user_id=self.lms_user_id + 1, content_key=self.content_key,
+        )
+        found_in_request_cache = []
+
+        def can_redeem(lms_user_id, content_key, reserved_spend=0):  # pylint: disable=unused-argument
+            found_in_request_cache.append(request_cache().get_cached_response('previous-task').is_found)
+            request_cache().set('previous-task', lms_user_id)
+            return (True, None, [])
+
+        self.mock_can_redeem.side_effect = can_redeem
+
+        process_redemption_intent_task.apply(args=(str(intent.uuid),))
+        process_redemption_intent_task.apply(args=(str(other_intent.uuid),))
+
+        self.assertEqual(found_in_request_cache, [False, False])
+        self.assertFalse(request_cache().get_cached_response('previous-task').is_found)
@@ -0,0 +1,92 @@
+"""
+Tests for the ``spend_api.py`` module of the subsidy_access_policy app.
+"""
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from enterprise_access.apps.subsidy_access_policy import spend_api
+from enterprise_access.apps.subsidy_access_policy.tests.factories import (
+    PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory
+)
+from enterprise_access.apps.subsidy_access_policy.tests.test_models import MockPolicyDependenciesMixin
+
+
+class SpendApiTests(MockPolicyDependenciesMixin, TestCase):
+    """
+    Tests for the spend reservation counters.
+    """
+    def setUp(self):
+        super().setUp()
+        self.policy = PerLearnerEnrollmentCapLearnerCreditAccessPolicyFactory(spend_limit=10000)
+        self.set_redeemed(-1000)
+
+    def set_redeemed(self, total_quantity):
+        self.mock_subsidy_client.list_subsidy_transactions.return_value = {
+            'results': [],
+            'aggregates': {'total_quantity': total_quantity},
+        }
+
+    def test_reserve_commit_rollback(self):
+        reservation = spend_api.reserve_spend(self.policy, 3000)
+        other_reservation = spend_api.reserve_spend(self.policy, 2000)
+        self.assertIsNotNone(reservation)
+        self.assertIsNotNone(other_reservation)
+        self.assertEqual(spend_api.get_total_spend(self.policy), 6000)
+        # A caller's own reservation can be left out.
+        self.assertEqual(spend_api.get_total_spend(self.policy, excluding_reserved=3000), 3000)
+
+        spend_api.commit_spend(self.policy, reservation)
+        spend_api.rollback_spend(self.policy, other_reservation)
+
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 4000)
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 0)
+
+    def test_reserve_spend_refused_at_limit(self):
+        self.assertIsNotNone(spend_api.reserve_spend(self.policy, 8000))
+        self.assertIsNone(spend_api.reserve_spend(self.policy, 1000))
+        # The refused reservation isn't left behind.
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 8000)
+
+    @override_settings(POLICY_SPEND_RESERVATION_TIMEOUT=1)
+    @mock.patch.object(spend_api, 'time')
+    def test_expired_reservation_released_late(self, mock_time):
+        """
+        Releasing a reservation after it expired doesn't release other reservations still in flight.
+        """
+        self.set_redeemed(0)
+        self.policy.spend_limit = 1000
+
+        mock_time.time.return_value = 0
+        first_reservation = spend_api.reserve_spend(self.policy, 600)
+        self.assertIsNotNone(first_reservation)
+
+        # The first reservation counts for at least one more window...
+        mock_time.time.return_value = 1.2
+        self.assertIsNone(spend_api.reserve_spend(self.policy, 600))
+
+        # ...and at most two.
+        mock_time.time.return_value = 2.1
+        self.assertIsNotNone(spend_api.reserve_spend(self.policy, 600))
+        spend_api.rollback_spend(self.policy, first_reservation)
+
+        self.assertEqual(spend_api.get_reserved_spend(self.policy), 600)
+        self.assertIsNone(spend_api.reserve_spend(self.policy, 900))
+
+    def test_reconcile_spend(self):
+        """
+        Reconciliation corrects committed spend for spend that didn't go through this service.
+        """
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 1000)
+        spend_api.record_committed_spend(self.policy, 500)
+
+        # Meanwhile, upstream saw our 500 plus a 200 reversal.
+        self.set_redeemed(-1300)
+        self.assertEqual(spend_api.reconcile_spend(self.policy), -200)
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 1300)
+        self.assertEqual(spend_api.reconcile_spend(self.policy), 0)
+
+    def test_reconcile_spend_seeds_missing_counter(self):
+        self.assertEqual(spend_api.reconcile_spend(self.policy), 0)
+        self.assertEqual(spend_api.get_committed_spend(self.policy), 1000)
+        self.assertEqual(self.mock_subsidy_client.list_subsidy_transactions.call_count, 1)
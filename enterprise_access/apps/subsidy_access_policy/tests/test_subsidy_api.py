@@ -1,19 +1,44 @@
 """
 Tests for the subsidy_api module.
 """
+import time
 import uuid
 from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache as django_cache
+from django.test import TestCase, override_settings
+from edx_django_utils.cache import RequestCache, TieredCache
 
-from ..subsidy_api import get_and_cache_transactions_for_learner, get_redemptions_by_content_and_policy_for_learner
+from enterprise_access.apps.api_client.circuit_breaker import CircuitBreakerOpen
+
+from ..constants import TransactionStateChoices
+from ..subsidy_api import (
+    LearnerLedger,
+    allow_degraded_responses,
+    get_and_cache_transactions_for_learner,
+    get_learner_ledger,
+    get_redemptions_by_content_and_policy_for_learner,
+    invalidate_learner_ledger_cache,
+    is_degraded_response,
+    last_known_cache_key,
+    learner_transaction_cache_key
+)
 from .factories import PerLearnerSpendCapLearnerCreditAccessPolicyFactory
 
 
+def _transaction(modified, state=TransactionStateChoices.COMMITTED):
+    return {'uuid': str(uuid.uuid4()), 'state': state, 'modified': modified}
+
+
 class TransactionsForLearnerTests(TestCase):
     """
     Tests the ``get_and_cache_transactions_for_learner`` function.
     """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+
     @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_versioned_subsidy_client')
     def test_request_caching_works(self, mock_client_getter):
         """
@@ -94,6 +119,146 @@ class TransactionsForLearnerTests(TestCase):
         )
         mock_client.client.get.assert_called_once_with(first_response_payload['next'])
 
+    @override_settings(SUBSIDY_TRANSACTIONS_FETCH_MAX_WORKERS=2, SUBSIDY_TRANSACTIONS_PAGE_SIZE=2)
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_versioned_subsidy_client')
+    def test_remaining_pages_are_fetched_concurrently(self, mock_client_getter):
+        """
+        Test that, once the first page reveals the number of pages, the remaining pages are fetched
+        concurrently, if configured to, and their results are concatenated in page order.
+        """
+        page_url = 'http://enterprise-subsidy.example.com/api/v2/transactions/?lms_user_id=42&page={}'
+        mock_client = mock_client_getter.return_value
+        mock_client.list_subsidy_transactions.return_value = {
+            'next': page_url.format(2),
+            'count': 5,
+            'results': [{'thing': 1}, {'thing': 2}],
+        }
+        results_by_page_url = {
+            page_url.format(2): [{'thing': 3}, {'thing': 4}],
+            page_url.format(3): [{'thing': 5}],
+        }
+
+        def get_page(url):
+            # The later page responds first.
+            time.sleep(0.05 if url == page_url.format(2) else 0)
+            return mock.Mock(json=mock.Mock(return_value={'results': results_by_page_url[url]}))
+
+        mock_client.client.get.side_effect = get_page
+
+        result = get_and_cache_transactions_for_learner(uuid.uuid4(), 42)
+
+        self.assertEqual(result['transactions'], [{'thing': thing} for thing in range(1, 6)])
+        self.assertEqual(mock_client.list_subsidy_transactions.call_args.kwargs['page_size'], 2)
+        self.assertCountEqual(
+            mock_client.client.get.call_args_list,
+            [mock.call(page_url.format(2)), mock.call(page_url.format(3))],
+        )
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_versioned_subsidy_client')
+    def test_ledger_syncs_only_modified_transactions(self, mock_client_getter):
+        """
+        Test that later requests only fetch the transactions modified since the cached ones, and merge them in.
+        """
+        first, second = _transaction('2023-08-01T10:00:00Z'), _transaction('2023-08-02T10:00:00Z')
+        mock_client = mock_client_getter.return_value
+        mock_client.list_subsidy_transactions.return_value = {'next': None, 'results': [first, second]}
+        subsidy_uuid = uuid.uuid4()
+        lms_user_id = 42
+
+        get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+
+        changed_second = {**second, 'modified': '2023-08-03T10:00:00Z', 'reversal': {'state': 'committed'}}
+        third = _transaction('2023-08-03T11:00:00Z')
+        mock_client.list_subsidy_transactions.return_value = {'next': None, 'results': [changed_second, third]}
+        RequestCache.clear_all_namespaces()
+
+        result = get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+
+        self.assertEqual(result['transactions'], [first, changed_second, third])
+        mock_client.list_subsidy_transactions.assert_called_with(
+            subsidy_uuid=subsidy_uuid,
+            lms_user_id=lms_user_id,
+            include_aggregates=False,
+            modified__gte='2023-08-02T10:00:00Z',
+        )
+
+        # Nothing changed since the last sync, but the high-water mark is inclusive, so the latest transaction
+        # comes back again, and the cached ledger isn't rewritten for it.
+        mock_client.list_subsidy_transactions.return_value = {'next': None, 'results': [dict(third)]}
+        RequestCache.clear_all_namespaces()
+
+        with mock.patch.object(TieredCache, 'set_all_tiers') as mock_set:
+            result = get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+
+        mock_set.assert_not_called()
+
+        self.assertEqual(result['transactions'], [first, changed_second, third])
+        mock_client.list_subsidy_transactions.assert_called_with(
+            subsidy_uuid=subsidy_uuid,
+            lms_user_id=lms_user_id,
+            include_aggregates=False,
+            modified__gte='2023-08-03T11:00:00Z',
+        )
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_versioned_subsidy_client')
+    def test_last_known_transactions_are_remembered_when_changed(self, mock_client_getter):
+        """
+        Test that the last-known transactions are only written when the learner's ledger changes, and are served
+        while the subsidy service's circuit breaker is open.
+        """
+        first = _transaction('2023-08-01T10:00:00Z')
+        mock_client = mock_client_getter.return_value
+        mock_client.list_subsidy_transactions.return_value = {'next': None, 'results': [first]}
+        subsidy_uuid = uuid.uuid4()
+        lms_user_id = 42
+        last_known_key = last_known_cache_key(learner_transaction_cache_key(subsidy_uuid, lms_user_id))
+
+        get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+
+        self.assertEqual(django_cache.get(last_known_key), {'transactions': [first], 'aggregates': {}})
+
+        RequestCache.clear_all_namespaces()
+        with mock.patch.object(django_cache, 'set', wraps=django_cache.set) as mock_set:
+            get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+
+        self.assertNotIn(last_known_key, [call.args[0] for call in mock_set.call_args_list])
+
+        mock_client.list_subsidy_transactions.side_effect = CircuitBreakerOpen('enterprise-subsidy', 12)
+        RequestCache.clear_all_namespaces()
+        allow_degraded_responses()
+
+        result = get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+
+        self.assertEqual(result['transactions'], [first])
+        self.assertTrue(is_degraded_response())
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_versioned_subsidy_client')
+    def test_ledger_full_sync(self, mock_client_getter):
+        """
+        Test that the ledger is fetched in full while it has in-flight transactions, or after it's invalidated.
+        """
+        committed = _transaction('2023-08-01T10:00:00Z')
+        pending = _transaction('2023-08-02T10:00:00Z', state=TransactionStateChoices.PENDING)
+        mock_client = mock_client_getter.return_value
+        mock_client.list_subsidy_transactions.return_value = {'next': None, 'results': [committed, pending]}
+        subsidy_uuid = uuid.uuid4()
+        lms_user_id = 42
+        full_sync_call = mock.call(subsidy_uuid=subsidy_uuid, lms_user_id=lms_user_id, include_aggregates=False)
+
+        get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+        RequestCache.clear_all_namespaces()
+        get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+
+        self.assertEqual(mock_client.list_subsidy_transactions.call_args_list, [full_sync_call] * 2)
+
+        mock_client.list_subsidy_transactions.return_value = {'next': None, 'results': [committed]}
+        invalidate_learner_ledger_cache(subsidy_uuid, lms_user_id)
+
+        result = get_and_cache_transactions_for_learner(subsidy_uuid, lms_user_id)
+
+        self.assertEqual(result['transactions'], [committed])
+        self.assertEqual(mock_client.list_subsidy_transactions.call_args_list, [full_sync_call] * 3)
+
     @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
     def test_redemptions_by_content_and_policy(self, mock_transaction_cache):
         cake_subsidy_uuid = uuid.uuid4()
@@ -151,3 +316,66 @@ class TransactionsForLearnerTests(TestCase):
             },
             result,
         )
+
+
+class LearnerLedgerTests(TestCase):
+    """
+    Tests the ``LearnerLedger`` class and the ``get_learner_ledger`` function.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.policy_uuid = uuid.uuid4()
+        self.transactions = [
+            {
+                'uuid': 'committed',
+                'state': TransactionStateChoices.COMMITTED,
+                'subsidy_access_policy_uuid': str(self.policy_uuid),
+                'content_key': 'content-1',
+                'quantity': -100,
+                'reversal': None,
+            },
+            {
+                'uuid': 'failed',
+                'state': TransactionStateChoices.FAILED,
+                'subsidy_access_policy_uuid': str(self.policy_uuid),
+                'content_key': 'content-2',
+                'quantity': -200,
+                'reversal': None,
+            },
+            {
+                'uuid': 'reversed',
+                'state': TransactionStateChoices.COMMITTED,
+                'subsidy_access_policy_uuid': str(uuid.uuid4()),
+                'content_key': 'content-1',
+                'quantity': -300,
+                'reversal': {'state': TransactionStateChoices.COMMITTED},
+            },
+        ]
+
+    def test_indexes(self):
+        ledger = LearnerLedger(self.transactions)
+
+        self.assertEqual(ledger.for_policy(self.policy_uuid), self.transactions[:2])
+        self.assertEqual(ledger.for_policy(str(self.policy_uuid)), self.transactions[:2])
+        self.assertEqual(ledger.for_content_key('content-1'), [self.transactions[0], self.transactions[2]])
+        self.assertEqual(ledger.for_policy_and_content_key(self.policy_uuid, 'content-1'), [self.transactions[0]])
+        self.assertEqual(ledger.in_state(TransactionStateChoices.FAILED), [self.transactions[1]])
+        self.assertEqual(ledger.total_quantity_for_policy(self.policy_uuid), -300)
+        self.assertEqual(ledger.retryable_transaction_uuids(), ['failed', 'reversed'])
+
+        self.assertEqual(ledger.for_policy(uuid.uuid4()), [])
+        self.assertEqual(ledger.total_quantity_for_policy(uuid.uuid4()), 0)
+
+    @mock.patch('enterprise_access.apps.subsidy_access_policy.subsidy_api.get_and_cache_transactions_for_learner')
+    def test_ledger_is_built_once_per_request(self, mock_transaction_cache):
+        subsidy_uuid = uuid.uuid4()
+        mock_transaction_cache.return_value = {'transactions': self.transactions, 'aggregates': {}}
+
+        ledger = get_learner_ledger(subsidy_uuid, 1)
+        self.assertIs(get_learner_ledger(subsidy_uuid, 1), ledger)
+        self.assertEqual(mock_transaction_cache.call_count, 1)
+
+        invalidate_learner_ledger_cache(subsidy_uuid, 1)
+        self.assertIsNot(get_learner_ledger(subsidy_uuid, 1), ledger)
+        self.assertEqual(mock_transaction_cache.call_count, 2)
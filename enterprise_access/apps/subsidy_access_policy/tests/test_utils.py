@@ -1,11 +1,32 @@
 """
 Tests for subsidy_access_policy utils.
 """
+import threading
+import time
 import uuid
 
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.test import TestCase, override_settings
+from edx_django_utils.cache import RequestCache, TieredCache
 
-from enterprise_access.apps.subsidy_access_policy.utils import create_idempotency_key_for_transaction
+from enterprise_access.apps.api_client.base_oauth import get_pooled_oauth_api_client
+from enterprise_access.apps.subsidy_access_policy.exceptions import SubsidyAccessPolicyEvaluationTimeout
+from enterprise_access.apps.subsidy_access_policy.utils import (
+    CACHE_GENERATION_CUSTOMER_SCOPE,
+    CACHE_GENERATION_SUBSIDY_SCOPE,
+    bump_cache_generation,
+    cache_generation_key,
+    create_idempotency_key_for_transaction,
+    fetch_and_cache_with_single_flight,
+    fetch_many_with_single_flight,
+    get_cache_generation,
+    get_versioned_subsidy_client,
+    map_with_bounded_concurrency,
+    request_cache,
+    single_flight_lock_key,
+    versioned_cache_key
+)
 
 
 class SubsidyAccessPolicyUtilsTests(TestCase):
@@ -83,3 +104,195 @@ class SubsidyAccessPolicyUtilsTests(TestCase):
 
         assert len(different_keys) == len(modified_inputs_should_change_output) + 1
         assert len(same_keys) == 1
+
+    def test_versioned_subsidy_client_is_pooled(self):
+        """
+        The subsidy client is created once per process, and uses the pooled OAuth session.
+        """
+        client = get_versioned_subsidy_client()
+
+        self.assertIs(get_versioned_subsidy_client(), client)
+        self.assertIs(
+            client.client,
+            get_pooled_oauth_api_client(
+                settings.OAUTH2_PROVIDER_URL,
+                settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+                settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+            ),
+        )
+
+
+class CacheGenerationTests(TestCase):
+    """
+    Tests for scoped cache generations in ``versioned_cache_key()``.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+
+    def test_bumping_a_scope_only_changes_its_keys(self):
+        customer_a, customer_b, subsidy = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        keys = {
+            'a': versioned_cache_key('metadata', customer_a, 'edX+DemoX', customer=customer_a),
+            'b': versioned_cache_key('metadata', customer_b, 'edX+DemoX', customer=customer_b),
+            'subsidy': versioned_cache_key('record', subsidy, subsidy=subsidy),
+        }
+
+        bump_cache_generation(CACHE_GENERATION_CUSTOMER_SCOPE, customer_a)
+
+        # The bump is visible within this request, and to later requests.
+        for clear_request_cache in (False, True):
+            if clear_request_cache:
+                RequestCache.clear_all_namespaces()
+            self.assertNotEqual(
+                versioned_cache_key('metadata', customer_a, 'edX+DemoX', customer=customer_a), keys['a'],
+            )
+            self.assertEqual(versioned_cache_key('metadata', customer_b, 'edX+DemoX', customer=customer_b), keys['b'])
+            self.assertEqual(versioned_cache_key('record', subsidy, subsidy=subsidy), keys['subsidy'])
+
+    def test_evicted_generation_never_goes_back(self):
+        subsidy = uuid.uuid4()
+        generation = bump_cache_generation(CACHE_GENERATION_SUBSIDY_SCOPE, subsidy)
+
+        django_cache.delete(cache_generation_key(CACHE_GENERATION_SUBSIDY_SCOPE, subsidy))
+        RequestCache.clear_all_namespaces()
+        time.sleep(0.002)
+
+        self.assertGreater(get_cache_generation(CACHE_GENERATION_SUBSIDY_SCOPE, subsidy), generation)
+
+    def test_unknown_scope(self):
+        with self.assertRaises(ValueError):
+            versioned_cache_key('record', 'foo', learner=42)
+
+
+class MapWithBoundedConcurrencyTests(TestCase):
+    """
+    Tests for ``map_with_bounded_concurrency()``.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(RequestCache.clear_all_namespaces)
+
+    def test_serial_by_default(self):
+        thread_ids = map_with_bounded_concurrency(lambda _: threading.get_ident(), range(3))
+        assert thread_ids == [threading.get_ident()] * 3
+
+    def test_results_follow_input_order(self):
+        def slow_square(item):
+            time.sleep(0.01 * (5 - item))
+            return item * item
+
+        assert map_with_bounded_concurrency(slow_square, range(5), max_workers=5) == [0, 1, 4, 9, 16]
+
+    def test_request_cache_is_shared_with_workers(self):
+        request_cache().set('seeded', 'by-caller')
+
+        def read_and_write(item):
+            request_cache().set(f'written-{item}', item)
+            return request_cache().get_cached_response('seeded').value
+
+        assert map_with_bounded_concurrency(read_and_write, range(3), max_workers=3) == ['by-caller'] * 3
+        for item in range(3):
+            assert request_cache().get_cached_response(f'written-{item}').value == item
+
+    def test_earliest_exception_is_raised(self):
+        def fail_on_odd(item):
+            if item % 2:
+                time.sleep(0.01 * (5 - item))
+                raise ValueError(item)
+            return item
+
+        with self.assertRaisesRegex(ValueError, '1'):
+            map_with_bounded_concurrency(fail_on_odd, range(5), max_workers=5)
+
+    def test_timeout(self):
+        with self.assertRaises(SubsidyAccessPolicyEvaluationTimeout):
+            map_with_bounded_concurrency(lambda _: time.sleep(0.5), range(2), max_workers=2, timeout=0.05)
+
+    @override_settings(POLICY_EVALUATION_TIMEOUT_SECONDS=0.2)
+    def test_deadline_spans_calls_of_a_request(self):
+        map_with_bounded_concurrency(lambda _: time.sleep(0.15), range(2), max_workers=2)
+
+        # Within its own timeout, but not within what's left of the request's.
+        with self.assertRaises(SubsidyAccessPolicyEvaluationTimeout):
+            map_with_bounded_concurrency(lambda _: time.sleep(0.1), range(2), max_workers=2)
+
+        RequestCache.clear_all_namespaces()
+        map_with_bounded_concurrency(lambda _: time.sleep(0.1), range(2), max_workers=2)
+
+    def test_pool_is_shared_and_nested_calls_are_serial(self):
+        def nested(_):
+            return (threading.get_ident(), map_with_bounded_concurrency(lambda _: threading.get_ident(), range(2)))
+
+        first_thread_ids = set()
+        for _ in range(3):
+            for thread_id, nested_thread_ids in map_with_bounded_concurrency(nested, range(2), max_workers=2):
+                first_thread_ids.add(thread_id)
+                assert nested_thread_ids == [thread_id, thread_id]
+
+        # Every call ran on the same two pooled threads.
+        assert len(first_thread_ids) <= 2
+
+
+class SingleFlightTests(TestCase):
+    """
+    Tests for ``fetch_many_with_single_flight()`` and ``fetch_and_cache_with_single_flight()``.
+    """
+    def setUp(self):
+        super().setUp()
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(django_cache.clear)
+        self.addCleanup(RequestCache.clear_all_namespaces)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        fetched = []
+
+        def slow_fetch():
+            fetched.append(threading.get_ident())
+            time.sleep(0.1)
+            return {'uuid': 'the-subsidy'}
+
+        results = map_with_bounded_concurrency(
+            lambda _: fetch_and_cache_with_single_flight('subsidy-record', slow_fetch, 60),
+            range(4),
+            max_workers=4,
+        )
+
+        assert len(fetched) == 1
+        assert results == [{'uuid': 'the-subsidy'}] * 4
+        assert TieredCache.get_cached_response('subsidy-record').value == {'uuid': 'the-subsidy'}
+        assert django_cache.get(single_flight_lock_key('subsidy-record')) is None
+
+    def test_waiter_reads_value_populated_by_holder(self):
+        django_cache.add(single_flight_lock_key('key-a'), True)
+
+        def populate_later():
+            time.sleep(0.05)
+            django_cache.set('key-a', 'from-holder')
+
+        threading.Thread(target=populate_later).start()
+        results = fetch_many_with_single_flight(
+            {'a': 'key-a'},
+            lambda ids: self.fail('the lock holder populates the value'),
+        )
+
+        assert results == {'a': 'from-holder'}
+
+    @override_settings(SINGLE_FLIGHT_WAIT_TIMEOUT=0.05)
+    def test_waiter_fetches_directly_after_timeout(self):
+        django_cache.add(single_flight_lock_key('key-a'), True)
+
+        results = fetch_many_with_single_flight({'a': 'key-a', 'b': 'key-b'}, lambda ids: {i: i.upper() for i in ids})
+
+        assert results == {'a': 'A', 'b': 'B'}
+
+    def test_lock_released_when_fetch_fails(self):
+        def failing_fetch():
+            raise ValueError('upstream is down')
+
+        with self.assertRaises(ValueError):
+            fetch_and_cache_with_single_flight('subsidy-record', failing_fetch, 60)
+
+        assert django_cache.get(single_flight_lock_key('subsidy-record')) is None
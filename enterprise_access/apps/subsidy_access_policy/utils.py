@@ -2,17 +2,52 @@
 Utils for subsidy_access_policy
 """
 import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from django.apps import apps
 from django.conf import settings
-from edx_django_utils.cache import RequestCache
+from django.core.cache import cache as django_cache
+from django.db import connections
+from edx_django_utils.cache import DEFAULT_REQUEST_CACHE, RequestCache, TieredCache
+from edx_django_utils.cache.utils import get_cache_key
 from edx_enterprise_subsidy_client import get_enterprise_subsidy_api_client
 from simple_history.models import HistoricalRecords, registered_models
 
-from enterprise_access import __version__ as code_version
+from enterprise_access.apps.api_client.base_oauth import get_or_create_pooled_client, get_pooled_oauth_api_client
+from enterprise_access.apps.api_client.circuit_breaker import CircuitBreaker, CircuitBreakerAdapter
+
+from .exceptions import SubsidyAccessPolicyEvaluationTimeout
+
+logger = logging.getLogger(__name__)
 
 CACHE_KEY_SEP = ':'
 CACHE_NAMESPACE = 'subsidy_access_policy'
+# Bump this whenever the shape of any value cached under a versioned key changes,
+# so that deploying the change doesn't read values cached by the previous code.
+CACHE_KEY_SCHEMA_VERSION = 1
+
+# The monotonic time by which all (concurrent) policy evaluation of the current request must complete.
+POLICY_EVALUATION_DEADLINE_CACHE_KEY = 'policy_evaluation_deadline'
+
+SINGLE_FLIGHT_INITIAL_BACKOFF_SECONDS = 0.02
+SINGLE_FLIGHT_MAX_BACKOFF_SECONDS = 0.2
+
+CACHE_GENERATION_RESOURCE_NAME = 'subsidy_access_policy_cache_generation'
+CACHE_GENERATION_GLOBAL_SCOPE = 'global'
+CACHE_GENERATION_CUSTOMER_SCOPE = 'customer'
+CACHE_GENERATION_SUBSIDY_SCOPE = 'subsidy'
+CACHE_GENERATION_CATALOG_SCOPE = 'catalog'
+CACHE_GENERATION_SCOPES = (
+    CACHE_GENERATION_GLOBAL_SCOPE,
+    CACHE_GENERATION_CUSTOMER_SCOPE,
+    CACHE_GENERATION_SUBSIDY_SCOPE,
+    CACHE_GENERATION_CATALOG_SCOPE,
+)
+
+SUBSIDY_CIRCUIT_BREAKER_NAME = 'enterprise-subsidy'
 
 LEDGERED_SUBSIDY_IDEMPOTENCY_KEY_PREFIX = 'ledger-for-subsidy'
 TRANSACTION_METADATA_KEYS = {
@@ -25,25 +60,99 @@ TRANSACTION_METADATA_KEYS = {
 
 def get_versioned_subsidy_client():
     """
-    Returns an instance of the enterprise subsidy client as the version specified by the
-    Django setting `ENTERPRISE_SUBSIDY_API_CLIENT_VERSION`, if any.
+    Returns the process-wide instance of the enterprise subsidy client, as the version specified by the
+    Django setting `ENTERPRISE_SUBSIDY_API_CLIENT_VERSION`, if any.  The client is shared across threads,
+    and uses the pooled OAuth session, so that connections to the subsidy service are kept alive across calls.
+
+    Calls to the subsidy service go through the ``SUBSIDY_CIRCUIT_BREAKER_NAME`` circuit breaker, and time out
+    after ``SUBSIDY_CLIENT_TIMEOUT`` seconds.
     """
     kwargs = {}
     if getattr(settings, 'ENTERPRISE_SUBSIDY_API_CLIENT_VERSION', None):
         kwargs['version'] = int(settings.ENTERPRISE_SUBSIDY_API_CLIENT_VERSION)
-    return get_enterprise_subsidy_api_client(**kwargs)
+
+    def _create_client():
+        client = get_enterprise_subsidy_api_client(**kwargs)
+        client.client = get_pooled_oauth_api_client(
+            settings.OAUTH2_PROVIDER_URL,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_KEY,
+            settings.BACKEND_SERVICE_EDX_OAUTH2_SECRET,
+        )
+        client.client.mount(client.API_BASE_URL, CircuitBreakerAdapter(
+            CircuitBreaker(SUBSIDY_CIRCUIT_BREAKER_NAME),
+            default_timeout=float(settings.SUBSIDY_CLIENT_TIMEOUT),
+            pool_connections=settings.API_CLIENT_POOL_CONNECTIONS,
+            pool_maxsize=settings.API_CLIENT_POOL_MAXSIZE,
+        ))
+        return client
+
+    return get_or_create_pooled_client(('enterprise_subsidy_api_client', kwargs.get('version')), _create_client)
+
+
+def cache_generation_key(scope, identifier):
+    return get_cache_key(resource=CACHE_GENERATION_RESOURCE_NAME, scope=scope, identifier=identifier)
+
+
+def get_cache_generation(scope, identifier):
+    """
+    Returns the current generation of the given cache scope, e.g. ``('subsidy', <subsidy uuid>)``,
+    which is request-cached so that building many keys in the same scope reads it only once.
+
+    A generation that doesn't exist yet (or was evicted) is seeded from the current time in milliseconds,
+    so that a scope never goes back to an earlier generation, whose keys may still be cached.
+    """
+    generation_key = cache_generation_key(scope, identifier)
+    cached_response = request_cache().get_cached_response(generation_key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    generation = django_cache.get(generation_key)
+    if generation is None:
+        django_cache.add(generation_key, int(time.time() * 1000), None)
+        generation = django_cache.get(generation_key)
+    request_cache().set(generation_key, generation)
+    return generation
 
 
-def versioned_cache_key(*args):
+def bump_cache_generation(scope, identifier):
+    """
+    Logically invalidates every versioned cache key built in the given scope, e.g. ``('customer', <customer uuid>)``,
+    without affecting keys of any other scope.  Stale entries simply expire from the cache.
+
+    Only called by the ``bump_cache_generation`` management command, for upstream changes that this service
+    isn't notified of; changes that it does handle invalidate the individual keys they affect instead.
+    """
+    generation_key = cache_generation_key(scope, identifier)
+    try:
+        generation = django_cache.incr(generation_key)
+    except ValueError:
+        # There's no current generation, so seeding a new one is enough.
+        request_cache().delete(generation_key)
+        generation = get_cache_generation(scope, identifier)
+    request_cache().set(generation_key, generation)
+    return generation
+
+
+def versioned_cache_key(*args, **scopes):
     """
     Utility to produce a versioned cache key, which includes
-    an optional settings variable and the current code version,
+    the cache key schema version and an optional settings variable,
     so that we can perform key-based cache invalidation.
+
+    Keyword arguments name the cache scopes that the cached value depends on, e.g.
+    ``versioned_cache_key('get_subsidy_record', subsidy_uuid, subsidy=subsidy_uuid)``.
+    The current generation of the ``global`` scope and each given scope is mixed into the key, so that
+    ``bump_cache_generation()`` invalidates exactly the keys of one scope (see ``CACHE_GENERATION_SCOPES``).
     """
     components = [str(arg) for arg in args]
-    components.append(code_version)
+    components.append(str(CACHE_KEY_SCHEMA_VERSION))
     if stamp_from_settings := getattr(settings, 'CACHE_KEY_VERSION_STAMP', None):
         components.append(stamp_from_settings)
+    generation_scopes = {CACHE_GENERATION_GLOBAL_SCOPE: CACHE_GENERATION_GLOBAL_SCOPE, **scopes}
+    for scope, identifier in generation_scopes.items():
+        if scope not in CACHE_GENERATION_SCOPES:
+            raise ValueError(f'Unknown cache generation scope: {scope}')
+        components.append(f'{scope}={get_cache_generation(scope, identifier)}')
     decoded_cache_key = CACHE_KEY_SEP.join(components)
     return hashlib.sha512(decoded_cache_key.encode()).hexdigest()
 
@@ -55,6 +164,187 @@ def request_cache():
     return RequestCache(namespace=CACHE_NAMESPACE)
 
 
+def _request_cache_namespaces():
+    """
+    The request cache namespaces used by this app, including the one underlying ``TieredCache``.
+    """
+    return (RequestCache(namespace=CACHE_NAMESPACE), RequestCache())
+
+
+_evaluation_executors_by_size = {}
+_evaluation_executors_lock = threading.Lock()
+_evaluation_worker = threading.local()
+
+
+def _get_evaluation_executor(max_workers):
+    """
+    Returns the process-wide thread pool of the given size, creating it on first use.  Sharing pools across requests
+    bounds the number of evaluation threads per process, including those still finishing calls that timed out.
+    """
+    with _evaluation_executors_lock:
+        executor = _evaluation_executors_by_size.get(max_workers)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='policy-evaluation')
+            _evaluation_executors_by_size[max_workers] = executor
+        return executor
+
+
+def get_remaining_evaluation_time(timeout=None):
+    """
+    Returns how many seconds are left until the policy evaluation deadline of the current request, which is set
+    ``settings.POLICY_EVALUATION_TIMEOUT_SECONDS`` from the first call (per request), or None if there's no deadline.
+    If given, ``timeout`` further bounds the result.
+    """
+    remaining = timeout
+    request_timeout = getattr(settings, 'POLICY_EVALUATION_TIMEOUT_SECONDS', None)
+    if request_timeout is not None:
+        cached_response = request_cache().get_cached_response(POLICY_EVALUATION_DEADLINE_CACHE_KEY)
+        if cached_response.is_found:
+            deadline = cached_response.value
+        else:
+            deadline = time.monotonic() + request_timeout
+            request_cache().set(POLICY_EVALUATION_DEADLINE_CACHE_KEY, deadline)
+        request_remaining = max(deadline - time.monotonic(), 0)
+        remaining = request_remaining if remaining is None else min(remaining, request_remaining)
+    return remaining
+
+
+def _call_with_request_cache(func, item, request_cache_snapshot):
+    """
+    Calls ``func(item)`` in a worker thread, seeding the worker's (thread-local) request caches
+    from the given snapshot.  Returns the result along with the worker's resulting request cache data.
+    """
+    _evaluation_worker.active = True
+    try:
+        for namespaced_cache, data in zip(_request_cache_namespaces(), request_cache_snapshot):
+            namespaced_cache.data.update(data)
+        result = func(item)
+        return result, [dict(namespaced_cache.data) for namespaced_cache in _request_cache_namespaces()]
+    finally:
+        _evaluation_worker.active = False
+        RequestCache.clear_all_namespaces()
+        connections.close_all()
+
+
+def map_with_bounded_concurrency(func, items, max_workers=None, timeout=None):
+    """
+    Returns ``[func(item) for item in items]``, optionally dispatching the calls on a bounded thread pool.
+
+    Calls are made serially unless ``max_workers`` (defaulting to ``settings.POLICY_EVALUATION_MAX_WORKERS``)
+    is greater than 1, in which case they're dispatched on a process-wide pool of that many threads.  Calls made
+    from such a thread are always serial, so that nested calls can't starve the pool.  Either way, results are
+    returned in the order of ``items``, and if any call raises, the exception raised by the earliest such item
+    is re-raised.
+
+    Request caches are thread-local, so each worker starts from a copy of the caller's request caches,
+    and whatever the workers cache is merged back into the caller's request caches afterwards.
+
+    Raises:
+        SubsidyAccessPolicyEvaluationTimeout: If the calls did not all complete before the request's evaluation
+          deadline, or within ``timeout`` seconds, if given (see ``get_remaining_evaluation_time()``).
+    """
+    items = list(items)
+    if max_workers is None:
+        max_workers = getattr(settings, 'POLICY_EVALUATION_MAX_WORKERS', 1)
+    if min(max_workers, len(items)) <= 1 or getattr(_evaluation_worker, 'active', False):
+        return [func(item) for item in items]
+
+    timeout = get_remaining_evaluation_time(timeout)
+    request_cache_snapshot = [dict(namespaced_cache.data) for namespaced_cache in _request_cache_namespaces()]
+    executor = _get_evaluation_executor(max_workers)
+    futures = [
+        executor.submit(_call_with_request_cache, func, item, request_cache_snapshot)
+        for item in items
+    ]
+    _, not_done = wait(futures, timeout=timeout)
+    if not_done:
+        for future in not_done:
+            future.cancel()
+        raise SubsidyAccessPolicyEvaluationTimeout(
+            f'{len(not_done)} of {len(items)} concurrent evaluations did not complete before the deadline.'
+        )
+
+    results = []
+    for future in futures:
+        result, worker_request_cache_data = future.result()
+        for namespaced_cache, data in zip(_request_cache_namespaces(), worker_request_cache_data):
+            namespaced_cache.data.update(data)
+        results.append(result)
+    return results
+
+
+def single_flight_lock_key(cache_key):
+    return f'{cache_key}:single-flight'
+
+
+def fetch_many_with_single_flight(cache_keys_by_id, fetch_many):
+    """
+    Coalesces concurrent cache misses of the same keys, across processes, into a single upstream fetch per key.
+
+    For each missing key, whichever caller first adds a short-lived lock to the django cache fetches it;
+    other callers poll the django cache (with backoff) for the value it populates.  Keys that
+    are still missing after ``SINGLE_FLIGHT_WAIT_TIMEOUT`` seconds, e.g. because their fetch failed,
+    are fetched directly.
+
+    Params:
+      cache_keys_by_id: A dictionary mapping some identifier of each missing value to its cache key.
+      fetch_many: A function that takes a list of identifiers, fetches their values, caches them
+        in the django cache under their cache keys, and returns a dictionary of identifier -> value.
+    Returns:
+      A dictionary of identifier -> value, for every given identifier.
+    """
+    claimed_ids, waiting_ids = [], []
+    for identifier, cache_key in cache_keys_by_id.items():
+        if django_cache.add(single_flight_lock_key(cache_key), True, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+            claimed_ids.append(identifier)
+        else:
+            waiting_ids.append(identifier)
+
+    results = {}
+    if claimed_ids:
+        try:
+            results.update(fetch_many(claimed_ids))
+        finally:
+            django_cache.delete_many([single_flight_lock_key(cache_keys_by_id[i]) for i in claimed_ids])
+
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    backoff = SINGLE_FLIGHT_INITIAL_BACKOFF_SECONDS
+    while waiting_ids:
+        cached_values = django_cache.get_many([cache_keys_by_id[i] for i in waiting_ids])
+        for identifier in list(waiting_ids):
+            if cache_keys_by_id[identifier] in cached_values:
+                results[identifier] = cached_values[cache_keys_by_id[identifier]]
+                waiting_ids.remove(identifier)
+        remaining = deadline - time.monotonic()
+        if not waiting_ids or remaining <= 0:
+            break
+        time.sleep(min(backoff, remaining))
+        backoff = min(backoff * 2, SINGLE_FLIGHT_MAX_BACKOFF_SECONDS)
+
+    if waiting_ids:
+        logger.warning(
+            'Gave up waiting on concurrent fetches of %s keys after %s seconds, fetching them directly.',
+            len(waiting_ids), settings.SINGLE_FLIGHT_WAIT_TIMEOUT,
+        )
+        results.update(fetch_many(waiting_ids))
+    return results
+
+
+def fetch_and_cache_with_single_flight(cache_key, fetch, timeout):
+    """
+    Single-key variant of ``fetch_many_with_single_flight()``, for ``TieredCache`` entries:
+    returns the value of ``fetch()``, or of a concurrent fetch of the same key, and caches it in all tiers.
+    """
+    def _fetch_and_cache(_):
+        value = fetch()
+        TieredCache.set_all_tiers(cache_key, value, timeout)
+        return {cache_key: value}
+
+    value = fetch_many_with_single_flight({cache_key: cache_key}, _fetch_and_cache)[cache_key]
+    DEFAULT_REQUEST_CACHE.set(cache_key, value)
+    return value
+
+
 def create_idempotency_key_for_transaction(subsidy_uuid, **metadata):
     """
     Create a key that allows a transaction to be created idempotently.
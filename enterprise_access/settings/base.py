@@ -442,6 +442,13 @@ KAFKA_TOPICS = [
     SUBSIDY_REDEMPTION_TOPIC_NAME,
 ]
 
+# Subsidy transaction lifecycle events are produced by the enterprise-subsidy service, and consumed by
+# the consume_subsidy_transaction_events management command.
+SUBSIDY_TRANSACTION_TOPIC_NAME = "subsidy-transaction"
+SUBSIDY_TRANSACTION_CONSUMER_GROUP_ID = "enterprise-access-learner-ledger-projection"
+# Subsidy transaction events that can't be deserialized or projected are described on this topic, and skipped.
+SUBSIDY_TRANSACTION_DEAD_LETTER_TOPIC_NAME = "subsidy-transaction-dead-letter"
+
 
 ################### End Kafka Related Settings ##############################
 
@@ -462,6 +469,24 @@ ECOMMERCE_CLIENT_TIMEOUT = os.environ.get('ECOMMERCE_CLIENT_TIMEOUT', 45)
 DISCOVERY_CLIENT_TIMEOUT = os.environ.get('DISCOVERY_CLIENT_TIMEOUT', 45)
 SUBSIDY_CLIENT_TIMEOUT = os.environ.get('SUBSIDY_CLIENT_TIMEOUT', 45)
 
+# API clients are pooled per process, with one keep-alive connection pool per upstream service.
+# The max pool size bounds how many concurrent connections a process keeps open to each host,
+# so it should be at least as large as the concurrency of e.g. POLICY_EVALUATION_MAX_WORKERS.
+API_CLIENT_POOL_CONNECTIONS = int(os.environ.get('API_CLIENT_POOL_CONNECTIONS', 10))
+API_CLIENT_POOL_MAXSIZE = int(os.environ.get('API_CLIENT_POOL_MAXSIZE', 10))
+
+# Circuit breaker for calls to the enterprise-subsidy service, see ``api_client.circuit_breaker``.
+# The breaker opens when, within a window, at least the minimum number of calls were made and at least
+# the failure rate of them failed (raised, returned a 5xx, or took longer than the slow call threshold).
+CIRCUIT_BREAKER_WINDOW_SECONDS = int(os.environ.get('CIRCUIT_BREAKER_WINDOW_SECONDS', 30))
+CIRCUIT_BREAKER_MINIMUM_CALLS = int(os.environ.get('CIRCUIT_BREAKER_MINIMUM_CALLS', 10))
+CIRCUIT_BREAKER_FAILURE_RATE = float(os.environ.get('CIRCUIT_BREAKER_FAILURE_RATE', 0.5))
+CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(os.environ.get('CIRCUIT_BREAKER_SLOW_CALL_SECONDS', 5))
+# How long an open breaker fails calls fast, before letting a single probe call through.
+CIRCUIT_BREAKER_OPEN_SECONDS = int(os.environ.get('CIRCUIT_BREAKER_OPEN_SECONDS', 30))
+# How long the last-known subsidy data, served by read-only endpoints while the breaker is open, is kept.
+SUBSIDY_LAST_KNOWN_DATA_TIMEOUT = int(os.environ.get('SUBSIDY_LAST_KNOWN_DATA_TIMEOUT', 60 * 60 * 24))
+
 # Braze
 BRAZE_NEW_REQUESTS_NOTIFICATION_CAMPAIGN = ''
 BRAZE_APPROVE_NOTIFICATION_CAMPAIGN = ''
@@ -475,5 +500,51 @@ BRAZE_APP_ID = os.environ.get('BRAZE_APP_ID', '')
 # Enterprise Subsidy API Client settings
 ENTERPRISE_SUBSIDY_API_CLIENT_VERSION = 2
 
+# How long, in seconds, a subsidy record (including its balance) may be cached across requests.
+SUBSIDY_RECORD_CACHE_TIMEOUT = int(os.environ.get('SUBSIDY_RECORD_CACHE_TIMEOUT', 60))
+# How long, in seconds, a policy's transaction aggregates may be cached across requests.
+POLICY_AGGREGATES_CACHE_TIMEOUT = int(os.environ.get('POLICY_AGGREGATES_CACHE_TIMEOUT', 30))
+# How long, in seconds, a learner's transactions may be cached across requests.  Every request still syncs the
+# transactions modified since the cached ones, so this mostly bounds how long upstream reversals may go unnoticed.
+LEARNER_LEDGER_CACHE_TIMEOUT = int(os.environ.get('LEARNER_LEDGER_CACHE_TIMEOUT', 60 * 15))
+# Whether learners' transactions in backfilled subsidies are read from the local learner ledger projection,
+# which the consume_subsidy_transaction_events management command keeps up to date, instead of the subsidy service.
+LEARNER_LEDGER_PROJECTION_ENABLED = os.environ.get('LEARNER_LEDGER_PROJECTION_ENABLED', 'false').lower() == 'true'
+# How long, in seconds, a learner's membership in an enterprise customer may be cached across requests.
+# Unlinking learners invalidates it, but newly linked learners may wait this long before being recognized.
+LEARNER_MEMBERSHIP_CACHE_TIMEOUT = int(os.environ.get('LEARNER_MEMBERSHIP_CACHE_TIMEOUT', 60 * 2))
+# How old, in seconds, a policy's balance snapshot may be for policy responses to serve their aggregates from it,
+# rather than from the enterprise-subsidy service.  Should exceed the refresh_policy_balance_snapshots interval.
+POLICY_BALANCE_SNAPSHOT_MAX_AGE = int(os.environ.get('POLICY_BALANCE_SNAPSHOT_MAX_AGE', 60 * 15))
+# How long, in seconds, spend reserved by an in-flight redemption outlives the process that reserved it, at least
+# (and at most twice that).  Reservations are counted per window of this many seconds, see ``spend_api``.
+POLICY_SPEND_RESERVATION_TIMEOUT = int(os.environ.get('POLICY_SPEND_RESERVATION_TIMEOUT', 300))
+# How long, in seconds, a policy's locally committed spend is trusted before it's re-seeded from subsidy aggregates.
+# The reconcile_policy_spend management command corrects it more frequently than that.
+POLICY_COMMITTED_SPEND_TIMEOUT = int(os.environ.get('POLICY_COMMITTED_SPEND_TIMEOUT', 3600))
+# How long, in seconds, a policy lock is held before it expires, unless renewed by its holder.
+POLICY_LOCK_LEASE_TIMEOUT = int(os.environ.get('POLICY_LOCK_LEASE_TIMEOUT', 60))
+# How long, in seconds, to wait for a held policy lock before responding with a 429.
+POLICY_LOCK_WAIT_TIMEOUT = float(os.environ.get('POLICY_LOCK_WAIT_TIMEOUT', 2))
+# The Retry-After, in seconds, suggested to clients along with that 429.
+POLICY_LOCKED_RETRY_AFTER = int(os.environ.get('POLICY_LOCKED_RETRY_AFTER', 5))
+
+# Subsidy access policy evaluation.
+# Setting POLICY_EVALUATION_MAX_WORKERS above 1 opts in to evaluating policies on a bounded thread pool,
+# in which case the evaluation of a single request must complete within POLICY_EVALUATION_TIMEOUT_SECONDS.
+POLICY_EVALUATION_MAX_WORKERS = int(os.environ.get('POLICY_EVALUATION_MAX_WORKERS', 1))
+POLICY_EVALUATION_TIMEOUT_SECONDS = int(os.environ.get('POLICY_EVALUATION_TIMEOUT_SECONDS', 30))
+# Setting SUBSIDY_TRANSACTIONS_FETCH_MAX_WORKERS above 1 opts in to fetching a learner's transactions in several
+# subsidies, and their pages, concurrently, on the same pool and within the same deadline as policy evaluation.
+SUBSIDY_TRANSACTIONS_FETCH_MAX_WORKERS = int(os.environ.get('SUBSIDY_TRANSACTIONS_FETCH_MAX_WORKERS', 1))
+# If set, the page size to request when listing a learner's transactions, e.g. the maximum the subsidy service allows.
+SUBSIDY_TRANSACTIONS_PAGE_SIZE = int(os.environ.get('SUBSIDY_TRANSACTIONS_PAGE_SIZE', 0)) or None
+
+# Concurrent cache misses of the same remote data are coalesced into a single upstream fetch.
+# The fetching worker holds a lock for at most SINGLE_FLIGHT_LOCK_TIMEOUT seconds, and the other
+# workers wait at most SINGLE_FLIGHT_WAIT_TIMEOUT seconds for its result before fetching it themselves.
+SINGLE_FLIGHT_LOCK_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_LOCK_TIMEOUT', 10))
+SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.environ.get('SINGLE_FLIGHT_WAIT_TIMEOUT', 1))
+
 # Allows broader modification of access policy records from django admin
 DJANGO_ADMIN_POLICY_SUPER_ADMIN = False
@@ -117,5 +117,7 @@ KAFKA_TOPICS = [
     ACCESS_POLICY_TOPIC_NAME,
     SUBSIDY_REDEMPTION_TOPIC_NAME,
 ]
+SUBSIDY_TRANSACTION_TOPIC_NAME = "subsidy-transaction-dev"
+SUBSIDY_TRANSACTION_DEAD_LETTER_TOPIC_NAME = "subsidy-transaction-dead-letter-dev"
 
 ################### End Kafka Related Settings ##############################
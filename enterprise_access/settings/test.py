@@ -23,6 +23,9 @@ results_dir = tempfile.TemporaryDirectory()
 CELERY_RESULT_BACKEND = f'file://{results_dir.name}'
 # END CELERY
 
+# Don't wait on held policy locks unless a test asks to.
+POLICY_LOCK_WAIT_TIMEOUT = 0
+
 ECOMMERCE_URL = 'http://ecommerce.example.com'
 LICENSE_MANAGER_URL = 'http://license-manager.example.com'
 LMS_URL = 'http://edx-platform.example.com'
@@ -60,4 +63,6 @@ KAFKA_TOPICS = [
     ACCESS_POLICY_TOPIC_NAME,
     SUBSIDY_REDEMPTION_TOPIC_NAME,
 ]
+SUBSIDY_TRANSACTION_TOPIC_NAME = "subsidy-transaction-test"
+SUBSIDY_TRANSACTION_DEAD_LETTER_TOPIC_NAME = "subsidy-transaction-dead-letter-test"
 ################### End Kafka Related Settings ##############################
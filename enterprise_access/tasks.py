@@ -3,9 +3,11 @@ Base task that includes retries for different error types.
 """
 
 from braze.exceptions import BrazeClientError
+from celery.signals import task_postrun, task_prerun
 from celery_utils.logged_task import LoggedTask
 from django.conf import settings
 from django.db import OperationalError
+from edx_django_utils.cache import RequestCache
 from requests.exceptions import ConnectionError as RequestsConnectionError
 from requests.exceptions import HTTPError
 from requests.exceptions import Timeout as RequestsTimeoutError
@@ -29,3 +31,13 @@ class LoggedTaskWithRetry(LoggedTask):  # pylint: disable=abstract-method
     retry_backoff = 5  # delay factor of 5 seconds
     # Add randomness to backoff delays to prevent all tasks in queue from executing simultaneously
     retry_jitter = True
+
+
+@task_prerun.connect
+@task_postrun.connect
+def clear_request_cache(**kwargs):
+    """
+    Gives each task run its own RequestCache, like a request gets from the RequestCacheMiddleware,
+    since nothing else clears it in a worker thread that runs one task after another.
+    """
+    RequestCache.clear_all_namespaces()
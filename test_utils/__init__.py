@@ -11,8 +11,10 @@ So this package is the place to put them.
 import json
 from unittest import mock
 
+from django.core.cache import cache as django_cache
 from django.test import TestCase
 from django.test.client import RequestFactory
+from edx_django_utils.cache import RequestCache
 from edx_rest_framework_extensions.auth.jwt.cookies import jwt_cookie_name
 from edx_rest_framework_extensions.auth.jwt.tests.utils import generate_jwt_token, generate_unversioned_payload
 from pytest import mark
@@ -134,6 +136,10 @@ class APITestWithMocks(APITest):
     """
     def setUp(self):
         super().setUp()
+        # Cached remote facts (e.g. subsidy records) must not leak between tests.
+        RequestCache.clear_all_namespaces()
+        django_cache.clear()
+
         self.disco_patcher = mock.patch('enterprise_access.apps.subsidy_request.tasks.DiscoveryApiClient')
         self.mock_discovery_client = self.disco_patcher.start()
         self.mock_discovery_client().get_course_data.return_value = {